@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from app.db.database import get_db
+from app.db.versioning import VersionConflict, versioned_update
+from app.api.deps import authorize_chapter
+from app.core.security import get_current_user
+from app.core.consistency_hub import consistency_hub
+from app.core.engine_registry import engine_registry
+from app.models.novel import Chapter
+from app.schemas.chapter import ChapterResponse, ChapterUpdate
+from app.services import revision_service
+
+router = APIRouter(
+    prefix="/chapters",
+    tags=["chapters"]
+)
+
+@router.put("/{chapter_id}", response_model=ChapterResponse)
+async def update_chapter(
+    chapter_id: int,
+    update: ChapterUpdate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    章のタイトル・説明・目標単語数を更新し、説明（アウトライン）を改訂履歴に記録する
+
+    version を指定した場合、他の編集者が先に更新していれば 409 と現在の章を返す
+    """
+    owner = authorize_chapter(db, chapter_id, current_user)
+    changes = update.dict(exclude_unset=True)
+    expected_version = changes.pop("version", None)
+
+    try:
+        chapter = versioned_update(db, Chapter, [Chapter.id == chapter_id], expected_version, changes)
+        if chapter is None:
+            raise HTTPException(status_code=404, detail="Chapter not found")
+        # アウトライン（説明）の履歴を同じトランザクションで記録する（変わっていなければ記録しない）
+        await revision_service.save_revision(
+            db, "chapter_outline", chapter_id, chapter.description, author_id=current_user.id
+        )
+        db.commit()
+        db.refresh(chapter)
+    except VersionConflict as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Chapter has been modified by another editor",
+                "version": e.current.version,
+                "current": jsonable_encoder(ChapterResponse.from_orm(e.current))
+            }
+        )
+
+    engine_registry.invalidate(str(owner.novel_id))
+    consistency_hub.notify_saved(str(owner.novel_id))
+    return chapter
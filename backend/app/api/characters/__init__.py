@@ -1,10 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+import asyncio
+from typing import Any, Dict, List, Optional
 import json
 import os
 from pydantic import BaseModel, validator
 from pathlib import Path
 
+from app.core.responses import DuplexNDJSONResponse
+from app.services.bulk_validation import validate_ndjson_stream
+
 # ルーターの初期化
 router = APIRouter()
 
@@ -16,7 +20,7 @@ class CharacterConfig(BaseModel):
     personality: Dict[str, str]
     relationships: Dict[str, str]
     background: str
-    attributes: Dict[str, any]
+    attributes: Dict[str, Any]
 
     class Config:
         schema_extra = {
@@ -83,12 +87,21 @@ def validate_character_data(character_data: dict) -> bool:
             detail=f"キャラクターデータが無効です: {str(e)}"
         )
 
-# グローバル変数としてテンプレートを保持
-character_templates = load_character_templates()
+# テンプレートは初回参照時（またはウォームアップ時）に読み込んで保持する
+_character_templates: Optional[Dict[str, CharacterConfig]] = None
+
+def warm_character_templates() -> Dict[str, CharacterConfig]:
+    """テンプレートを読み込んでキャッシュする（ウォームアップ用）"""
+    global _character_templates
+    if _character_templates is None:
+        _character_templates = load_character_templates()
+    return _character_templates
 
 # 依存性注入用の関数
 async def get_character_templates():
-    return character_templates
+    if _character_templates is not None:
+        return _character_templates
+    return await asyncio.to_thread(warm_character_templates)
 
 # エンドポイントの例
 @router.get("/templates")
@@ -101,4 +114,20 @@ async def get_templates(
 @router.post("/validate")
 async def validate_character(character_data: dict):
     """キャラクターデータを検証する"""
-    return {"valid": validate_character_data(character_data)}
\ No newline at end of file
+    return {"valid": validate_character_data(character_data)}
+
+@router.post("/validate/bulk")
+async def validate_characters_bulk(
+    request: Request,
+    errors_only: bool = Query(False, description="true の場合は不正なレコードの結果だけを返す")
+):
+    """
+    1 行 1 キャラクターの NDJSON を一括で検証する
+
+    結果は行ごとの {"line", "valid", "errors"} を入力と同じ順序で NDJSON で返し、
+    最後の行に件数・フィールドごとのエラー数・処理速度の集計（{"summary": ...}）を返す。
+    1 件目の不正なレコードで中断せず、レコードごとにすべてのエラーを集める
+    """
+    return DuplexNDJSONResponse(
+        validate_ndjson_stream(CharacterConfig, request.stream(), errors_only=errors_only)
+    )
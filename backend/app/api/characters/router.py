@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from typing import List, Optional
 from sqlalchemy.orm import Session
 
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
+from app.db.versioning import VersionConflict, versioned_update
+from app.models.character import Character as CharacterModel
 from app.services import character_service
 from app.schemas import character as character_schemas
+from app.api.deps import get_owned_novel
 from app.core.security import get_current_user
+from app.core.engine_registry import engine_registry
+from app.core.responses import FastJSONResponse, NDJSONResponse, serialize_many, wants_ndjson
 
 router = APIRouter(
     prefix="/characters",
@@ -29,7 +35,7 @@ async def create_character(
 @router.get("/{character_id}", response_model=character_schemas.Character)
 async def get_character(
     character_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
     """
@@ -59,7 +65,20 @@ async def update_character(
         raise HTTPException(status_code=403, detail="Not authorized to update this character")
     
     try:
+        # バージョンの検査と更新を 1 文で行い、以降の変更を同じトランザクションで適用する
+        versioned_update(
+            db, CharacterModel, [CharacterModel.id == character_id], character_update.version, {}
+        )
         return await character_service.update_character(db, character_id, character_update)
+    except VersionConflict as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Character has been modified by another editor",
+                "current": jsonable_encoder(character_schemas.Character.from_orm(e.current))
+            }
+        )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -81,17 +100,76 @@ async def delete_character(
     await character_service.delete_character(db, character_id)
     return {"message": "Character successfully deleted"}
 
+# NDJSON で返す際に 1 回のフェッチで読み込む行数
+STREAM_BATCH_SIZE = 500
+
 @router.get("/list/{novel_id}", response_model=List[character_schemas.Character])
 async def list_characters(
     novel_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    format: Optional[str] = Query(None, regex="^(json|ndjson)$", description="ndjson を指定すると 1 行 1 キャラクターで逐次返す"),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
     """
     指定された小説に関連するすべてのキャラクターを取得する
+    ORM オブジェクトはモデルの再検証を行わずにシリアライズする
+    Accept: application/x-ndjson または format=ndjson の場合は全件を読み込まずに逐次返す
     """
+    if wants_ndjson(request, format):
+        query = db.query(CharacterModel).filter(
+            CharacterModel.novel_id == novel_id,
+            CharacterModel.user_id == current_user.id
+        ).order_by(CharacterModel.id)
+        return NDJSONResponse(query.yield_per(STREAM_BATCH_SIZE), character_schemas.Character)
+
     try:
         characters = await character_service.get_characters_by_novel(db, novel_id, current_user.id)
-        return characters
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(serialize_many(characters, character_schemas.Character))
+
+@router.get("/engine/{novel_id}/{character_id}/similar", dependencies=[Depends(get_owned_novel)])
+async def find_similar_characters(
+    novel_id: int,
+    character_id: str,
+    k: int = Query(5, ge=1, le=100),
+    metric: str = Query("cosine", regex="^(cosine|euclidean)$")
+):
+    """
+    パーソナリティが似ているキャラクターを取得する
+    """
+    engines = await engine_registry.get(str(novel_id))
+    try:
+        return engines.characters.find_similar_characters(character_id, k=k, metric=metric)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/engine/{novel_id}/duplicates", dependencies=[Depends(get_owned_novel)])
+async def find_near_duplicate_characters(
+    novel_id: int,
+    threshold: float = Query(0.95, description="cosine では類似度の下限、euclidean では距離の上限"),
+    metric: str = Query("cosine", regex="^(cosine|euclidean)$")
+):
+    """
+    パーソナリティがほぼ同じキャラクターの組を取得する
+    """
+    engines = await engine_registry.get(str(novel_id))
+    return engines.characters.find_near_duplicate_characters(threshold=threshold, metric=metric)
+
+@router.get("/engine/{novel_id}/layout", dependencies=[Depends(get_owned_novel)])
+async def get_relationship_layout(
+    novel_id: int,
+    method: str = Query("force", regex="^(force|stress)$", description="force（力学モデル）または stress（PivotMDS）"),
+    encoding: str = Query("json", regex="^(json|base64)$", description="座標の形式（base64 は float32 の配列）")
+):
+    """
+    関係性グラフのレイアウト（座標）を取得する
+
+    座標は ids と同じ順の [x0, y0, x1, y1, ...]（[-1, 1] に正規化）で、辺は ids の
+    添字の組の平坦な配列で返す。グラフは character_relationships（強さは
+    relationships.intensity）から作り、変わっていなければ計算済みの結果を返す
+    """
+    engines = await engine_registry.get(str(novel_id))
+    layout = await engines.characters.get_relationship_layout(method)
+    return layout.to_payload(encoding)
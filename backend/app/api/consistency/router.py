@@ -0,0 +1,191 @@
+import asyncio
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from typing import List
+from sqlalchemy.orm import Session
+
+from app.db.database import ReadSessionLocal, get_db, get_read_db
+from app.api.deps import authorize_novel, get_owned_novel
+from app.core.security import get_current_user
+from app.core.consistency_hub import HubFull, analyze_novel, consistency_hub
+from app.core.engine_registry import engine_registry
+from app.schemas.consistency import (
+    ConsistencyDelta, ConsistencyRunResult, ConsistencyRunSummary, ConsistencySnapshot
+)
+from app.services import consistency_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/consistency",
+    tags=["consistency"]
+)
+
+def _authorize_stream(novel_id: int, current_user) -> bool:
+    """WebSocket の接続前に所有者を確認する（接続中はセッションを保持しない）"""
+    db = ReadSessionLocal()
+    try:
+        authorize_novel(db, novel_id, current_user)
+        return True
+    except HTTPException:
+        return False
+    finally:
+        db.close()
+
+@router.websocket("/ws/novels/{novel_id}")
+async def consistency_stream(
+    websocket: WebSocket,
+    novel_id: int,
+    current_user = Depends(get_current_user)
+):
+    """
+    小説の整合性チェック結果を WebSocket で配信する
+
+    接続直後に全件のスナップショット、以降は保存のたびに差分
+    （added / resolved / changed）を送る。クライアントから "resync" を
+    送るとスナップショットを再送する。
+    """
+    if not _authorize_stream(novel_id, current_user):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    try:
+        subscriber = consistency_hub.subscribe(str(novel_id))
+    except HubFull:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    await websocket.accept()
+
+    async def send_updates() -> None:
+        while True:
+            message = await consistency_hub.next_message(subscriber)
+            await websocket.send_json(message)
+
+    async def receive_commands() -> None:
+        while True:
+            command = await websocket.receive_text()
+            if command == "resync":
+                subscriber.needs_snapshot = True
+                if subscriber.queue.empty():
+                    subscriber.queue.put_nowait({"type": "resync"})
+
+    sender = asyncio.create_task(send_updates())
+    receiver = asyncio.create_task(receive_commands())
+    try:
+        done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            # 切断は正常な終了として扱う
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                logger.warning(f"Consistency stream for novel {novel_id} closed: {str(error)}")
+    finally:
+        sender.cancel()
+        receiver.cancel()
+        consistency_hub.unsubscribe(subscriber)
+
+@router.post("/novels/{novel_id}/notify", dependencies=[Depends(get_owned_novel)])
+async def notify_saved(novel_id: int):
+    """
+    保存を通知し、購読者がいれば整合性チェックを予約する
+    """
+    consistency_hub.notify_saved(str(novel_id))
+    return {"novel_id": novel_id, "scheduled": True}
+
+@router.get("/novels/{novel_id}", dependencies=[Depends(get_owned_novel)])
+async def get_consistency_report(novel_id: int):
+    """
+    小説の整合性チェックを実行し、検出された問題の一覧を取得する
+    """
+    issues = await analyze_novel(str(novel_id))
+    return {"novel_id": novel_id, "issues": list(issues.values())}
+
+@router.post(
+    "/novels/{novel_id}/runs",
+    response_model=ConsistencyRunResult,
+    dependencies=[Depends(get_owned_novel)]
+)
+async def create_consistency_run(
+    novel_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    整合性チェックを実行して結果を保存する
+
+    前回の実行から問題が変わっていない場合は新しい実行を作らず、最新の実行を返す。
+    変化した問題は GET /novels/{novel_id}/delta?since=<前回の実行ID> で取得する
+    """
+    issues = await analyze_novel(str(novel_id))
+    run, created = await consistency_service.record_run(db, novel_id, issues)
+    db.commit()
+    return ConsistencyRunResult(run=ConsistencyRunSummary.from_orm(run), created=created)
+
+@router.get(
+    "/novels/{novel_id}/runs",
+    response_model=List[ConsistencyRunSummary],
+    dependencies=[Depends(get_owned_novel)]
+)
+async def list_consistency_runs(
+    novel_id: int,
+    limit: int = Query(50, ge=1, le=consistency_service.KEEP_RUNS),
+    db: Session = Depends(get_read_db)
+):
+    """
+    整合性チェックの実行の履歴を新しい順に取得する
+    """
+    return await consistency_service.list_runs(db, novel_id, limit)
+
+@router.get(
+    "/novels/{novel_id}/runs/latest",
+    response_model=ConsistencySnapshot,
+    dependencies=[Depends(get_owned_novel)]
+)
+async def get_latest_consistency_run(
+    novel_id: int,
+    db: Session = Depends(get_read_db)
+):
+    """
+    最新の実行時点の問題を全件取得する（差分を適用する前の初回読み込み用）
+    """
+    snapshot = await consistency_service.get_snapshot(db, novel_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Consistency check has not been run")
+    return ConsistencySnapshot(novel_id=novel_id, **snapshot)
+
+@router.get(
+    "/novels/{novel_id}/delta",
+    response_model=ConsistencyDelta,
+    dependencies=[Depends(get_owned_novel)]
+)
+async def get_consistency_delta(
+    novel_id: int,
+    since: int = Query(..., description="クライアントが最後に受け取った実行ID"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    指定した実行から最新の実行までに追加・解消・変更された問題だけを取得する
+
+    指定した実行が削除済み（または存在しない）場合は 410 を返すので、
+    GET /novels/{novel_id}/runs/latest で全件を取得し直す
+    """
+    try:
+        delta = await consistency_service.get_delta(db, novel_id, since)
+    except consistency_service.RunExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    return ConsistencyDelta(novel_id=novel_id, **delta)
+
+@router.get("/novels/{novel_id}/rules/{rule_name}/impact", dependencies=[Depends(get_owned_novel)])
+async def get_rule_impact(
+    novel_id: int,
+    rule_name: str
+):
+    """
+    世界観ルールを変更した場合に影響を受ける章を取得する
+    """
+    engines = await engine_registry.get(str(novel_id))
+    if engines.novel.structure is None:
+        raise HTTPException(status_code=404, detail="Story structure has not been loaded")
+    try:
+        return engines.novel.analyze_rule_impact(rule_name)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
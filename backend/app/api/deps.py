@@ -0,0 +1,74 @@
+"""
+ルーター間で共有する依存関係
+
+小説・章・シーンの所有者の確認をまとめる。対象が存在しない場合は 404、
+所有者でない場合は 403 を返す。
+"""
+
+from fastapi import Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.security import get_current_user
+from app.db.database import get_read_db
+from app.models.novel import Chapter, Novel, Scene
+
+
+def authorize_novel(db: Session, novel_id: int, current_user):
+    """
+    小説の所有者を確認する
+
+    Returns:
+        小説の (id, author_id)
+
+    Raises:
+        HTTPException: 小説が存在しない（404）・所有者でない（403）場合
+    """
+    novel = db.query(Novel.id, Novel.author_id).filter(Novel.id == novel_id).first()
+    if not novel:
+        raise HTTPException(status_code=404, detail="Novel not found")
+    if novel.author_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this novel")
+    return novel
+
+
+def authorize_chapter(db: Session, chapter_id: int, current_user):
+    """
+    章が属する小説の所有者を確認する
+
+    Returns:
+        章の (novel_id, author_id)
+    """
+    owner = db.query(Chapter.novel_id, Novel.author_id).join(
+        Novel, Novel.id == Chapter.novel_id
+    ).filter(Chapter.id == chapter_id).first()
+    if not owner:
+        raise HTTPException(status_code=404, detail="Chapter not found")
+    if owner.author_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this chapter")
+    return owner
+
+
+def authorize_scene(db: Session, scene_id: int, current_user):
+    """
+    シーンが属する小説の所有者を確認する
+
+    Returns:
+        シーンの (novel_id, author_id)
+    """
+    owner = db.query(Chapter.novel_id, Novel.author_id).join(
+        Scene, Scene.chapter_id == Chapter.id
+    ).join(Novel, Novel.id == Chapter.novel_id).filter(Scene.id == scene_id).first()
+    if not owner:
+        raise HTTPException(status_code=404, detail="Scene not found")
+    if owner.author_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this scene")
+    return owner
+
+
+def get_owned_novel(
+    novel_id: int,
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """パスの novel_id の小説を所有者だけに許可する依存関係（小説の (id, author_id) を返す）"""
+    return authorize_novel(db, novel_id, current_user)
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict, Optional
+import asyncio
+from sqlalchemy.orm import Session
+
+from app.db.database import ReadSessionLocal, get_read_db
+from app.services import character_service, dialogue_service
+from app.api.deps import get_owned_novel
+from app.core.security import get_current_user
+from app.core.dialogue_engine import get_dialogue_engine
+
+router = APIRouter(
+    prefix="/dialogue",
+    tags=["dialogue"]
+)
+
+@router.get("/novels/{novel_id}", dependencies=[Depends(get_owned_novel)])
+async def get_dialogue_report(
+    novel_id: int,
+    chapter_id: Optional[int] = None,
+    include_chapters: bool = False,
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    作品全体（または指定章）の話者別台詞統計を取得する
+    前回から変更されたシーンだけを再解析する（解析はスレッドで行う）
+    """
+    try:
+        characters = await character_service.get_characters_by_novel(db, novel_id, current_user.id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    engine = get_dialogue_engine(str(novel_id))
+
+    def build_report() -> Dict:
+        with engine.lock:
+            dialogue_service.sync_dialogue_engine(ReadSessionLocal, novel_id, engine, characters)
+            if chapter_id is not None:
+                return {"chapter_id": chapter_id, "characters": engine.chapter_report(str(chapter_id))}
+            return engine.novel_report(include_chapters=include_chapters)
+
+    return await asyncio.to_thread(build_report)
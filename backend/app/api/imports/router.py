@@ -0,0 +1,118 @@
+import io
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
+from typing import Optional
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.db.database import get_read_db, SessionLocal
+from app.api.deps import authorize_novel, get_owned_novel
+from app.core.security import get_current_user
+from app.core.consistency_hub import consistency_hub
+from app.core.engine_registry import engine_registry
+from app.schemas.imports import ImportJobStatus
+from app.services.manuscript_import import (
+    BoundaryRules,
+    ImportJob,
+    get_word_count_executor,
+    import_jobs,
+    import_manuscript
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/imports",
+    tags=["imports"]
+)
+
+# この大きさを超える原稿の単語数はプロセスプールで計算する
+POOL_THRESHOLD_BYTES = 2 * 1024 * 1024
+
+def _spool_upload(upload: UploadFile) -> str:
+    """アップロードされたファイルを一時ファイルに書き出す（メモリに全体を載せない）"""
+    fd, path = tempfile.mkstemp(prefix="novelspec-import-", suffix=".txt")
+    with os.fdopen(fd, "wb") as out:
+        shutil.copyfileobj(upload.file, out, length=1024 * 1024)
+    return path
+
+def _run_import(path: str, job: ImportJob, rules: BoundaryRules) -> None:
+    """取り込みを実行する（準備中の失敗もジョブの失敗として記録し、例外は送出しない）"""
+    db = None
+    try:
+        db = SessionLocal()
+        executor = get_word_count_executor() if job.total_bytes > POOL_THRESHOLD_BYTES else None
+        with io.open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as stream:
+            import_manuscript(db, job.novel_id, stream, job, rules=rules, executor=executor)
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        job.finished_at = time.time()
+        logger.error(f"Manuscript import {job.id} could not be started: {str(e)}")
+    finally:
+        if db is not None:
+            db.close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+@router.post(
+    "/novels/{novel_id}",
+    response_model=ImportJobStatus,
+    status_code=202,
+    dependencies=[Depends(get_owned_novel)]
+)
+async def start_import(
+    novel_id: int,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="プレーンテキストまたは Markdown の原稿（UTF-8）"),
+    chapter_pattern: Optional[str] = Form(None, description="章見出しの正規表現"),
+    scene_pattern: Optional[str] = Form(None, description="シーン見出しの正規表現"),
+    separator_pattern: Optional[str] = Form(None, description="シーン区切り行の正規表現")
+):
+    """
+    原稿ファイルを取り込み、章とシーンを既存の章の後ろに追加する
+
+    取り込みはバックグラウンドで行い、進捗は GET /imports/{job_id} で確認する
+    """
+    try:
+        rules = BoundaryRules.from_patterns(chapter_pattern, scene_pattern, separator_pattern)
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid boundary pattern: {str(e)}")
+
+    path = await run_in_threadpool(_spool_upload, file)
+    job = import_jobs.create(novel_id, os.path.getsize(path))
+
+    async def run() -> None:
+        await run_in_threadpool(_run_import, path, job, rules)
+        if job.status == "completed":
+            engine_registry.invalidate(str(novel_id))
+            consistency_hub.notify_saved(str(novel_id))
+
+    background_tasks.add_task(run)
+    return job.to_dict()
+
+@router.get("/{job_id}", response_model=ImportJobStatus)
+async def get_import_status(
+    job_id: str,
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    原稿取り込みジョブの進捗を取得する
+    """
+    job = import_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    try:
+        authorize_novel(db, job.novel_id, current_user)
+    except HTTPException:
+        # 他のユーザーのジョブの存在は明かさない
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.to_dict()
@@ -1,11 +1,12 @@
 from fastapi import APIRouter
-from typing import Dict, List, Optional
-import yaml
+from typing import TYPE_CHECKING, Dict, List, Optional
 import os
 from pathlib import Path
 
-from app.core.novel_engine import NovelEngine
-from app.core.markdown_processor import MarkdownProcessor
+# yaml・エンジン・Markdown処理は初期化時に読み込む（起動時間短縮のため）
+if TYPE_CHECKING:
+    from app.core.novel_engine import NovelEngine
+    from app.core.markdown_processor import MarkdownProcessor
 
 # APIルーターの初期化
 router = APIRouter()
@@ -16,11 +17,13 @@ class NovelConfig:
     def __init__(self):
         self.templates_path = Path("app/templates/novels")
         self.config: Dict = {}
-        self.engine: Optional[NovelEngine] = None
-        self.markdown_processor: Optional[MarkdownProcessor] = None
+        self.engine: Optional["NovelEngine"] = None
+        self.markdown_processor: Optional["MarkdownProcessor"] = None
 
     def load_config(self, config_path: str) -> Dict:
         """設定ファイルを読み込む"""
+        import yaml
+
         try:
             with open(config_path, 'r', encoding='utf-8') as f:
                 self.config = yaml.safe_load(f)
@@ -30,6 +33,9 @@ class NovelConfig:
 
     def initialize_engine(self) -> None:
         """NovelEngineの初期化"""
+        from app.core.novel_engine import NovelEngine
+        from app.core.markdown_processor import MarkdownProcessor
+
         self.engine = NovelEngine(self.config)
         self.markdown_processor = MarkdownProcessor()
 
@@ -39,6 +45,8 @@ def load_novel_templates() -> List[Dict]:
     Returns:
         List[Dict]: テンプレート情報のリスト
     """
+    import yaml
+
     template_path = Path("app/templates/novels")
     templates = []
     
@@ -88,11 +96,34 @@ def initialize_novel_system() -> NovelConfig:
     except Exception as e:
         raise Exception(f"Failed to initialize novel system: {str(e)}")
 
-# エンドポイントのインポート
-from .endpoints import plots, characters, chapters, world_building
+_novel_system: Optional[NovelConfig] = None
+
+def get_novel_system() -> NovelConfig:
+    """
+    初期化済みの小説システムを返す（未初期化なら初期化する）
+    Returns:
+        NovelConfig: 初期化された小説設定オブジェクト
+    """
+    global _novel_system
+    if _novel_system is None:
+        _novel_system = initialize_novel_system()
+    return _novel_system
+
+def include_endpoint_routers() -> APIRouter:
+    """
+    エンドポイントモジュールを読み込み、ルーターに登録する
+    パッケージのインポート時ではなくアプリケーション組み立て時に呼び出す
+    Returns:
+        APIRouter: エンドポイント登録済みのルーター
+    """
+    if router.routes:
+        return router
+
+    from .endpoints import plots, characters, chapters, world_building
 
-# ルーターにエンドポイントを登録
-router.include_router(plots.router, prefix="/plots", tags=["plots"])
-router.include_router(characters.router, prefix="/characters", tags=["characters"])
-router.include_router(chapters.router, prefix="/chapters", tags=["chapters"])
-router.include_router(world_building.router, prefix="/world-building", tags=["world-building"])
\ No newline at end of file
+    # ルーターにエンドポイントを登録
+    router.include_router(plots.router, prefix="/plots", tags=["plots"])
+    router.include_router(characters.router, prefix="/characters", tags=["characters"])
+    router.include_router(chapters.router, prefix="/chapters", tags=["chapters"])
+    router.include_router(world_building.router, prefix="/world-building", tags=["world-building"])
+    return router
\ No newline at end of file
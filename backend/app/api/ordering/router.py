@@ -0,0 +1,119 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from typing import Optional, Set, Tuple
+from sqlalchemy.orm import Session
+
+from app.db.database import get_db
+from app.api.deps import get_owned_novel
+from app.core.consistency_hub import consistency_hub
+from app.core.engine_registry import engine_registry
+from app.core.ordering import OrderingError, key_between, needs_rebalance
+from app.models.novel import Chapter, Scene
+from app.services.ordering_service import (
+    Container, container_query, ensure_keys, model_for, rebalance_in_background
+)
+from app.schemas.ordering import MoveItem, MovedItem, ReorderRequest, ReorderResponse
+
+router = APIRouter(
+    prefix="/novels",
+    tags=["ordering"]
+)
+
+def _neighbour_keys(db: Session, container: Container, move: MoveItem) -> Tuple[Optional[str], Optional[str]]:
+    """移動先の前後の要素の並び順キーを取得する"""
+    model = model_for(container[0])
+    query = container_query(db, container).filter(model.id != move.id)
+
+    def key_of(item_id: int) -> str:
+        item = query.filter(model.id == item_id).with_entities(model.sort_key).first()
+        if item is None:
+            raise HTTPException(status_code=400, detail=f"{container[0]} {item_id} is not in the target list")
+        if item.sort_key is None:
+            raise HTTPException(status_code=409, detail=f"{container[0]} {item_id} has no ordering key yet")
+        return item.sort_key
+
+    after_key = key_of(move.after_id) if move.after_id is not None else None
+    before_key = key_of(move.before_id) if move.before_id is not None else None
+
+    if move.before_id is None:
+        # after の直後（after がなければ先頭）の要素を探す
+        following = query.filter(model.sort_key.isnot(None))
+        if after_key is not None:
+            following = following.filter(model.sort_key > after_key)
+        row = following.order_by(model.sort_key).with_entities(model.sort_key).first()
+        before_key = row.sort_key if row else None
+    elif move.after_id is None:
+        row = query.filter(model.sort_key < before_key).order_by(
+            model.sort_key.desc()
+        ).with_entities(model.sort_key).first()
+        after_key = row.sort_key if row else None
+
+    return after_key, before_key
+
+@router.post("/{novel_id}/reorder", response_model=ReorderResponse, dependencies=[Depends(get_owned_novel)])
+async def reorder(
+    novel_id: int,
+    request: ReorderRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """
+    章・シーンを一括で並べ替える
+
+    移動ごとに移動する行の並び順キーだけを 1 文で更新する。
+    キーが長くなった一覧はレスポンス後にバックグラウンドで振り直す。
+    """
+    chapter_ids = {
+        row.id for row in db.query(Chapter.id).filter(Chapter.novel_id == novel_id)
+    }
+    moved = []
+    to_rebalance: Set[Container] = set()
+
+    try:
+        for move in request.moves:
+            if move.kind == "chapter":
+                if move.id not in chapter_ids:
+                    raise HTTPException(status_code=404, detail=f"Chapter {move.id} not found")
+                container: Container = ("chapter", novel_id)
+                values = {}
+            else:
+                scene = db.query(Scene.chapter_id).filter(
+                    Scene.id == move.id, Scene.chapter_id.in_(chapter_ids)
+                ).first()
+                if scene is None:
+                    raise HTTPException(status_code=404, detail=f"Scene {move.id} not found")
+                target_chapter = move.chapter_id or scene.chapter_id
+                if target_chapter not in chapter_ids:
+                    raise HTTPException(status_code=404, detail=f"Chapter {target_chapter} not found")
+                container = ("scene", target_chapter)
+                values = {"chapter_id": target_chapter}
+
+            ensure_keys(db, container)
+            after_key, before_key = _neighbour_keys(db, container, move)
+            try:
+                new_key = key_between(after_key, before_key)
+            except OrderingError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+            model = model_for(move.kind)
+            db.query(model).filter(model.id == move.id).update(
+                {**values, "sort_key": new_key}, synchronize_session=False
+            )
+            moved.append(MovedItem(
+                kind=move.kind, id=move.id, sort_key=new_key, chapter_id=values.get("chapter_id")
+            ))
+            if needs_rebalance(new_key):
+                to_rebalance.add(container)
+
+        db.commit()
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"並べ替え中にエラーが発生しました: {str(e)}")
+
+    engine_registry.invalidate(str(novel_id))
+    consistency_hub.notify_saved(str(novel_id))
+    if to_rebalance:
+        background_tasks.add_task(rebalance_in_background, to_rebalance)
+    return ReorderResponse(moved=moved, rebalance_scheduled=bool(to_rebalance))
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from sqlalchemy.orm import Session
+
+from app.db.database import get_read_db
+from app.services import overview_service
+from app.services.overview_service import OverviewFieldError, overview_cache
+from app.schemas.novel import NovelOverview
+from app.api.deps import get_owned_novel
+from app.core.security import get_current_user
+from app.core.responses import FastJSONResponse
+
+router = APIRouter(
+    prefix="/novels",
+    tags=["overview"]
+)
+
+@router.get(
+    "/{novel_id}/overview",
+    # FastJSONResponse をそのまま返すため、スキーマはドキュメントにだけ使う
+    responses={200: {"model": NovelOverview}},
+    dependencies=[Depends(get_owned_novel)]
+)
+async def get_novel_overview(
+    novel_id: int,
+    include: Optional[str] = Query(None, description="カンマ区切りの項目（novel, characters, world, chapters, progress）"),
+    fields: Optional[str] = Query(None, description="カンマ区切りの '項目.フィールド'（例: chapters.title,chapters.scene_count）"),
+    cached: bool = Query(False, description="有効なキャッシュがあれば使う"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    ダッシュボードに必要な小説・キャラクター・世界観・章の集計・進捗をまとめて取得する
+
+    各項目は別々のセッションで同時に取得する。取得に失敗した項目は null になり、
+    理由を errors に含める。
+    """
+    try:
+        sections, selected = overview_service.parse_selection(include, fields)
+    except OverviewFieldError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    fingerprint = None
+    if cached:
+        fingerprint = overview_service.overview_fingerprint(db, novel_id)
+        overview = overview_cache.get(novel_id, sections, selected, fingerprint)
+        if overview is not None:
+            return FastJSONResponse({**overview, "cached": True})
+
+    overview = await overview_service.build_overview(novel_id, current_user.id, sections, selected)
+    if cached and "errors" not in overview:
+        overview_cache.put(novel_id, sections, selected, fingerprint, overview)
+    return FastJSONResponse({**overview, "cached": False})
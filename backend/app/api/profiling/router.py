@@ -0,0 +1,89 @@
+import hmac
+from fastapi import APIRouter, Header, HTTPException, Depends
+from fastapi.responses import FileResponse, PlainTextResponse
+from typing import List, Optional
+
+from app.core.profiling import (
+    ProfileStore,
+    get_profile_store,
+    get_profiling_admin_token,
+    to_collapsed_stacks
+)
+
+router = APIRouter(
+    prefix="/profiling",
+    tags=["profiling"]
+)
+
+async def require_profiling_admin(
+    x_novelspec_profile: Optional[str] = Header(None)
+) -> None:
+    """
+    管理者トークンを検証する
+    """
+    token = get_profiling_admin_token()
+    if not token:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not x_novelspec_profile or not hmac.compare_digest(x_novelspec_profile, token):
+        raise HTTPException(status_code=403, detail="Not authorized to access profiles")
+
+@router.get("/profiles", dependencies=[Depends(require_profiling_admin)])
+async def list_profiles(store: ProfileStore = Depends(get_profile_store)) -> List[dict]:
+    """
+    保存済みプロファイルの一覧を取得する
+    """
+    return [record.__dict__ for record in store.list()]
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_profiling_admin)])
+async def download_profile(
+    profile_id: str,
+    format: str = "pstats",
+    store: ProfileStore = Depends(get_profile_store)
+):
+    """
+    プロファイルをダウンロードする
+
+    format=pstats で pstats バイナリ、format=collapsed で flamegraph 互換の
+    collapsed stack テキストを返す
+    """
+    stats_path = store.stats_path(profile_id)
+    if stats_path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    if format == "pstats":
+        return FileResponse(
+            stats_path,
+            media_type="application/octet-stream",
+            filename=f"{profile_id}.pstats"
+        )
+    if format == "collapsed":
+        return PlainTextResponse(
+            to_collapsed_stacks(stats_path),
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.collapsed"'}
+        )
+    raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+
+@router.delete("/profiles/{profile_id}", dependencies=[Depends(require_profiling_admin)])
+async def delete_profile(profile_id: str, store: ProfileStore = Depends(get_profile_store)):
+    """
+    プロファイルを削除する
+    """
+    if not store.delete(profile_id):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return {"message": "Profile successfully deleted"}
+
+@router.put("/users/{user_id}", dependencies=[Depends(require_profiling_admin)])
+async def enable_user_profiling(user_id: str, store: ProfileStore = Depends(get_profile_store)):
+    """
+    指定ユーザーのリクエストを計測対象にする
+    """
+    store.enabled_users.add(user_id)
+    return {"user_id": user_id, "enabled": True}
+
+@router.delete("/users/{user_id}", dependencies=[Depends(require_profiling_admin)])
+async def disable_user_profiling(user_id: str, store: ProfileStore = Depends(get_profile_store)):
+    """
+    指定ユーザーのリクエストを計測対象から外す
+    """
+    store.enabled_users.discard(user_id)
+    return {"user_id": user_id, "enabled": False}
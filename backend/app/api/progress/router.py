@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List
+from sqlalchemy.orm import Session
+
+from app.db.database import get_read_db
+from app.services import progress_service
+from app.schemas import progress as progress_schemas
+from app.api.deps import get_owned_novel
+
+router = APIRouter(
+    prefix="/progress",
+    tags=["progress"]
+)
+
+@router.get(
+    "/novels/{novel_id}",
+    response_model=progress_schemas.ProgressDashboard,
+    dependencies=[Depends(get_owned_novel)]
+)
+async def get_progress_dashboard(
+    novel_id: int,
+    window_days: int = Query(14, ge=1, le=365),
+    db: Session = Depends(get_read_db)
+):
+    """
+    執筆速度・目標到達までの日数・連続執筆日数などを取得する
+    """
+    return await progress_service.get_progress_dashboard(db, novel_id, window_days=window_days)
+
+@router.get(
+    "/novels/{novel_id}/chapters",
+    response_model=List[progress_schemas.ChapterProgressEntry],
+    dependencies=[Depends(get_owned_novel)]
+)
+async def get_chapter_progress(
+    novel_id: int,
+    db: Session = Depends(get_read_db)
+):
+    """
+    章ごとの進捗を取得する
+    """
+    return await progress_service.get_chapter_progress(db, novel_id)
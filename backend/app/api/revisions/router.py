@@ -0,0 +1,126 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
+from sqlalchemy.orm import Session
+
+from app.db.database import get_db, get_read_db
+from app.api.deps import authorize_chapter, authorize_scene
+from app.core.security import get_current_user
+from app.schemas import revision as revision_schemas
+from app.services import revision_service
+from app.services.revision_service import RetentionPolicy
+
+router = APIRouter(
+    prefix="/revisions",
+    tags=["revisions"]
+)
+
+def _authorize(db: Session, entity_type: str, entity_id: int, current_user) -> None:
+    """改訂の対象（シーンまたは章）の所有者を確認する"""
+    if entity_type not in revision_service.ENTITY_TYPES:
+        raise HTTPException(status_code=404, detail=f"Unknown revision target: {entity_type}")
+    if entity_type == "scene":
+        authorize_scene(db, entity_id, current_user)
+    else:
+        authorize_chapter(db, entity_id, current_user)
+
+@router.get("/{entity_type}/{entity_id}", response_model=List[revision_schemas.RevisionSummary])
+async def list_revisions(
+    entity_type: str,
+    entity_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    before: Optional[int] = Query(None, description="この番号より前の改訂を返す（ページング用）"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    改訂の一覧を新しい順に取得する（本文は含まない）
+    """
+    _authorize(db, entity_type, entity_id, current_user)
+    return await revision_service.list_revisions(db, entity_type, entity_id, limit=limit, before=before)
+
+@router.post("/{entity_type}/{entity_id}", response_model=revision_schemas.RevisionSummary)
+async def create_revision(
+    entity_type: str,
+    entity_id: int,
+    revision: revision_schemas.RevisionCreate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    改訂を手動で保存する（名前付きの版など）
+
+    content を省略した場合は、現在保存されているシーンの本文・章のアウトラインを記録する
+    """
+    _authorize(db, entity_type, entity_id, current_user)
+    content = revision.content
+    if content is None:
+        content = revision_service.stored_content(db, entity_type, entity_id)
+    saved = await revision_service.save_revision(
+        db, entity_type, entity_id, content,
+        author_id=current_user.id, label=revision.label
+    )
+    if saved is None:
+        raise HTTPException(status_code=409, detail="Content is identical to the latest revision")
+    db.commit()
+    return revision_schemas.RevisionSummary(
+        number=saved.number, size=saved.size, word_count=saved.word_count,
+        label=saved.label, author_id=saved.author_id, created_at=saved.created_at
+    )
+
+@router.get("/{entity_type}/{entity_id}/diff", response_model=revision_schemas.RevisionDiff)
+async def diff_revisions(
+    entity_type: str,
+    entity_id: int,
+    from_number: int = Query(..., alias="from"),
+    to_number: int = Query(..., alias="to"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    2 つの改訂の差分を取得する
+    """
+    _authorize(db, entity_type, entity_id, current_user)
+    diff = await revision_service.diff_revisions(db, entity_type, entity_id, from_number, to_number)
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return diff
+
+@router.post("/{entity_type}/{entity_id}/retention", response_model=revision_schemas.RetentionResult)
+async def apply_retention(
+    entity_type: str,
+    entity_id: int,
+    request: revision_schemas.RetentionRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    保持方針に従って古い改訂を削除する
+    """
+    _authorize(db, entity_type, entity_id, current_user)
+    policy = RetentionPolicy(
+        keep_last=request.keep_last,
+        keep_daily_days=request.keep_daily_days,
+        keep_labeled=request.keep_labeled
+    )
+    deleted = await revision_service.apply_retention(db, entity_type, entity_id, policy)
+    db.commit()
+    stats = await revision_service.get_storage_stats(db, entity_type, entity_id)
+    return {"deleted": deleted, **stats}
+
+@router.get("/{entity_type}/{entity_id}/{number}", response_model=revision_schemas.RevisionContent)
+async def get_revision(
+    entity_type: str,
+    entity_id: int,
+    number: int,
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    改訂の本文を取得する
+    """
+    _authorize(db, entity_type, entity_id, current_user)
+    revisions = await revision_service.list_revisions(db, entity_type, entity_id, limit=1, before=number + 1)
+    if not revisions or revisions[0]["number"] != number:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    content = await revision_service.get_revision_content(db, entity_type, entity_id, number)
+    return {**revisions[0], "content": content}
@@ -0,0 +1,146 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from app.db.database import get_db, get_read_db
+from app.db.versioning import VersionConflict, versioned_update
+from app.api.deps import authorize_scene
+from app.core.security import get_current_user
+from app.core.consistency_hub import consistency_hub
+from app.core.engine_registry import engine_registry
+from app.models.novel import Scene
+from app.schemas.scene import (
+    SceneAutosaveResult, SceneContentUpdate, SceneFlushResult, SceneSaveResult, SceneState, SceneTimeUpdate,
+    SceneTimeResult
+)
+from app.services import progress_service, revision_service, timeline_service
+from app.services.autosave_service import AutosaveConflict, autosave_buffer
+
+router = APIRouter(
+    prefix="/scenes",
+    tags=["scenes"]
+)
+
+def _conflict(e: VersionConflict) -> HTTPException:
+    """競合の 409 レスポンス（現在のシーンを添える）"""
+    return HTTPException(
+        status_code=409,
+        detail={
+            "message": "Scene has been modified by another editor",
+            "version": e.current.version,
+            "current": jsonable_encoder(SceneState.from_orm(e.current))
+        }
+    )
+
+@router.put("/{scene_id}/content", response_model=SceneSaveResult)
+async def save_scene_content(
+    scene_id: int,
+    update: SceneContentUpdate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    シーン本文を保存し、単語数の増減を進捗に、本文を改訂履歴に記録する
+
+    version を指定した場合、他の編集者が先に保存していれば 409 と現在のシーンを返す。
+    他の編集者の未保存の自動保存の下書きは先に書き込み（この保存と競合すれば 409）、
+    自分の下書きは保存のコミット後にこの本文で置き換える
+    """
+    owner = authorize_scene(db, scene_id, current_user)
+    await autosave_buffer.flush_others(scene_id, current_user.id)
+    expected_version = autosave_buffer.effective_version(scene_id, current_user.id, update.version)
+
+    try:
+        scene = versioned_update(db, Scene, [Scene.id == scene_id], expected_version, {})
+        if scene is None:
+            raise HTTPException(status_code=404, detail="Scene not found")
+        delta = await progress_service.apply_scene_content(db, scene, owner.novel_id, update.content)
+        await revision_service.save_revision(
+            db, "scene", scene_id, update.content, author_id=current_user.id
+        )
+        db.commit()
+    except VersionConflict as e:
+        db.rollback()
+        raise _conflict(e)
+
+    await autosave_buffer.discard(scene_id, current_user.id)
+    autosave_buffer.record_saved(scene_id, current_user.id, update.version, scene.version)
+    consistency_hub.notify_saved(str(owner.novel_id))
+    return SceneSaveResult(id=scene.id, version=scene.version, word_count=scene.word_count, delta=delta)
+
+@router.put("/{scene_id}/autosave", response_model=SceneAutosaveResult, status_code=202)
+async def autosave_scene_content(
+    scene_id: int,
+    update: SceneContentUpdate,
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    シーン本文の自動保存を受け付ける
+
+    本文はすぐには書き込まず、同じシーンへの続く保存とまとめて一定間隔で書き込む。
+    version には編集元のバージョンをそのまま送り続けてよい（自動保存で進んだ
+    バージョンはサーバー側で読み替える）。下書きが他の編集と競合した場合は 409 を返す
+    """
+    owner = authorize_scene(db, scene_id, current_user)
+    try:
+        draft = await autosave_buffer.submit(
+            scene_id, owner.novel_id, update.content, author_id=current_user.id, version=update.version
+        )
+    except AutosaveConflict as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Scene has been modified by another editor", "version": e.current_version}
+        )
+    return SceneAutosaveResult(
+        id=scene_id, version=draft.version, pending_saves=draft.saves, flush_interval=autosave_buffer.interval
+    )
+
+@router.post("/{scene_id}/autosave/flush", response_model=SceneFlushResult)
+async def flush_scene_autosave(
+    scene_id: int,
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    シーンの自動保存の下書きをすぐに書き込む（エディタを閉じるときなど）
+    """
+    authorize_scene(db, scene_id, current_user)
+    try:
+        version = await autosave_buffer.flush_scene(scene_id)
+    except AutosaveConflict as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Scene has been modified by another editor", "version": e.current_version}
+        )
+    return SceneFlushResult(id=scene_id, flushed=version is not None, version=version)
+
+@router.put("/{scene_id}/time", response_model=SceneTimeResult)
+async def update_scene_time(
+    scene_id: int,
+    update: SceneTimeUpdate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    シーンの作中の日付を更新する
+
+    日付は小説の暦で通し日数に変換して保存し、時系列の並べ替えや範囲検索に使う。
+    暦で解釈できない日付はそのまま保存し、time_ordinal は None になる
+    """
+    owner = authorize_scene(db, scene_id, current_user)
+    try:
+        scene = await timeline_service.set_scene_time(
+            db, owner.novel_id, scene_id, update.time_period, update.version
+        )
+        if scene is None:
+            raise HTTPException(status_code=404, detail="Scene not found")
+        db.commit()
+    except VersionConflict as e:
+        db.rollback()
+        raise _conflict(e)
+
+    engine_registry.invalidate(str(owner.novel_id))
+    return SceneTimeResult(
+        id=scene.id, version=scene.version, time_period=scene.time_period, time_ordinal=scene.time_ordinal
+    )
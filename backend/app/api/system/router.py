@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.core.warmup import warmup_manager
+
+router = APIRouter(
+    prefix="/health",
+    tags=["system"]
+)
+
+@router.get("/live")
+async def liveness():
+    """
+    プロセスが応答可能かどうかを返す
+    """
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def readiness():
+    """
+    ウォームアップが完了し、トラフィックを受け付けられるかどうかを返す
+    未完了の場合は 503 を返す
+    """
+    status = warmup_manager.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
+from sqlalchemy.orm import Session
+
+from app.db.database import get_db, get_read_db
+from app.api.deps import get_owned_novel
+from app.core.engine_registry import engine_registry
+from app.core.fictional_calendar import CalendarError
+from app.schemas.timeline import CalendarDefinition, CalendarResponse, TimelineScene
+from app.services import timeline_service
+
+router = APIRouter(
+    prefix="/timeline",
+    tags=["timeline"]
+)
+
+@router.get(
+    "/novels/{novel_id}/calendar",
+    response_model=CalendarResponse,
+    dependencies=[Depends(get_owned_novel)]
+)
+async def get_calendar(
+    novel_id: int,
+    db: Session = Depends(get_read_db)
+):
+    """
+    小説の暦の定義を取得する（定義がない場合は calendar が None = グレゴリオ暦）
+    """
+    calendar = timeline_service.get_calendar(db, novel_id)
+    return CalendarResponse(
+        novel_id=novel_id,
+        calendar=None if calendar.is_default else calendar.to_dict()
+    )
+
+@router.put(
+    "/novels/{novel_id}/calendar",
+    response_model=CalendarResponse,
+    dependencies=[Depends(get_owned_novel)]
+)
+async def set_calendar(
+    novel_id: int,
+    definition: Optional[CalendarDefinition] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    小説の暦を設定し、全シーンの通し日数を計算し直す
+
+    months を空にするとグレゴリオ暦になる（epoch だけを指定して相対日付の起点を
+    決めることもできる）。本文を省略すると暦の設定を消す
+    """
+    try:
+        calendar, rescored = await timeline_service.set_calendar(
+            db, novel_id, definition.dict() if definition else None
+        )
+        db.commit()
+    except CalendarError as e:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
+
+    engine_registry.invalidate(str(novel_id))
+    return CalendarResponse(
+        novel_id=novel_id,
+        calendar=None if calendar.is_default else calendar.to_dict(),
+        rescored_scenes=rescored
+    )
+
+@router.get(
+    "/novels/{novel_id}/scenes",
+    response_model=List[TimelineScene],
+    dependencies=[Depends(get_owned_novel)]
+)
+async def list_timeline_scenes(
+    novel_id: int,
+    start: Optional[str] = Query(None, description="範囲の開始日（作中の暦の表記）"),
+    end: Optional[str] = Query(None, description="範囲の終了日（この日を含む）"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_read_db)
+):
+    """
+    作中の日付の範囲に含まれるシーンを時系列順に取得する
+
+    日付を設定していないシーンと、暦で解釈できない日付のシーンは含まれない
+    """
+    try:
+        return await timeline_service.list_scenes_in_range(db, novel_id, start, end, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
@@ -1,24 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Iterable, List, Optional
 from datetime import datetime
 
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
+from app.db.versioning import VersionConflict, versioned_update
 from app.models.world import World, WorldElement
 from app.schemas.world import (
     WorldCreate,
     WorldUpdate,
     WorldResponse,
-    WorldElementResponse
+    WorldElementResponse,
+    WorldElementUpdate,
+    NovelWorldLink,
+    WorldOverrideCreate,
+    WorldOverrideResponse,
+    SharedWorldElementResponse,
+    SharedWorldValidation
 )
+from app.api.deps import authorize_novel
 from app.core.auth import get_current_user
+from app.core.consistency_hub import consistency_hub
+from app.core.engine_registry import engine_registry
+from app.core.responses import FastJSONResponse, NDJSONResponse, serialize_many, wants_ndjson
 from app.models.user import User
+from app.services import shared_world_service
 
 router = APIRouter(
     prefix="/worlds",
     tags=["worldbuilding"]
 )
 
+def _refresh_novels(novel_ids: Iterable[int]) -> None:
+    """世界観の変更を小説のエンジンと整合性チェックの購読者に反映する（コミット後に呼ぶ）"""
+    for novel_id in novel_ids:
+        engine_registry.invalidate(str(novel_id))
+        consistency_hub.notify_saved(str(novel_id))
+
 @router.post("/create", response_model=WorldResponse)
 async def create_world(
     world: WorldCreate,
@@ -51,7 +70,7 @@ async def create_world(
 async def get_world(
     world_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     指定されたIDの世界観設定を取得するエンドポイント
@@ -78,41 +97,126 @@ async def update_world(
 ):
     """
     指定されたIDの世界観設定を更新するエンドポイント
+
+    version を指定した場合、他の編集者が先に更新していれば 409 と
+    現在の状態を返す
     """
-    world = db.query(World).filter(
+    changes = world_update.dict(exclude_unset=True)
+    expected_version = changes.pop("version", None)
+    changes["updated_at"] = datetime.utcnow()
+
+    try:
+        world = versioned_update(
+            db,
+            World,
+            [World.id == world_id, World.created_by == current_user.id],
+            expected_version,
+            changes
+        )
+        if not world:
+            raise HTTPException(
+                status_code=404,
+                detail="指定された世界観が見つかりません"
+            )
+        db.commit()
+        db.refresh(world)
+        _refresh_novels(shared_world_service.get_linked_novel_ids(db, world_id))
+        return world
+    except VersionConflict as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "世界観は他の編集者によって更新されています",
+                "current": jsonable_encoder(WorldResponse.from_orm(e.current))
+            }
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"世界観の更新中にエラーが発生しました: {str(e)}"
+        )
+
+@router.put("/{world_id}/elements/{element_id}", response_model=WorldElementResponse)
+async def update_world_element(
+    world_id: int,
+    element_id: int,
+    element_update: WorldElementUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    共有の世界観の要素を更新するエンドポイント
+
+    version を指定した場合、他の編集者が先に更新していれば 409 と
+    現在の状態を返す
+    """
+    world = db.query(World.id).filter(
         World.id == world_id,
         World.created_by == current_user.id
     ).first()
-    
     if not world:
         raise HTTPException(
             status_code=404,
             detail="指定された世界観が見つかりません"
         )
-    
+
+    changes = element_update.dict(exclude_unset=True)
+    expected_version = changes.pop("version", None)
+    changes["updated_at"] = datetime.utcnow()
+
     try:
-        for key, value in world_update.dict(exclude_unset=True).items():
-            setattr(world, key, value)
-        
-        world.updated_at = datetime.utcnow()
+        element = versioned_update(
+            db,
+            WorldElement,
+            [WorldElement.id == element_id, WorldElement.world_id == world_id],
+            expected_version,
+            changes
+        )
+        if not element:
+            raise HTTPException(
+                status_code=404,
+                detail="指定された世界観要素が見つかりません"
+            )
         db.commit()
-        db.refresh(world)
-        return world
+        db.refresh(element)
+        _refresh_novels(shared_world_service.get_linked_novel_ids(db, world_id))
+        return element
+    except VersionConflict as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "世界観要素は他の編集者によって更新されています",
+                "current": jsonable_encoder(WorldElementResponse.from_orm(e.current))
+            }
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
             status_code=500,
-            detail=f"世界観の更新中にエラーが発生しました: {str(e)}"
+            detail=f"世界観要素の更新中にエラーが発生しました: {str(e)}"
         )
 
+# NDJSON で返す際に 1 回のフェッチで読み込む行数
+STREAM_BATCH_SIZE = 500
+
 @router.get("/elements/{world_id}", response_model=List[WorldElementResponse])
 async def get_world_elements(
     world_id: int,
+    request: Request,
+    format: Optional[str] = Query(None, regex="^(json|ndjson)$", description="ndjson を指定すると 1 行 1 要素で逐次返す"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     指定された世界観に関連する要素を取得するエンドポイント
+    Accept: application/x-ndjson または format=ndjson の場合はストリーミングで返す
     """
     world = db.query(World).filter(
         World.id == world_id,
@@ -125,8 +229,189 @@ async def get_world_elements(
             detail="指定された世界観が見つかりません"
         )
     
-    elements = db.query(WorldElement).filter(
+    query = db.query(WorldElement).filter(
         WorldElement.world_id == world_id
-    ).all()
-    
-    return elements
+    ).order_by(WorldElement.id)
+
+    if wants_ndjson(request, format):
+        return NDJSONResponse(query.yield_per(STREAM_BATCH_SIZE), WorldElementResponse)
+    return FastJSONResponse(serialize_many(query.all(), WorldElementResponse))
+
+
+def _get_linked_world_id(db: Session, novel_id: int, current_user: User) -> int:
+    authorize_novel(db, novel_id, current_user)
+    world_id = shared_world_service.get_linked_world_id(db, novel_id)
+    if world_id is None:
+        raise HTTPException(
+            status_code=404,
+            detail="この小説には共有の世界観が設定されていません"
+        )
+    return world_id
+
+@router.put("/{world_id}/novels/{novel_id}", response_model=NovelWorldLink)
+async def link_novel_to_world(
+    world_id: int,
+    novel_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    小説が参照する共有の世界観を設定するエンドポイント
+
+    同じ世界観を複数の小説から参照でき、小説ごとの変更は差分として保存される
+    """
+    authorize_novel(db, novel_id, current_user)
+    world = db.query(World.id).filter(
+        World.id == world_id,
+        World.created_by == current_user.id
+    ).first()
+    if not world:
+        raise HTTPException(
+            status_code=404,
+            detail="指定された世界観が見つかりません"
+        )
+    link = await shared_world_service.link_novel(db, novel_id, world_id)
+    db.commit()
+    _refresh_novels([novel_id])
+    return link
+
+@router.get("/novels/{novel_id}/elements", response_model=List[SharedWorldElementResponse])
+async def get_novel_world_elements(
+    novel_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    共有の世界観に小説の差分を重ねた要素一覧を取得するエンドポイント
+    """
+    _get_linked_world_id(db, novel_id, current_user)
+    elements = await shared_world_service.list_novel_elements(db, novel_id)
+    if elements is None:
+        raise HTTPException(
+            status_code=404,
+            detail="指定された世界観が見つかりません"
+        )
+    return FastJSONResponse(elements)
+
+@router.get("/novels/{novel_id}/validation", response_model=SharedWorldValidation)
+async def validate_novel_world(
+    novel_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    小説の世界観を検証するエンドポイント
+    共有部分の検証結果は同じ世界観を参照するすべての小説で使い回す
+    """
+    _get_linked_world_id(db, novel_id, current_user)
+    result = await shared_world_service.validate_novel_world(db, novel_id)
+    if result is None:
+        raise HTTPException(
+            status_code=404,
+            detail="指定された世界観が見つかりません"
+        )
+    return result
+
+@router.put("/novels/{novel_id}/elements/{element_id}", response_model=WorldOverrideResponse)
+async def override_world_element(
+    novel_id: int,
+    element_id: int,
+    override: WorldOverrideCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    共有の要素をこの小説の中だけで上書きするエンドポイント
+    共有の要素と、同じ世界観を参照する他の小説には影響しない
+    """
+    world_id = _get_linked_world_id(db, novel_id, current_user)
+    fields = override.dict(exclude_unset=True)
+    expected_version = fields.pop("version", None)
+    try:
+        result = await shared_world_service.override_element(
+            db, novel_id, world_id, element_id, fields, expected_version
+        )
+        if result is None:
+            raise HTTPException(
+                status_code=404,
+                detail="指定された世界観要素が見つかりません"
+            )
+        db.commit()
+        db.refresh(result)
+        _refresh_novels([novel_id])
+        return result
+    except VersionConflict as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "上書きは他の編集者によって更新されています",
+                "current": jsonable_encoder(WorldOverrideResponse.from_orm(e.current))
+            }
+        )
+
+@router.delete("/novels/{novel_id}/elements/{element_id}", response_model=WorldOverrideResponse)
+async def hide_world_element(
+    novel_id: int,
+    element_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    共有の要素をこの小説の中だけで非表示にするエンドポイント
+    """
+    world_id = _get_linked_world_id(db, novel_id, current_user)
+    result = await shared_world_service.hide_element(db, novel_id, world_id, element_id)
+    if result is None:
+        raise HTTPException(
+            status_code=404,
+            detail="指定された世界観要素が見つかりません"
+        )
+    db.commit()
+    db.refresh(result)
+    _refresh_novels([novel_id])
+    return result
+
+@router.post("/novels/{novel_id}/elements", response_model=WorldOverrideResponse)
+async def add_novel_world_element(
+    novel_id: int,
+    element: WorldOverrideCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    この小説だけに存在する世界観要素を追加するエンドポイント
+    """
+    if not element.name or not element.category:
+        raise HTTPException(
+            status_code=422,
+            detail="要素の名前と分類は必須です"
+        )
+    world_id = _get_linked_world_id(db, novel_id, current_user)
+    result = await shared_world_service.add_novel_element(
+        db, novel_id, world_id, element.dict(exclude_unset=True)
+    )
+    db.commit()
+    db.refresh(result)
+    _refresh_novels([novel_id])
+    return result
+
+@router.delete("/novels/{novel_id}/overrides/{override_id}")
+async def revert_world_override(
+    novel_id: int,
+    override_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    差分を削除して共有の状態に戻すエンドポイント
+    """
+    authorize_novel(db, novel_id, current_user)
+    if not await shared_world_service.revert_override(db, novel_id, override_id):
+        raise HTTPException(
+            status_code=404,
+            detail="指定された差分が見つかりません"
+        )
+    db.commit()
+    _refresh_novels([novel_id])
+    return {"status": "reverted", "override_id": override_id}
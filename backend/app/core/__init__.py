@@ -28,9 +28,21 @@ def init_core() -> None:
     pass
 
 # Export commonly used components and utilities
-from .config import settings  # type: ignore
-from .security import get_password_hash, verify_password  # type: ignore
-from .database import get_db  # type: ignore
+# config / security / database の読み込みは重いため、最初に参照されたときに行う
+_LAZY_EXPORTS: Dict[str, str] = {
+    "settings": ".config",
+    "get_password_hash": ".security",
+    "verify_password": ".security",
+    "get_db": ".database",
+}
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(_LAZY_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
 
 __all__ = [
     "CONFIG",
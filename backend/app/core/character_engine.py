@@ -1,8 +1,13 @@
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from collections import Counter
+import asyncio
+from dataclasses import dataclass, field
 from datetime import datetime
 import json
 from pydantic import BaseModel
 
+from app.core.locks import KeyedLock
+
 class Character(BaseModel):
     """キャラクターを表すPydanticモデル"""
     id: str
@@ -17,11 +22,52 @@ class Character(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+# 変更通知を受け取るコールバック（イベント名, 変更後のキャラクター）
+CharacterListener = Callable[[str, Character], Awaitable[None]]
+
+# 味方としての強さを判定する関係性の種類
+ALLY_RELATIONSHIP_TYPES = ("friendship", "family", "mentor", "romance")
+
+PairKey = Tuple[str, str]
+
+# キャラクターの一覧・グラフのバージョン・特性索引を更新する処理が共有するロックのキー
+# （キャラクターID と衝突しないようにタプルにする）
+REGISTRY_LOCK_KEY = ("characters",)
+
+def _pair_key(a: str, b: str) -> PairKey:
+    return (a, b) if a <= b else (b, a)
+
+@dataclass
+class RelationshipSummary:
+    """キャラクターごとの関係性の要約（双方向の平均値に基づく）"""
+    partners: Set[str] = field(default_factory=set)
+    counts: Counter = field(default_factory=Counter)
+    ally_id: Optional[str] = None
+    ally_score: float = 0.0
+    rival_id: Optional[str] = None
+    rival_score: float = 0.0
+
 class CharacterEngine:
-    """キャラクター管理エンジンクラス"""
+    """キャラクター管理エンジンクラス
+
+    更新はキャラクター単位のロックの中で行い、登録されたリスナーへの通知
+    （永続化など）もロックを保持したまま待つ。異なるキャラクターへの更新は
+    並行して進む。作成は一覧全体のロック（REGISTRY_LOCK_KEY）も取得し、
+    作成同士は直列化する。
+    """
 
     def __init__(self):
         self.characters: Dict[str, Character] = {}
+        self.listeners: List[CharacterListener] = []
+        self._locks = KeyedLock()
+        # 双方向の平均値（ペア単位）とキャラクターごとの要約を更新時に維持する
+        self._pair_aggregates: Dict[PairKey, Dict[str, float]] = {}
+        self._summaries: Dict[str, RelationshipSummary] = {}
+        # NumPy は初回の類似検索まで読み込まない
+        self._personality_index = None
+        # 関係性グラフのバージョン（ノード・辺が変わるたびに増える）とレイアウト
+        self.graph_version = 0
+        self._layouts: Dict[str, object] = {}
         self.relationship_types = {
             "friendship": (0.0, 1.0),
             "rivalry": (-1.0, 1.0),
@@ -74,20 +120,126 @@ class CharacterEngine:
             updated_at=now
         )
         
-        self.characters[character_id] = character
+        # 新しいキャラクターへの更新は、作成の通知が終わるまで待たせる
+        async with self._locks.hold(REGISTRY_LOCK_KEY, character_id):
+            self.characters[character_id] = character
+            self.graph_version += 1
+            if self._personality_index is not None:
+                self._personality_index.upsert(character_id, character.personality)
+            await self._notify("character_created", character)
         return character
 
+    async def update_personality(
+        self,
+        character_id: str,
+        personality: Dict[str, float],
+        replace: bool = False
+    ) -> Character:
+        """
+        キャラクターのパーソナリティ特性を更新する
+
+        Args:
+            character_id: キャラクターID
+            personality: 特性名 → 値 の辞書
+            replace: True の場合は既存の特性を置き換える（False なら統合する）
+
+        Returns:
+            更新されたCharacterオブジェクト
+        """
+        if character_id not in self.characters:
+            raise ValueError(f"Character with ID {character_id} not found")
+
+        async with self._locks.hold(character_id):
+            character = self.characters[character_id]
+            if replace or character.personality is None:
+                character.personality = dict(personality)
+            else:
+                character.personality.update(personality)
+            character.updated_at = datetime.utcnow()
+            if self._personality_index is not None:
+                self._personality_index.upsert(character_id, character.personality)
+            await self._notify("personality_updated", character)
+        return character
+
+    @property
+    def personality_index(self):
+        """パーソナリティ特性ベクトルの近傍索引（初回アクセス時に構築）"""
+        if self._personality_index is None:
+            from app.core.personality_index import PersonalityIndex
+
+            index = PersonalityIndex(initial_capacity=max(len(self.characters), 64))
+            for character_id, character in self.characters.items():
+                index.upsert(character_id, character.personality)
+            self._personality_index = index
+        return self._personality_index
+
+    def find_similar_characters(
+        self,
+        character_id: str,
+        k: int = 5,
+        metric: str = "cosine"
+    ) -> List[Dict]:
+        """
+        パーソナリティが似ているキャラクターを返す
+
+        Args:
+            character_id: 基準となるキャラクターID
+            k: 返す件数
+            metric: "cosine" または "euclidean"
+
+        Returns:
+            キャラクターIDとスコアの辞書のリスト（似ている順）
+        """
+        if character_id not in self.characters:
+            raise ValueError(f"Character with ID {character_id} not found")
+        return [
+            {"character_id": other_id, "score": score}
+            for other_id, score in self.personality_index.nearest(character_id, k=k, metric=metric)
+        ]
+
+    def find_near_duplicate_characters(
+        self,
+        threshold: float = 0.95,
+        metric: str = "cosine"
+    ) -> List[Dict]:
+        """
+        パーソナリティがほぼ同じキャラクターの組を返す
+
+        Args:
+            threshold: cosine では類似度の下限、euclidean では距離の上限
+            metric: "cosine" または "euclidean"
+
+        Returns:
+            キャラクターIDの組とスコアの辞書のリスト
+        """
+        return [
+            {"character_ids": [a, b], "score": score}
+            for a, b, score in self.personality_index.near_duplicates(threshold, metric=metric)
+        ]
+
+    def add_listener(self, listener: CharacterListener) -> None:
+        """変更通知を受け取るリスナーを登録する"""
+        self.listeners.append(listener)
+
+    async def _notify(self, event: str, character: Character) -> None:
+        for listener in self.listeners:
+            await listener(event, character)
+
     async def analyze_relationships(
         self,
         character_id: str,
-        target_character_id: Optional[str] = None
+        target_character_id: Optional[str] = None,
+        include_unrelated: bool = True
     ) -> Dict[str, Dict[str, float]]:
         """
         キャラクター間の関係性を分析する
 
+        双方向の平均値は update_relationship で維持しているため再計算しない。
+
         Args:
             character_id: 分析対象のキャラクターID
             target_character_id: 特定の相手キャラクターID（省略可）
+            include_unrelated: False の場合、関係性を持つ相手だけを返す（O(次数)）
 
         Returns:
             関係性分析の結果
@@ -108,31 +260,184 @@ class CharacterEngine:
                     {k: 0.0 for k in self.relationship_types.keys()})
             }
 
-        # すべてのキャラクターとの関係性を分析
-        analysis_results = {}
-        for other_id, other_char in self.characters.items():
-            if other_id == character_id:
-                continue
+        # 関係性を持つ相手は維持済みの双方向平均を使う
+        summary = self._summaries.get(character_id)
+        partners = summary.partners if summary else set()
+        analysis_results = {
+            other_id: dict(self._pair_aggregates[_pair_key(character_id, other_id)])
+            for other_id in partners
+        }
+        if include_unrelated:
+            zeros = {k: 0.0 for k in self.relationship_types.keys()}
+            for other_id in self.characters:
+                if other_id != character_id and other_id not in analysis_results:
+                    analysis_results[other_id] = dict(zeros)
 
-            # 既存の関係性を取得するか、デフォルト値を設定
-            current_relationship = relationships.get(other_id, 
-                {k: 0.0 for k in self.relationship_types.keys()})
-            
-            # 関係性の相互参照を考慮した分析
-            other_relationship = other_char.relationships.get(character_id, {})
-            
-            # 双方向の関係性を平均化して分析
-            analyzed_relationship = {}
+        return analysis_results
+
+    def get_relationship_summary(self, character_id: str) -> Dict:
+        """
+        キャラクターの関係性の要約を返す（O(1)）
+
+        Returns:
+            最も強い味方・最も強いライバル・種類ごとの関係数を含む辞書
+        """
+        if character_id not in self.characters:
+            raise ValueError(f"Character with ID {character_id} not found")
+
+        summary = self._summaries.get(character_id) or RelationshipSummary()
+        return {
+            "character_id": character_id,
+            "strongest_ally": (
+                {"character_id": summary.ally_id, "score": summary.ally_score}
+                if summary.ally_id else None
+            ),
+            "strongest_rival": (
+                {"character_id": summary.rival_id, "score": summary.rival_score}
+                if summary.rival_id else None
+            ),
+            "counts": {k: summary.counts.get(k, 0) for k in self.relationship_types},
+            "partner_count": len(summary.partners),
+        }
+
+    def load_characters(self, characters: Iterable[Character]) -> None:
+        """
+        キャラクターの一覧を置き換える（データベースから読み込んだ直後など）
+
+        リスナーへの通知は行わない。関係性の集計を作り直し、特性の索引は次回の
+        アクセス時に構築し直す。
+
+        Args:
+            characters: 関係性を含むキャラクターの一覧
+        """
+        self.characters = {character.id: character for character in characters}
+        self._personality_index = None
+        self.rebuild_relationship_index()
+
+    def rebuild_relationship_index(self) -> None:
+        """関係性の集計を全キャラクターの関係性から作り直す（外部から読み込んだ後など）"""
+        self._pair_aggregates.clear()
+        self._summaries.clear()
+        self.graph_version += 1
+        pairs = set()
+        for character_id, character in self.characters.items():
+            for target_id in (character.relationships or {}):
+                if target_id in self.characters and target_id != character_id:
+                    pairs.add(_pair_key(character_id, target_id))
+        for a, b in pairs:
+            self._refresh_pair(a, b)
+
+    def relationship_edges(self) -> Dict[PairKey, float]:
+        """関係性グラフの辺（ペア → 双方向平均の絶対値の最大値）"""
+        return {
+            key: max(abs(value) for value in aggregate.values())
+            for key, aggregate in self._pair_aggregates.items()
+        }
+
+    async def get_relationship_layout(self, method: str = "force"):
+        """
+        関係性グラフのレイアウトを返す
+
+        グラフのバージョンが前回と同じならキャッシュを返す。変わった辺が少なければ
+        前回の座標から変わった部分だけを調整し、多ければ最初から計算し直す。
+        計算はグラフの複製に対して別スレッドで行う。
+
+        Args:
+            method: "force" または "stress"
+
+        Returns:
+            GraphLayout
+        """
+        from app.core.graph_layout import LAYOUT_METHODS, compute_layout, refine_layout
+
+        if method not in LAYOUT_METHODS:
+            raise ValueError(f"Unknown layout method: {method}")
+        cached = self._layouts.get(method)
+        if cached is not None and cached.version == self.graph_version:
+            return cached
+
+        version = self.graph_version
+        ids = sorted(self.characters)
+        edges = self.relationship_edges()
+
+        def build():
+            layout = refine_layout(cached, ids, edges, version) if cached is not None else None
+            return layout or compute_layout(ids, edges, version, method=method)
+
+        layout = await asyncio.to_thread(build)
+        current = self._layouts.get(method)
+        if current is None or current.version < layout.version:
+            self._layouts[method] = layout
+        return layout
+
+    def _pair_scores(self, aggregate: Dict[str, float]) -> Tuple[float, float]:
+        ally = max((aggregate.get(k, 0.0) for k in ALLY_RELATIONSHIP_TYPES), default=0.0)
+        return ally, aggregate.get("rivalry", 0.0)
+
+    def _refresh_pair(self, a: str, b: str) -> None:
+        """ペアの双方向平均を再計算し、両者の要約に差分を反映する"""
+        key = _pair_key(a, b)
+        forward = (self.characters[a].relationships or {}).get(b, {})
+        backward = (self.characters[b].relationships or {}).get(a, {})
+        new = {
+            rel_type: (forward.get(rel_type, 0.0) + backward.get(rel_type, 0.0)) / 2
+            for rel_type in self.relationship_types
+        }
+        old = self._pair_aggregates.get(key)
+        related = any(value != 0.0 for value in new.values())
+        if old != (new if related else None):
+            self.graph_version += 1
+        if related:
+            self._pair_aggregates[key] = new
+        else:
+            self._pair_aggregates.pop(key, None)
+
+        for me, other in ((a, b), (b, a)):
+            summary = self._summaries.setdefault(me, RelationshipSummary())
             for rel_type in self.relationship_types:
-                val1 = current_relationship.get(rel_type, 0.0)
-                val2 = other_relationship.get(rel_type, 0.0)
-                analyzed_relationship[rel_type] = (val1 + val2) / 2
+                was = old is not None and old.get(rel_type, 0.0) != 0.0
+                now = new[rel_type] != 0.0
+                if was != now:
+                    summary.counts[rel_type] += 1 if now else -1
+            if related:
+                summary.partners.add(other)
+            else:
+                summary.partners.discard(other)
+            self._update_extremes(me, other, summary, new if related else None)
+
+    def _update_extremes(
+        self,
+        me: str,
+        other: str,
+        summary: RelationshipSummary,
+        aggregate: Optional[Dict[str, float]]
+    ) -> None:
+        """最も強い味方・ライバルを更新する（値が下がった場合のみ O(次数) で探し直す）"""
+        ally, rival = self._pair_scores(aggregate) if aggregate else (0.0, 0.0)
 
-            analysis_results[other_id] = analyzed_relationship
+        if ally > 0.0 and (summary.ally_id is None or ally > summary.ally_score):
+            summary.ally_id, summary.ally_score = other, ally
+        elif summary.ally_id == other and ally < summary.ally_score:
+            summary.ally_id, summary.ally_score = self._find_best(me, summary, 0)
+        elif summary.ally_id == other:
+            summary.ally_score = ally
 
-        return analysis_results
+        if rival > 0.0 and (summary.rival_id is None or rival > summary.rival_score):
+            summary.rival_id, summary.rival_score = other, rival
+        elif summary.rival_id == other and rival < summary.rival_score:
+            summary.rival_id, summary.rival_score = self._find_best(me, summary, 1)
+        elif summary.rival_id == other:
+            summary.rival_score = rival
 
-    def update_relationship(
+    def _find_best(self, me: str, summary: RelationshipSummary, index: int) -> Tuple[Optional[str], float]:
+        best_id, best_score = None, 0.0
+        for partner in summary.partners:
+            score = self._pair_scores(self._pair_aggregates[_pair_key(me, partner)])[index]
+            if score > best_score:
+                best_id, best_score = partner, score
+        return best_id, best_score
+
+    async def update_relationship(
         self,
         character_id: str,
         target_character_id: str,
@@ -155,12 +460,20 @@ class CharacterEngine:
         if not min_val <= value <= max_val:
             raise ValueError(f"Value must be between {min_val} and {max_val}")
 
-        character = self.characters[character_id]
-        if character.relationships is None:
-            character.relationships = {}
-        
-        if target_character_id not in character.relationships:
-            character.relationships[target_character_id] = {}
-            
-        character.relationships[target_character_id][relationship_type] = value
-        character.updated_at = datetime.utcnow()
\ No newline at end of file
+        if character_id not in self.characters:
+            raise ValueError(f"Character with ID {character_id} not found")
+
+        # 関係性の分析は双方向の値を参照するため、両方のキャラクターをロックする
+        async with self._locks.hold(character_id, target_character_id):
+            character = self.characters[character_id]
+            if character.relationships is None:
+                character.relationships = {}
+
+            if target_character_id not in character.relationships:
+                character.relationships[target_character_id] = {}
+
+            character.relationships[target_character_id][relationship_type] = value
+            character.updated_at = datetime.utcnow()
+            if target_character_id in self.characters and target_character_id != character_id:
+                self._refresh_pair(character_id, target_character_id)
+            await self._notify("relationship_updated", character)
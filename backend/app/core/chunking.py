@@ -0,0 +1,79 @@
+"""
+内容で区切るチャンク分割（Content-Defined Chunking）
+
+Gear ハッシュによるローリングハッシュで境界を決めるため、文書の途中に
+文字を挿入・削除しても、変更箇所の前後以外のチャンクは同じ内容・同じ
+ハッシュのまま残る。改訂履歴ではチャンク単位で重複を除くことで、保存量を
+文書の大きさではなく編集の大きさに比例させる。
+"""
+
+import hashlib
+import random
+from typing import List, Tuple
+
+MIN_CHUNK_SIZE = 512
+AVG_CHUNK_SIZE = 2048
+MAX_CHUNK_SIZE = 8192
+
+# 固定の乱数表（値を変えると既存のチャンク境界と一致しなくなる）
+_rng = random.Random(0x6E6F76656C)
+_GEAR = [_rng.getrandbits(32) for _ in range(256)]
+del _rng
+_MASK_32 = 0xFFFFFFFF
+
+
+def _mask_for(average: int) -> int:
+    # Gear ハッシュの下位ビットは直近の数バイトにしか依存しないため、上位ビットで判定する
+    bits = max(average.bit_length() - 1, 1)
+    return ((1 << bits) - 1) << (32 - bits)
+
+
+def chunk_boundaries(
+    data: bytes,
+    min_size: int = MIN_CHUNK_SIZE,
+    avg_size: int = AVG_CHUNK_SIZE,
+    max_size: int = MAX_CHUNK_SIZE
+) -> List[Tuple[int, int]]:
+    """
+    チャンクの (開始, 終了) の一覧を返す
+
+    Args:
+        data: 分割するバイト列
+        min_size: チャンクの最小サイズ（この範囲はハッシュを計算しない）
+        avg_size: チャンクの平均サイズの目安（2 のべき乗に丸める）
+        max_size: チャンクの最大サイズ
+
+    Returns:
+        List[Tuple[int, int]]: 各チャンクの範囲
+    """
+    mask = _mask_for(avg_size)
+    gear = _GEAR
+    length = len(data)
+    boundaries = []
+    start = 0
+    while start < length:
+        end = min(start + max_size, length)
+        position = start + min_size
+        if position >= end:
+            boundaries.append((start, end))
+            break
+        h = 0
+        cut = end
+        for i in range(position, end):
+            h = ((h << 1) + gear[data[i]]) & _MASK_32
+            if not h & mask:
+                cut = i + 1
+                break
+        boundaries.append((start, cut))
+        start = cut
+    return boundaries
+
+
+def split_chunks(data: bytes, **kwargs) -> List[bytes]:
+    """バイト列をチャンクに分割する"""
+    return [data[start:end] for start, end in chunk_boundaries(data, **kwargs)]
+
+
+def chunk_hash(chunk: bytes) -> str:
+    """チャンクの内容ハッシュ（SHA-256 の16進表記）"""
+    return hashlib.sha256(chunk).hexdigest()
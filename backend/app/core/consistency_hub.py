@@ -0,0 +1,264 @@
+"""
+整合性チェック結果のライブ配信
+
+保存のたびに小説単位で整合性チェックを予約し、短時間に続いた保存は
+1 回のチェックにまとめる。チェック結果は前回との差分（追加・解消・変更された
+問題）だけを、その小説を購読している全接続へ配信する。購読者がいない小説では
+チェック自体を行わない。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.core.engine_registry import engine_registry
+
+logger = logging.getLogger(__name__)
+
+Issue = Dict[str, Any]
+Analyzer = Callable[[str], Awaitable[Dict[str, Issue]]]
+
+
+def issue_id(source: str, check: str, subject: Any) -> str:
+    """
+    問題の同一性を表す安定したIDを生成する
+
+    Args:
+        source: 問題を検出したエンジン（"novel" / "world"）
+        check: チェックの種類
+        subject: 問題の対象を表す値（メッセージや要素名・ルールの組など）
+
+    Returns:
+        16 桁の16進文字列
+    """
+    raw = json.dumps([source, check, subject], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def flatten_issues(novel_report: Optional[Dict], world_report: Optional[Dict]) -> Dict[str, Issue]:
+    """
+    NovelEngine.analyze_consistency / WorldEngine.validate_consistency の結果を
+    ID → 問題 の辞書に平坦化する
+    """
+    issues: Dict[str, Issue] = {}
+
+    def add(source: str, check: str, severity: str, subject: Any, detail: Any) -> None:
+        key = issue_id(source, check, subject)
+        issues[key] = {
+            "id": key,
+            "source": source,
+            "check": check,
+            "severity": severity,
+            "detail": detail,
+        }
+
+    for check, result in (novel_report or {}).items():
+        if not isinstance(result, dict):
+            continue
+        for message in result.get("issues", []):
+            add("novel", check, "error", message, message)
+        for message in result.get("gaps", []):
+            add("novel", f"{check}.gaps", "warning", message, message)
+        for message in result.get("potential_issues", []):
+            add("novel", f"{check}.potential_issues", "warning", message, message)
+
+    for conflict in (world_report or {}).get("conflicts", []):
+        add("world", "rule", "error", [conflict.get("element"), conflict.get("rule")], conflict)
+    for warning in (world_report or {}).get("warnings", []):
+        add("world", "relationship", "warning",
+            [warning.get("element"), warning.get("relationship")], warning)
+
+    return issues
+
+
+def diff_issues(previous: Dict[str, Issue], current: Dict[str, Issue]) -> Dict[str, List]:
+    """前回の問題一覧との差分を返す"""
+    return {
+        "added": [issue for key, issue in current.items() if key not in previous],
+        "resolved": [key for key in previous if key not in current],
+        "changed": [
+            issue for key, issue in current.items()
+            if key in previous and previous[key] != issue
+        ],
+    }
+
+
+async def analyze_novel(novel_id: str) -> Dict[str, Issue]:
+    """レジストリのエンジンで小説の整合性をチェックする"""
+    engines = await engine_registry.get(novel_id)
+    novel_report = None
+    if engines.novel.structure is not None:
+        novel_report = await engines.novel.analyze_consistency()
+    world_report = engines.world.validate_consistency()
+    return flatten_issues(novel_report, world_report)
+
+
+class HubFull(Exception):
+    """接続数の上限に達したことを表す例外クラス"""
+    pass
+
+
+@dataclass(eq=False)
+class Subscriber:
+    """購読中の接続 1 つ分の送信キュー
+
+    キューが溢れた場合は溜まった差分を捨て、次に取り出すときに
+    全件のスナップショットを送る（遅い接続が他の接続やチェックを待たせない）。
+    """
+    novel_id: str
+    queue: asyncio.Queue
+    needs_snapshot: bool = True
+
+    def offer(self, message: Dict) -> None:
+        if self.needs_snapshot:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.needs_snapshot = True
+            # 受信待ちの get() を起こすためのマーカー
+            self.queue.put_nowait({"type": "resync"})
+
+
+@dataclass(eq=False)
+class NovelChannel:
+    """小説 1 つ分の購読者とチェック状態"""
+    novel_id: str
+    subscribers: Set[Subscriber] = field(default_factory=set)
+    issues: Optional[Dict[str, Issue]] = None
+    version: int = 0
+    dirty: bool = False
+    runner: Optional[asyncio.Task] = None
+
+
+class ConsistencyHub:
+    """整合性チェックの予約・集約と購読者への配信を管理するクラス"""
+
+    def __init__(
+        self,
+        analyzer: Analyzer = analyze_novel,
+        debounce_seconds: float = 1.0,
+        max_concurrent_checks: int = 4,
+        queue_size: int = 16,
+        max_subscribers_per_novel: int = 200,
+        max_subscribers: int = 5000
+    ):
+        self.analyzer = analyzer
+        self.debounce_seconds = debounce_seconds
+        self.queue_size = queue_size
+        self.max_subscribers_per_novel = max_subscribers_per_novel
+        self.max_subscribers = max_subscribers
+        self._checks = asyncio.Semaphore(max_concurrent_checks)
+        self._channels: Dict[str, NovelChannel] = {}
+        self._subscriber_count = 0
+
+    def subscribe(self, novel_id: str) -> Subscriber:
+        """
+        小説の整合性チェック結果を購読する
+
+        Raises:
+            HubFull: 接続数の上限に達している場合
+        """
+        if self._subscriber_count >= self.max_subscribers:
+            raise HubFull("Too many subscribers")
+        channel = self._channels.setdefault(novel_id, NovelChannel(novel_id=novel_id))
+        if len(channel.subscribers) >= self.max_subscribers_per_novel:
+            raise HubFull(f"Too many subscribers for novel {novel_id}")
+
+        subscriber = Subscriber(novel_id=novel_id, queue=asyncio.Queue(maxsize=self.queue_size))
+        channel.subscribers.add(subscriber)
+        self._subscriber_count += 1
+
+        if channel.issues is None or channel.dirty:
+            # 結果がない・古い場合はチェックを予約し、完了後にスナップショットを送る
+            self.notify_saved(novel_id)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        channel = self._channels.get(subscriber.novel_id)
+        if channel is None or subscriber not in channel.subscribers:
+            return
+        channel.subscribers.discard(subscriber)
+        self._subscriber_count -= 1
+        if not channel.subscribers and channel.runner is None:
+            del self._channels[subscriber.novel_id]
+
+    def notify_saved(self, novel_id: str) -> None:
+        """
+        保存があったことを通知する
+
+        購読者がいればデバウンス後のチェックを予約する。チェック中に届いた通知は
+        チェック完了後の 1 回にまとめられる。
+        """
+        channel = self._channels.get(novel_id)
+        if channel is None or not channel.subscribers:
+            return
+        channel.dirty = True
+        if channel.runner is None:
+            channel.runner = asyncio.get_running_loop().create_task(self._run(channel))
+
+    async def next_message(self, subscriber: Subscriber) -> Dict:
+        """購読者に送る次のメッセージを取得する"""
+        while True:
+            if subscriber.needs_snapshot:
+                channel = self._channels.get(subscriber.novel_id)
+                if channel is not None and channel.issues is not None:
+                    subscriber.needs_snapshot = False
+                    # スナップショットより前の差分は不要
+                    while not subscriber.queue.empty():
+                        subscriber.queue.get_nowait()
+                    return {
+                        "type": "snapshot",
+                        "novel_id": subscriber.novel_id,
+                        "version": channel.version,
+                        "issues": list(channel.issues.values()),
+                    }
+            message = await subscriber.queue.get()
+            if message.get("type") == "resync":
+                continue
+            return message
+
+    async def _run(self, channel: NovelChannel) -> None:
+        try:
+            while channel.dirty and channel.subscribers:
+                await asyncio.sleep(self.debounce_seconds)
+                channel.dirty = False
+                async with self._checks:
+                    try:
+                        current = await self.analyzer(channel.novel_id)
+                    except Exception as e:
+                        logger.error(f"Consistency check failed for novel {channel.novel_id}: {str(e)}")
+                        continue
+                self._publish(channel, current)
+        finally:
+            channel.runner = None
+            if not channel.subscribers:
+                self._channels.pop(channel.novel_id, None)
+
+    def _publish(self, channel: NovelChannel, current: Dict[str, Issue]) -> None:
+        previous = channel.issues
+        channel.issues = current
+        if previous is None:
+            channel.version += 1
+            # 初回は各購読者がスナップショットを受け取る
+            for subscriber in channel.subscribers:
+                if subscriber.queue.empty():
+                    subscriber.queue.put_nowait({"type": "resync"})
+            return
+
+        delta = diff_issues(previous, current)
+        if not any(delta.values()):
+            return
+        channel.version += 1
+        message = {"type": "delta", "novel_id": channel.novel_id, "version": channel.version, **delta}
+        for subscriber in channel.subscribers:
+            subscriber.offer(message)
+
+
+# アプリケーション全体で共有するハブ
+consistency_hub = ConsistencyHub()
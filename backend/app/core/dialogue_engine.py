@@ -0,0 +1,503 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+import hashlib
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 開き括弧と閉じ括弧の対応
+QUOTE_PAIRS: Dict[str, str] = {
+    "「": "」",
+    "『": "』",
+    "“": "”",
+}
+
+# 文末表現（長いものから順に判定する）
+SENTENCE_ENDING_PARTICLES: Tuple[str, ...] = (
+    "でございます", "ですわ", "ですよ", "ですね", "ますよ", "ますね",
+    "かしら", "だろう", "でしょう", "じゃん", "だぜ", "だよ", "だね", "だな",
+    "のよ", "のね", "わよ", "わね", "です", "ます", "っす",
+    "よ", "ね", "わ", "ぞ", "ぜ", "な", "さ", "の", "か", "だ",
+)
+
+# 一人称代名詞
+FIRST_PERSON_PRONOUNS: Tuple[str, ...] = (
+    "わたくし", "あたし", "わたし", "ぼく", "おれ", "うち", "わし",
+    "私", "僕", "俺", "拙者", "吾輩", "我輩", "自分", "我", "余",
+)
+
+# 台詞の長さの集計単位（文字数）
+LENGTH_BUCKET_SIZE = 10
+
+_SENTENCE_SPLIT = re.compile(r"[。！？!?…]+")
+_TRAILING_NOISE = re.compile(r"[、。！？!?…ー～〜っッ・\s]+$")
+_PRONOUN_PATTERN = re.compile("|".join(sorted(FIRST_PERSON_PRONOUNS, key=len, reverse=True)))
+
+# 台詞の前後で話者を探す地の文の長さ
+ATTRIBUTION_WINDOW = 40
+# 話者名と台詞の間に置かれうる文字（太郎：「……」 など）
+SPEAKER_TAG_SUFFIX = r"[\s:：]*"
+
+
+@dataclass
+class DialogueLine:
+    """抽出された台詞"""
+    text: str
+    quote: str
+    speaker: Optional[str]
+    offset: int
+
+
+@dataclass
+class DialogueStats:
+    """キャラクター単位の台詞統計
+
+    すべての値が加算可能な形で保持されているため、シーン単位の結果を
+    章・作品単位へ足し引きするだけで集計を更新できる。
+    """
+    line_count: int = 0
+    total_chars: int = 0
+    length_buckets: Counter = field(default_factory=Counter)
+    endings: Counter = field(default_factory=Counter)
+    pronouns: Counter = field(default_factory=Counter)
+    catchphrases: Counter = field(default_factory=Counter)
+
+    def add_line(self, text: str, catchphrases: Iterable[str] = ()) -> None:
+        """台詞 1 件を集計に加える"""
+        self.line_count += 1
+        self.total_chars += len(text)
+        self.length_buckets[len(text) // LENGTH_BUCKET_SIZE] += 1
+        self.pronouns.update(_PRONOUN_PATTERN.findall(text))
+
+        for sentence in _SENTENCE_SPLIT.split(text):
+            sentence = _TRAILING_NOISE.sub("", sentence)
+            if not sentence:
+                continue
+            for ending in SENTENCE_ENDING_PARTICLES:
+                if sentence.endswith(ending):
+                    self.endings[ending] += 1
+                    break
+
+        for phrase in catchphrases:
+            count = text.count(phrase)
+            if count:
+                self.catchphrases[phrase] += count
+
+    def merge(self, other: "DialogueStats", sign: int = 1) -> None:
+        """他の統計を加算する（sign=-1 で減算）"""
+        self.line_count += sign * other.line_count
+        self.total_chars += sign * other.total_chars
+        for mine, theirs in (
+            (self.length_buckets, other.length_buckets),
+            (self.endings, other.endings),
+            (self.pronouns, other.pronouns),
+            (self.catchphrases, other.catchphrases),
+        ):
+            for key, value in theirs.items():
+                mine[key] += sign * value
+                if mine[key] <= 0:
+                    del mine[key]
+
+    def to_dict(self, top: int = 10) -> Dict:
+        """レポート用の辞書に変換する"""
+        return {
+            "line_count": self.line_count,
+            "average_length": self.total_chars / self.line_count if self.line_count else 0.0,
+            "length_distribution": {
+                f"{bucket * LENGTH_BUCKET_SIZE}-{(bucket + 1) * LENGTH_BUCKET_SIZE - 1}": count
+                for bucket, count in sorted(self.length_buckets.items())
+            },
+            "sentence_endings": dict(self.endings.most_common(top)),
+            "first_person_pronouns": dict(self.pronouns.most_common(top)),
+            "catchphrases": dict(self.catchphrases.most_common(top)),
+        }
+
+
+SpeakerStats = Dict[str, DialogueStats]
+
+UNKNOWN_SPEAKER = "unknown"
+
+
+def _merge_speaker_stats(target: SpeakerStats, source: SpeakerStats, sign: int = 1) -> None:
+    for speaker, stats in source.items():
+        if speaker not in target:
+            target[speaker] = DialogueStats()
+        target[speaker].merge(stats, sign)
+        if target[speaker].line_count <= 0:
+            del target[speaker]
+
+
+class DialogueExtractor:
+    """テキストを分割して受け取りながら台詞を抽出するストリーミング抽出器
+
+    地の文のうち台詞の直前・直後だけを保持するため、メモリ使用量は
+    シーンの長さに依存しない。
+    """
+
+    def __init__(self, character_names: Iterable[str] = ()):
+        names = sorted({name for name in character_names if name}, key=len, reverse=True)
+        self._name_pattern = re.compile("|".join(map(re.escape, names))) if names else None
+        # 太郎「……」 / 太郎：「……」 のように台詞の直前に置かれた話者名
+        self._tag_pattern = (
+            re.compile(f"({'|'.join(map(re.escape, names))}){SPEAKER_TAG_SUFFIX}$") if names else None
+        )
+        self._offset = 0
+        self._narration_before = ""
+        self._quote_stack: List[str] = []
+        self._quote_opening = ""
+        self._quote_start = 0
+        self._quote_text: List[str] = []
+        self._pending: Optional[DialogueLine] = None
+        self._pending_before = ""
+        self._narration_after = ""
+
+    def _speaker_tag(self, text: str) -> Optional[str]:
+        """地の文の末尾が話者名（台詞の直前に置かれた名前）であれば返す"""
+        match = self._tag_pattern.search(text) if self._tag_pattern is not None else None
+        return match.group(1) if match else None
+
+    def _find_speaker(self, before: str, after: str, next_quote: bool = False) -> Optional[str]:
+        """
+        台詞前後の地の文から話者を推定する
+
+        Args:
+            before: 台詞の直前の地の文
+            after: 台詞の直後の地の文
+            next_quote: after の直後に次の台詞が続く（after の末尾の名前は次の台詞の話者）
+        """
+        if self._name_pattern is None:
+            return None
+        # 太郎「……」 のように直前に話者名がある形を優先する
+        tag = self._speaker_tag(before)
+        if tag:
+            return tag
+        # 「……」と太郎は言った のように直後に名前がある形
+        if after and not (next_quote and self._speaker_tag(after)):
+            match = self._name_pattern.search(after)
+            if match:
+                return match.group(0)
+        # 太郎は言った。「……」 の形
+        matches = list(self._name_pattern.finditer(before))
+        if matches:
+            return matches[-1].group(0)
+        return None
+
+    def _resolve_pending(self, next_quote: bool = False) -> Optional[DialogueLine]:
+        line = self._pending
+        if line is None:
+            return None
+        line.speaker = self._find_speaker(self._pending_before, self._narration_after, next_quote)
+        self._pending = None
+        self._narration_after = ""
+        return line
+
+    def feed(self, chunk: str) -> Iterator[DialogueLine]:
+        """
+        テキストの断片を処理し、確定した台詞を返す
+
+        Args:
+            chunk: シーン本文の断片
+
+        Yields:
+            話者の推定まで完了した DialogueLine
+        """
+        for char in chunk:
+            offset = self._offset
+            self._offset += 1
+
+            if self._quote_stack:
+                if char == QUOTE_PAIRS[self._quote_stack[-1]]:
+                    self._quote_stack.pop()
+                    if not self._quote_stack:
+                        line = self._resolve_pending()
+                        if line is not None:
+                            yield line
+                        self._pending = DialogueLine(
+                            text="".join(self._quote_text),
+                            quote=self._quote_opening,
+                            speaker=None,
+                            offset=self._quote_start
+                        )
+                        self._pending_before = self._narration_before
+                        self._narration_before = ""
+                        continue
+                elif char in QUOTE_PAIRS:
+                    self._quote_stack.append(char)
+                self._quote_text.append(char)
+                continue
+
+            if char in QUOTE_PAIRS:
+                if self._pending is not None:
+                    line = self._resolve_pending(next_quote=True)
+                    if line is not None:
+                        yield line
+                self._quote_stack.append(char)
+                self._quote_opening = char
+                self._quote_start = offset
+                self._quote_text = []
+                continue
+
+            if self._pending is not None:
+                if char == "\n" or len(self._narration_after) >= ATTRIBUTION_WINDOW:
+                    line = self._resolve_pending()
+                    if line is not None:
+                        yield line
+                else:
+                    self._narration_after += char
+
+            if char == "\n":
+                # 段落をまたいだ地の文は話者推定に使わない
+                self._narration_before = ""
+            else:
+                self._narration_before = (self._narration_before + char)[-ATTRIBUTION_WINDOW:]
+
+    def close(self) -> Iterator[DialogueLine]:
+        """入力の終端で保留中の台詞を確定する"""
+        line = self._resolve_pending()
+        if line is not None:
+            yield line
+
+
+def extract_dialogue(
+    chunks: Iterable[str],
+    character_names: Iterable[str] = ()
+) -> Iterator[DialogueLine]:
+    """
+    テキストから台詞を抽出する
+
+    Args:
+        chunks: 本文（文字列または文字列の断片のイテラブル）
+        character_names: 話者推定に使うキャラクター名
+
+    Yields:
+        DialogueLine
+    """
+    if isinstance(chunks, str):
+        chunks = (chunks,)
+    extractor = DialogueExtractor(character_names)
+    for chunk in chunks:
+        yield from extractor.feed(chunk)
+    yield from extractor.close()
+
+
+def guideline_vocabulary(guidelines: Optional[Dict]) -> Tuple[List[str], List[str]]:
+    """
+    dialogue_guidelines.yaml の内容から話者名（別名を含む）と口癖を取り出す
+
+    Args:
+        guidelines: {"characters": {名前: {"catchphrases": [...], "aliases": [...]}}} 形式の辞書
+
+    Returns:
+        (話者名のリスト, 口癖のリスト)
+    """
+    names: List[str] = []
+    phrases: List[str] = []
+    for name, guide in ((guidelines or {}).get("characters") or {}).items():
+        names.append(name)
+        names.extend((guide or {}).get("aliases") or [])
+        phrases.extend((guide or {}).get("catchphrases") or [])
+    return names, phrases
+
+
+_CATCHPHRASE_CLAUSE = re.compile(r"口癖[^。\n]*")
+_QUOTED = re.compile("|".join(f"{re.escape(o)}([^{re.escape(c)}]+){re.escape(c)}" for o, c in QUOTE_PAIRS.items()))
+
+
+def catchphrases_from_text(text: Optional[str]) -> List[str]:
+    """
+    キャラクターの設定文から口癖を取り出す（口癖は「〜だぜ」「まったく」。 のような記述）
+
+    Args:
+        text: 性格・背景などの設定文
+
+    Returns:
+        List[str]: 口癖のリスト
+    """
+    phrases: List[str] = []
+    for clause in _CATCHPHRASE_CLAUSE.findall(text or ""):
+        for match in _QUOTED.finditer(clause):
+            phrase = next(group for group in match.groups() if group)
+            # 「〜だぜ」の「〜」は任意の語を表すため取り除く
+            phrase = phrase.strip().lstrip("〜～…")
+            if phrase:
+                phrases.append(phrase)
+    return phrases
+
+
+@dataclass
+class _SceneEntry:
+    chapter_id: Optional[str]
+    content_hash: str
+    revision: Optional[str]
+    stats: SpeakerStats
+
+
+class DialogueEngine:
+    """台詞統計エンジン
+
+    シーン単位の統計を本文のハッシュでキャッシュし、章・作品単位の集計は
+    シーンの差分を足し引きして更新する。スレッドから更新する場合は lock を取得する。
+    """
+
+    def __init__(
+        self,
+        character_names: Iterable[str] = (),
+        catchphrases: Iterable[str] = (),
+        cache_size: int = 4096
+    ):
+        self.character_names: Tuple[str, ...] = tuple(character_names)
+        self.catchphrases: Tuple[str, ...] = tuple(catchphrases)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, SpeakerStats]" = OrderedDict()
+        self._scenes: Dict[str, _SceneEntry] = {}
+        self._chapter_totals: Dict[Optional[str], SpeakerStats] = {}
+        self._novel_totals: SpeakerStats = {}
+        # 更新・集計を 1 スレッドずつに限るロック（リクエストとウォームアップで共有する）
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_guidelines(cls, guidelines: Dict, **kwargs) -> "DialogueEngine":
+        """
+        dialogue_guidelines.yaml の内容からエンジンを作成する
+
+        Args:
+            guidelines: {"characters": {名前: {"catchphrases": [...], "aliases": [...]}}} 形式の辞書
+
+        Returns:
+            DialogueEngine
+        """
+        names, phrases = guideline_vocabulary(guidelines)
+        return cls(character_names=names, catchphrases=phrases, **kwargs)
+
+    def set_characters(self, character_names: Iterable[str], catchphrases: Iterable[str] = ()) -> None:
+        """キャラクター構成を変更する（話者推定が変わるため集計をやり直す）"""
+        self.character_names = tuple(character_names)
+        self.catchphrases = tuple(catchphrases)
+        self._cache.clear()
+        self._scenes.clear()
+        self._chapter_totals.clear()
+        self._novel_totals = {}
+
+    def analyze_content(self, content: str) -> SpeakerStats:
+        """
+        シーン本文を解析する（本文のハッシュでキャッシュする）
+
+        Args:
+            content: シーン本文
+
+        Returns:
+            話者ごとの DialogueStats
+        """
+        content_hash = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        return self._analyze(content, content_hash)
+
+    def _analyze(self, content: str, content_hash: str) -> SpeakerStats:
+        cached = self._cache.get(content_hash)
+        if cached is not None:
+            self._cache.move_to_end(content_hash)
+            return cached
+
+        stats: SpeakerStats = {}
+        for line in extract_dialogue(content, self.character_names):
+            speaker = line.speaker or UNKNOWN_SPEAKER
+            if speaker not in stats:
+                stats[speaker] = DialogueStats()
+            stats[speaker].add_line(line.text, self.catchphrases)
+
+        self._cache[content_hash] = stats
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return stats
+
+    def update_scene(
+        self,
+        scene_id: str,
+        chapter_id: Optional[str],
+        content: Optional[str],
+        revision: Optional[str] = None
+    ) -> bool:
+        """
+        シーンの統計を更新し、章・作品の集計に差分を反映する
+
+        Args:
+            scene_id: シーンID
+            chapter_id: シーンが属する章のID
+            content: シーン本文
+            revision: 更新日時などの版識別子。前回と同じ場合は本文を読まずに終了する
+
+        Returns:
+            bool: 集計が変化したかどうか
+        """
+        entry = self._scenes.get(scene_id)
+        if entry is not None and revision is not None and entry.revision == revision \
+                and entry.chapter_id == chapter_id:
+            return False
+
+        content = content or ""
+        content_hash = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        if entry is not None and entry.content_hash == content_hash and entry.chapter_id == chapter_id:
+            entry.revision = revision
+            return False
+
+        stats = self._analyze(content, content_hash)
+        if entry is not None:
+            self._apply(entry.chapter_id, entry.stats, sign=-1)
+        self._apply(chapter_id, stats, sign=1)
+        self._scenes[scene_id] = _SceneEntry(chapter_id, content_hash, revision, stats)
+        return True
+
+    def remove_scene(self, scene_id: str) -> None:
+        """シーンを集計から除外する"""
+        entry = self._scenes.pop(scene_id, None)
+        if entry is not None:
+            self._apply(entry.chapter_id, entry.stats, sign=-1)
+
+    def scene_revision(self, scene_id: str) -> Optional[str]:
+        """集計済みシーンの版識別子を返す"""
+        entry = self._scenes.get(scene_id)
+        return entry.revision if entry else None
+
+    def scene_ids(self) -> List[str]:
+        return list(self._scenes.keys())
+
+    def _apply(self, chapter_id: Optional[str], stats: SpeakerStats, sign: int) -> None:
+        chapter_totals = self._chapter_totals.setdefault(chapter_id, {})
+        _merge_speaker_stats(chapter_totals, stats, sign)
+        if not chapter_totals:
+            del self._chapter_totals[chapter_id]
+        _merge_speaker_stats(self._novel_totals, stats, sign)
+
+    def chapter_report(self, chapter_id: str) -> Dict[str, Dict]:
+        """章単位の話者別統計"""
+        totals = self._chapter_totals.get(chapter_id, {})
+        return {speaker: stats.to_dict() for speaker, stats in totals.items()}
+
+    def novel_report(self, include_chapters: bool = False) -> Dict:
+        """作品全体の話者別統計"""
+        report: Dict = {
+            "scene_count": len(self._scenes),
+            "characters": {
+                speaker: stats.to_dict() for speaker, stats in self._novel_totals.items()
+            },
+        }
+        if include_chapters:
+            report["chapters"] = {
+                str(chapter_id): self.chapter_report(chapter_id)
+                for chapter_id in self._chapter_totals
+            }
+        return report
+
+
+# 作品ごとの台詞統計エンジン（プロセス内で共有する）
+_novel_dialogue_engines: Dict[str, DialogueEngine] = {}
+
+
+def get_dialogue_engine(novel_id: str) -> DialogueEngine:
+    """作品の台詞統計エンジンを返す（なければ作成する）"""
+    engine = _novel_dialogue_engines.get(novel_id)
+    if engine is None:
+        engine = _novel_dialogue_engines[novel_id] = DialogueEngine()
+    return engine
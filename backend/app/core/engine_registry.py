@@ -0,0 +1,128 @@
+"""
+小説ごとのエンジンインスタンスの管理
+
+NovelEngine / WorldEngine / CharacterEngine をリクエストごとに作り直すと
+構造の構築や検証が毎回やり直しになるため、小説単位でプロセス内に保持する。
+保持する小説の数は ENGINE_CACHE_SIZE までで、最も長く使われていないものから破棄する。
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.core.character_engine import CharacterEngine
+from app.core.novel_engine import NovelEngine
+from app.core.world_engine import WorldEngine
+
+logger = logging.getLogger(__name__)
+
+ENGINE_CACHE_SIZE = int(os.getenv("NOVELSPEC_ENGINE_CACHE_SIZE", "64"))
+
+
+@dataclass
+class NovelEngines:
+    """1 つの小説に属するエンジンの組"""
+    novel_id: str
+    novel: NovelEngine = field(default_factory=NovelEngine)
+    world: WorldEngine = field(default_factory=WorldEngine)
+    characters: CharacterEngine = field(default_factory=CharacterEngine)
+    loaded_at: float = field(default_factory=time.time)
+
+
+EngineLoader = Callable[[str], Awaitable[NovelEngines]]
+
+
+async def _empty_loader(novel_id: str) -> NovelEngines:
+    return NovelEngines(novel_id=novel_id)
+
+
+class EngineRegistry:
+    """小説ID → エンジンの組を保持するレジストリ
+
+    同じ小説の読み込みが並行して要求された場合、読み込みは 1 回だけ行う。
+    読み込み中に invalidate された場合、その結果は保持しない（待っていた呼び出しには返す）。
+    保持する件数は max_engines までで、古いものから破棄する。
+    """
+
+    def __init__(self, loader: EngineLoader = _empty_loader, max_engines: int = ENGINE_CACHE_SIZE):
+        self._loader = loader
+        self.max_engines = max_engines
+        self._engines: "OrderedDict[str, NovelEngines]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        # 小説ID → invalidate の回数（読み込み中の破棄を検出する）
+        self._generations: Dict[str, int] = {}
+
+    def set_loader(self, loader: EngineLoader) -> None:
+        """エンジンの組を構築する関数を設定する（構造の読み込み元を差し替える）"""
+        self._loader = loader
+
+    def peek(self, novel_id: str) -> Optional[NovelEngines]:
+        """読み込み済みであれば返す（読み込みは行わない）"""
+        return self._engines.get(novel_id)
+
+    async def get(self, novel_id: str) -> NovelEngines:
+        """
+        小説のエンジンの組を返す（未読み込みなら読み込む）
+
+        Args:
+            novel_id: 小説ID
+
+        Returns:
+            NovelEngines
+        """
+        engines = self._engines.get(novel_id)
+        if engines is not None:
+            self._engines.move_to_end(novel_id)
+            return engines
+
+        pending = self._loading.get(novel_id)
+        if pending is not None:
+            return await pending
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[novel_id] = future
+        generation = self._generations.get(novel_id, 0)
+        try:
+            engines = await self._loader(novel_id)
+            if self._generations.get(novel_id, 0) == generation:
+                self._store(novel_id, engines)
+            else:
+                logger.debug(f"Engines for novel {novel_id} were invalidated while loading; not caching")
+            future.set_result(engines)
+            return engines
+        except Exception as e:
+            logger.error(f"Failed to load engines for novel {novel_id}: {str(e)}")
+            future.set_exception(e)
+            # 待機者がいない場合の "exception was never retrieved" を防ぐ
+            future.exception()
+            raise
+        finally:
+            if self._loading.get(novel_id) is future:
+                del self._loading[novel_id]
+
+    def _store(self, novel_id: str, engines: NovelEngines) -> None:
+        self._engines[novel_id] = engines
+        self._engines.move_to_end(novel_id)
+        while len(self._engines) > self.max_engines:
+            evicted, _ = self._engines.popitem(last=False)
+            logger.debug(f"Evicted engines for novel {evicted}")
+
+    def invalidate(self, novel_id: str) -> None:
+        """保持しているエンジンを破棄する（次回アクセス時に再読み込み）
+
+        読み込み中のものは保持せず、以降の get は新しく読み込む
+        """
+        self._engines.pop(novel_id, None)
+        self._generations[novel_id] = self._generations.get(novel_id, 0) + 1
+        self._loading.pop(novel_id, None)
+
+    def loaded_ids(self):
+        return list(self._engines.keys())
+
+
+# アプリケーション全体で共有するレジストリ
+engine_registry = EngineRegistry()
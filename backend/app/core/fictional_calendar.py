@@ -0,0 +1,261 @@
+"""
+架空の暦の日付を整数の通し日数に変換する
+
+小説ごとに紀元（年号）と月の日数を定義し、"星暦 1024年3月5日"、
+"year 1024, Frostmoon 3"（月の名前は年の後）、"3日目" / "day 3" などの文字列を、
+暦の起点からの日数（ordinal）に変換する。日付の比較や範囲検索は文字列ではなく
+この整数で行う。暦を定義していない小説はグレゴリオ暦（ISO 形式など）として扱う。
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+# 相対日付: "3日目"、"第3日"、"day 3"、"Day 3"
+_RELATIVE_PATTERN = re.compile(r"^(?:第\s*(\d+)\s*日|(\d+)\s*日目|day\s*(\d+))$", re.IGNORECASE)
+# "1024年3月5日"、"1024-3-5"、"1024/3/5"、"1024.3.5"、"1024年3月"、"1024年"、"1024"（整数だけの場合は年）
+_NUMERIC_DATE_PATTERN = re.compile(
+    r"^(\d+)\s*(?:年|[-/.]|\s)?\s*(?:(\d+)\s*(?:月|[-/.]|\s)?\s*(?:(\d+)\s*日?)?)?$"
+)
+_TOKEN_PATTERN = re.compile(r"\d+|[^\d\s,、，年月日]+")
+# 起点のない相対日付の通し日数の範囲（負の値。暦の日付は 0 以上なので重ならない）
+RELATIVE_ORDINAL_BASE = -(2 ** 30)
+MAX_RELATIVE_DAY = 2 ** 30
+
+
+class CalendarError(ValueError):
+    """暦の定義が不正な場合の例外クラス"""
+    pass
+
+
+@dataclass
+class Era:
+    """紀元（年号）"""
+    name: str
+    # 紀元の年数（最後の紀元は None = 終わりなし）
+    years: Optional[int] = None
+    aliases: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Month:
+    """月"""
+    name: str
+    days: int
+    aliases: List[str] = field(default_factory=list)
+
+
+class FictionalCalendar:
+    """小説ごとの暦
+
+    months を定義しない場合はグレゴリオ暦として扱い、ordinal は
+    datetime.date.toordinal() と同じ値になる（epoch だけを定義して、相対日付の
+    起点を決めることもできる）。架空の暦では、最初の紀元の 1年1月1日を
+    ordinal 0 とする（閏年はない）。整数だけの日付は年として解釈する。
+    起点を定義していない場合、相対日付は暦の日付と重ならない負の通し日数
+    （RELATIVE_ORDINAL_BASE から）になり、すべての暦の日付より前に並ぶ。
+    """
+
+    def __init__(
+        self,
+        eras: Optional[List[Era]] = None,
+        months: Optional[List[Month]] = None,
+        epoch: Optional[str] = None,
+        default_era: Optional[str] = None
+    ):
+        self.eras = eras or []
+        self.months = months or []
+        if self.eras and not self.months:
+            raise CalendarError("A calendar with eras must define its months")
+        if any(month.days <= 0 for month in self.months):
+            raise CalendarError("Month length must be positive")
+        if any(era.years is None or era.years <= 0 for era in self.eras[:-1]):
+            raise CalendarError("Every era except the last must have a positive number of years")
+
+        self.days_per_year = sum(month.days for month in self.months)
+        # 紀元の開始年（最初の紀元の 1 年を 0 とした通し年）
+        self._era_offsets: List[int] = []
+        offset = 0
+        for era in self.eras:
+            self._era_offsets.append(offset)
+            offset += era.years or 0
+        # 月の開始日（年始からの日数）
+        self._month_offsets: List[int] = []
+        offset = 0
+        for month in self.months:
+            self._month_offsets.append(offset)
+            offset += month.days
+
+        self._era_names = sorted(
+            ((name, i) for i, era in enumerate(self.eras) for name in [era.name] + era.aliases),
+            key=lambda item: -len(item[0])
+        )
+        self._month_names = sorted(
+            ((name.lower(), i) for i, month in enumerate(self.months) for name in [month.name] + month.aliases),
+            key=lambda item: -len(item[0])
+        )
+        self.default_era = self._era_index(default_era) if default_era else max(len(self.eras) - 1, 0)
+
+        # 相対日付（"3日目"）の起点
+        self.epoch = epoch
+        self.epoch_ordinal: Optional[int] = None
+        if epoch:
+            ordinal = self.to_ordinal(epoch)
+            if ordinal is None or ordinal < 0:
+                raise CalendarError(f"Cannot parse calendar epoch: {epoch}")
+            self.epoch_ordinal = ordinal
+
+    @property
+    def is_gregorian(self) -> bool:
+        return not self.months
+
+    @property
+    def is_default(self) -> bool:
+        """起点も定義していないグレゴリオ暦（暦の設定がないのと同じ）かどうか"""
+        return self.is_gregorian and not self.epoch
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict]) -> "FictionalCalendar":
+        """
+        設定の辞書から暦を作る（None または空の場合はグレゴリオ暦）
+
+        Args:
+            config: {"eras": [{"name", "years", "aliases"}], "months": [{"name", "days", "aliases"}],
+                     "epoch": 相対日付の起点, "default_era": 紀元を省略した場合の紀元}
+
+        Raises:
+            CalendarError: 定義が不正な場合
+        """
+        config = config or {}
+        try:
+            return cls(
+                eras=[Era(**era) for era in config.get("eras", [])],
+                months=[Month(**month) for month in config.get("months", [])],
+                epoch=config.get("epoch"),
+                default_era=config.get("default_era")
+            )
+        except TypeError as e:
+            raise CalendarError(f"Invalid calendar definition: {str(e)}")
+
+    def to_dict(self) -> Dict:
+        return {
+            "eras": [{"name": e.name, "years": e.years, "aliases": e.aliases} for e in self.eras],
+            "months": [{"name": m.name, "days": m.days, "aliases": m.aliases} for m in self.months],
+            "epoch": self.epoch,
+            "default_era": self.eras[self.default_era].name if self.eras else None,
+        }
+
+    def _era_index(self, name: str) -> int:
+        for era_name, index in self._era_names:
+            if era_name == name:
+                return index
+        raise CalendarError(f"Unknown era: {name}")
+
+    def _split_era(self, text: str) -> Tuple[Optional[int], str]:
+        for name, index in self._era_names:
+            if text.startswith(name):
+                return index, text[len(name):].strip()
+        return None, text
+
+    def to_ordinal(self, text: Optional[str]) -> Optional[int]:
+        """
+        日付の文字列を通し日数に変換する
+
+        Args:
+            text: 日付の文字列
+
+        Returns:
+            通し日数（解釈できない場合は None）
+        """
+        if text is None:
+            return None
+        text = unicodedata.normalize("NFKC", str(text)).strip()
+        if not text:
+            return None
+
+        relative = _RELATIVE_PATTERN.match(text)
+        if relative:
+            day = int(next(group for group in relative.groups() if group))
+            if not 1 <= day <= MAX_RELATIVE_DAY:
+                return None
+            if self.epoch_ordinal is None:
+                return RELATIVE_ORDINAL_BASE + day - 1
+            return self.epoch_ordinal + day - 1
+        if self.is_gregorian:
+            return self._gregorian_ordinal(text)
+
+        era, rest = self._split_era(text)
+        if era is None:
+            era = self.default_era
+        parsed = self._parse_fields(rest)
+        if parsed is None:
+            return None
+        year, month, day = parsed
+        if not self._is_valid(era, year, month, day):
+            return None
+        absolute_year = (self._era_offsets[era] if self.eras else 0) + year - 1
+        return absolute_year * self.days_per_year + self._month_offsets[month - 1] + day - 1
+
+    def _gregorian_ordinal(self, text: str) -> Optional[int]:
+        match = _NUMERIC_DATE_PATTERN.match(text)
+        if not match:
+            return None
+        year, month, day = (int(value) if value else 1 for value in match.groups())
+        try:
+            return date(year, month, day).toordinal()
+        except ValueError:
+            return None
+
+    def _parse_fields(self, text: str) -> Optional[Tuple[int, int, int]]:
+        """紀元を除いた部分から (年, 月, 日) を取り出す（月日は省略時 1）"""
+        match = _NUMERIC_DATE_PATTERN.match(text)
+        if match:
+            year, month, day = match.groups()
+            return int(year), int(month or 1), int(day or 1)
+
+        # 月の名前を含む形式: 年が先、日が後（"1024 Frostmoon 3"、"1024年 霜月 3日"、"year 1024, Frostmoon 3"）
+        month = None
+        lowered = text.lower()
+        for name, index in self._month_names:
+            if name in lowered:
+                month = index + 1
+                lowered = lowered.replace(name, " ", 1)
+                break
+        numbers = []
+        for token in _TOKEN_PATTERN.findall(lowered):
+            if token.isdigit():
+                numbers.append(int(token))
+            elif token not in ("year", "the", "of"):
+                return None
+        if month is None or not numbers or len(numbers) > 2:
+            return None
+        return numbers[0], month, numbers[1] if len(numbers) > 1 else 1
+
+    def _is_valid(self, era: int, year: int, month: int, day: int) -> bool:
+        if year < 1 or not 1 <= month <= len(self.months):
+            return False
+        if self.eras and self.eras[era].years is not None and year > self.eras[era].years:
+            return False
+        return 1 <= day <= self.months[month - 1].days
+
+    def from_ordinal(self, ordinal: int) -> str:
+        """通し日数を暦の表記に戻す（表示用）"""
+        if ordinal < 0:
+            # 起点のない相対日付（"3日目"）
+            return f"{ordinal - RELATIVE_ORDINAL_BASE + 1}日目"
+        if self.is_gregorian:
+            return date.fromordinal(ordinal).isoformat()
+        year, remainder = divmod(ordinal, self.days_per_year)
+        month = next(i for i in range(len(self.months) - 1, -1, -1) if self._month_offsets[i] <= remainder)
+        day = remainder - self._month_offsets[month] + 1
+        era = 0
+        for i, offset in enumerate(self._era_offsets):
+            if offset <= year:
+                era = i
+        era_name = f"{self.eras[era].name} " if self.eras else ""
+        return f"{era_name}{year - (self._era_offsets[era] if self.eras else 0) + 1}年{month + 1}月{day}日"
+
+
+GREGORIAN = FictionalCalendar()
@@ -0,0 +1,402 @@
+"""
+関係性グラフのレイアウト計算
+
+キャラクターの関係性グラフの座標をサーバー側で NumPy により計算する。
+
+- stress: PivotMDS（少数のピボットからの最短距離だけを使う、ストレス最小化の近似）
+- force: PivotMDS の座標を初期値とした Fruchterman-Reingold 法
+
+斥力は全ノード対について計算するが、行をブロックに分けて行列演算するため、
+ノード数の 2 乗の作業領域は確保しない。少数の辺だけが変わった場合は、前回の
+座標を保ったまま、変わったノードとその隣接ノードだけを動かして調整する
+（stress のレイアウトはストレス最小化、force のレイアウトは力学モデルで動かす）。
+"""
+
+import base64
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+LAYOUT_METHODS = ("force", "stress")
+
+# PivotMDS のピボット数の上限
+MAX_PIVOTS = 50
+# 斥力の計算で 1 ブロックに含める (行 × 全ノード) の要素数の目安
+BLOCK_ELEMENTS = 2_000_000
+FULL_ITERATIONS = 60
+# 反復 1 回の計算量はノード数の 2 乗に比例するため、大きなグラフでは反復を減らす
+# （PivotMDS の初期配置で全体の形はできているため、局所的な調整だけを行う）
+LARGE_GRAPH_NODES = 1000
+MIN_ITERATIONS = 15
+REFINE_ITERATIONS = 30
+# 変わった辺がこの割合以下なら部分的な調整で済ませる
+INCREMENTAL_EDGE_RATIO = 0.05
+
+Edge = Tuple[str, str]
+
+
+@dataclass
+class GraphLayout:
+    """計算済みのレイアウト"""
+    ids: List[str]
+    positions: np.ndarray  # (ノード数, 2) の float32
+    version: int
+    method: str
+    edges: Dict[Edge, float] = field(repr=False)
+    incremental: bool = False
+    moved: int = 0
+    elapsed_seconds: float = 0.0
+
+    def to_payload(self, encoding: str = "json", precision: int = 3) -> Dict:
+        """
+        レスポンス用の辞書に変換する（座標は [-1, 1] に正規化する）
+
+        Args:
+            encoding: "json"（x0, y0, x1, y1, ... の数値の配列）または
+                      "base64"（同じ並びの float32 リトルエンディアンを base64 にしたもの）
+            precision: json の場合の小数点以下の桁数
+
+        Returns:
+            Dict: ids, coords（または coords_b64）, edges（ids の添字の組の平坦な配列）など
+        """
+        positions = self.positions
+        if len(positions):
+            center = (positions.max(axis=0) + positions.min(axis=0)) / 2
+            scale = float(np.abs(positions - center).max()) or 1.0
+            positions = (positions - center) / scale
+        flat = positions.astype("<f4").ravel()
+
+        index = {node_id: i for i, node_id in enumerate(self.ids)}
+        edges = [index[node] for edge in self.edges for node in edge]
+        payload = {
+            "version": self.version,
+            "method": self.method,
+            "ids": self.ids,
+            "edges": edges,
+            "weights": [round(weight, 3) for weight in self.edges.values()],
+            "incremental": self.incremental,
+            "moved": self.moved,
+            "elapsed_seconds": round(self.elapsed_seconds, 4),
+        }
+        if encoding == "base64":
+            payload["coords_b64"] = base64.b64encode(flat.tobytes()).decode("ascii")
+        else:
+            payload["coords"] = np.round(flat.astype(np.float64), precision).tolist()
+        return payload
+
+
+def _adjacency(n: int, src: np.ndarray, dst: np.ndarray) -> List[List[int]]:
+    neighbors: List[List[int]] = [[] for _ in range(n)]
+    for a, b in zip(src.tolist(), dst.tolist()):
+        neighbors[a].append(b)
+        neighbors[b].append(a)
+    return neighbors
+
+
+def _bfs(neighbors: List[List[int]], source: int) -> np.ndarray:
+    distances = np.full(len(neighbors), -1.0, dtype=np.float32)
+    distances[source] = 0.0
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        next_distance = distances[node] + 1.0
+        for other in neighbors[node]:
+            if distances[other] < 0:
+                distances[other] = next_distance
+                queue.append(other)
+    return distances
+
+
+def pivot_mds(n: int, src: np.ndarray, dst: np.ndarray, pivots: int = MAX_PIVOTS, seed: int = 0) -> np.ndarray:
+    """
+    PivotMDS による初期レイアウト
+
+    最大 pivots 個のピボット（互いに遠いノードを順に選ぶ）からの最短距離だけを
+    使って古典的 MDS を近似する。到達できないノードへの距離は最大距離 + 1 とする。
+
+    Returns:
+        np.ndarray: (n, 2) の座標（辺の理想長がおよそ 1 になる尺度）
+    """
+    if n == 0:
+        return np.zeros((0, 2), dtype=np.float32)
+    if n <= 2:
+        return np.array([[0.0, 0.0], [1.0, 0.0]][:n], dtype=np.float32)
+
+    neighbors = _adjacency(n, src, dst)
+    count = min(pivots, n)
+    chosen = [int(np.random.default_rng(seed).integers(n))]
+    columns = []
+    nearest = np.full(n, np.inf, dtype=np.float32)
+    for _ in range(count):
+        distances = _bfs(neighbors, chosen[-1])
+        unreachable = distances < 0
+        distances[unreachable] = (distances.max() if (~unreachable).any() else 0.0) + 1.0
+        columns.append(distances)
+        nearest = np.minimum(nearest, distances)
+        candidate = int(np.argmax(nearest))
+        if nearest[candidate] == 0:
+            break
+        chosen.append(candidate)
+
+    squared = np.stack(columns, axis=1).astype(np.float64) ** 2
+    centered = squared - squared.mean(axis=0) - squared.mean(axis=1, keepdims=True) + squared.mean()
+    centered *= -0.5
+    u, s, _ = np.linalg.svd(centered, full_matrices=False)
+    coords = u[:, :2] * s[:2]
+    if coords.shape[1] < 2:
+        coords = np.hstack([coords, np.zeros((n, 2 - coords.shape[1]))])
+
+    # 重なったノード（同じ距離ベクトルを持つ葉など）を少しずらす
+    jitter = np.random.default_rng(seed + 1).normal(scale=1e-3, size=coords.shape)
+    coords = coords + jitter * (np.abs(coords).max() or 1.0)
+
+    # 辺の平均長が 1 になるように尺度を合わせる
+    if len(src):
+        lengths = np.linalg.norm(coords[src] - coords[dst], axis=1)
+        mean = float(lengths.mean())
+        if mean > 0:
+            coords /= mean
+    return coords.astype(np.float32)
+
+
+def _displacement(
+    positions: np.ndarray,
+    active: np.ndarray,
+    src: np.ndarray,
+    dst: np.ndarray,
+    weights: np.ndarray,
+    k: float
+) -> np.ndarray:
+    """active のノードに働く力（斥力はブロック単位、引力は辺単位）"""
+    n = len(positions)
+    disp = np.zeros((len(active), 2), dtype=np.float32)
+    block = max(1, BLOCK_ELEMENTS // max(n, 1))
+    k2 = k * k
+    x, y = positions[:, 0], positions[:, 1]
+    for start in range(0, len(active), block):
+        rows = active[start:start + block]
+        dx = x[rows, None] - x[None, :]
+        dy = y[rows, None] - y[None, :]
+        scale = dx * dx
+        scale += dy * dy
+        np.maximum(scale, 1e-4, out=scale)
+        np.divide(k2, scale, out=scale)
+        scale[np.arange(len(rows)), rows] = 0.0
+        disp[start:start + len(rows), 0] = np.einsum("ij,ij->i", dx, scale)
+        disp[start:start + len(rows), 1] = np.einsum("ij,ij->i", dy, scale)
+
+    if len(src):
+        delta = positions[src] - positions[dst]
+        dist = np.linalg.norm(delta, axis=1, keepdims=True)
+        pull = delta * (dist * weights[:, None] / k)
+        full = np.zeros((n, 2), dtype=np.float32)
+        np.add.at(full, src, -pull)
+        np.add.at(full, dst, pull)
+        disp += full[active]
+    return disp
+
+
+def force_directed(
+    positions: np.ndarray,
+    src: np.ndarray,
+    dst: np.ndarray,
+    weights: np.ndarray,
+    active: Optional[np.ndarray] = None,
+    iterations: int = FULL_ITERATIONS,
+    temperature: Optional[float] = None
+) -> np.ndarray:
+    """
+    Fruchterman-Reingold 法で座標を調整する
+
+    Args:
+        positions: 初期座標 (n, 2)
+        src, dst, weights: 辺の両端の添字と重み
+        active: 動かすノードの添字（省略時は全ノード）
+        iterations: 反復回数
+        temperature: 1 反復で動ける距離の初期値（省略時はグラフの広がりの 1/10）
+
+    Returns:
+        np.ndarray: 調整後の座標
+    """
+    positions = positions.astype(np.float32, copy=True)
+    n = len(positions)
+    if n < 2 or iterations <= 0:
+        return positions
+    active = np.arange(n) if active is None else np.asarray(active, dtype=np.int64)
+    if not len(active):
+        return positions
+
+    k = 1.0
+    if temperature is None:
+        temperature = float(np.ptp(positions, axis=0).max()) / 10 or 1.0
+    for step in range(iterations):
+        t = temperature * (1 - step / iterations)
+        disp = _displacement(positions, active, src, dst, weights, k)
+        length = np.linalg.norm(disp, axis=1, keepdims=True)
+        np.maximum(length, 1e-9, out=length)
+        positions[active] += disp / length * np.minimum(length, t)
+    return positions
+
+
+def stress_majorization(
+    positions: np.ndarray,
+    neighbors: List[List[int]],
+    active: np.ndarray,
+    iterations: int = REFINE_ITERATIONS
+) -> np.ndarray:
+    """
+    active のノードだけをストレス最小化（SMACOF の局所的な更新）で動かす
+
+    各ノードを、他のノードとの距離が最短距離（辺の数）に近づく位置へ重み d^-2 で
+    順に移す。到達できないノードへの距離は pivot_mds と同じく最大距離 + 1 とする。
+
+    Args:
+        positions: 初期座標 (n, 2)（辺の理想長がおよそ 1 の尺度）
+        neighbors: 隣接リスト
+        active: 動かすノードの添字
+        iterations: 反復回数
+
+    Returns:
+        np.ndarray: 調整後の座標
+    """
+    positions = positions.astype(np.float32, copy=True)
+    if len(positions) < 2 or not len(active) or iterations <= 0:
+        return positions
+
+    targets = []
+    for i in active.tolist():
+        distances = _bfs(neighbors, i)
+        unreachable = distances < 0
+        distances[unreachable] = distances.max() + 1.0
+        weights = np.zeros_like(distances)
+        np.divide(1.0, distances * distances, out=weights, where=distances > 0)
+        targets.append((i, distances[:, None], weights[:, None], float(weights.sum())))
+
+    for _ in range(iterations):
+        for i, distances, weights, total in targets:
+            delta = positions[i] - positions
+            length = np.linalg.norm(delta, axis=1, keepdims=True)
+            np.maximum(length, 1e-9, out=length)
+            ideal = positions + delta * (distances / length)
+            positions[i] = (weights * ideal).sum(axis=0) / total
+    return positions
+
+
+def _edge_arrays(ids: Sequence[str], edges: Dict[Edge, float]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    pairs = [(index[a], index[b], w) for (a, b), w in edges.items() if a in index and b in index]
+    if not pairs:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=np.float32)
+    src, dst, weights = zip(*pairs)
+    return np.array(src), np.array(dst), np.array(weights, dtype=np.float32)
+
+
+def compute_layout(
+    ids: Sequence[str],
+    edges: Dict[Edge, float],
+    version: int,
+    method: str = "force",
+    iterations: int = FULL_ITERATIONS
+) -> GraphLayout:
+    """
+    レイアウトを最初から計算する
+
+    Args:
+        ids: ノード（キャラクターID）
+        edges: (ID, ID) → 重み（0〜1）
+        version: グラフのバージョン
+        method: "force" または "stress"
+
+    Returns:
+        GraphLayout
+    """
+    if method not in LAYOUT_METHODS:
+        raise ValueError(f"Unknown layout method: {method}")
+    started = time.perf_counter()
+    ids = list(ids)
+    src, dst, weights = _edge_arrays(ids, edges)
+    positions = pivot_mds(len(ids), src, dst)
+    if method == "force":
+        if len(ids) > LARGE_GRAPH_NODES:
+            iterations = max(MIN_ITERATIONS, iterations * LARGE_GRAPH_NODES // len(ids))
+        positions = force_directed(positions, src, dst, weights, iterations=iterations)
+    return GraphLayout(
+        ids=ids, positions=positions, version=version, method=method, edges=dict(edges),
+        moved=len(ids), elapsed_seconds=time.perf_counter() - started
+    )
+
+
+def changed_nodes(old: Dict[Edge, float], new: Dict[Edge, float]) -> Set[str]:
+    """辺が追加・削除・重み変更されたノード"""
+    nodes: Set[str] = set()
+    for edge in old.keys() ^ new.keys():
+        nodes.update(edge)
+    for edge in old.keys() & new.keys():
+        if old[edge] != new[edge]:
+            nodes.update(edge)
+    return nodes
+
+
+def refine_layout(
+    previous: GraphLayout,
+    ids: Sequence[str],
+    edges: Dict[Edge, float],
+    version: int,
+    iterations: int = REFINE_ITERATIONS
+) -> Optional[GraphLayout]:
+    """
+    前回のレイアウトを少数の変更に合わせて調整する
+
+    新しいノードは配置済みの隣接ノードの重心（なければ全体の重心の近く）に置き、
+    変わったノードとその隣接ノードだけを、前回と同じ方法（stress はストレス
+    最小化、force は力学モデル）で動かす。変更が多い場合は None を返す
+    （compute_layout で計算し直す）。
+
+    Returns:
+        GraphLayout または None
+    """
+    ids = list(ids)
+    previous_index = {node_id: i for i, node_id in enumerate(previous.ids)}
+    added = [node_id for node_id in ids if node_id not in previous_index]
+    removed = len(previous.ids) - (len(ids) - len(added))
+    touched = changed_nodes(previous.edges, edges)
+    budget = max(1, int(INCREMENTAL_EDGE_RATIO * max(len(edges), len(previous.edges))))
+    if len(touched) + len(added) + removed > 2 * budget:
+        return None
+
+    started = time.perf_counter()
+    src, dst, weights = _edge_arrays(ids, edges)
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    positions = np.zeros((len(ids), 2), dtype=np.float32)
+    for node_id, i in index.items():
+        if node_id in previous_index:
+            positions[i] = previous.positions[previous_index[node_id]]
+
+    neighbors = _adjacency(len(ids), src, dst)
+    center = positions.mean(axis=0) if len(previous.ids) else np.zeros(2, dtype=np.float32)
+    rng = np.random.default_rng(version)
+    for node_id in added:
+        i = index[node_id]
+        placed = [j for j in neighbors[i] if ids[j] in previous_index]
+        anchor = positions[placed].mean(axis=0) if placed else center
+        positions[i] = anchor + rng.normal(scale=0.5, size=2)
+
+    moving: Set[int] = set()
+    for node_id in touched.union(added):
+        if node_id in index:
+            i = index[node_id]
+            moving.add(i)
+            moving.update(neighbors[i])
+    active = np.array(sorted(moving), dtype=np.int64)
+    if previous.method == "stress":
+        positions = stress_majorization(positions, neighbors, active, iterations=iterations)
+    else:
+        positions = force_directed(positions, src, dst, weights, active=active, iterations=iterations, temperature=1.0)
+    return GraphLayout(
+        ids=ids, positions=positions, version=version, method=previous.method, edges=dict(edges),
+        incremental=True, moved=len(active), elapsed_seconds=time.perf_counter() - started
+    )
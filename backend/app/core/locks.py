@@ -0,0 +1,63 @@
+"""
+エンジンの状態を更新するための細粒度ロック
+
+小説やキャラクターなどのキー単位で asyncio のロックを割り当てる。異なるキーへの
+更新は並行して進み、同じキーへの更新だけが直列化される。使われなくなった
+ロックは自動的に破棄されるため、キーの数に比例してメモリが増え続けることはない。
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Hashable, List
+
+
+class _Entry:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class KeyedLock:
+    """キーごとの排他ロック"""
+
+    def __init__(self):
+        self._entries: Dict[Hashable, _Entry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @asynccontextmanager
+    async def hold(self, *keys: Hashable) -> AsyncIterator[None]:
+        """
+        指定したキーのロックをすべて取得する
+
+        複数のキーは常に同じ順序で取得するため、キーの組が重なる
+        並行処理同士でもデッドロックしない。
+
+        Args:
+            *keys: ロックするキー
+        """
+        ordered: List[Hashable] = sorted(set(keys), key=repr)
+        entries = []
+        for key in ordered:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            entry.users += 1
+            entries.append((key, entry))
+
+        acquired: List[_Entry] = []
+        try:
+            for _, entry in entries:
+                await entry.lock.acquire()
+                acquired.append(entry)
+            yield
+        finally:
+            for entry in reversed(acquired):
+                entry.lock.release()
+            for key, entry in entries:
+                entry.users -= 1
+                if entry.users == 0:
+                    del self._entries[key]
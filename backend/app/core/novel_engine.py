@@ -1,8 +1,16 @@
 from typing import Dict, List, Optional
+from bisect import bisect_left, bisect_right, insort
 from datetime import datetime
 import logging
+import mmap
+import os
 from pydantic import BaseModel
 
+from app.core.fictional_calendar import GREGORIAN, FictionalCalendar
+from app.core.ordering import evenly_spaced_keys, is_valid_key, key_between, sequence_key
+from app.core.rule_dependencies import RuleDependencyIndex
+from app.core.structure_codec import decode_structure, encode_structure
+
 # ログ設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,6 +21,7 @@ class PlotElement(BaseModel):
     title: str
     description: str
     order: int
+    sort_key: Optional[str] = None
     chapter_id: Optional[str]
     created_at: datetime
     updated_at: datetime
@@ -32,6 +41,11 @@ class NovelEngine:
         self.structure: Optional[StoryStructure] = None
         self.consistency_rules = []
         self.validation_errors = []
+        # 世界観ルールと章の依存関係（構造の作成時に構築する）
+        self.rule_index = RuleDependencyIndex(self._validate_world_rule)
+        # 作中の暦と、タイムラインのイベントの (通し日数, ID) の昇順リスト
+        self.calendar: FictionalCalendar = GREGORIAN
+        self._timeline_order: List[tuple] = []
 
     async def create_structure(self, 
                              plot_elements: List[Dict],
@@ -60,12 +74,71 @@ class NovelEngine:
                 world_building=world_building,
                 timeline=timeline
             )
+            self.rule_index.load(world_building.get('rules', []), chapters)
+            self._index_timeline()
             logger.info("Story structure created successfully")
             return self.structure
         except Exception as e:
             logger.error(f"Error creating story structure: {str(e)}")
             raise
 
+    def dump_structure(self) -> bytes:
+        """
+        物語構造をバイナリ形式（app.core.structure_codec）に変換する
+
+        Returns:
+            bytes: バイナリ形式のデータ
+        """
+        if not self.structure:
+            raise ValueError("Story structure has not been created")
+        return encode_structure(self.structure)
+
+    def save_structure(self, path: str) -> int:
+        """
+        物語構造をバイナリ形式でファイルに保存する
+
+        Args:
+            path: 保存先のパス
+
+        Returns:
+            int: 書き込んだバイト数
+        """
+        data = self.dump_structure()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        # 書き込み途中のファイルを読み込まないよう、置き換えは最後に行う
+        os.replace(tmp_path, path)
+        return len(data)
+
+    async def load_structure(self, source) -> StoryStructure:
+        """
+        バイナリ形式の物語構造を読み込む
+
+        ファイルは mmap で開き、数値の列はコピーせずに参照しながら組み立てる。
+        ルールの依存関係とタイムラインの索引は create_structure と同じく作り直す。
+
+        Args:
+            source: dump_structure の結果（bytes）またはファイルのパス
+
+        Returns:
+            StoryStructure: 読み込んだ物語構造
+        """
+        try:
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                structure = decode_structure(source, StoryStructure, PlotElement)
+            else:
+                with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    structure = decode_structure(data, StoryStructure, PlotElement)
+            self.structure = structure
+            self.rule_index.load(structure.world_building.get('rules', []), structure.chapters)
+            self._index_timeline()
+            logger.info("Story structure loaded successfully")
+            return self.structure
+        except Exception as e:
+            logger.error(f"Error loading story structure: {str(e)}")
+            raise
+
     async def validate_plot(self) -> bool:
         """
         プロットの整合性を検証する
@@ -79,7 +152,9 @@ class NovelEngine:
         self.validation_errors = []
         
         # プロット要素の順序チェック
-        plot_orders = [elem.order for elem in self.structure.plot_elements]
+        plot_orders = [
+            sequence_key(elem.sort_key, elem.order) for elem in self.structure.plot_elements
+        ]
         if len(plot_orders) != len(set(plot_orders)):
             self.validation_errors.append("Duplicate plot element orders found")
 
@@ -128,43 +203,296 @@ class NovelEngine:
         return {"status": len(issues) == 0, "issues": issues}
 
     def _check_timeline_consistency(self) -> Dict:
-        """タイムラインの整合性をチェック"""
+        """タイムラインの整合性をチェック
+
+        日付は作成時に通し日数へ変換済みのため、文字列の比較は行わない。
+        作中の暦で解釈できない日付と、同じイベントIDの重複を報告する。
+        """
         issues = []
-        events = sorted(self.structure.timeline, key=lambda x: x['date'])
-        
-        for i in range(len(events) - 1):
-            if events[i]['date'] > events[i + 1]['date']:
-                issues.append(f"Timeline inconsistency between events {events[i]['id']} and {events[i + 1]['id']}")
+        seen = set()
+        for event in self.structure.timeline:
+            if event.get('ordinal') is None:
+                issues.append(f"Timeline event {event['id']} has an unrecognized date '{event.get('date')}'")
+            if event['id'] in seen:
+                issues.append(f"Timeline event {event['id']} is defined more than once")
+            seen.add(event['id'])
 
         return {"status": len(issues) == 0, "issues": issues}
 
+    def _index_timeline(self) -> None:
+        """タイムラインの各イベントの通し日数を求め、昇順の索引を作り直す"""
+        self._timeline_order = []
+        for event in self.structure.timeline:
+            event['ordinal'] = self.calendar.to_ordinal(event.get('date'))
+            if event['ordinal'] is not None:
+                self._timeline_order.append((event['ordinal'], str(event['id'])))
+        self._timeline_order.sort()
+
+    def set_calendar(self, calendar: FictionalCalendar) -> None:
+        """
+        作中の暦を設定する（構造がある場合はタイムラインの通し日数を計算し直す）
+
+        Args:
+            calendar: 作中の暦
+        """
+        self.calendar = calendar
+        if self.structure:
+            self._index_timeline()
+
+    def add_timeline_event(self, event: Dict) -> Dict:
+        """
+        タイムラインにイベントを追加・更新する（通し日数は書き込み時に 1 回だけ計算する）
+
+        Args:
+            event: イベント（'id' と 'date' が必須）
+
+        Returns:
+            Dict: 'ordinal' を設定したイベント
+        """
+        if not self.structure:
+            raise ValueError("Story structure has not been created")
+
+        event_id = str(event['id'])
+        timeline = self.structure.timeline
+        for i, existing in enumerate(timeline):
+            if str(existing['id']) == event_id:
+                if existing.get('ordinal') is not None:
+                    self._timeline_order.remove((existing['ordinal'], event_id))
+                timeline[i] = event
+                break
+        else:
+            timeline.append(event)
+
+        event['ordinal'] = self.calendar.to_ordinal(event.get('date'))
+        if event['ordinal'] is not None:
+            insort(self._timeline_order, (event['ordinal'], event_id))
+        return event
+
+    def timeline_between(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        """
+        作中の日付の範囲に含まれるイベントを日付順に返す
+
+        Args:
+            start: 範囲の開始日（作中の暦の表記、省略時は先頭から）
+            end: 範囲の終了日（この日を含む、省略時は末尾まで）
+
+        Returns:
+            List[Dict]: イベントのリスト
+        """
+        if not self.structure:
+            raise ValueError("Story structure has not been created")
+
+        low = 0
+        high = len(self._timeline_order)
+        if start is not None:
+            ordinal = self.calendar.to_ordinal(start)
+            if ordinal is None:
+                raise ValueError(f"Cannot parse date: {start}")
+            low = bisect_left(self._timeline_order, (ordinal,))
+        if end is not None:
+            ordinal = self.calendar.to_ordinal(end)
+            if ordinal is None:
+                raise ValueError(f"Cannot parse date: {end}")
+            high = bisect_right(self._timeline_order, (ordinal, chr(0x10FFFF)))
+
+        events = {str(event['id']): event for event in self.structure.timeline}
+        return [events[event_id] for _, event_id in self._timeline_order[low:high]]
+
     def _check_world_building_consistency(self) -> Dict:
-        """世界観設定の整合性をチェック"""
+        """世界観設定の整合性をチェック
+
+        依存関係の索引を使い、前回から変更されたルール・章に関係する組だけを検証する。
+        """
         issues = []
-        rules = self.structure.world_building.get('rules', [])
-        
-        for chapter in self.structure.chapters:
-            for rule in rules:
-                if not self._validate_world_rule(chapter, rule):
-                    issues.append(f"World building rule '{rule['name']}' violated in chapter {chapter['id']}")
+        for rule_name, chapter_id in self.rule_index.evaluate():
+            chapter = self.rule_index.chapters[chapter_id]
+            issues.append(f"World building rule '{rule_name}' violated in chapter {chapter['id']}")
 
         return {"status": len(issues) == 0, "issues": issues}
 
+    def update_chapter(self, chapter: Dict) -> None:
+        """
+        章を追加・更新する（この章に関係するルールだけが再検証の対象になる）
+
+        Args:
+            chapter: チャプター情報（'id' が必須）
+        """
+        if not self.structure:
+            raise ValueError("Story structure has not been created")
+
+        for i, existing in enumerate(self.structure.chapters):
+            if str(existing['id']) == str(chapter['id']):
+                self.structure.chapters[i] = chapter
+                break
+        else:
+            self.structure.chapters.append(chapter)
+        self.rule_index.set_chapter(chapter)
+
+    def remove_chapter(self, chapter_id: str) -> None:
+        """章を削除する"""
+        if not self.structure:
+            raise ValueError("Story structure has not been created")
+
+        self.structure.chapters = [
+            c for c in self.structure.chapters if str(c['id']) != str(chapter_id)
+        ]
+        self.rule_index.remove_chapter(chapter_id)
+
+    def update_world_rule(self, rule: Dict) -> List[str]:
+        """
+        世界観ルールを追加・更新する（このルールを参照する章だけが再検証の対象になる）
+
+        Args:
+            rule: ルール（'name' が必須）
+
+        Returns:
+            List[str]: ルールが適用される章のID
+        """
+        if not self.structure:
+            raise ValueError("Story structure has not been created")
+
+        rules = self.structure.world_building.setdefault('rules', [])
+        for i, existing in enumerate(rules):
+            if existing['name'] == rule['name']:
+                rules[i] = rule
+                break
+        else:
+            rules.append(rule)
+        self.rule_index.set_rule(rule)
+        return self.rule_index.impact(rule['name'])["chapters"]
+
+    def remove_world_rule(self, name: str) -> None:
+        """世界観ルールを削除する"""
+        if not self.structure:
+            raise ValueError("Story structure has not been created")
+
+        self.structure.world_building['rules'] = [
+            r for r in self.structure.world_building.get('rules', []) if r['name'] != name
+        ]
+        self.rule_index.remove_rule(name)
+
+    def analyze_rule_impact(self, name: str) -> Dict:
+        """
+        世界観ルールを変更した場合の影響範囲を返す
+
+        Args:
+            name: ルール名
+
+        Returns:
+            Dict: 影響を受ける章と現在の違反を含む辞書
+        """
+        if not self.structure:
+            raise ValueError("Story structure has not been created")
+
+        if name not in self.rule_index.rules:
+            raise ValueError(f"World building rule '{name}' not found")
+        self.rule_index.evaluate()
+        return self.rule_index.impact(name)
+
     def _analyze_plot_flow(self) -> Dict:
-        """プロットの流れを分析"""
-        plot_elements = sorted(self.structure.plot_elements, key=lambda x: x.order)
+        """プロットの流れを分析
+
+        並び順キーの値そのものではなく論理的な順序で判定する。連続する
+        プロット要素の間でプロットを持たない章が飛ばされている場合を
+        ギャップ、章の順序が逆行している場合を潜在的な問題として報告する。
+        """
+        plot_elements = sorted(
+            self.structure.plot_elements,
+            key=lambda x: sequence_key(x.sort_key, x.order)
+        )
         flow_analysis = {
             "plot_points": len(plot_elements),
             "gaps": [],
             "potential_issues": []
         }
 
-        for i in range(len(plot_elements) - 1):
-            if plot_elements[i + 1].order - plot_elements[i].order > 1:
-                flow_analysis["gaps"].append(f"Gap between elements {plot_elements[i].id} and {plot_elements[i + 1].id}")
+        chapters = sorted(
+            self.structure.chapters,
+            key=lambda c: sequence_key(c.get('sort_key'), c.get('order'))
+        )
+        chapter_positions = {chapter['id']: i for i, chapter in enumerate(chapters)}
+
+        for current, following in zip(plot_elements, plot_elements[1:]):
+            current_pos = chapter_positions.get(current.chapter_id)
+            following_pos = chapter_positions.get(following.chapter_id)
+            if current_pos is None or following_pos is None:
+                continue
+            if following_pos - current_pos > 1:
+                skipped = [chapters[i]['id'] for i in range(current_pos + 1, following_pos)]
+                flow_analysis["gaps"].append(
+                    f"Gap between elements {current.id} and {following.id}: "
+                    f"chapters {', '.join(map(str, skipped))} have no plot elements"
+                )
+            elif following_pos < current_pos:
+                flow_analysis["potential_issues"].append(
+                    f"Plot element {following.id} follows {current.id} but is placed in an earlier chapter"
+                )
 
         return flow_analysis
 
+    def move_plot_element(
+        self,
+        element_id: str,
+        after_id: Optional[str] = None,
+        before_id: Optional[str] = None
+    ) -> PlotElement:
+        """
+        プロット要素を移動する（移動する要素の並び順キーのみを更新する）
+
+        Args:
+            element_id: 移動するプロット要素のID
+            after_id: 直前に来る要素のID（先頭に移動する場合は None）
+            before_id: 直後に来る要素のID（after_id の直後に移動する場合は省略可）
+
+        Returns:
+            PlotElement: 更新されたプロット要素
+
+        Raises:
+            ValueError: 要素が見つからない場合、自身の前後を指定した場合、
+                after_id と before_id が隣り合う順になっていない場合
+        """
+        if not self.structure:
+            raise ValueError("Story structure has not been created")
+
+        ordered = sorted(
+            self.structure.plot_elements,
+            key=lambda x: sequence_key(x.sort_key, x.order)
+        )
+        if not all(is_valid_key(elem.sort_key) for elem in ordered):
+            # 整数 order のみの要素・旧形式のキーの要素には現在の順序のまま並び順キーを割り当てる
+            for elem, key in zip(ordered, evenly_spaced_keys(len(ordered))):
+                elem.sort_key = key
+
+        by_id = {elem.id: elem for elem in ordered}
+        if element_id not in by_id:
+            raise ValueError(f"Plot element with ID {element_id} not found")
+        others = [elem for elem in ordered if elem.id != element_id]
+
+        if after_id is not None and after_id not in by_id:
+            raise ValueError(f"Plot element with ID {after_id} not found")
+        if before_id is not None and before_id not in by_id:
+            raise ValueError(f"Plot element with ID {before_id} not found")
+        if element_id in (after_id, before_id):
+            raise ValueError("A plot element cannot be moved relative to itself")
+
+        positions = {elem.id: i for i, elem in enumerate(others)}
+        if before_id is None:
+            index = positions[after_id] + 1 if after_id is not None else 0
+            before_id = others[index].id if index < len(others) else None
+        elif after_id is None:
+            index = positions[before_id]
+            after_id = others[index - 1].id if index > 0 else None
+        elif positions[before_id] != positions[after_id] + 1:
+            raise ValueError(f"Plot element {before_id} does not directly follow {after_id}")
+
+        element = by_id[element_id]
+        element.sort_key = key_between(
+            by_id[after_id].sort_key if after_id else None,
+            by_id[before_id].sort_key if before_id else None
+        )
+        element.updated_at = datetime.utcnow()
+        return element
+
     def _validate_world_rule(self, chapter: Dict, rule: Dict) -> bool:
         """世界観ルールの検証"""
         # 実装は世界観ルールの具体的な形式に依存
@@ -0,0 +1,131 @@
+"""
+辞書順の分数インデックスによる並び順キー
+
+キーは 36 進数の小数 0.xxx の小数部分を表す文字列で、文字列の辞書順が
+そのまま数値の大小に一致する。任意の 2 つのキーの間に新しいキーを
+生成できるため、並べ替えは移動する行の 1 回の更新で完了する。
+
+桁には数字と英小文字だけを使う。大文字と小文字が混在すると、バイト順以外の
+照合順序（PostgreSQL のロケール照合や MySQL の大文字小文字を区別しない照合）で
+ORDER BY sort_key や sort_key > x の比較が数値の大小と食い違うため。
+"""
+
+from typing import List, Optional, Tuple
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+_DIGIT_INDEX = {digit: i for i, digit in enumerate(DIGITS)}
+
+# これより長いキーが生成されたら再採番を検討する
+REBALANCE_KEY_LENGTH = 24
+
+
+class OrderingError(ValueError):
+    """並び順キーの生成に失敗したことを表す例外クラス"""
+    pass
+
+
+def is_valid_key(key: Optional[str]) -> bool:
+    """現在の桁の文字だけからなる、末尾が 0 でないキーかどうか（旧形式のキーは False）"""
+    return bool(key) and key[-1] != DIGITS[0] and all(c in _DIGIT_INDEX for c in key)
+
+
+def _validate(key: str) -> None:
+    if not is_valid_key(key):
+        raise OrderingError(f"Invalid ordering key: {key!r}")
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    """a < b を満たす小数部分 a, b の間の最短の文字列を返す（b=None は 1.0）"""
+    if b is not None:
+        # 共通の接頭辞はそのまま残す
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else DIGITS[0]) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = _DIGIT_INDEX[a[0]] if a else 0
+    digit_b = _DIGIT_INDEX[b[0]] if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b) // 2]
+    # 先頭の桁が隣接している場合は次の桁で中間を取る
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def key_between(before: Optional[str], after: Optional[str]) -> str:
+    """
+    2 つのキーの間に位置する新しいキーを生成する
+
+    Args:
+        before: 直前の要素のキー（先頭に挿入する場合は None）
+        after: 直後の要素のキー（末尾に追加する場合は None）
+
+    Returns:
+        before < key < after を満たすキー
+
+    Raises:
+        OrderingError: キーが不正、または before >= after の場合
+    """
+    if before is not None:
+        _validate(before)
+    if after is not None:
+        _validate(after)
+    if before is not None and after is not None and before >= after:
+        raise OrderingError(f"{before!r} must sort before {after!r}")
+    # 末尾への追加・先頭への挿入が続いてもキーが伸びにくいよう、1 桁だけ進める
+    if after is None and before is not None:
+        for i, digit in enumerate(before):
+            if digit != DIGITS[-1]:
+                return before[:i] + DIGITS[_DIGIT_INDEX[digit] + 1]
+    if before is None and after is not None:
+        for i, digit in enumerate(after):
+            if digit != DIGITS[0]:
+                if _DIGIT_INDEX[digit] > 1:
+                    return after[:i] + DIGITS[_DIGIT_INDEX[digit] - 1]
+                break
+    return _midpoint(before or "", after)
+
+
+def evenly_spaced_keys(count: int) -> List[str]:
+    """
+    等間隔に並ぶ count 個のキーを生成する（初期採番・再採番用）
+
+    Args:
+        count: 生成するキーの数
+
+    Returns:
+        昇順に並んだ、できるだけ短いキーのリスト
+    """
+    if count <= 0:
+        return []
+    width = 1
+    while BASE ** width <= count:
+        width += 1
+    span = BASE ** width
+    keys = []
+    for i in range(1, count + 1):
+        value = i * span // (count + 1)
+        digits = []
+        for _ in range(width):
+            value, remainder = divmod(value, BASE)
+            digits.append(DIGITS[remainder])
+        keys.append("".join(reversed(digits)).rstrip(DIGITS[0]))
+    return keys
+
+
+def needs_rebalance(key: str) -> bool:
+    """キーが長くなりすぎて再採番が望ましいかどうか"""
+    return len(key) > REBALANCE_KEY_LENGTH
+
+
+def sequence_key(sort_key: Optional[str], order: Optional[int]) -> Tuple[bool, str, int]:
+    """
+    並び順キーと旧来の整数 order を併用する要素のソートキー
+
+    並び順キーを持つ要素を先に、キーを持たない要素は order の順に並べる
+    """
+    return (sort_key is None, sort_key or "", order or 0)
+
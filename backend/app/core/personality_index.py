@@ -0,0 +1,220 @@
+"""
+パーソナリティ特性ベクトルの近傍検索
+
+キャラクターの personality（特性名 → 値）を NumPy の行列に詰めて保持し、
+コサイン類似度・ユークリッド距離による上位 k 件の検索と、しきい値以上に
+似ているペア（ほぼ重複したキャラクター）の列挙を行う。全ペアの列挙は
+ブロック単位の行列積で計算するため、キャスト全体の類似度行列を一度に
+確保しない。
+
+特性の語彙は追加された順に列を割り当て、ベクトルに含まれない特性は 0 として扱う。
+"""
+
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+METRICS = ("cosine", "euclidean")
+
+
+class PersonalityIndex:
+    """パーソナリティ特性ベクトルの索引
+
+    行の追加・更新・削除は O(特性数) で行い、行列は容量を倍々に確保する。
+    削除した行は末尾の行で埋めるため、行列は常に先頭から詰まっている。
+    """
+
+    def __init__(self, initial_capacity: int = 64, dtype=np.float32):
+        self.dtype = dtype
+        self._traits: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._matrix = np.zeros((initial_capacity, 8), dtype=dtype)
+        self._norms = np.zeros(initial_capacity, dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._rows
+
+    @property
+    def traits(self) -> List[str]:
+        return list(self._traits)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """登録済みの行だけを含む行列（ビュー）"""
+        return self._matrix[:len(self._ids), :len(self._traits)]
+
+    def _ensure_shape(self, rows: int, columns: int) -> None:
+        capacity, width = self._matrix.shape
+        if rows <= capacity and columns <= width:
+            return
+        new_capacity = max(capacity, 1)
+        while new_capacity < rows:
+            new_capacity *= 2
+        new_width = max(width, 1)
+        while new_width < columns:
+            new_width *= 2
+        matrix = np.zeros((new_capacity, new_width), dtype=self.dtype)
+        matrix[:capacity, :width] = self._matrix
+        norms = np.zeros(new_capacity, dtype=self.dtype)
+        norms[:capacity] = self._norms
+        self._matrix, self._norms = matrix, norms
+
+    def _encode(self, vector: Mapping[str, float], grow: bool) -> np.ndarray:
+        if grow:
+            for trait in vector:
+                if trait not in self._traits:
+                    self._traits[trait] = len(self._traits)
+            self._ensure_shape(len(self._ids), len(self._traits))
+        encoded = np.zeros(self._matrix.shape[1], dtype=self.dtype)
+        for trait, value in vector.items():
+            column = self._traits.get(trait)
+            if column is not None:
+                encoded[column] = float(value)
+        return encoded
+
+    def upsert(self, item_id: str, vector: Optional[Mapping[str, float]]) -> None:
+        """
+        ベクトルを登録する（既に登録済みなら置き換える）
+
+        Args:
+            item_id: キャラクターID
+            vector: 特性名 → 値 の辞書
+        """
+        vector = vector or {}
+        row = self._rows.get(item_id)
+        if row is None:
+            row = len(self._ids)
+            self._ensure_shape(row + 1, len(self._traits))
+            self._ids.append(item_id)
+            self._rows[item_id] = row
+        encoded = self._encode(vector, grow=True)
+        self._matrix[row] = encoded
+        self._norms[row] = np.linalg.norm(encoded)
+
+    def remove(self, item_id: str) -> None:
+        """ベクトルを削除する（未登録なら何もしない）"""
+        row = self._rows.pop(item_id, None)
+        if row is None:
+            return
+        last = len(self._ids) - 1
+        if row != last:
+            moved = self._ids[last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+            self._matrix[row] = self._matrix[last]
+            self._norms[row] = self._norms[last]
+        self._ids.pop()
+        self._matrix[last] = 0
+        self._norms[last] = 0
+
+    def _query_vector(self, query) -> Tuple[np.ndarray, Optional[str]]:
+        if isinstance(query, str):
+            row = self._rows.get(query)
+            if row is None:
+                raise KeyError(query)
+            return self._matrix[row, :len(self._traits)], query
+        return self._encode(query, grow=False)[:len(self._traits)], None
+
+    def _scores(self, block: np.ndarray, block_norms: np.ndarray,
+                others: np.ndarray, other_norms: np.ndarray, metric: str) -> np.ndarray:
+        """ブロック × 全体 のスコア行列（大きいほど似ている）"""
+        dots = block @ others.T
+        if metric == "cosine":
+            denominator = np.outer(block_norms, other_norms)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                scores = np.where(denominator > 0, dots / denominator, 0.0)
+            return scores
+        squared = block_norms[:, None] ** 2 + other_norms[None, :] ** 2 - 2 * dots
+        return -np.sqrt(np.maximum(squared, 0.0))
+
+    def nearest(self, query, k: int = 5, metric: str = "cosine") -> List[Tuple[str, float]]:
+        """
+        最も似ている上位 k 件を返す
+
+        Args:
+            query: キャラクターID、または特性名 → 値 の辞書
+            k: 返す件数
+            metric: "cosine"（類似度、大きいほど近い）または "euclidean"（距離、小さいほど近い）
+
+        Returns:
+            (キャラクターID, スコア) のリスト（近い順）。ID で指定した場合は自身を除く
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        count = len(self._ids)
+        if count == 0 or k <= 0:
+            return []
+
+        vector, exclude = self._query_vector(query)
+        scores = self._scores(
+            vector[None, :], np.array([np.linalg.norm(vector)], dtype=self.dtype),
+            self.matrix, self._norms[:count], metric
+        )[0]
+        if exclude is not None:
+            scores[self._rows[exclude]] = -np.inf
+
+        k = min(k, count - (1 if exclude is not None else 0))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        sign = 1.0 if metric == "cosine" else -1.0
+        return [(self._ids[i], float(sign * scores[i])) for i in top]
+
+    def iter_similar_pairs(
+        self,
+        threshold: float,
+        metric: str = "cosine",
+        block_size: int = 512
+    ) -> Iterator[Tuple[str, str, float]]:
+        """
+        しきい値を満たすペアを列挙する
+
+        行をブロックに分け、各ブロックとそれ以降の行との行列積だけを計算する。
+        メモリ使用量は block_size × 行数 に比例する。
+
+        Args:
+            threshold: cosine では類似度の下限、euclidean では距離の上限
+            metric: "cosine" または "euclidean"
+            block_size: 1 回の行列積で扱う行数
+
+        Yields:
+            (キャラクターID, キャラクターID, スコア)
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        count = len(self._ids)
+        matrix = self.matrix
+        norms = self._norms[:count]
+        limit = threshold if metric == "cosine" else -threshold
+
+        for start in range(0, count, block_size):
+            stop = min(start + block_size, count)
+            scores = self._scores(
+                matrix[start:stop], norms[start:stop], matrix[start:], norms[start:], metric
+            )
+            # 対角より下（同じ行・既に見たペア）を除外する
+            scores[np.tril_indices(stop - start, 0, scores.shape[1])] = -np.inf
+            rows, columns = np.nonzero(scores >= limit)
+            for r, c in zip(rows, columns):
+                score = float(scores[r, c])
+                yield (
+                    self._ids[start + r],
+                    self._ids[start + c],
+                    score if metric == "cosine" else -score
+                )
+
+    def near_duplicates(
+        self,
+        threshold: float = 0.95,
+        metric: str = "cosine",
+        block_size: int = 512
+    ) -> List[Tuple[str, str, float]]:
+        """しきい値を満たすペアを近い順に返す"""
+        pairs = list(self.iter_similar_pairs(threshold, metric, block_size))
+        pairs.sort(key=lambda p: p[2], reverse=(metric == "cosine"))
+        return pairs
@@ -0,0 +1,441 @@
+"""
+オンデマンドのリクエストプロファイリング
+
+管理者ヘッダー、または管理者が有効化したユーザーのリクエストに限り
+cProfile で計測し、結果をローカルに保存する。無効時はミドルウェア自体を
+登録しないため、通常のリクエストにオーバーヘッドは発生しない。
+"""
+
+import asyncio
+import cProfile
+import hmac
+import inspect
+import json
+import logging
+import os
+import pstats
+import time
+from dataclasses import asdict, dataclass
+from importlib import import_module
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+
+from starlette.requests import Request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-novelspec-profile"
+PROFILE_ID_HEADER = "x-novelspec-profile-id"
+
+# get_current_user を提供するモジュール（ユーザー単位の計測でユーザーを記録する）
+USER_DEPENDENCY_MODULES = ("app.core.security", "app.core.auth")
+
+# pstats の関数キー (filename, lineno, funcname)
+FuncKey = Tuple[str, int, str]
+
+
+@dataclass
+class ProfileRecord:
+    """保存済みプロファイルのメタデータ"""
+    id: str
+    method: str
+    path: str
+    user_id: Optional[str]
+    status_code: Optional[int]
+    duration_ms: float
+    size_bytes: int
+    created_at: float
+
+
+class ProfileStore:
+    """プロファイル結果の保存と保持期間の管理
+
+    件数・合計サイズ・経過時間のいずれかが上限を超えた場合、
+    古いものから削除する。
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_profiles: int = 50,
+        max_total_bytes: int = 200 * 1024 * 1024,
+        max_age_seconds: int = 7 * 24 * 3600
+    ):
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+        self.max_total_bytes = max_total_bytes
+        self.max_age_seconds = max_age_seconds
+        self.enabled_users: Set[str] = set()
+        self._records: Dict[str, ProfileRecord] = {}
+        self._loaded = False
+
+    def _ensure_loaded(self) -> None:
+        """ディレクトリ上の既存プロファイルを読み込む"""
+        if self._loaded:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for meta_file in self.directory.glob("*.json"):
+            try:
+                with open(meta_file, "r", encoding="utf-8") as f:
+                    record = ProfileRecord(**json.load(f))
+                if self._stats_path(record.id).exists():
+                    self._records[record.id] = record
+            except Exception as e:
+                logger.warning(f"Skipping broken profile metadata {meta_file}: {str(e)}")
+        self._loaded = True
+
+    def _stats_path(self, profile_id: str) -> Path:
+        return self.directory / f"{profile_id}.pstats"
+
+    def _meta_path(self, profile_id: str) -> Path:
+        return self.directory / f"{profile_id}.json"
+
+    def save(self, profile_id: str, profiler: cProfile.Profile, **meta) -> ProfileRecord:
+        """
+        プロファイル結果を保存する
+
+        Args:
+            profile_id: プロファイルID
+            profiler: 計測を終えたプロファイラ
+            **meta: ProfileRecord のその他のフィールド
+
+        Returns:
+            保存されたプロファイルのメタデータ
+        """
+        self._ensure_loaded()
+        stats_path = self._stats_path(profile_id)
+        profiler.dump_stats(str(stats_path))
+
+        record = ProfileRecord(
+            id=profile_id,
+            size_bytes=stats_path.stat().st_size,
+            created_at=time.time(),
+            **meta
+        )
+        with open(self._meta_path(profile_id), "w", encoding="utf-8") as f:
+            json.dump(asdict(record), f)
+
+        self._records[profile_id] = record
+        self._enforce_retention()
+        return record
+
+    def list(self) -> List[ProfileRecord]:
+        """保存済みプロファイルを新しい順に返す"""
+        self._ensure_loaded()
+        return sorted(self._records.values(), key=lambda r: r.created_at, reverse=True)
+
+    def get(self, profile_id: str) -> Optional[ProfileRecord]:
+        self._ensure_loaded()
+        return self._records.get(profile_id)
+
+    def stats_path(self, profile_id: str) -> Optional[Path]:
+        """pstats ファイルのパスを返す（存在しない場合は None）"""
+        if self.get(profile_id) is None:
+            return None
+        return self._stats_path(profile_id)
+
+    def delete(self, profile_id: str) -> bool:
+        self._ensure_loaded()
+        if self._records.pop(profile_id, None) is None:
+            return False
+        for path in (self._stats_path(profile_id), self._meta_path(profile_id)):
+            path.unlink(missing_ok=True)
+        return True
+
+    def _enforce_retention(self) -> None:
+        """保持上限を超えたプロファイルを古い順に削除する"""
+        now = time.time()
+        records = sorted(self._records.values(), key=lambda r: r.created_at)
+
+        for record in list(records):
+            if now - record.created_at > self.max_age_seconds:
+                self.delete(record.id)
+                records.remove(record)
+
+        total_bytes = sum(r.size_bytes for r in records)
+        while records and (
+            len(records) > self.max_profiles or total_bytes > self.max_total_bytes
+        ):
+            oldest = records.pop(0)
+            total_bytes -= oldest.size_bytes
+            self.delete(oldest.id)
+
+
+def _frame_label(func: FuncKey) -> str:
+    """collapsed stack 用のフレーム名"""
+    filename, lineno, funcname = func
+    if filename == "~":
+        # 組み込み関数は "<built-in method ...>" の形式
+        return funcname.replace(";", ":")
+    return f"{funcname} ({os.path.basename(filename)}:{lineno})".replace(";", ":")
+
+
+def to_collapsed_stacks(stats_path: Path, max_depth: int = 128) -> str:
+    """
+    pstats ファイルを flamegraph 互換の collapsed stack 形式に変換する
+
+    cProfile は呼び出し元と呼び出し先の 1 段の関係しか記録しないため、
+    各関数の累積時間を呼び出し辺の比率で按分してスタックを再構成する。
+
+    Args:
+        stats_path: pstats ファイルのパス
+        max_depth: 再構成するスタックの最大深さ
+
+    Returns:
+        "frame;frame;frame <マイクロ秒>" 形式の行を改行で連結した文字列
+    """
+    raw = pstats.Stats(str(stats_path)).stats  # type: ignore[attr-defined]
+
+    callees: Dict[FuncKey, Dict[FuncKey, float]] = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3]
+
+    roots = [func for func, entry in raw.items() if not entry[4]]
+    folded: Dict[str, float] = {}
+
+    def walk(func: FuncKey, time_on_path: float, stack: List[FuncKey]) -> None:
+        if time_on_path < 1e-6 or len(stack) >= max_depth or func in stack:
+            return
+        _, _, tottime, cumtime, _ = raw[func]
+        stack.append(func)
+        if cumtime > 0:
+            self_time = time_on_path * (tottime / cumtime)
+            if self_time > 0:
+                key = ";".join(_frame_label(f) for f in stack)
+                folded[key] = folded.get(key, 0.0) + self_time
+            for callee, edge_time in callees.get(func, {}).items():
+                walk(callee, time_on_path * (edge_time / cumtime), stack)
+        stack.pop()
+
+    for root in roots:
+        walk(root, raw[root][3], [])
+
+    lines = [
+        f"{stack} {int(seconds * 1_000_000)}"
+        for stack, seconds in folded.items()
+        if seconds * 1_000_000 >= 1
+    ]
+    return "\n".join(sorted(lines)) + "\n"
+
+
+# scope["state"] に置く、計測中のリクエストの情報のキー
+PROFILE_STATE_KEY = "novelspec.profile"
+
+
+def default_user_resolver(scope: Dict) -> Optional[str]:
+    """認証の依存関数（install_profiling で置き換えたもの）が scope["state"] に設定したユーザーIDを返す"""
+    state = scope.get("state") or {}
+    user_id = state.get("user_id")
+    return str(user_id) if user_id is not None else None
+
+
+class _RequestProfile:
+    """1 リクエスト分の計測（ヘッダーの場合は最初から、ユーザー指定の場合は認証後に開始する）"""
+
+    def __init__(self, middleware: "ProfilingMiddleware"):
+        self.middleware = middleware
+        self.profiler: Optional[cProfile.Profile] = None
+        self.user_id: Optional[str] = None
+        self.started = 0.0
+
+    def start(self, user_id: Optional[str] = None) -> bool:
+        # 同時に計測できるのは 1 リクエストのみ
+        if self.profiler is not None or self.middleware._active:
+            return False
+        self.middleware._active = True
+        self.user_id = user_id
+        self.profiler = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.profiler.enable()
+        return True
+
+    def stop(self) -> Optional[float]:
+        """計測を止めて所要時間（ミリ秒）を返す（計測していない場合は None）"""
+        if self.profiler is None:
+            return None
+        self.profiler.disable()
+        self.middleware._active = False
+        return (time.perf_counter() - self.started) * 1000
+
+
+def record_request_user(scope: Dict, user_id) -> None:
+    """
+    認証したユーザーIDをリクエストに記録し、計測対象のユーザーであれば計測を開始する
+
+    Args:
+        scope: ASGI の scope
+        user_id: 認証したユーザーのID
+    """
+    if user_id is None:
+        return
+    state = scope.setdefault("state", {})
+    state["user_id"] = user_id
+    capture = state.get(PROFILE_STATE_KEY)
+    if capture is not None and str(user_id) in capture.middleware.store.enabled_users:
+        capture.start(str(user_id))
+
+
+def wrap_user_dependency(dependency: Callable) -> Callable:
+    """
+    認証の依存関数を、解決したユーザーを record_request_user に渡す依存関数で包む
+
+    元の関数の引数（トークンやセッションの依存関係）はそのまま FastAPI に解決させる。
+
+    Args:
+        dependency: get_current_user などの依存関数
+
+    Returns:
+        Callable: app.dependency_overrides に登録する依存関数
+    """
+    signature = inspect.signature(dependency)
+
+    async def resolve_user(__profiling_request: Request, **kwargs):
+        user = dependency(**kwargs)
+        if inspect.isawaitable(user):
+            user = await user
+        record_request_user(__profiling_request.scope, getattr(user, "id", None))
+        return user
+
+    parameters = [
+        inspect.Parameter("__profiling_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+    ] + [
+        parameter.replace(kind=inspect.Parameter.KEYWORD_ONLY)
+        for parameter in signature.parameters.values()
+    ]
+    resolve_user.__signature__ = signature.replace(parameters=parameters)
+    return resolve_user
+
+
+class ProfilingMiddleware:
+    """プロファイリング対象のリクエストだけを cProfile で計測する ASGI ミドルウェア
+
+    管理者ヘッダーのあるリクエストは最初から計測する。有効化したユーザーの
+    リクエストは、認証の依存関数がユーザーを解決した時点（record_request_user）
+    から計測する。
+
+    cProfile はスレッド単位で計測するため、計測中に同じイベントループ上で
+    並行して実行された他のリクエストの処理も含まれる。同時に計測できるのは
+    1 リクエストのみで、計測中に届いた対象リクエストは計測せずに処理する。
+    """
+
+    def __init__(
+        self,
+        app,
+        store: ProfileStore,
+        admin_token: str,
+        user_resolver: Callable[[Dict], Optional[str]] = default_user_resolver
+    ):
+        self.app = app
+        self.store = store
+        self.admin_token = admin_token.encode("utf-8")
+        self.user_resolver = user_resolver
+        self._active = False
+
+    def _has_admin_header(self, scope: Dict) -> bool:
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER.encode("latin-1"):
+                return hmac.compare_digest(value, self.admin_token)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        capture = _RequestProfile(self)
+        if self._has_admin_header(scope):
+            capture.start()
+        elif self.store.enabled_users:
+            # 認証の依存関数が対象ユーザーを解決したときに計測を開始する
+            scope.setdefault("state", {})[PROFILE_STATE_KEY] = capture
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid4().hex
+        status_code: Optional[int] = None
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if capture.profiler is not None:
+                    headers = list(message.get("headers", []))
+                    headers.append((PROFILE_ID_HEADER.encode("latin-1"), profile_id.encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            duration_ms = capture.stop()
+            if duration_ms is not None:
+                profiler = capture.profiler
+                user_id = capture.user_id or self.user_resolver(scope)
+                try:
+                    # ファイル書き込みはイベントループを塞がないようにスレッドで行う
+                    await asyncio.get_running_loop().run_in_executor(
+                        None,
+                        lambda: self.store.save(
+                            profile_id,
+                            profiler,
+                            method=scope.get("method", ""),
+                            path=scope.get("path", ""),
+                            user_id=user_id,
+                            status_code=status_code,
+                            duration_ms=duration_ms
+                        )
+                    )
+                    logger.info(f"Captured profile {profile_id} for {scope.get('path')} ({duration_ms:.1f} ms)")
+                except Exception as e:
+                    logger.error(f"Failed to store profile {profile_id}: {str(e)}")
+
+
+_profile_store: Optional[ProfileStore] = None
+
+
+def get_profile_store() -> ProfileStore:
+    """プロセス共通の ProfileStore を返す"""
+    global _profile_store
+    if _profile_store is None:
+        _profile_store = ProfileStore(
+            Path(os.getenv("NOVELSPEC_PROFILE_DIR", "var/profiles")),
+            max_profiles=int(os.getenv("NOVELSPEC_PROFILE_MAX_COUNT", "50")),
+            max_total_bytes=int(os.getenv("NOVELSPEC_PROFILE_MAX_BYTES", str(200 * 1024 * 1024))),
+            max_age_seconds=int(os.getenv("NOVELSPEC_PROFILE_MAX_AGE", str(7 * 24 * 3600)))
+        )
+    return _profile_store
+
+
+def get_profiling_admin_token() -> Optional[str]:
+    """プロファイリング用の管理者トークン（未設定なら機能自体が無効）"""
+    return os.getenv("NOVELSPEC_PROFILE_TOKEN") or None
+
+
+def install_profiling(app) -> bool:
+    """
+    管理者トークンが設定されている場合のみプロファイリングミドルウェアを登録する
+
+    Args:
+        app: FastAPI アプリケーション
+
+    Returns:
+        bool: ミドルウェアを登録したかどうか
+    """
+    token = get_profiling_admin_token()
+    if not token:
+        return False
+    app.add_middleware(ProfilingMiddleware, store=get_profile_store(), admin_token=token)
+
+    # ユーザー単位の計測のため、認証の依存関数が解決したユーザーをリクエストに記録する
+    for module_path in USER_DEPENDENCY_MODULES:
+        try:
+            dependency = getattr(import_module(module_path), "get_current_user")
+        except (ImportError, AttributeError) as e:
+            logger.warning(f"Per-user profiling unavailable for {module_path}: {str(e)}")
+            continue
+        app.dependency_overrides.setdefault(dependency, wrap_user_dependency(dependency))
+    logger.info("Request profiling middleware installed")
+    return True
@@ -0,0 +1,223 @@
+"""
+世界観ルールと章の依存関係の索引
+
+ルールが参照する語（ルール名・対象の世界観要素）と、章が参照する語
+（明示的な参照と本文中の出現）を記録し、ルールごとに検証が必要な章の
+集合を保持する。ルールや章を編集したときは、影響を受ける (ルール, 章) の
+組だけを再検証し、それ以外は前回の結果を使う。
+
+ルールに参照語がない場合、または scope が "global" の場合は全章に適用する。
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+RuleValidator = Callable[[Dict, Dict], bool]
+
+# 章の辞書で世界観要素・ルールへの明示的な参照を表すキー
+CHAPTER_REFERENCE_KEYS = ("world_elements", "rules", "locations", "elements")
+# 本文中の出現を調べるキー
+CHAPTER_TEXT_KEYS = ("title", "summary", "description", "content")
+# ルールの辞書で対象の世界観要素を表すキー
+RULE_REFERENCE_KEYS = ("elements", "applies_to", "keywords")
+
+
+def _as_list(value) -> List:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+
+def rule_terms(rule: Dict) -> Set[str]:
+    """ルールが参照する語（小文字化済み）"""
+    terms = set()
+    for key in RULE_REFERENCE_KEYS:
+        terms.update(str(v).lower() for v in _as_list(rule.get(key)) if v)
+    return terms
+
+
+class RuleDependencyIndex:
+    """ルール ⇔ 章 の依存関係と検証結果のキャッシュ"""
+
+    def __init__(self, validator: RuleValidator):
+        self.validator = validator
+        self.rules: Dict[str, Dict] = {}
+        self.chapters: Dict[str, Dict] = {}
+        self._rule_terms: Dict[str, Set[str]] = {}
+        self._global_rules: Set[str] = set()
+        self._term_rules: Dict[str, Set[str]] = {}
+        self._chapter_refs: Dict[str, Set[str]] = {}
+        self._chapter_text: Dict[str, str] = {}
+        self._rule_chapters: Dict[str, Set[str]] = {}
+        self._chapter_rules: Dict[str, Set[str]] = {}
+        self._results: Dict[Tuple[str, str], bool] = {}
+        self._dirty: Set[Tuple[str, str]] = set()
+        self.evaluations = 0
+
+    def load(self, rules: Iterable[Dict], chapters: Iterable[Dict]) -> None:
+        """ルールと章をまとめて読み込み、索引を作り直す"""
+        self.__init__(self.validator)
+        for chapter in chapters:
+            self._store_chapter(chapter)
+        for rule in rules:
+            self.set_rule(rule)
+
+    # --- 章 ---
+
+    def _store_chapter(self, chapter: Dict) -> str:
+        chapter_id = str(chapter['id'])
+        self.chapters[chapter_id] = chapter
+        refs = set()
+        for key in CHAPTER_REFERENCE_KEYS:
+            refs.update(str(v).lower() for v in _as_list(chapter.get(key)) if v)
+        self._chapter_refs[chapter_id] = refs
+        self._chapter_text[chapter_id] = "\n".join(
+            str(chapter[key]) for key in CHAPTER_TEXT_KEYS if chapter.get(key)
+        ).lower()
+        self._chapter_rules.setdefault(chapter_id, set())
+        return chapter_id
+
+    def _chapter_mentions(self, chapter_id: str, term: str) -> bool:
+        return term in self._chapter_refs[chapter_id] or term in self._chapter_text[chapter_id]
+
+    def set_chapter(self, chapter: Dict) -> Set[str]:
+        """
+        章を追加・更新し、この章に関係するルールだけを再検証の対象にする
+
+        Returns:
+            この章に適用されるルール名の集合
+        """
+        chapter_id = self._store_chapter(chapter)
+        relevant = set(self._global_rules)
+        for term, names in self._term_rules.items():
+            if self._chapter_mentions(chapter_id, term):
+                relevant |= names
+
+        for name in self._chapter_rules[chapter_id] - relevant:
+            self._unlink(name, chapter_id)
+        for name in relevant:
+            self._link(name, chapter_id)
+        return relevant
+
+    def remove_chapter(self, chapter_id: str) -> None:
+        chapter_id = str(chapter_id)
+        for name in list(self._chapter_rules.get(chapter_id, ())):
+            self._unlink(name, chapter_id)
+        for store in (self.chapters, self._chapter_refs, self._chapter_text, self._chapter_rules):
+            store.pop(chapter_id, None)
+
+    # --- ルール ---
+
+    def set_rule(self, rule: Dict) -> Set[str]:
+        """
+        ルールを追加・更新し、このルールを参照する章だけを再検証の対象にする
+
+        Returns:
+            このルールが適用される章IDの集合
+        """
+        name = rule['name']
+        self._drop_rule_terms(name)
+        self.rules[name] = rule
+        terms = rule_terms(rule)
+        is_global = not terms or rule.get('scope') == 'global'
+        # 章の "rules" からルール名で参照される場合にも対応する
+        terms.add(str(name).lower())
+        self._rule_terms[name] = terms
+        if is_global:
+            self._global_rules.add(name)
+            affected = set(self.chapters)
+        else:
+            for term in terms:
+                self._term_rules.setdefault(term, set()).add(name)
+            affected = {
+                chapter_id for chapter_id in self.chapters
+                if any(self._chapter_mentions(chapter_id, term) for term in terms)
+            }
+
+        for chapter_id in self._rule_chapters.get(name, set()) - affected:
+            self._unlink(name, chapter_id)
+        # ルールの内容が変わったため、結果が残っている組も再検証する
+        for chapter_id in affected:
+            self._link(name, chapter_id)
+        return affected
+
+    def remove_rule(self, name: str) -> None:
+        for chapter_id in list(self._rule_chapters.get(name, ())):
+            self._unlink(name, chapter_id)
+        self._drop_rule_terms(name)
+        self.rules.pop(name, None)
+        self._rule_chapters.pop(name, None)
+
+    def _drop_rule_terms(self, name: str) -> None:
+        self._global_rules.discard(name)
+        for term in self._rule_terms.pop(name, ()):
+            names = self._term_rules.get(term)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._term_rules[term]
+
+    # --- 依存関係 ---
+
+    def _link(self, name: str, chapter_id: str) -> None:
+        self._rule_chapters.setdefault(name, set()).add(chapter_id)
+        self._chapter_rules.setdefault(chapter_id, set()).add(name)
+        self._dirty.add((name, chapter_id))
+
+    def _unlink(self, name: str, chapter_id: str) -> None:
+        self._rule_chapters.get(name, set()).discard(chapter_id)
+        self._chapter_rules.get(chapter_id, set()).discard(name)
+        self._results.pop((name, chapter_id), None)
+        self._dirty.discard((name, chapter_id))
+
+    def mark_chapter_dirty(self, chapter_id: str) -> None:
+        """章の内容以外（検証関数の前提など）が変わった場合に再検証を予約する"""
+        for name in self._chapter_rules.get(str(chapter_id), ()):
+            self._dirty.add((name, str(chapter_id)))
+
+    @property
+    def pending(self) -> int:
+        """再検証待ちの (ルール, 章) の組の数"""
+        return len(self._dirty)
+
+    def evaluate(self) -> List[Tuple[str, str]]:
+        """
+        再検証が必要な組だけを検証し、違反している (ルール名, 章ID) を返す
+
+        Returns:
+            章の登録順・ルールの登録順に並べた違反の一覧
+        """
+        for name, chapter_id in self._dirty:
+            self._results[(name, chapter_id)] = self.validator(
+                self.chapters[chapter_id], self.rules[name]
+            )
+            self.evaluations += 1
+        self._dirty.clear()
+
+        rule_order = {name: i for i, name in enumerate(self.rules)}
+        violations = []
+        for chapter_id in self.chapters:
+            names = sorted(self._chapter_rules.get(chapter_id, ()), key=rule_order.__getitem__)
+            for name in names:
+                if not self._results.get((name, chapter_id), True):
+                    violations.append((name, chapter_id))
+        return violations
+
+    def impact(self, name: str) -> Optional[Dict]:
+        """
+        ルールを変更した場合に影響を受ける章を返す
+
+        Returns:
+            影響分析の結果（ルールが存在しない場合は None）
+        """
+        if name not in self.rules:
+            return None
+        chapters = [c for c in self.chapters if c in self._rule_chapters.get(name, ())]
+        return {
+            "rule": name,
+            "global": name in self._global_rules,
+            "terms": sorted(self._rule_terms.get(name, ())),
+            "chapters": chapters,
+            "violations": [c for c in chapters if self._results.get((name, c)) is False],
+        }
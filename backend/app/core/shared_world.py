@@ -0,0 +1,265 @@
+"""
+シリーズで共有する世界観
+
+複数の小説が 1 つの世界観を参照する場合、共有部分（ベース）は読み込みと
+検証を 1 回だけ行ってプロセス内に保持し、各小説の変更は差分（上書き・追加・
+非表示）として別に持つ。小説ごとの要素一覧はベースに差分を重ねて作り、
+検証は差分で変わった要素だけをやり直して、残りはベースの結果を使い回す。
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Callable, Dict, Hashable, Iterable, List, Mapping, Optional
+from uuid import uuid4
+
+from app.core.world_engine import WorldElement, WorldEngine
+
+logger = logging.getLogger(__name__)
+
+# 差分で書き換えられる要素の項目
+ELEMENT_FIELDS = ("name", "category", "description", "details")
+
+OVERRIDE_OPERATIONS = ("modify", "add", "remove")
+
+
+@dataclass(frozen=True)
+class ElementOverride:
+    """小説ごとの差分 1 件"""
+    id: int
+    operation: str
+    element_id: Optional[int] = None
+    fields: Mapping = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class BaseWorld:
+    """共有の世界観の読み取り専用のスナップショット
+
+    elements と element_results は複数の小説から同時に参照されるため、
+    変更できない Mapping として保持する。
+    """
+    world_id: int
+    fingerprint: Hashable
+    elements: Mapping[int, Mapping]
+    element_results: Mapping[int, Mapping]
+    loaded_at: float
+
+
+def _engine_element(element: Mapping) -> WorldElement:
+    """要素の辞書を WorldEngine の要素に変換する（details が JSON ならルールと関係性を取り出す）"""
+    extra = {}
+    details = element.get("details")
+    if details and details.lstrip().startswith("{"):
+        try:
+            extra = json.loads(details)
+        except ValueError:
+            extra = {}
+    now = datetime.utcnow()
+    return WorldElement(
+        id=uuid4(),
+        name=element.get("name") or "",
+        description=element.get("description") or "",
+        category=element.get("category") or "",
+        attributes=extra.get("attributes") or {},
+        created_at=now,
+        updated_at=now,
+        relationships=extra.get("relationships") or [],
+        rules=extra.get("rules") or []
+    )
+
+
+def engine_elements(elements: Iterable[Mapping]) -> List[WorldElement]:
+    """差分を重ねた要素の一覧を WorldEngine に読み込む要素に変換する"""
+    return [_engine_element(element) for element in elements]
+
+
+def validate_elements(elements: Mapping[Hashable, Mapping]) -> Dict[Hashable, Dict]:
+    """
+    要素ごとに WorldEngine の検証を行う
+
+    Args:
+        elements: キー → 要素の辞書
+
+    Returns:
+        Dict: キー → {"conflicts": [...], "warnings": [...]}
+    """
+    engine = WorldEngine()
+    keys = {}
+    for key, element in elements.items():
+        converted = _engine_element(element)
+        engine.elements[converted.id] = converted
+        keys[converted.id] = key
+
+    results = {}
+    for engine_id, key in keys.items():
+        result = engine.validate_consistency(engine_id)
+        results[key] = {"conflicts": result["conflicts"], "warnings": result["warnings"]}
+    return results
+
+
+class SharedWorldCache:
+    """世界観ID → ベースのスナップショット
+
+    スナップショットは fingerprint（要素の件数・最終更新日時など）と一緒に保持し、
+    fingerprint が変わった場合だけ読み込みと検証をやり直す。保持する世界観の数は
+    max_worlds までで、古いものから破棄する。
+    """
+
+    def __init__(self, max_worlds: int = 64):
+        self.max_worlds = max_worlds
+        self._worlds: "OrderedDict[int, BaseWorld]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        world_id: int,
+        fingerprint: Hashable,
+        loader: Callable[[], Iterable[Mapping]]
+    ) -> BaseWorld:
+        """
+        ベースのスナップショットを返す（古い場合は loader で読み込み直す）
+
+        Args:
+            world_id: 世界観ID
+            fingerprint: 世界観の現在の状態を表す値
+            loader: 要素の辞書（"id" を含む）を返す関数
+
+        Returns:
+            BaseWorld
+        """
+        with self._lock:
+            cached = self._worlds.get(world_id)
+            if cached is not None and cached.fingerprint == fingerprint:
+                self._worlds.move_to_end(world_id)
+                self.hits += 1
+                return cached
+
+        elements = {}
+        for row in loader():
+            elements[row["id"]] = MappingProxyType({key: row.get(key) for key in ("id", "world_id") + ELEMENT_FIELDS})
+        results = validate_elements(elements)
+        base = BaseWorld(
+            world_id=world_id,
+            fingerprint=fingerprint,
+            elements=MappingProxyType(elements),
+            element_results=MappingProxyType(results),
+            loaded_at=time.time()
+        )
+        logger.info(f"Loaded shared world {world_id} ({len(elements)} elements)")
+
+        with self._lock:
+            self.misses += 1
+            self._worlds[world_id] = base
+            self._worlds.move_to_end(world_id)
+            while len(self._worlds) > self.max_worlds:
+                self._worlds.popitem(last=False)
+        return base
+
+    def invalidate(self, world_id: int) -> None:
+        """保持しているスナップショットを破棄する"""
+        with self._lock:
+            self._worlds.pop(world_id, None)
+
+    def stats(self) -> Dict:
+        return {"worlds": len(self._worlds), "hits": self.hits, "misses": self.misses}
+
+
+def merge_elements(base: BaseWorld, overrides: Iterable[ElementOverride]) -> List[Dict]:
+    """
+    ベースの要素に小説の差分を重ねた要素の一覧を返す（ベースは変更しない）
+
+    Returns:
+        List[Dict]: 要素の辞書。source は "shared"（共有のまま）/ "override"（上書き）/
+        "novel"（小説だけの要素）
+    """
+    modified: Dict[int, ElementOverride] = {}
+    removed = set()
+    added: List[ElementOverride] = []
+    for override in overrides:
+        if override.operation == "remove":
+            removed.add(override.element_id)
+        elif override.operation == "modify":
+            modified[override.element_id] = override
+        else:
+            added.append(override)
+
+    merged = []
+    for element_id, element in base.elements.items():
+        if element_id in removed:
+            continue
+        item = dict(element)
+        override = modified.get(element_id)
+        if override is None:
+            item.update(source="shared", override_id=None)
+        else:
+            item.update({key: value for key, value in override.fields.items() if key in ELEMENT_FIELDS})
+            item.update(source="override", override_id=override.id)
+        merged.append(item)
+    for override in added:
+        item = {"id": None, "world_id": base.world_id}
+        item.update({key: override.fields.get(key) for key in ELEMENT_FIELDS})
+        item.update(source="novel", override_id=override.id)
+        merged.append(item)
+    return merged
+
+
+def validate_merged(base: BaseWorld, overrides: Iterable[ElementOverride]) -> Dict:
+    """
+    差分を重ねた世界観を検証する
+
+    共有のままの要素はベースの検証結果を使い、上書き・追加した要素だけを
+    検証し直す。同じカテゴリ内の名前の重複は重ねた後の一覧で調べる。
+
+    Returns:
+        Dict: is_valid, conflicts, warnings と、使い回した / 検証し直した要素の数
+    """
+    merged = merge_elements(base, overrides)
+    changed = {
+        ("override", item["override_id"]): item
+        for item in merged if item["source"] != "shared"
+    }
+    fresh = validate_elements(changed)
+
+    conflicts: List[Dict] = []
+    warnings: List[Dict] = []
+    reused = 0
+    for item in merged:
+        if item["source"] == "shared":
+            result = base.element_results.get(item["id"], {})
+            reused += 1
+        else:
+            result = fresh[("override", item["override_id"])]
+        conflicts.extend(result.get("conflicts", []))
+        warnings.extend(result.get("warnings", []))
+
+    names = Counter((item["category"], item["name"]) for item in merged)
+    for (category, name), count in names.items():
+        if count > 1:
+            warnings.append({
+                "element": name,
+                "category": category,
+                "warning": f"{count} elements share the name '{name}' in category '{category}'"
+            })
+
+    return {
+        "world_id": base.world_id,
+        "is_valid": not conflicts,
+        "conflicts": conflicts,
+        "warnings": warnings,
+        "elements": len(merged),
+        "reused_results": reused,
+        "revalidated": len(changed),
+        "timestamp": datetime.utcnow(),
+    }
+
+
+# アプリケーション全体で共有するキャッシュ
+shared_worlds = SharedWorldCache()
@@ -0,0 +1,495 @@
+"""
+StoryStructure のバイナリ形式
+
+pydantic の JSON より小さく速く保存・転送するための形式。文字列はすべて
+1 つの文字列表に重複なく格納して番号で参照し、プロット要素とタイムラインは
+列ごとの配列（列指向）で持つ。章・キャラクター・世界観などの任意の辞書は、
+型タグ・整数・浮動小数点数・文字列番号・長さの 5 本の列に分けて格納する。
+
+数値の列はリトルエンディアンの固定長配列で、8 バイト境界に揃えて置くため、
+StructureView では読み込んだバッファ（mmap を含む）をコピーせずに
+memoryview として参照できる。文字列表は 1 回の UTF-8 デコードで展開する。
+
+レイアウト:
+    ヘッダ     MAGIC(4) | バージョン u16 | フラグ u16 | セクション数 u32 | CRC32 u32
+    目次       セクションごとの (オフセット u64, 長さ u64)
+    セクション SECTIONS の順に並べ、各セクションは 8 バイト境界から始まる
+
+CRC32 はヘッダより後ろ（目次とセクション）全体のチェックサムで、読み込み時に
+検査する。バージョン 1 の形式（CRC32 なし）も読み込める。
+"""
+
+import struct
+import sys
+import zlib
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+MAGIC = b"NSS\x01"
+FORMAT_VERSION = 2
+
+# (セクション名, array の型コード。None はバイト列)
+SECTIONS: List[Tuple[str, Optional[str]]] = [
+    ("string_offsets", "I"),  # 文字列表の各文字列の開始位置（文字単位、末尾に全体の長さ）
+    ("string_data", None),  # 文字列表（UTF-8）
+    ("plot_id", "I"),
+    ("plot_title", "I"),
+    ("plot_description", "I"),
+    ("plot_order", "q"),
+    ("plot_sort_key", "I"),
+    ("plot_chapter_id", "I"),
+    ("plot_created_at", "q"),  # エポックからのマイクロ秒
+    ("plot_updated_at", "q"),
+    ("plot_created_tz", "i"),  # UTC からのずれ（秒）。NAIVE はタイムゾーンなし
+    ("plot_updated_tz", "i"),
+    ("timeline_date", "I"),  # 'date' の文字列番号（NONE / ABSENT）
+    ("timeline_ordinal", "q"),  # 'ordinal' の値
+    ("timeline_ordinal_state", "B"),  # 0: キーなし 1: None 2: 整数
+    ("value_tags", "B"),  # 任意の値の型タグ
+    ("value_ints", "q"),
+    ("value_floats", "d"),
+    ("value_strings", "I"),
+    ("value_lengths", "I"),
+]
+_SECTION_INDEX = {name: i for i, (name, _) in enumerate(SECTIONS)}
+
+_HEADER = struct.Struct("<4sHHII")
+# バージョン 1 のヘッダ（CRC32 なし）
+_HEADER_V1 = struct.Struct("<4sHHI")
+_DIRECTORY_ENTRY = struct.Struct("<QQ")
+_ALIGN = 8
+
+# 文字列番号の特別な値
+NONE = 0xFFFFFFFF
+ABSENT = 0xFFFFFFFE
+NAIVE = -0x80000000
+
+# 任意の値の型タグ
+T_NONE, T_FALSE, T_TRUE, T_INT, T_FLOAT, T_STR, T_LIST, T_DICT, T_BIGINT, T_DATETIME, T_DATE, T_ANYDICT = range(12)
+
+_EPOCH = datetime(1970, 1, 1)
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+# 任意の値として格納する StoryStructure のフィールド（この順に格納する）
+VALUE_FIELDS = ("chapters", "characters", "world_building")
+
+
+class StructureCodecError(ValueError):
+    """バイナリ形式への変換・読み込みに失敗した場合の例外クラス"""
+    pass
+
+
+# 壊れたデータの読み込みで起こりうる例外（UnicodeDecodeError は ValueError に含まれる）
+_DECODE_ERRORS = (
+    ValueError, OverflowError, TypeError, KeyError, IndexError, StopIteration,
+    RecursionError, struct.error
+)
+
+
+def _datetime_parts(value: datetime) -> Tuple[int, int]:
+    """datetime を（エポックからのマイクロ秒, UTC からのずれの秒）に分ける"""
+    offset = value.utcoffset()
+    naive = value.replace(tzinfo=None)
+    delta = naive - _EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+    return micros, NAIVE if offset is None else int(offset.total_seconds())
+
+
+def _datetime_from_parts(micros: int, tz: int) -> datetime:
+    value = _EPOCH + timedelta(microseconds=micros)
+    if tz != NAIVE:
+        value = value.replace(tzinfo=timezone(timedelta(seconds=tz)))
+    return value
+
+
+class _Encoder:
+    """文字列表と任意の値の列を組み立てる"""
+
+    def __init__(self):
+        self.strings: Dict[str, int] = {}
+        self.tags = bytearray()
+        self.ints = array("q")
+        self.floats = array("d")
+        self.refs = array("I")
+        self.lengths = array("I")
+
+    def intern(self, value: str) -> int:
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def optional_string(self, value: Optional[str]) -> int:
+        return NONE if value is None else self.intern(value)
+
+    def value(self, value: Any) -> None:
+        kind = type(value)
+        if kind is str:
+            self.tags.append(T_STR)
+            self.refs.append(self.intern(value))
+        elif kind is dict:
+            if all(type(key) is str for key in value):
+                self.tags.append(T_DICT)
+                self.lengths.append(len(value))
+                for key, item in value.items():
+                    self.refs.append(self.intern(key))
+                    self.value(item)
+            else:
+                self.tags.append(T_ANYDICT)
+                self.lengths.append(len(value))
+                for key, item in value.items():
+                    self.value(key)
+                    self.value(item)
+        elif kind is list or kind is tuple:
+            self.tags.append(T_LIST)
+            self.lengths.append(len(value))
+            for item in value:
+                self.value(item)
+        elif kind is int:
+            if _INT64_MIN <= value <= _INT64_MAX:
+                self.tags.append(T_INT)
+                self.ints.append(value)
+            else:
+                self.tags.append(T_BIGINT)
+                self.refs.append(self.intern(str(value)))
+        elif value is None:
+            self.tags.append(T_NONE)
+        elif kind is bool:
+            self.tags.append(T_TRUE if value else T_FALSE)
+        elif kind is float:
+            self.tags.append(T_FLOAT)
+            self.floats.append(value)
+        elif isinstance(value, datetime):
+            self.tags.append(T_DATETIME)
+            self.ints.extend(_datetime_parts(value))
+        elif isinstance(value, date):
+            self.tags.append(T_DATE)
+            self.ints.append(value.toordinal())
+        elif isinstance(value, int):
+            self.value(int(value))
+        elif isinstance(value, str):
+            self.value(str(value))
+        else:
+            raise StructureCodecError(f"Cannot encode value of type {kind.__name__}")
+
+
+class _Decoder:
+    """任意の値の列から値を順に読み出す"""
+
+    def __init__(self, strings: List[str], tags, ints, floats, refs, lengths):
+        self.strings = strings
+        self.tags = iter(tags)
+        self.ints = iter(ints)
+        self.floats = iter(floats)
+        self.refs = iter(refs)
+        self.lengths = iter(lengths)
+
+    def value(self) -> Any:
+        tag = next(self.tags)
+        if tag == T_STR:
+            return self.strings[next(self.refs)]
+        if tag == T_DICT:
+            strings, refs, value = self.strings, self.refs, self.value
+            return {strings[next(refs)]: value() for _ in range(next(self.lengths))}
+        if tag == T_LIST:
+            value = self.value
+            return [value() for _ in range(next(self.lengths))]
+        if tag == T_INT:
+            return next(self.ints)
+        if tag == T_NONE:
+            return None
+        if tag == T_TRUE:
+            return True
+        if tag == T_FALSE:
+            return False
+        if tag == T_FLOAT:
+            return next(self.floats)
+        if tag == T_ANYDICT:
+            result = {}
+            for _ in range(next(self.lengths)):
+                key = self.value()
+                result[key] = self.value()
+            return result
+        if tag == T_BIGINT:
+            return int(self.strings[next(self.refs)])
+        if tag == T_DATETIME:
+            return _datetime_from_parts(next(self.ints), next(self.ints))
+        if tag == T_DATE:
+            return date.fromordinal(next(self.ints))
+        raise StructureCodecError(f"Unknown value tag {tag}")
+
+
+def _section_bytes(column: Any) -> bytes:
+    if isinstance(column, array):
+        if not _LITTLE_ENDIAN:
+            column = array(column.typecode, column)
+            column.byteswap()
+        return column.tobytes()
+    return bytes(column)
+
+
+def encode_structure(structure: Any) -> bytes:
+    """
+    StoryStructure をバイナリ形式に変換する
+
+    Args:
+        structure: StoryStructure（または同じ属性を持つオブジェクト）
+
+    Returns:
+        bytes: バイナリ形式のデータ
+
+    Raises:
+        StructureCodecError: 格納できない型の値が含まれている場合
+    """
+    encoder = _Encoder()
+    intern = encoder.intern
+    optional_string = encoder.optional_string
+
+    columns: Dict[str, Any] = {}
+    plot = structure.plot_elements
+    columns["plot_id"] = array("I", [intern(p.id) for p in plot])
+    columns["plot_title"] = array("I", [intern(p.title) for p in plot])
+    columns["plot_description"] = array("I", [intern(p.description) for p in plot])
+    columns["plot_order"] = array("q", [p.order for p in plot])
+    columns["plot_sort_key"] = array("I", [optional_string(p.sort_key) for p in plot])
+    columns["plot_chapter_id"] = array("I", [optional_string(p.chapter_id) for p in plot])
+    for name in ("created", "updated"):
+        parts = [_datetime_parts(getattr(p, f"{name}_at")) for p in plot]
+        columns[f"plot_{name}_at"] = array("q", [micros for micros, _ in parts])
+        columns[f"plot_{name}_tz"] = array("i", [tz for _, tz in parts])
+
+    for field in VALUE_FIELDS:
+        encoder.value(getattr(structure, field))
+
+    dates = array("I")
+    ordinals = array("q")
+    ordinal_states = bytearray()
+    rest = []
+    for event in structure.timeline:
+        event = dict(event)
+        value = event.get("date", ABSENT)
+        if value is ABSENT:
+            dates.append(ABSENT)
+        elif value is None or type(value) is str:
+            dates.append(optional_string(event.pop("date")))
+        else:
+            dates.append(ABSENT)
+        value = event.get("ordinal", ABSENT)
+        if value is ABSENT:
+            ordinals.append(0)
+            ordinal_states.append(0)
+        elif value is None:
+            event.pop("ordinal")
+            ordinals.append(0)
+            ordinal_states.append(1)
+        elif type(value) is int and _INT64_MIN <= value <= _INT64_MAX:
+            event.pop("ordinal")
+            ordinals.append(value)
+            ordinal_states.append(2)
+        else:
+            ordinals.append(0)
+            ordinal_states.append(0)
+        rest.append(event)
+    encoder.value(rest)
+    columns["timeline_date"] = dates
+    columns["timeline_ordinal"] = ordinals
+    columns["timeline_ordinal_state"] = ordinal_states
+
+    strings = list(encoder.strings)
+    offsets = array("I", [0])
+    total = 0
+    for value in strings:
+        total += len(value)
+        offsets.append(total)
+    columns["string_offsets"] = offsets
+    columns["string_data"] = "".join(strings).encode("utf-8", "surrogatepass")
+    columns["value_tags"] = encoder.tags
+    columns["value_ints"] = encoder.ints
+    columns["value_floats"] = encoder.floats
+    columns["value_strings"] = encoder.refs
+    columns["value_lengths"] = encoder.lengths
+
+    payloads = [_section_bytes(columns[name]) for name, _ in SECTIONS]
+    position = _HEADER.size + _DIRECTORY_ENTRY.size * len(SECTIONS)
+    directory = []
+    for payload in payloads:
+        position += -position % _ALIGN
+        directory.append((position, len(payload)))
+        position += len(payload)
+
+    out = bytearray(position)
+    for i, entry in enumerate(directory):
+        _DIRECTORY_ENTRY.pack_into(out, _HEADER.size + i * _DIRECTORY_ENTRY.size, *entry)
+    for (offset, length), payload in zip(directory, payloads):
+        out[offset:offset + length] = payload
+    checksum = zlib.crc32(memoryview(out)[_HEADER.size:])
+    _HEADER.pack_into(out, 0, MAGIC, FORMAT_VERSION, 0, len(SECTIONS), checksum)
+    return bytes(out)
+
+
+class StructureView:
+    """バイナリ形式のデータを展開せずに参照するクラス
+
+    数値の列は元のバッファを指す memoryview（リトルエンディアン以外の環境ではコピー）で、
+    文字列は初回の参照時に文字列表をまとめて展開する。
+    """
+
+    def __init__(self, buffer: Any):
+        self.buffer = memoryview(buffer)
+        if self.buffer.ndim != 1 or self.buffer.itemsize != 1:
+            self.buffer = self.buffer.cast("B")
+        try:
+            self._read_header()
+        except BaseException:
+            self.buffer.release()
+            raise
+        self._strings: Optional[List[str]] = None
+
+    def _read_header(self) -> None:
+        if len(self.buffer) < _HEADER_V1.size:
+            raise StructureCodecError("Data is too short")
+        magic, version, _, count = _HEADER_V1.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise StructureCodecError("Not a story structure file")
+        if version not in (1, FORMAT_VERSION) or count != len(SECTIONS):
+            raise StructureCodecError(f"Unsupported format version {version}")
+        header_size = _HEADER_V1.size if version == 1 else _HEADER.size
+        if len(self.buffer) < header_size + _DIRECTORY_ENTRY.size * count:
+            raise StructureCodecError("Data is truncated")
+        if version != 1:
+            checksum = _HEADER.unpack_from(self.buffer, 0)[4]
+            if zlib.crc32(self.buffer[header_size:]) != checksum:
+                raise StructureCodecError("Checksum mismatch")
+        self._directory = [
+            _DIRECTORY_ENTRY.unpack_from(self.buffer, header_size + i * _DIRECTORY_ENTRY.size)
+            for i in range(count)
+        ]
+        for offset, length in self._directory:
+            if offset + length > len(self.buffer):
+                raise StructureCodecError("Data is truncated")
+
+    def column(self, name: str):
+        """列を返す（数値の列は memoryview、バイト列のセクションは memoryview('B')）"""
+        index = _SECTION_INDEX[name]
+        offset, length = self._directory[index]
+        raw = self.buffer[offset:offset + length]
+        typecode = SECTIONS[index][1]
+        if typecode is None or typecode == "B":
+            return raw
+        if _LITTLE_ENDIAN and offset % _ALIGN == 0:
+            return raw.cast(typecode)
+        values = array(typecode)
+        values.frombytes(raw)
+        if not _LITTLE_ENDIAN:
+            values.byteswap()
+        return memoryview(values)
+
+    @property
+    def strings(self) -> List[str]:
+        """文字列表（初回の参照時に 1 回だけデコードする）"""
+        if self._strings is None:
+            text = str(self.column("string_data"), "utf-8", "surrogatepass")
+            offsets = self.column("string_offsets").tolist()
+            self._strings = [text[start:end] for start, end in zip(offsets, offsets[1:])]
+        return self._strings
+
+    @property
+    def plot_count(self) -> int:
+        return len(self.column("plot_id"))
+
+    @property
+    def timeline_count(self) -> int:
+        return len(self.column("timeline_date"))
+
+    def timeline_ordinals(self) -> Iterator[Optional[int]]:
+        """タイムラインの 'ordinal' を順に返す（キーがない場合も None）"""
+        for state, value in zip(self.column("timeline_ordinal_state"), self.column("timeline_ordinal")):
+            yield value if state == 2 else None
+
+    def _string_column(self, name: str) -> List[Optional[str]]:
+        strings = self.strings
+        return [None if i == NONE else strings[i] for i in self.column(name).tolist()]
+
+    def plot_elements(self) -> List[Dict]:
+        """プロット要素を PlotElement のフィールドの辞書として返す"""
+        ids = self._string_column("plot_id")
+        titles = self._string_column("plot_title")
+        descriptions = self._string_column("plot_description")
+        sort_keys = self._string_column("plot_sort_key")
+        chapter_ids = self._string_column("plot_chapter_id")
+        orders = self.column("plot_order").tolist()
+        created = zip(self.column("plot_created_at").tolist(), self.column("plot_created_tz").tolist())
+        updated = zip(self.column("plot_updated_at").tolist(), self.column("plot_updated_tz").tolist())
+        return [
+            {
+                "id": ids[i],
+                "title": titles[i],
+                "description": descriptions[i],
+                "order": orders[i],
+                "sort_key": sort_keys[i],
+                "chapter_id": chapter_ids[i],
+                "created_at": _datetime_from_parts(*created_at),
+                "updated_at": _datetime_from_parts(*updated_at),
+            }
+            for i, created_at, updated_at in zip(range(len(ids)), created, updated)
+        ]
+
+    def values(self) -> Dict[str, Any]:
+        """chapters / characters / world_building / timeline を展開する"""
+        decoder = _Decoder(
+            self.strings,
+            self.column("value_tags"),
+            self.column("value_ints").tolist(),
+            self.column("value_floats").tolist(),
+            self.column("value_strings").tolist(),
+            self.column("value_lengths").tolist(),
+        )
+        result = {field: decoder.value() for field in VALUE_FIELDS}
+        timeline = decoder.value()
+
+        strings = self.strings
+        dates = self.column("timeline_date").tolist()
+        states = self.column("timeline_ordinal_state")
+        for event, date_ref, state, ordinal in zip(timeline, dates, states, self.timeline_ordinals()):
+            if date_ref != ABSENT:
+                event["date"] = None if date_ref == NONE else strings[date_ref]
+            if state:
+                event["ordinal"] = ordinal
+        result["timeline"] = timeline
+        return result
+
+
+def decode_structure(data: Any, structure_cls: Any, plot_element_cls: Any) -> Any:
+    """
+    バイナリ形式から StoryStructure を組み立てる
+
+    型は形式で保証されているため、pydantic の検証は行わずに construct で組み立てる。
+
+    Args:
+        data: encode_structure の結果（bytes / bytearray / mmap / memoryview）
+        structure_cls: StoryStructure
+        plot_element_cls: PlotElement
+
+    Returns:
+        StoryStructure
+
+    Raises:
+        StructureCodecError: 形式が不正な場合
+    """
+    view = None
+    try:
+        view = StructureView(data)
+        plot_elements = [plot_element_cls.construct(**fields) for fields in view.plot_elements()]
+        values = view.values()
+    except StructureCodecError:
+        raise
+    except _DECODE_ERRORS as e:
+        raise StructureCodecError(f"Data is corrupted: {type(e).__name__}: {str(e)}") from e
+    finally:
+        # mmap を閉じられるよう、バッファへの参照を手放す
+        if view is not None:
+            view.buffer.release()
+    return structure_cls.construct(plot_elements=plot_elements, **values)
@@ -0,0 +1,122 @@
+"""
+起動後のバックグラウンドウォームアップ
+
+テンプレートや設定ファイルの読み込みなど、リクエストの処理に必須ではないが
+初回アクセスを遅くする初期化処理を、アプリケーション起動後に
+バックグラウンドで実行する。完了状況はレディネスエンドポイントで公開する。
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmupTask:
+    """ウォームアップ処理 1 件の状態"""
+    name: str
+    func: Callable[[], Any]
+    required: bool = True
+    progress: Optional[Callable[[], Dict]] = None  # 実行中の進捗を返す関数
+    status: str = "pending"  # pending / running / done / failed
+    error: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return (self.finished_at - self.started_at) * 1000
+
+
+@dataclass
+class WarmupManager:
+    """ウォームアップ処理の登録と実行を管理するクラス"""
+    tasks: Dict[str, WarmupTask] = field(default_factory=dict)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    _runner: Optional[asyncio.Task] = None
+
+    def register(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        required: bool = True,
+        progress: Optional[Callable[[], Dict]] = None
+    ) -> None:
+        """
+        ウォームアップ処理を登録する
+
+        Args:
+            name: 処理名
+            func: 実行する関数。同期関数はスレッドプールで実行される
+            required: False の場合、失敗してもレディネスを妨げない
+            progress: 進捗を返す関数（状態に含めて公開する）
+        """
+        self.tasks[name] = WarmupTask(name=name, func=func, required=required, progress=progress)
+
+    @property
+    def ready(self) -> bool:
+        """必須の処理がすべて完了しているか"""
+        return self.finished_at is not None and all(
+            task.status == "done" for task in self.tasks.values() if task.required
+        )
+
+    async def _run_task(self, task: WarmupTask) -> None:
+        task.status = "running"
+        task.started_at = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(task.func):
+                await task.func()
+            else:
+                await asyncio.to_thread(task.func)
+            task.status = "done"
+        except Exception as e:
+            task.status = "failed"
+            task.error = str(e)
+            logger.error(f"Warmup task '{task.name}' failed: {str(e)}")
+        finally:
+            task.finished_at = time.perf_counter()
+
+    async def run(self) -> None:
+        """登録済みの処理を並行して実行し、すべての完了を待つ"""
+        self.started_at = time.perf_counter()
+        await asyncio.gather(*(self._run_task(task) for task in self.tasks.values()))
+        self.finished_at = time.perf_counter()
+        logger.info(f"Warmup finished in {(self.finished_at - self.started_at) * 1000:.1f} ms")
+
+    def start(self) -> asyncio.Task:
+        """バックグラウンドでウォームアップを開始する（起動イベントから呼び出す）"""
+        if self._runner is None:
+            self._runner = asyncio.get_running_loop().create_task(self.run())
+        return self._runner
+
+    def status(self) -> Dict:
+        """レディネスエンドポイント向けの状態"""
+        tasks: List[Dict] = [
+            {
+                "name": task.name,
+                "status": task.status,
+                "required": task.required,
+                "duration_ms": task.duration_ms,
+                "error": task.error,
+                "progress": task.progress() if task.progress is not None else None
+            }
+            for task in self.tasks.values()
+        ]
+        return {
+            "ready": self.ready,
+            "started": self.started_at is not None,
+            "finished": self.finished_at is not None,
+            "tasks": tasks
+        }
+
+
+# アプリケーション全体で共有するウォームアップマネージャ
+warmup_manager = WarmupManager()
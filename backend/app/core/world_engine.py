@@ -1,11 +1,16 @@
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
 from dataclasses import dataclass
 from datetime import datetime
 import logging
 from uuid import UUID, uuid4
 
+from app.core.locks import KeyedLock
+
 logger = logging.getLogger(__name__)
 
+# 要素の一覧と検証結果のキャッシュを更新する処理が共有するロックのキー
+REGISTRY_LOCK_KEY = ("elements",)
+
 @dataclass
 class WorldElement:
     """世界観の要素を表すデータクラス"""
@@ -19,18 +24,29 @@ class WorldElement:
     relationships: List[Dict]
     rules: List[str]
 
+# 変更通知を受け取るコールバック（イベント名, 変更後の要素）
+WorldListener = Callable[[str, WorldElement], Awaitable[None]]
+
 class WorldEngine:
     """世界観管理エンジン
     
     小説の世界観を管理し、整合性を検証するためのエンジン。
+    要素の更新は要素単位のロックの中で行い、リスナーへの通知もロック内で待つ。
+    作成は一覧全体のロック（REGISTRY_LOCK_KEY）も取得し、作成同士は直列化する。
     """
 
     def __init__(self):
         self.elements: Dict[UUID, WorldElement] = {}
         self.rules_registry: List[Dict] = []
         self.consistency_cache = {}
+        self.listeners: List[WorldListener] = []
+        self._locks = KeyedLock()
 
-    def create_world_element(
+    def add_listener(self, listener: WorldListener) -> None:
+        """変更通知を受け取るリスナーを登録する"""
+        self.listeners.append(listener)
+
+    async def create_world_element(
         self,
         name: str,
         description: str,
@@ -67,11 +83,28 @@ class WorldEngine:
             rules=rules or []
         )
         
-        self.elements[element_id] = element
+        async with self._locks.hold(REGISTRY_LOCK_KEY, element_id):
+            self.elements[element_id] = element
+            # 要素が増えたため、全体の検証結果は無効になる
+            self.consistency_cache = {}
+            for listener in self.listeners:
+                await listener("world_element_created", element)
         logger.info(f"Created new world element: {name} ({element_id})")
         
         return element
 
+    def load_elements(self, elements: Iterable[WorldElement]) -> None:
+        """
+        要素の一覧を置き換える（データベースから読み込んだ直後など）
+
+        リスナーへの通知は行わない。検証結果のキャッシュは破棄する。
+
+        Args:
+            elements: 世界観の要素の一覧
+        """
+        self.elements = {element.id: element for element in elements}
+        self.consistency_cache = {}
+
     def validate_consistency(self, element_id: Optional[UUID] = None) -> Dict:
         """世界観の整合性を検証する
 
@@ -0,0 +1,171 @@
+"""
+データベース接続とセッションの管理
+
+接続先は環境変数 NOVELSPEC_DATABASE_URL（未設定なら DATABASE_URL）で指定する。
+どちらも未設定の場合はカレントディレクトリの SQLite ファイルを使う。
+
+読み込みと書き込みで接続プールを分ける。一覧・閲覧・分析のエンドポイントは
+get_read_db、保存を行うエンドポイントは get_write_db（= get_db）を使う。
+読み込み用の接続先は NOVELSPEC_READ_DATABASE_URL でレプリカを指定でき、
+未設定の場合は書き込みと同じデータベースに別のプールで接続する。
+
+SQLite のファイルでは WAL モードにして、書き込み中も読み込みを待たせない。
+"""
+
+import os
+from typing import Iterator, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+DEFAULT_DATABASE_URL = "sqlite:///./novelspec.db"
+
+# SQLite がロックの解放を待つ時間（ミリ秒）。自動保存が集中しても即座に
+# "database is locked" にならないよう、書き込み 1 回分より十分長くする
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("NOVELSPEC_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# 接続ごとにキャッシュするプリペアドステートメントの数（sqlite3 の既定は 128）
+SQLITE_STATEMENT_CACHE_SIZE = int(os.getenv("NOVELSPEC_SQLITE_STATEMENT_CACHE_SIZE", "512"))
+# SQLAlchemy がキャッシュするコンパイル済み SQL の数
+QUERY_CACHE_SIZE = int(os.getenv("NOVELSPEC_QUERY_CACHE_SIZE", "1000"))
+
+READ_POOL_SIZE = int(os.getenv("NOVELSPEC_READ_POOL_SIZE", "10"))
+WRITE_POOL_SIZE = int(os.getenv("NOVELSPEC_WRITE_POOL_SIZE", "5"))
+
+
+class ReadOnlySessionError(RuntimeError):
+    """読み込み用のセッションで書き込もうとした場合の例外クラス"""
+    pass
+
+
+def get_database_url() -> str:
+    return os.getenv("NOVELSPEC_DATABASE_URL") or os.getenv("DATABASE_URL") or DEFAULT_DATABASE_URL
+
+
+def get_read_database_url() -> str:
+    return os.getenv("NOVELSPEC_READ_DATABASE_URL") or get_database_url()
+
+
+def is_sqlite_memory(url: str) -> bool:
+    """接続ごとに別のデータベースになるインメモリの SQLite かどうか"""
+    path = url.split("://", 1)[-1]
+    return url.startswith("sqlite") and (path in ("", "/", "/:memory:") or "mode=memory" in url)
+
+
+def _configure_sqlite(engine: Engine, read_only: bool, wal: bool) -> None:
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if wal:
+                # WAL では読み込みが書き込みを待たず、書き込みも読み込みを待たない
+                cursor.execute("PRAGMA journal_mode=WAL")
+                # WAL ではチェックポイント時だけ fsync すれば破損しない
+                cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            if read_only:
+                cursor.execute("PRAGMA query_only=ON")
+        finally:
+            cursor.close()
+
+
+def build_engine(url: str, read_only: bool = False, wal: bool = True, pool_size: Optional[int] = None) -> Engine:
+    """
+    接続先に応じた設定でエンジンを作成する
+
+    Args:
+        url: SQLAlchemy の接続URL
+        read_only: 読み込み専用の接続にする（SQLite では query_only を有効にする）
+        wal: SQLite のファイルを WAL モードで開く
+        pool_size: 接続プールの大きさ（省略時は用途ごとの既定値）
+
+    Returns:
+        Engine
+    """
+    size = pool_size or (READ_POOL_SIZE if read_only else WRITE_POOL_SIZE)
+    if url.startswith("sqlite"):
+        # FastAPI は同期エンドポイントをスレッドプールで実行するため、スレッド間で接続を共有する
+        connect_args = {
+            "check_same_thread": False,
+            "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+            "cached_statements": SQLITE_STATEMENT_CACHE_SIZE,
+        }
+        if is_sqlite_memory(url):
+            return create_engine(url, connect_args=connect_args, query_cache_size=QUERY_CACHE_SIZE)
+        engine = create_engine(
+            url,
+            connect_args=connect_args,
+            query_cache_size=QUERY_CACHE_SIZE,
+            pool_size=size,
+            max_overflow=size
+        )
+        _configure_sqlite(engine, read_only, wal)
+        return engine
+    return create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=size,
+        max_overflow=2 * size,
+        query_cache_size=QUERY_CACHE_SIZE
+    )
+
+
+def _reject_flush(session, flush_context, instances) -> None:
+    if session.new or session.dirty or session.deleted:
+        raise ReadOnlySessionError("Cannot write through a read-only session; use get_write_db")
+
+
+def build_sessionmakers(write_url: str, read_url: Optional[str] = None):
+    """
+    書き込み用と読み込み用のセッションファクトリを作成する
+
+    インメモリの SQLite は接続ごとに別のデータベースになるため、
+    読み込みも書き込み用のエンジンを使う。
+
+    Returns:
+        (書き込み用の sessionmaker, 読み込み用の sessionmaker)
+    """
+    write_engine = build_engine(write_url)
+    read_url = read_url or write_url
+    if is_sqlite_memory(write_url) and read_url == write_url:
+        read_engine = write_engine
+    else:
+        read_engine = build_engine(read_url, read_only=True)
+
+    write_sessions = sessionmaker(bind=write_engine, autocommit=False, autoflush=False)
+    read_sessions = sessionmaker(bind=read_engine, autocommit=False, autoflush=False)
+    event.listen(read_sessions, "before_flush", _reject_flush)
+    return write_sessions, read_sessions
+
+
+SessionLocal, ReadSessionLocal = build_sessionmakers(get_database_url(), get_read_database_url())
+engine = SessionLocal.kw["bind"]
+read_engine = ReadSessionLocal.kw["bind"]
+
+
+def get_write_db() -> Iterator[Session]:
+    """保存を行うリクエスト用のセッションを提供する依存関数"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db() -> Iterator[Session]:
+    """
+    一覧・閲覧・分析のリクエスト用のセッションを提供する依存関数
+
+    読み込み用のプール（またはレプリカ）から接続し、書き込もうとすると
+    ReadOnlySessionError になる
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        # 読み込みだけのトランザクションはコミットせずに閉じる
+        db.close()
+
+
+# 既存のエンドポイント向け（書き込み用のセッション）
+get_db = get_write_db
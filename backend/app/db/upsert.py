@@ -0,0 +1,31 @@
+"""
+INSERT ... ON CONFLICT による upsert
+
+SQLite と PostgreSQL の方言の insert() は on_conflict_do_update / on_conflict_do_nothing
+を持つ。それ以外のデータベースでは None を返すため、呼び出し側は従来の
+「更新して、なければ追加する」処理にフォールバックする。
+"""
+
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+
+def dialect_insert(db: Session) -> Optional[Callable]:
+    """
+    接続先のデータベースの ON CONFLICT 対応の insert() を返す
+
+    Args:
+        db: データベースセッション
+
+    Returns:
+        方言の insert 関数（ON CONFLICT に対応していなければ None）
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    return None
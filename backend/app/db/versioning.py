@@ -0,0 +1,64 @@
+"""
+バージョン列による楽観的排他制御
+
+更新はバージョンを条件に含めた 1 文の UPDATE で行い、同時に
+バージョンを 1 つ進める。条件に一致する行がなければ他の編集者が先に
+更新しているため、現在の状態を添えて VersionConflict を送出する。
+"""
+
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+
+class VersionConflict(Exception):
+    """編集元のバージョンが最新でないことを表す例外クラス"""
+
+    def __init__(self, current: Any, expected_version: Optional[int]):
+        self.current = current
+        self.expected_version = expected_version
+        super().__init__(
+            f"Version conflict: expected {expected_version}, current {getattr(current, 'version', None)}"
+        )
+
+
+def versioned_update(
+    db: Session,
+    model,
+    filters: Iterable,
+    expected_version: Optional[int],
+    values: Dict[str, Any]
+) -> Optional[Any]:
+    """
+    バージョンを検査しながら行を更新する（コミットは呼び出し側で行う）
+
+    Args:
+        db: データベースセッション
+        model: 更新するモデルクラス（version 列を持つこと）
+        filters: 更新対象を特定する条件
+        expected_version: 編集元のバージョン。None の場合は検査せずに更新する
+        values: 更新する列と値（モデルに存在しない列は無視する）
+
+    Returns:
+        更新後のオブジェクト（対象が存在しない場合は None）
+
+    Raises:
+        VersionConflict: バージョンが一致しない場合
+    """
+    filters = list(filters)
+    columns = model.__table__.c
+    values = {key: value for key, value in values.items() if key in columns and key != "version"}
+
+    stmt = update(model).where(*filters)
+    if expected_version is not None:
+        stmt = stmt.where(model.version == expected_version)
+    stmt = stmt.values(**values, version=model.version + 1).execution_options(
+        synchronize_session=False
+    )
+
+    result = db.execute(stmt)
+    current = db.query(model).filter(*filters).populate_existing().first()
+    if result.rowcount == 0 and current is not None:
+        raise VersionConflict(current, expected_version)
+    return current
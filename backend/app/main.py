@@ -0,0 +1,114 @@
+"""
+FastAPIアプリケーションのエントリーポイント
+
+ルーターの組み立てまでを同期的に行い、テンプレートや設定ファイルの読み込みなど
+重い初期化処理は起動後のバックグラウンドウォームアップに回す。
+"""
+
+import logging
+from importlib import import_module
+from typing import List, Tuple
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.core import CONFIG
+from app.core.profiling import install_profiling
+from app.core.responses import FastJSONResponse
+from app.core.warmup import warmup_manager
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/api"
+
+# (モジュールパス, ルーター属性名)。順序はルートのマッチング順に影響する
+ROUTER_MODULES: List[Tuple[str, str]] = [
+    ("app.api.system.router", "router"),
+    ("app.api.profiling.router", "router"),
+    ("app.api.characters", "router"),
+    ("app.api.characters.router", "router"),
+    ("app.api.overview.router", "router"),
+    ("app.api.novels.router", "router"),
+    ("app.api.worldbuilding", "router"),
+    ("app.api.worldbuilding.router", "router"),
+    ("app.api.dialogue.router", "router"),
+    ("app.api.ordering.router", "router"),
+    ("app.api.consistency.router", "router"),
+    ("app.api.progress.router", "router"),
+    ("app.api.chapters.router", "router"),
+    ("app.api.scenes.router", "router"),
+    ("app.api.imports.router", "router"),
+    ("app.api.revisions.router", "router"),
+    ("app.api.timeline.router", "router"),
+]
+
+
+def _include_routers(app: FastAPI) -> None:
+    """ルーターモジュールを読み込んでアプリケーションに登録する"""
+    for module_path, attr in ROUTER_MODULES:
+        router = getattr(import_module(module_path), attr)
+        app.include_router(router, prefix=API_PREFIX)
+
+    from app.api.novels import include_endpoint_routers
+    app.include_router(include_endpoint_routers(), prefix=f"{API_PREFIX}/novels")
+
+
+def _register_warmup_tasks() -> None:
+    """起動後に実行するウォームアップ処理を登録する"""
+    from app.api.characters import warm_character_templates
+    from app.api.novels import get_novel_system
+    from app.core.engine_registry import engine_registry
+    from app.services.novel_warmup import load_novel_engines, novel_warmup
+
+    engine_registry.set_loader(load_novel_engines)
+    warmup_manager.register("character_templates", warm_character_templates)
+    # キャッシュを温めるだけの処理は、失敗してもレディネスを妨げない
+    warmup_manager.register("novel_system", get_novel_system, required=False)
+    warmup_manager.register(
+        "active_novels", novel_warmup.run, required=False, progress=novel_warmup.progress
+    )
+
+
+def create_app() -> FastAPI:
+    """
+    アプリケーションを組み立てる
+
+    Returns:
+        FastAPI: 組み立て済みのアプリケーション
+    """
+    app = FastAPI(
+        title=CONFIG["app_name"],
+        debug=CONFIG["debug"],
+        default_response_class=FastJSONResponse
+    )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    install_profiling(app)
+
+    _include_routers(app)
+    _register_warmup_tasks()
+
+    @app.on_event("startup")
+    async def start_warmup() -> None:
+        warmup_manager.start()
+
+    @app.on_event("startup")
+    async def start_autosave() -> None:
+        from app.services.autosave_service import autosave_buffer
+        await autosave_buffer.start()
+
+    @app.on_event("shutdown")
+    async def stop_autosave() -> None:
+        from app.services.autosave_service import autosave_buffer
+        await autosave_buffer.stop()
+
+    return app
+
+
+app = create_app()
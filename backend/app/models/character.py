@@ -26,6 +26,7 @@ class Character(Base):
     background = Column(Text)
     motivation = Column(Text)
     role_in_story = Column(String(100))
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # 楽観的排他制御用
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
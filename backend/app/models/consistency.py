@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index
+from datetime import datetime
+
+from .database import Base
+
+class ConsistencyRun(Base):
+    """整合性チェックの実行 1 回分（問題そのものは ConsistencyIssue に差分として保存する）"""
+    __tablename__ = "consistency_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    novel_id = Column(Integer, nullable=False, index=True)
+    issue_count = Column(Integer, default=0, nullable=False)  # 実行時点で未解決の問題の数
+    error_count = Column(Integer, default=0, nullable=False)
+    warning_count = Column(Integer, default=0, nullable=False)
+    added = Column(Integer, default=0, nullable=False)  # 前回の実行から追加された問題の数
+    resolved = Column(Integer, default=0, nullable=False)
+    changed = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class ConsistencyIssue(Base):
+    """問題が存在した期間（検出された実行から解消された実行まで）
+
+    同じ問題が解消後に再び検出された場合は新しい行を作る。各実行の問題一覧は
+    opened_run_id <= 実行ID かつ（resolved_run_id が None または > 実行ID）の行になる。
+    """
+    __tablename__ = "consistency_issues"
+    __table_args__ = (
+        Index("ix_consistency_issues_novel_open", "novel_id", "resolved_run_id"),
+        Index("ix_consistency_issues_novel_opened", "novel_id", "opened_run_id"),
+        Index("ix_consistency_issues_novel_changed", "novel_id", "changed_run_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    novel_id = Column(Integer, nullable=False)
+    issue_id = Column(String(16), nullable=False)  # consistency_hub.issue_id による安定したID
+    fingerprint = Column(String(40), nullable=False)  # 内容のハッシュ（変更の検出用）
+    severity = Column(String(16), nullable=False)
+    payload = Column(JSON, nullable=False)
+    opened_run_id = Column(Integer, nullable=False)
+    changed_run_id = Column(Integer, nullable=False)  # 最後に内容が変わった実行
+    resolved_run_id = Column(Integer)  # 解消された実行（未解決の場合は None）
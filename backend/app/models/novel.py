@@ -1,11 +1,21 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum, JSON, event, func, select
+from sqlalchemy.orm import Session, relationship
 from datetime import datetime
 import enum
-from typing import List
+from typing import Dict, List, Tuple
 
+from app.core.ordering import is_valid_key, key_between
 from .database import Base
 
+
+def sequence_order(model) -> Tuple:
+    """
+    章・シーンを並び順に並べる ORDER BY の式
+
+    並び順キーを持つ行を先に並べる（NULL の位置はデータベースによって異なるため明示する）
+    """
+    return (model.sort_key.is_(None), model.sort_key, model.order)
+
 class NovelStatus(enum.Enum):
     """小説の状態を表す列挙型"""
     DRAFT = "draft"
@@ -25,11 +35,15 @@ class Novel(Base):
     genre = Column(String(100))
     target_word_count = Column(Integer)
     current_word_count = Column(Integer, default=0)
+    calendar = Column(JSON)  # 作中の暦の定義（None の場合はグレゴリオ暦）
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # リレーションシップ
-    chapters = relationship("Chapter", back_populates="novel", cascade="all, delete-orphan")
+    chapters = relationship(
+        "Chapter", back_populates="novel", cascade="all, delete-orphan",
+        order_by=lambda: list(sequence_order(Chapter))
+    )
     author = relationship("User", back_populates="novels")
 
     def update_word_count(self):
@@ -45,15 +59,20 @@ class Chapter(Base):
     novel_id = Column(Integer, ForeignKey("novels.id"), nullable=False)
     title = Column(String(255), nullable=False)
     order = Column(Integer, nullable=False)
+    sort_key = Column(String(64), index=True)  # 並べ替え用の分数インデックスキー
     description = Column(Text)
     current_word_count = Column(Integer, default=0)
     target_word_count = Column(Integer)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # 楽観的排他制御用
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # リレーションシップ
     novel = relationship("Novel", back_populates="chapters")
-    scenes = relationship("Scene", back_populates="chapter", cascade="all, delete-orphan")
+    scenes = relationship(
+        "Scene", back_populates="chapter", cascade="all, delete-orphan",
+        order_by=lambda: list(sequence_order(Scene))
+    )
 
     def update_word_count(self):
         """章の単語数を更新"""
@@ -69,10 +88,13 @@ class Scene(Base):
     title = Column(String(255), nullable=False)
     content = Column(Text)
     order = Column(Integer, nullable=False)
+    sort_key = Column(String(64), index=True)  # 並べ替え用の分数インデックスキー
     word_count = Column(Integer, default=0)
     pov_character = Column(String(255))  # POVキャラクター
     location = Column(String(255))  # シーンの舞台
     time_period = Column(String(255))  # シーンの時間設定
+    time_ordinal = Column(Integer, index=True)  # time_period を作中の暦で通し日数にしたもの
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # 楽観的排他制御用
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -84,4 +106,40 @@ class Scene(Base):
         if self.content:
             self.word_count = len(self.content.split())
         else:
-            self.word_count = 0
\ No newline at end of file
+            self.word_count = 0
+
+
+def _container_of(obj) -> Tuple:
+    """新しい章・シーンが並ぶ一覧（親が未保存の場合は親オブジェクトで区別する）"""
+    if isinstance(obj, Chapter):
+        parent_id = obj.novel_id if obj.novel_id is not None else (obj.novel.id if obj.novel else None)
+        return (Chapter, parent_id if parent_id is not None else ("new", id(obj.novel)))
+    parent_id = obj.chapter_id if obj.chapter_id is not None else (obj.chapter.id if obj.chapter else None)
+    return (Scene, parent_id if parent_id is not None else ("new", id(obj.chapter)))
+
+
+@event.listens_for(Session, "before_flush")
+def _assign_sort_keys(session, flush_context, instances) -> None:
+    """並び順キーのない新しい章・シーンに、一覧の末尾に並ぶキーを割り当てる
+
+    キーがないと並べ替えのたびに一覧全体の振り直しが必要になるため、作成時に割り当てる。
+    """
+    pending: Dict[Tuple, List] = {}
+    for obj in session.new:
+        if isinstance(obj, (Chapter, Scene)) and obj.sort_key is None:
+            pending.setdefault(_container_of(obj), []).append(obj)
+
+    for (model, parent_id), items in pending.items():
+        last_key = None
+        parent_column = model.novel_id if model is Chapter else model.chapter_id
+        if not isinstance(parent_id, tuple):
+            with session.no_autoflush:
+                last_key = session.execute(
+                    select(func.max(model.sort_key)).where(parent_column == parent_id)
+                ).scalar()
+            if last_key is not None and not is_valid_key(last_key):
+                # 旧形式のキーが残る一覧は、次の並べ替えでまとめて振り直す
+                continue
+        for item in sorted(items, key=lambda item: item.order or 0):
+            last_key = key_between(last_key, None)
+            item.sort_key = last_key
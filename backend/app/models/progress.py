@@ -0,0 +1,53 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Date, Index
+from datetime import datetime
+
+from .database import Base
+
+class WordCountEvent(Base):
+    """保存ごとの単語数の増減（追記のみのログ）"""
+    __tablename__ = "word_count_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    novel_id = Column(Integer, ForeignKey("novels.id"), nullable=False)
+    chapter_id = Column(Integer, ForeignKey("chapters.id"))
+    scene_id = Column(Integer, ForeignKey("scenes.id"))
+    delta = Column(Integer, nullable=False)  # 増減（負の値は削除）
+    words_after = Column(Integer, nullable=False)  # 保存後のシーンの単語数
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_word_count_events_novel_created", "novel_id", "created_at"),
+    )
+
+class DailyProgress(Base):
+    """小説ごとの日次集計"""
+    __tablename__ = "daily_progress"
+
+    novel_id = Column(Integer, ForeignKey("novels.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    words_added = Column(Integer, default=0, nullable=False)
+    words_removed = Column(Integer, default=0, nullable=False)
+    net_words = Column(Integer, default=0, nullable=False)
+    save_count = Column(Integer, default=0, nullable=False)
+
+class WeeklyProgress(Base):
+    """小説ごとの週次集計（週の開始日は月曜日）"""
+    __tablename__ = "weekly_progress"
+
+    novel_id = Column(Integer, ForeignKey("novels.id"), primary_key=True)
+    week_start = Column(Date, primary_key=True)
+    words_added = Column(Integer, default=0, nullable=False)
+    words_removed = Column(Integer, default=0, nullable=False)
+    net_words = Column(Integer, default=0, nullable=False)
+    save_count = Column(Integer, default=0, nullable=False)
+
+class ChapterProgress(Base):
+    """章ごとの集計"""
+    __tablename__ = "chapter_progress"
+
+    chapter_id = Column(Integer, ForeignKey("chapters.id"), primary_key=True)
+    novel_id = Column(Integer, ForeignKey("novels.id"), nullable=False, index=True)
+    words_added = Column(Integer, default=0, nullable=False)
+    words_removed = Column(Integer, default=0, nullable=False)
+    net_words = Column(Integer, default=0, nullable=False)
+    last_written_at = Column(DateTime)
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, LargeBinary, Index, UniqueConstraint
+from datetime import datetime
+
+from .database import Base
+
+class ContentChunk(Base):
+    """改訂履歴のチャンク（内容ハッシュで重複を除いて 1 件だけ保存する）"""
+    __tablename__ = "content_chunks"
+
+    hash = Column(String(64), primary_key=True)  # SHA-256
+    size = Column(Integer, nullable=False)  # 圧縮前のバイト数
+    data = Column(LargeBinary, nullable=False)  # zlib 圧縮済み
+    ref_count = Column(Integer, default=0, nullable=False)  # 参照している改訂の数
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class Revision(Base):
+    """シーン本文・章のアウトラインの改訂（本文はチャンクの並びとして保存する）"""
+    __tablename__ = "revisions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity_type = Column(String(32), nullable=False)  # "scene" / "chapter_outline"
+    entity_id = Column(Integer, nullable=False)
+    number = Column(Integer, nullable=False)  # 対象ごとの連番
+    chunk_hashes = Column(Text, nullable=False)  # チャンクのハッシュを "," で連結したもの
+    content_hash = Column(String(64), nullable=False)  # 本文全体のハッシュ（変更の有無の判定用）
+    size = Column(Integer, nullable=False)  # 本文のバイト数
+    word_count = Column(Integer, default=0, nullable=False)
+    label = Column(String(255))
+    author_id = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("entity_type", "entity_id", "number", name="uq_revisions_entity_number"),
+        Index("ix_revisions_entity_created", "entity_type", "entity_id", "created_at"),
+    )
+
+    @property
+    def hashes(self):
+        return self.chunk_hashes.split(",") if self.chunk_hashes else []
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from typing import List, Optional
@@ -12,6 +12,7 @@ class World(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
     description = Column(Text)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # 楽観的排他制御用
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -45,6 +46,7 @@ class WorldElement(Base):
     category = Column(String(100), nullable=False)  # 地理、文化、歴史など
     details = Column(Text)
     world_id = Column(Integer, ForeignKey('worlds.id'), nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # 楽観的排他制御用
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -81,4 +83,31 @@ class WorldElement(Base):
             'details': self.details,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
-        }
\ No newline at end of file
+        }
+
+class NovelWorld(Base):
+    """小説が参照する共有の世界観（シリーズの複数の小説で 1 つの世界観を共有する）"""
+    __tablename__ = 'novel_worlds'
+
+    novel_id = Column(Integer, ForeignKey('novels.id'), primary_key=True)
+    world_id = Column(Integer, ForeignKey('worlds.id'), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class WorldOverride(Base):
+    """小説ごとの世界観の差分（共有の要素は書き換えず、差分だけをここに保存する）"""
+    __tablename__ = 'world_overrides'
+    __table_args__ = (
+        UniqueConstraint('novel_id', 'element_id', name='uq_world_overrides_novel_element'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    novel_id = Column(Integer, ForeignKey('novels.id'), nullable=False, index=True)
+    world_id = Column(Integer, ForeignKey('worlds.id'), nullable=False)
+    # 上書き・非表示にする共有要素のID（小説だけに追加する要素の場合は None）
+    element_id = Column(Integer, ForeignKey('world_elements.id'))
+    operation = Column(String(16), nullable=False)  # "modify" / "add" / "remove"
+    fields = Column(JSON)  # 変更する項目（name, category, description, details）
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # 楽観的排他制御用
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
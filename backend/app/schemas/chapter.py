@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, Field
+
+class ChapterUpdate(BaseModel):
+    """章の更新リクエスト（指定したフィールドだけを更新する）"""
+    title: Optional[str] = Field(None, min_length=1, max_length=255, description="章のタイトル")
+    description: Optional[str] = Field(None, description="章の説明")
+    target_word_count: Optional[int] = Field(None, ge=0, description="目標単語数")
+    version: Optional[int] = Field(None, ge=1, description="編集元のバージョン（指定すると他の更新との競合を検出する）")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "title": "第2章 旅立ち",
+                "target_word_count": 8000,
+                "version": 3
+            }
+        }
+
+class ChapterResponse(BaseModel):
+    """章のレスポンス"""
+    id: int
+    novel_id: int
+    title: str
+    description: Optional[str]
+    order: int
+    sort_key: Optional[str]
+    current_word_count: Optional[int]
+    target_word_count: Optional[int]
+    version: int
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
@@ -56,6 +56,7 @@ class CharacterUpdate(BaseModel):
     background: Optional[str] = Field(None, max_length=2000)
     goals: Optional[str] = Field(None, max_length=1000)
     relationships: Optional[dict[str, str]] = None
+    version: Optional[int] = Field(None, ge=1, description="編集元のバージョン（指定すると他の更新との競合を検出する）")
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Config:
@@ -64,6 +65,7 @@ class CharacterUpdate(BaseModel):
                 "name": "John Doe Updated",
                 "age": 26,
                 "description": "更新された主人公の説明",
+                "version": 2,
                 "relationships": {
                     "Mary Smith": "親友",
                     "Dr. Evil": "宿敵",
@@ -75,6 +77,7 @@ class CharacterUpdate(BaseModel):
 class CharacterInDB(CharacterBase):
     """データベースに保存されるキャラクターモデル"""
     id: str
+    version: int
     created_at: datetime
     updated_at: datetime
     created_by: str
@@ -0,0 +1,56 @@
+from typing import Any, Dict, List
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+class ConsistencyRunSummary(BaseModel):
+    """整合性チェックの実行 1 回分の集計"""
+    id: int
+    novel_id: int
+    issue_count: int = Field(..., description="実行時点で未解決の問題の数")
+    error_count: int
+    warning_count: int
+    added: int = Field(..., description="前回の実行から追加された問題の数")
+    resolved: int = Field(..., description="前回の実行から解消された問題の数")
+    changed: int = Field(..., description="前回の実行から内容が変わった問題の数")
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class ConsistencyRunResult(BaseModel):
+    """整合性チェックの実行結果"""
+    run: ConsistencyRunSummary
+    created: bool = Field(..., description="False の場合は前回から変化がなく、最新の実行をそのまま返している")
+
+class ConsistencySnapshot(BaseModel):
+    """最新の実行時点の問題一覧"""
+    novel_id: int
+    run_id: int
+    issues: List[Dict[str, Any]]
+
+class ConsistencyDelta(BaseModel):
+    """指定した実行から最新の実行までの差分"""
+    novel_id: int
+    since: int = Field(..., description="差分の起点の実行ID")
+    run_id: int = Field(..., description="最新の実行ID（次回の since に使う）")
+    added: List[Dict[str, Any]]
+    resolved: List[str] = Field(..., description="解消された問題のID")
+    changed: List[Dict[str, Any]]
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "novel_id": 1,
+                "since": 41,
+                "run_id": 42,
+                "added": [{
+                    "id": "3f2a9c1d0b7e6a54",
+                    "source": "world",
+                    "check": "rule",
+                    "severity": "error",
+                    "detail": {"element": "王都", "rule": "魔法の制約"}
+                }],
+                "resolved": ["9b8c7d6e5f4a3b2c"],
+                "changed": []
+            }
+        }
@@ -0,0 +1,16 @@
+from typing import Optional
+from pydantic import BaseModel, Field
+
+class ImportJobStatus(BaseModel):
+    """原稿取り込みジョブの進捗"""
+    id: str
+    novel_id: int
+    status: str = Field(..., description="pending / running / completed / failed")
+    bytes_read: int
+    total_bytes: int
+    progress: Optional[float] = Field(None, description="読み込み済みの割合（0〜1）")
+    chapters: int
+    scenes: int
+    words: int
+    elapsed_seconds: Optional[float] = None
+    error: Optional[str] = None
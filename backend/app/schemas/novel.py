@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
 class NovelBase(BaseModel):
@@ -58,4 +58,27 @@ class NovelResponse(NovelBase):
                 "average_rating": 4.5,
                 "view_count": 1000
             }
-        }
\ No newline at end of file
+        }
+
+class NovelOverview(BaseModel):
+    """ダッシュボード向けの小説の概要（取得しなかった項目は含まない）"""
+    novel: Optional[Dict[str, Any]] = Field(None, description="小説の指定したフィールド")
+    characters: Optional[List[Dict[str, Any]]] = Field(None, description="キャラクターの指定したフィールド")
+    world: Optional[Dict[str, Any]] = Field(None, description="共有の世界観の名前と、カテゴリごとの要素数")
+    chapters: Optional[List[Dict[str, Any]]] = Field(None, description="章の指定したフィールド")
+    progress: Optional[Dict[str, Any]] = Field(None, description="執筆進捗ダッシュボードの指標")
+    errors: Optional[Dict[str, str]] = Field(None, description="取得に失敗した項目 → 理由")
+    generated_at: datetime = Field(..., description="概要を組み立てた日時")
+    cached: bool = Field(False, description="キャッシュした概要かどうか")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "novel": {"id": 1, "title": "素晴らしい物語", "status": "draft", "current_word_count": 52000},
+                "characters": [{"id": 3, "name": "アリス", "role_in_story": "主人公"}],
+                "world": {"id": 2, "name": "大陸", "element_count": 40, "categories": {"地理": 12, "歴史": 28}},
+                "chapters": [{"id": 10, "title": "第1章", "current_word_count": 5200, "scene_count": 4}],
+                "generated_at": "2024-01-01T00:00:00",
+                "cached": False
+            }
+        }
@@ -0,0 +1,36 @@
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+class MoveItem(BaseModel):
+    """並べ替え操作 1 件"""
+    kind: Literal["chapter", "scene"] = Field(..., description="移動対象の種類")
+    id: int = Field(..., description="移動する章またはシーンのID")
+    after_id: Optional[int] = Field(None, description="直前に来る要素のID（先頭に移動する場合は省略）")
+    before_id: Optional[int] = Field(None, description="直後に来る要素のID（after_id の直後に移動する場合は省略可）")
+    chapter_id: Optional[int] = Field(None, description="シーンを別の章へ移動する場合の移動先の章ID")
+
+class ReorderRequest(BaseModel):
+    """一括並べ替えリクエスト"""
+    moves: List[MoveItem] = Field(..., min_items=1, max_items=500, description="順に適用する移動操作")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "moves": [
+                    {"kind": "chapter", "id": 12, "after_id": 10},
+                    {"kind": "scene", "id": 301, "after_id": 298, "chapter_id": 12}
+                ]
+            }
+        }
+
+class MovedItem(BaseModel):
+    """移動後の並び順キー"""
+    kind: str
+    id: int
+    sort_key: str
+    chapter_id: Optional[int] = None
+
+class ReorderResponse(BaseModel):
+    """一括並べ替えの結果"""
+    moved: List[MovedItem]
+    rebalance_scheduled: bool = False
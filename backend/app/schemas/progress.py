@@ -0,0 +1,46 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+class DailyProgressEntry(BaseModel):
+    """日次の執筆量"""
+    day: str
+    words_added: int
+    words_removed: int
+    net_words: int
+    save_count: int
+
+class WeeklyProgressEntry(BaseModel):
+    """週次の執筆量"""
+    week_start: str
+    net_words: int
+    words_added: int
+
+class WritingStreak(BaseModel):
+    """連続執筆日数"""
+    current: int = Field(..., description="現在の連続日数")
+    longest: int = Field(..., description="最長の連続日数")
+
+class ProgressDashboard(BaseModel):
+    """執筆進捗ダッシュボード"""
+    novel_id: int
+    current_word_count: int
+    target_word_count: Optional[int]
+    remaining_words: Optional[int]
+    velocity_per_day: float = Field(..., description="直近 window_days 日間の1日あたりの純増単語数")
+    window_days: int
+    days_to_target: Optional[int] = Field(None, description="現在の速度で目標に到達するまでの日数")
+    projected_completion: Optional[str]
+    streak: WritingStreak
+    daily: List[DailyProgressEntry]
+    weekly: List[WeeklyProgressEntry]
+
+class ChapterProgressEntry(BaseModel):
+    """章ごとの進捗"""
+    chapter_id: int
+    title: str
+    current_word_count: int
+    target_word_count: Optional[int]
+    completion: Optional[float]
+    words_added: int
+    words_removed: int
+    last_written_at: Optional[str]
@@ -0,0 +1,52 @@
+from typing import List, Optional
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+class RevisionCreate(BaseModel):
+    """改訂の手動保存リクエスト"""
+    content: Optional[str] = Field(None, description="保存する本文（省略時は現在保存されている内容）")
+    label: Optional[str] = Field(None, max_length=255, description="改訂の名前（「第1稿」など）")
+
+class RevisionSummary(BaseModel):
+    """改訂の一覧の 1 件（本文は含まない）"""
+    number: int
+    size: int = Field(..., description="本文のバイト数")
+    word_count: int
+    label: Optional[str] = None
+    author_id: Optional[int] = None
+    created_at: datetime
+
+class RevisionContent(RevisionSummary):
+    """改訂の本文"""
+    content: str
+
+class DiffHunk(BaseModel):
+    """差分の 1 か所"""
+    op: str = Field(..., description="replace / delete / insert")
+    from_line: int = Field(..., description="変更前の開始行（1 始まり）")
+    to_line: int = Field(..., description="変更後の開始行（1 始まり）")
+    removed: List[str]
+    added: List[str]
+
+class RevisionDiff(BaseModel):
+    """2 つの改訂の差分"""
+    from_number: int
+    to_number: int
+    lines_added: int
+    lines_removed: int
+    shared_chunks: int = Field(..., description="両方の改訂が共有しているチャンクの数")
+    hunks: List[DiffHunk]
+
+class RetentionRequest(BaseModel):
+    """保持方針の適用リクエスト"""
+    keep_last: int = Field(100, ge=1, description="残す最新の改訂の数")
+    keep_daily_days: int = Field(30, ge=0, description="各日の最後の改訂を残す日数")
+    keep_labeled: bool = Field(True, description="ラベル付きの改訂を残す")
+
+class RetentionResult(BaseModel):
+    """保持方針の適用結果"""
+    deleted: int
+    revisions: int
+    logical_bytes: int
+    stored_bytes: int
+    unique_chunks: int
@@ -0,0 +1,73 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, Field
+
+class SceneState(BaseModel):
+    """シーンの現在の状態（競合時にクライアントがマージするために返す）"""
+    id: int
+    chapter_id: int
+    title: str
+    content: Optional[str]
+    word_count: Optional[int]
+    pov_character: Optional[str]
+    location: Optional[str]
+    time_period: Optional[str]
+    time_ordinal: Optional[int]
+    version: int
+    updated_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+
+class SceneContentUpdate(BaseModel):
+    """シーン本文の保存リクエスト"""
+    content: str = Field(..., description="シーンの本文")
+    version: Optional[int] = Field(None, ge=1, description="編集元のバージョン（指定すると他の更新との競合を検出する）")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "content": "「行こう」と彼は言った。",
+                "version": 4
+            }
+        }
+
+class SceneSaveResult(BaseModel):
+    """シーン本文の保存結果"""
+    id: int
+    version: int
+    word_count: int
+    delta: int = Field(..., description="保存前からの単語数の増減")
+
+class SceneAutosaveResult(BaseModel):
+    """自動保存の受け付け結果（本文はまだ書き込まれていない）"""
+    id: int
+    version: Optional[int] = Field(None, description="書き込み時に検査する編集元のバージョン")
+    pending_saves: int = Field(..., description="まとめて書き込む予定の保存の回数")
+    flush_interval: float = Field(..., description="下書きを書き込む間隔（秒）")
+
+class SceneFlushResult(BaseModel):
+    """下書きの書き込み結果"""
+    id: int
+    flushed: bool = Field(..., description="書き込む下書きがあったかどうか")
+    version: Optional[int] = Field(None, description="書き込み後のバージョン")
+
+class SceneTimeUpdate(BaseModel):
+    """シーンの作中の日付の更新リクエスト"""
+    time_period: Optional[str] = Field(None, max_length=255, description="作中の暦で表した日付（\"星暦 1024年3月5日\"、\"3日目\" など）")
+    version: Optional[int] = Field(None, ge=1, description="編集元のバージョン（指定すると他の更新との競合を検出する）")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "time_period": "星暦 1024年3月5日",
+                "version": 4
+            }
+        }
+
+class SceneTimeResult(BaseModel):
+    """シーンの作中の日付の更新結果"""
+    id: int
+    version: int
+    time_period: Optional[str]
+    time_ordinal: Optional[int] = Field(None, description="作中の暦の通し日数（解釈できない場合は None）")
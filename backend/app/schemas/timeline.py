@@ -0,0 +1,45 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+class EraDefinition(BaseModel):
+    """紀元（年号）の定義"""
+    name: str = Field(..., min_length=1, max_length=50, description="紀元の名前")
+    years: Optional[int] = Field(None, ge=1, description="紀元の年数（最後の紀元は省略可）")
+    aliases: List[str] = Field(default_factory=list, description="別名・略称")
+
+class MonthDefinition(BaseModel):
+    """月の定義"""
+    name: str = Field(..., min_length=1, max_length=50, description="月の名前")
+    days: int = Field(..., ge=1, le=1000, description="月の日数")
+    aliases: List[str] = Field(default_factory=list, description="別名・略称")
+
+class CalendarDefinition(BaseModel):
+    """作中の暦の定義（months を空にするとグレゴリオ暦。epoch だけを指定してもよい）"""
+    eras: List[EraDefinition] = Field(default_factory=list, description="紀元（古い順）")
+    months: List[MonthDefinition] = Field(default_factory=list, description="月（年始から順に）")
+    epoch: Optional[str] = Field(None, description="相対日付（\"1日目\"）の起点となる日付")
+    default_era: Optional[str] = Field(None, description="紀元を省略した日付に使う紀元（省略時は最後の紀元）")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "eras": [{"name": "旧暦", "years": 500}, {"name": "星暦", "aliases": ["SE"]}],
+                "months": [{"name": "霜月", "days": 30}, {"name": "陽月", "days": 35}],
+                "epoch": "星暦 1024年1月10日"
+            }
+        }
+
+class CalendarResponse(BaseModel):
+    """暦の設定結果"""
+    novel_id: int
+    calendar: Optional[CalendarDefinition] = Field(None, description="暦の定義（None の場合は起点のないグレゴリオ暦）")
+    rescored_scenes: int = Field(0, description="通し日数を計算し直したシーンの数")
+
+class TimelineScene(BaseModel):
+    """時系列順のシーン"""
+    id: int
+    chapter_id: int
+    title: str
+    time_period: Optional[str]
+    time_ordinal: int = Field(..., description="作中の暦の通し日数")
+    date: str = Field(..., description="通し日数を作中の暦で表記したもの")
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -38,6 +38,7 @@ class WorldUpdate(WorldBase):
     """世界観更新スキーマ"""
     title: Optional[str] = Field(None, min_length=1, max_length=200)
     description: Optional[str] = Field(None, min_length=1)
+    version: Optional[int] = Field(None, ge=1, description="編集元のバージョン（指定すると他の更新との競合を検出する）")
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
     class Config:
@@ -52,6 +53,7 @@ class WorldUpdate(WorldBase):
                 "technology_level": "超高度なAI社会",
                 "social_structure": "魔法使いと科学者の協調社会",
                 "rules_and_laws": "改正魔法規制法",
+                "version": 3,
                 "updated_at": "2024-01-01T00:00:00"
             }
         }
@@ -60,8 +62,99 @@ class WorldInDB(WorldBase):
     """データベースに保存される世界観スキーマ"""
     id: int
     project_id: int
+    version: int
     created_at: datetime
     updated_at: datetime
     
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class WorldElementResponse(BaseModel):
+    """世界観要素のレスポンススキーマ"""
+    id: int
+    world_id: int
+    name: str = Field(..., description="要素の名前")
+    category: str = Field(..., description="要素の分類（地理、文化、歴史など）")
+    description: Optional[str] = Field(None, description="要素の説明")
+    details: Optional[str] = Field(None, description="要素の詳細")
+    version: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class WorldElementUpdate(BaseModel):
+    """世界観要素の更新スキーマ（指定したフィールドだけを更新する）"""
+    name: Optional[str] = Field(None, min_length=1, max_length=255, description="要素の名前")
+    category: Optional[str] = Field(None, min_length=1, max_length=100, description="要素の分類")
+    description: Optional[str] = Field(None, description="要素の説明")
+    details: Optional[str] = Field(None, description="要素の詳細")
+    version: Optional[int] = Field(None, ge=1, description="編集元のバージョン（指定すると他の更新との競合を検出する）")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "description": "大陸の北端にある港町",
+                "version": 2
+            }
+        }
+
+class NovelWorldLink(BaseModel):
+    """小説と共有の世界観の関連付け"""
+    novel_id: int
+    world_id: int = Field(..., description="参照する共有の世界観のID")
+
+    class Config:
+        orm_mode = True
+
+class WorldOverrideCreate(BaseModel):
+    """小説ごとの世界観要素の上書き・追加"""
+    name: Optional[str] = Field(None, min_length=1, max_length=255, description="要素の名前")
+    category: Optional[str] = Field(None, min_length=1, max_length=100, description="要素の分類")
+    description: Optional[str] = Field(None, description="要素の説明")
+    details: Optional[str] = Field(None, description="要素の詳細")
+    version: Optional[int] = Field(None, ge=1, description="編集元の上書きのバージョン（指定すると競合を検出する）")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "description": "第2部では王都は廃墟となっている",
+                "version": 1
+            }
+        }
+
+class WorldOverrideResponse(BaseModel):
+    """小説ごとの差分"""
+    id: int
+    novel_id: int
+    world_id: int
+    element_id: Optional[int] = Field(None, description="対象の共有要素のID（小説だけの要素の場合は None）")
+    operation: str = Field(..., description="modify / add / remove")
+    fields: Optional[Dict[str, Any]] = None
+    version: int
+
+    class Config:
+        orm_mode = True
+
+class SharedWorldElementResponse(BaseModel):
+    """差分を重ねた世界観要素"""
+    id: Optional[int] = Field(None, description="共有要素のID（小説だけの要素の場合は None）")
+    world_id: int
+    name: Optional[str] = None
+    category: Optional[str] = None
+    description: Optional[str] = None
+    details: Optional[str] = None
+    source: str = Field(..., description="shared（共有のまま）/ override（上書き）/ novel（小説だけの要素）")
+    override_id: Optional[int] = None
+
+class SharedWorldValidation(BaseModel):
+    """差分を重ねた世界観の検証結果"""
+    world_id: int
+    is_valid: bool
+    conflicts: List[Dict[str, Any]]
+    warnings: List[Dict[str, Any]]
+    elements: int
+    reused_results: int = Field(..., description="共有部分の検証結果を使い回した要素の数")
+    revalidated: int = Field(..., description="差分のために検証し直した要素の数")
+    timestamp: datetime
@@ -0,0 +1,529 @@
+"""
+シーン本文の自動保存バッファ
+
+エディタの自動保存はシーンごとの下書きとしてメモリに溜め、同じシーンへの
+連続した保存は最後の本文だけにまとめる。下書きは一定間隔（または明示的な
+保存・フラッシュの要求時）に 1 つのトランザクションでまとめて書き込み、
+単語数と進捗の集計・改訂履歴の保存・整合性チェックの予約はフラッシュごとに
+1 回だけ行う。
+
+書き込み前に落ちた場合に備えて、受け付けた下書きはローカルのジャーナル
+（1 行 1 下書きの JSON）に追記し、起動時に読み戻す。ジャーナルはフラッシュの
+たびに未保存の下書きだけに書き直すため、大きくならない。ジャーナルのファイル
+操作（fsync を含む）は専用のスレッドで順に行い、イベントループを止めない。
+
+書き込みに失敗した下書き（競合以外のエラー）は、同じまとまりの他の下書きを
+巻き込まないようそのシーンだけ取り置き、自動では再試行しない。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows ではジャーナルをロックしない
+    fcntl = None
+
+from app.core.consistency_hub import consistency_hub
+from app.db.database import SessionLocal
+from app.db.versioning import VersionConflict, versioned_update
+from app.models.novel import Scene
+from app.services import progress_service, revision_service
+
+logger = logging.getLogger(__name__)
+
+AUTOSAVE_INTERVAL = float(os.getenv("NOVELSPEC_AUTOSAVE_INTERVAL", "5"))
+AUTOSAVE_JOURNAL_PATH = os.getenv("NOVELSPEC_AUTOSAVE_JOURNAL", "./autosave.journal")
+# 1 の場合は下書きを受け付けるたびにジャーナルを fsync する（OS ごと落ちても失わない）
+AUTOSAVE_FSYNC = os.getenv("NOVELSPEC_AUTOSAVE_FSYNC", "0") == "1"
+# 1 つのジャーナルのパスから派生させる枠の数（同時に動くワーカープロセスの上限）
+AUTOSAVE_JOURNAL_SLOTS = int(os.getenv("NOVELSPEC_AUTOSAVE_JOURNAL_SLOTS", "64"))
+# 1 トランザクションで書き込むシーンの数。未保存の下書きがこれを超えたら間隔を待たずに書き込む
+AUTOSAVE_BATCH_SIZE = 200
+# 保存で進んだバージョンを覚えておく（シーン・編集者）の組の数
+MAX_REBASED_VERSIONS = 10000
+
+
+@dataclass
+class Draft:
+    """未保存の下書き 1 件（同じシーンへの連続した保存をまとめたもの）"""
+    scene_id: int
+    novel_id: int
+    content: str
+    author_id: Optional[int] = None
+    version: Optional[int] = None  # 編集元のバージョン（書き込み時に検査する）
+    saves: int = 1  # まとめた保存の回数
+    received_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class FlushResult:
+    """フラッシュ 1 回分の結果"""
+    scenes: int = 0
+    saves: int = 0
+    conflicts: int = 0
+    failed: int = 0  # 書き込めずに取り置いた下書きの数
+    versions: Dict[int, int] = field(default_factory=dict)  # シーンID → 書き込み後のバージョン
+
+
+class AutosaveConflict(Exception):
+    """自動保存の下書きが他の編集と競合したことを表す例外クラス"""
+
+    def __init__(self, scene_id: int, current_version: Optional[int]):
+        self.scene_id = scene_id
+        self.current_version = current_version
+        super().__init__(f"Autosave conflict on scene {scene_id}: current version {current_version}")
+
+
+class AutosaveJournal:
+    """下書きのジャーナル（1 行 1 下書きの JSON を追記する）
+
+    複数のワーカープロセスが同じファイルを書き直し合わないよう、ロックファイルを
+    排他的に取得できた最初の枠（path、path.1、path.2、…）を使う。枠は再起動後も
+    同じ順に取得されるため、落ちたプロセスの下書きは次にその枠を取得した
+    プロセスが読み戻す。操作はスレッドセーフ。
+    """
+
+    def __init__(self, path: str, fsync: bool = False, max_slots: int = AUTOSAVE_JOURNAL_SLOTS):
+        self.base_path = path
+        self.path: Optional[str] = None
+        self.fsync = fsync
+        self.max_slots = max(max_slots, 1)
+        self._file = None
+        self._slot_lock = None
+        self._lock = threading.Lock()
+
+    def _acquire_slot(self) -> str:
+        """このプロセスのジャーナルのパスを決める（初回だけロックを取得する）"""
+        if self.path is not None:
+            return self.path
+        if fcntl is None:
+            self.path = self.base_path
+            return self.path
+        for slot in range(self.max_slots):
+            path = self.base_path if slot == 0 else f"{self.base_path}.{slot}"
+            lock_file = open(f"{path}.lock", "a")
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                continue
+            self._slot_lock = lock_file
+            self.path = path
+            if slot:
+                logger.info(f"Autosave journal {self.base_path} is in use; using {path}")
+            return path
+        raise RuntimeError(f"No free autosave journal slot for {self.base_path}")
+
+    def append(self, draft: Draft) -> None:
+        with self._lock:
+            if self._file is None:
+                self._file = open(self._acquire_slot(), "a", encoding="utf-8")
+            self._file.write(json.dumps(asdict(draft), ensure_ascii=False) + "\n")
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def rewrite(self, drafts: Iterable[Draft]) -> None:
+        """ジャーナルを指定した下書きだけに書き直す"""
+        with self._lock:
+            self._close_file()
+            path = self._acquire_slot()
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as out:
+                for draft in drafts:
+                    out.write(json.dumps(asdict(draft), ensure_ascii=False) + "\n")
+                out.flush()
+                if self.fsync:
+                    os.fsync(out.fileno())
+            os.replace(tmp_path, path)
+
+    def load(self) -> Dict[int, Draft]:
+        """
+        ジャーナルからシーンごとの最後の下書きを読み込む
+
+        書き込み途中で落ちた最後の行など、読めない行は無視する
+        """
+        drafts: Dict[int, Draft] = {}
+        with self._lock:
+            path = self._acquire_slot()
+            if not os.path.exists(path):
+                return drafts
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    try:
+                        draft = Draft(**json.loads(line))
+                    except (ValueError, TypeError):
+                        continue
+                    drafts[draft.scene_id] = draft
+        return drafts
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        """ファイルを閉じ、枠のロックを手放す"""
+        with self._lock:
+            self._close_file()
+            if self._slot_lock is not None:
+                self._slot_lock.close()
+                self._slot_lock = None
+                self.path = None
+
+
+class AutosaveBuffer:
+    """自動保存の下書きを溜めてまとめて書き込むクラス
+
+    編集者は書き込みが終わるまで新しいバージョンを知らないため、同じ編集者が
+    同じ編集元のバージョンで続けて保存した場合は、自動保存で進んだ後の
+    バージョンに読み替えて検査する。
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        interval: float = AUTOSAVE_INTERVAL,
+        batch_size: int = AUTOSAVE_BATCH_SIZE,
+        journal: Optional[AutosaveJournal] = None
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.journal = journal
+        self._pending: Dict[int, Draft] = {}
+        # 書き込みに失敗して取り置いた下書き（ジャーナルには残す）
+        self._parked: Dict[int, Draft] = {}
+        # (シーンID, 編集者) → [編集元のバージョンの集合, 保存後のバージョン]
+        self._rebased: "OrderedDict[Tuple[int, Optional[int]], List]" = OrderedDict()
+        self._conflicts: Dict[Tuple[int, Optional[int], Optional[int]], Optional[int]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._runner: Optional[asyncio.Task] = None
+        self._urgent: Optional[asyncio.Task] = None
+        # ジャーナルの操作を受け付けた順に 1 つずつ実行するスレッド
+        self._journal_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave-journal")
+
+    async def _journal(self, method: Callable, *args):
+        """ジャーナルの操作を専用のスレッドで、受け付けた順に実行する"""
+        return await asyncio.get_running_loop().run_in_executor(self._journal_executor, method, *args)
+
+    async def _rewrite_journal(self) -> None:
+        """ジャーナルを未保存・取り置き中の下書きだけに書き直す"""
+        if self.journal is not None:
+            await self._journal(self.journal.rewrite, [*self._pending.values(), *self._parked.values()])
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def pending(self, scene_id: int) -> Optional[Draft]:
+        return self._pending.get(scene_id)
+
+    def parked(self, scene_id: int) -> Optional[Draft]:
+        """書き込みに失敗して取り置いた下書き"""
+        return self._parked.get(scene_id)
+
+    def effective_version(self, scene_id: int, author_id: Optional[int], version: Optional[int]) -> Optional[int]:
+        """編集元のバージョンを、同じ編集者の保存で進んだ後のバージョンに読み替える"""
+        if version is None:
+            return None
+        entry = self._rebased.get((scene_id, author_id))
+        if entry is not None and version in entry[0]:
+            return entry[1]
+        return version
+
+    def record_saved(self, scene_id: int, author_id: Optional[int], base_version: Optional[int], version: int) -> None:
+        """
+        編集元のバージョンから保存後のバージョンへの読み替えを記録する
+
+        同じ編集者の保存が続いた場合は、それまでの編集元のバージョンもすべて
+        最新のバージョンに読み替える
+        """
+        if base_version is None:
+            return
+        key = (scene_id, author_id)
+        entry = self._rebased.get(key)
+        if entry is not None and (base_version in entry[0] or base_version == entry[1]):
+            entry[0].update((base_version, entry[1]))
+            entry[1] = version
+        else:
+            self._rebased[key] = [{base_version}, version]
+        self._rebased.move_to_end(key)
+        while len(self._rebased) > MAX_REBASED_VERSIONS:
+            self._rebased.popitem(last=False)
+
+    async def submit(
+        self,
+        scene_id: int,
+        novel_id: int,
+        content: str,
+        author_id: Optional[int] = None,
+        version: Optional[int] = None
+    ) -> Draft:
+        """
+        自動保存の下書きを受け付ける
+
+        Args:
+            scene_id: シーンID
+            novel_id: シーンが属する小説のID
+            content: シーンの本文
+            author_id: 保存したユーザーのID
+            version: 編集元のバージョン（指定すると書き込み時に競合を検出する）
+
+        Returns:
+            まとめた後の下書き
+
+        Raises:
+            AutosaveConflict: この編集元の下書きが他の編集と競合している場合
+        """
+        self._raise_conflict(scene_id, author_id, version)
+        effective = self.effective_version(scene_id, author_id, version)
+
+        existing = self._pending.get(scene_id)
+        saves = 1
+        if existing is not None:
+            if existing.author_id == author_id and existing.version == effective:
+                saves = existing.saves + 1
+            else:
+                # 別の編集元の下書きは先に書き込み、この下書きとの競合を確かめる
+                flushed = await self.flush([scene_id])
+                self._raise_conflict(scene_id, author_id, version)
+                effective = self.effective_version(scene_id, author_id, version)
+                current = flushed.versions.get(scene_id)
+                if effective is not None and current is not None and effective != current:
+                    raise AutosaveConflict(scene_id, current)
+
+        draft = Draft(
+            scene_id=scene_id,
+            novel_id=novel_id,
+            content=content,
+            author_id=author_id,
+            version=effective,
+            saves=saves
+        )
+        self._pending[scene_id] = draft
+        # 新しい下書きが届いたシーンの取り置きは不要になる（ジャーナルでも後の行が優先される）
+        self._parked.pop(scene_id, None)
+        if self.journal is not None:
+            await self._journal(self.journal.append, draft)
+
+        self._ensure_runner()
+        if len(self._pending) >= self.batch_size and self._urgent is None:
+            self._urgent = asyncio.get_running_loop().create_task(self._flush_urgent())
+        return draft
+
+    def _raise_conflict(self, scene_id: int, author_id: Optional[int], version: Optional[int]) -> None:
+        key = (scene_id, author_id, self.effective_version(scene_id, author_id, version))
+        if key in self._conflicts:
+            raise AutosaveConflict(scene_id, self._conflicts.pop(key))
+
+    async def flush_others(self, scene_id: int, author_id: Optional[int]) -> FlushResult:
+        """
+        シーンに他の編集者の未保存の下書きがあれば書き込む（明示的な保存の前に呼ぶ）
+
+        書き込んだ後の明示的な保存は、編集元のバージョンが古ければ競合になる
+        """
+        draft = self._pending.get(scene_id)
+        if draft is None or draft.author_id == author_id:
+            return FlushResult()
+        return await self.flush([scene_id])
+
+    async def discard(self, scene_id: int, author_id: Optional[int]) -> Optional[Draft]:
+        """
+        編集者自身の未保存・取り置き中の下書きを取り除く（明示的な保存のコミット後に呼ぶ）
+
+        他の編集者の下書きと競合の記録は残す。書き込み中のフラッシュがあれば完了を待つ
+        """
+        async with self._flush_lock:
+            draft = None
+            for drafts in (self._pending, self._parked):
+                if scene_id in drafts and drafts[scene_id].author_id == author_id:
+                    draft = drafts.pop(scene_id)
+            for key in [key for key in self._conflicts if key[:2] == (scene_id, author_id)]:
+                del self._conflicts[key]
+            if draft is not None:
+                await self._rewrite_journal()
+            return draft
+
+    async def flush(self, scene_ids: Optional[List[int]] = None) -> FlushResult:
+        """
+        未保存の下書きを書き込む
+
+        Args:
+            scene_ids: 書き込むシーンのID（省略時はすべての下書き）
+
+        Returns:
+            FlushResult
+        """
+        result = FlushResult()
+        async with self._flush_lock:
+            if scene_ids is None:
+                drafts = list(self._pending.values())
+                self._pending = {}
+            else:
+                drafts = [self._pending.pop(scene_id) for scene_id in scene_ids if scene_id in self._pending]
+            if not drafts:
+                return result
+
+            novels = set()
+            for start in range(0, len(drafts), self.batch_size):
+                batch = drafts[start:start + self.batch_size]
+                try:
+                    written = await self._write_batch(batch, result)
+                except Exception as e:
+                    logger.error(f"Autosave flush failed for {len(batch)} scenes: {str(e)}")
+                    # 書き込めなかった下書きは、後から届いた下書きがなければ次回に再試行する
+                    for draft in batch:
+                        self._pending.setdefault(draft.scene_id, draft)
+                    continue
+                novels.update(written)
+
+            await self._rewrite_journal()
+
+        for novel_id in novels:
+            consistency_hub.notify_saved(str(novel_id))
+        if result.scenes or result.failed:
+            logger.info(
+                f"Autosave flushed {result.scenes} scenes "
+                f"({result.saves} saves, {result.conflicts} conflicts, {result.failed} failed)"
+            )
+        return result
+
+    async def flush_scene(self, scene_id: int) -> Optional[int]:
+        """
+        1 つのシーンの下書きをすぐに書き込む
+
+        Returns:
+            書き込み後のバージョン（下書きがない場合は None）
+
+        Raises:
+            AutosaveConflict: 下書きが他の編集と競合した場合
+        """
+        draft = self._pending.get(scene_id)
+        if draft is None:
+            return None
+        result = await self.flush([scene_id])
+        if scene_id not in result.versions:
+            key = (scene_id, draft.author_id, draft.version)
+            if key in self._conflicts:
+                raise AutosaveConflict(scene_id, self._conflicts.pop(key))
+        return result.versions.get(scene_id)
+
+    async def _write_batch(self, batch: List[Draft], result: FlushResult) -> List[int]:
+        """
+        下書きのまとまりを 1 トランザクションで書き込み、書き込んだ小説のIDを返す
+
+        書き込み（改訂の差分・圧縮を含む）はイベントループを止めないようスレッドで行い、
+        バッファの状態はイベントループ側で更新する
+        """
+        novels, conflicts, saved, failed = await asyncio.to_thread(self._write_drafts, batch)
+
+        self._conflicts.update(conflicts)
+        result.conflicts += len(conflicts)
+        for draft in failed:
+            # 書き込みの後に届いた下書きがあれば、そちらを優先する
+            if draft.scene_id not in self._pending:
+                self._parked[draft.scene_id] = draft
+        result.failed += len(failed)
+        for draft, version in saved:
+            self.record_saved(draft.scene_id, draft.author_id, draft.version, version)
+            result.scenes += 1
+            result.saves += draft.saves
+            result.versions[draft.scene_id] = version
+        return novels
+
+    def _write_drafts(self, batch: List[Draft]):
+        """
+        下書きのまとまりを専用のセッションで書き込む（スレッドで実行する）
+
+        Returns:
+            (書き込んだ小説のID, 競合, (下書き, 書き込み後のバージョン), 書き込めなかった下書き)
+        """
+        db = self.session_factory()
+        novels: List[int] = []
+        conflicts: Dict[Tuple[int, Optional[int], Optional[int]], Optional[int]] = {}
+        saved: List[Tuple[Draft, int]] = []
+        failed: List[Draft] = []
+        try:
+            for draft in batch:
+                try:
+                    with db.begin_nested():
+                        scene = versioned_update(db, Scene, [Scene.id == draft.scene_id], draft.version, {})
+                        if scene is None:
+                            continue
+                        progress_service.write_scene_content(db, scene, draft.novel_id, draft.content)
+                        revision_service.write_revision(
+                            db, "scene", draft.scene_id, draft.content, author_id=draft.author_id
+                        )
+                except VersionConflict as e:
+                    conflicts[(draft.scene_id, draft.author_id, draft.version)] = e.current.version
+                    continue
+                except Exception as e:
+                    # この下書きの変更だけを取り消し、まとまりの残りは書き込む
+                    logger.error(f"Autosave of scene {draft.scene_id} failed, parking the draft: {str(e)}")
+                    failed.append(draft)
+                    continue
+                saved.append((draft, scene.version))
+                novels.append(draft.novel_id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return novels, conflicts, saved, failed
+
+    async def _flush_urgent(self) -> None:
+        try:
+            await self.flush()
+        finally:
+            self._urgent = None
+
+    def _ensure_runner(self) -> None:
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            if self._pending:
+                await self.flush()
+
+    async def start(self) -> int:
+        """
+        ジャーナルに残っている下書きを読み戻し、定期的な書き込みを開始する
+
+        Returns:
+            int: 読み戻した下書きの数
+        """
+        recovered = await self._journal(self.journal.load) if self.journal is not None else {}
+        for scene_id, draft in recovered.items():
+            self._pending.setdefault(scene_id, draft)
+        if recovered:
+            logger.info(f"Recovered {len(recovered)} autosave drafts from journal")
+        self._ensure_runner()
+        return len(recovered)
+
+    async def stop(self) -> None:
+        """定期的な書き込みを止め、残っている下書きを書き込む"""
+        if self._runner is not None:
+            self._runner.cancel()
+            self._runner = None
+        await self.flush()
+        if self.journal is not None:
+            await self._journal(self.journal.close)
+
+
+# アプリケーション全体で共有するバッファ
+autosave_buffer = AutosaveBuffer(journal=AutosaveJournal(AUTOSAVE_JOURNAL_PATH, fsync=AUTOSAVE_FSYNC))
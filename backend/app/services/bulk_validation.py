@@ -0,0 +1,257 @@
+"""
+NDJSON の一括検証
+
+取り込んだキャスト（キャラクター設定）など大量のレコードを、1 行 1 レコードの
+NDJSON で受け取って検証する。検証器はスキーマごとに 1 回だけ組み立て、
+型が一致している値は isinstance だけで判定する。判定できない値と不正な
+レコードだけを pydantic の validate_model で検証し直し、レコードごとに
+すべてのエラーを集める。一定行数ごとのバッチをワーカープールで並列に処理し、
+結果は入力と同じ順序で 1 行ずつ返す。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, Extra, validate_model
+
+from app.core.responses import dumps, orjson
+
+logger = logging.getLogger(__name__)
+
+VALIDATION_BATCH_SIZE = 500
+
+_STRICT_TYPES = (str, int, float, bool)
+
+
+def _loads(line: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def _type_check(field) -> Optional[Callable[[Any], bool]]:
+    """型が一致しているかだけを調べる関数（組み立てられない型の場合は None）"""
+    outer = field.outer_type_
+    if outer in _STRICT_TYPES:
+        return lambda value: type(value) is outer
+    if getattr(outer, "__origin__", None) is dict:
+        key_type, value_type = outer.__args__
+        if key_type is not str:
+            return None
+        if value_type is Any:
+            return lambda value: type(value) is dict and all(type(k) is str for k in value)
+        if value_type in _STRICT_TYPES:
+            return lambda value: type(value) is dict and all(
+                type(k) is str and type(v) is value_type for k, v in value.items()
+            )
+    return None
+
+
+class CompiledValidator:
+    """スキーマから組み立てた検証器
+
+    型が一致していれば pydantic でも必ず受け付けられる値だけを高速に判定し、
+    それ以外は validate_model の結果に従う。カスタムの validator を持つ
+    フィールドは常に pydantic のフィールド検証を通す。
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self._forbid_extra = model.__config__.extra == Extra.forbid
+        self._aliases = {field.alias for field in model.__fields__.values()}
+        self._plan: List[Tuple[str, bool, bool, Optional[Callable], Any]] = []
+        for field in model.__fields__.values():
+            check = None if field.class_validators or field.pre_validators or field.post_validators else _type_check(field)
+            self._plan.append((field.alias, field.required, field.allow_none, check, field))
+
+    def _fast_valid(self, data: Dict) -> bool:
+        if self._forbid_extra and not self._aliases.issuperset(data):
+            return False
+        values: Dict[str, Any] = {}
+        for alias, required, allow_none, check, field in self._plan:
+            if alias not in data:
+                if required:
+                    return False
+                continue
+            value = data[alias]
+            if value is None:
+                if not allow_none:
+                    return False
+            elif check is not None:
+                if not check(value):
+                    return False
+            else:
+                _, errors = field.validate(value, values, loc=alias, cls=self.model)
+                if errors:
+                    return False
+            values[alias] = value
+        return True
+
+    def errors(self, data: Any) -> List[Dict]:
+        """
+        レコードのエラーを返す（正しいレコードの場合は空のリスト）
+
+        Args:
+            data: JSON から読み込んだ値
+
+        Returns:
+            List[Dict]: {"loc": [...], "msg": ..., "type": ...} のリスト
+        """
+        if not isinstance(data, dict):
+            return [{"loc": ["__root__"], "msg": "record must be a JSON object", "type": "type_error.dict"}]
+        if self._fast_valid(data):
+            return []
+        _, _, error = validate_model(self.model, data)
+        return [] if error is None else [
+            {"loc": list(e["loc"]), "msg": e["msg"], "type": e["type"]} for e in error.errors()
+        ]
+
+
+# ワーカープロセス内で組み立てた検証器（スキーマごとに 1 回だけ組み立てる）
+_compiled: Dict[Type[BaseModel], CompiledValidator] = {}
+
+
+def get_validator(model: Type[BaseModel]) -> CompiledValidator:
+    validator = _compiled.get(model)
+    if validator is None:
+        validator = _compiled[model] = CompiledValidator(model)
+    return validator
+
+
+def validate_lines(model: Type[BaseModel], lines: List[Tuple[int, bytes]]) -> List[Dict]:
+    """
+    NDJSON の行のまとまりを検証する（ワーカープールで実行できる）
+
+    Args:
+        model: 検証に使うスキーマ
+        lines: (行番号, JSON の行) のリスト
+
+    Returns:
+        List[Dict]: 行ごとの {"line", "valid", "errors"}
+    """
+    validator = get_validator(model)
+    results = []
+    for number, line in lines:
+        try:
+            errors = validator.errors(_loads(line))
+        except ValueError as e:
+            errors = [{"loc": ["__line__"], "msg": f"invalid JSON: {str(e)}", "type": "value_error.json"}]
+        results.append({"line": number, "valid": not errors, "errors": errors})
+    return results
+
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+
+def get_validation_executor() -> Executor:
+    """一括検証に使うプロセスプール（初回の一括検証時に作成する）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(os.getenv("NOVELSPEC_VALIDATION_WORKERS", str(min(4, os.cpu_count() or 1))))
+            _executor = ProcessPoolExecutor(max_workers=max(workers, 1))
+        return _executor
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """バイト列のストリームを (行番号, 行) に分ける（空行は飛ばす）"""
+    rest = b""
+    number = 0
+    async for chunk in chunks:
+        rest += chunk
+        *lines, rest = rest.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+    if rest.strip():
+        yield number + 1, rest
+
+
+async def validate_ndjson_stream(
+    model: Type[BaseModel],
+    chunks: AsyncIterator[bytes],
+    executor: Optional[Executor] = None,
+    batch_size: int = VALIDATION_BATCH_SIZE,
+    errors_only: bool = False
+) -> AsyncIterator[bytes]:
+    """
+    NDJSON のストリームを検証し、結果を NDJSON で順に返す
+
+    batch_size 行ごとのバッチをワーカープールで検証し、バッチに満たない
+    端数（少量の入力ではこれだけ）は呼び出し元で検証する。処理中のバッチは最大でワーカー数の 2 倍までとし、
+    入力をすべて読み込まずに結果を返し始める。最後の行は集計結果
+    （{"summary": {...}}）になる。
+
+    Args:
+        model: 検証に使うスキーマ
+        chunks: リクエスト本文のバイト列のストリーム
+        executor: ワーカープール（省略時は get_validation_executor()）
+        batch_size: 1 回にワーカーへ渡す行数
+        errors_only: True の場合は不正なレコードの結果だけを返す
+
+    Yields:
+        bytes: 結果の NDJSON の行
+    """
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    pending: deque = deque()
+    max_pending = 0
+    summary = {"records": 0, "valid": 0, "invalid": 0}
+    errors_by_field: Counter = Counter()
+    used_pool = False
+
+    def emit(results: List[Dict]) -> List[bytes]:
+        out = []
+        for result in results:
+            summary["records"] += 1
+            if result["valid"]:
+                summary["valid"] += 1
+                if errors_only:
+                    continue
+            else:
+                summary["invalid"] += 1
+                errors_by_field.update(str(error["loc"][0]) if error["loc"] else "__root__" for error in result["errors"])
+            out.append(dumps(result) + b"\n")
+        return out
+
+    batch: List[Tuple[int, bytes]] = []
+    async for numbered in _iter_lines(chunks):
+        batch.append(numbered)
+        if len(batch) < batch_size:
+            continue
+        if not used_pool:
+            executor = executor or get_validation_executor()
+            max_pending = 2 * (getattr(executor, "_max_workers", None) or 2)
+            used_pool = True
+        pending.append(loop.run_in_executor(executor, validate_lines, model, batch))
+        batch = []
+        while len(pending) >= max_pending or (pending and pending[0].done()):
+            for out in emit(await pending.popleft()):
+                yield out
+
+    while pending:
+        for out in emit(await pending.popleft()):
+            yield out
+    if batch:
+        # 端数のバッチ（少量の入力ではこれだけ）はプロセス間の受け渡しをせずに検証する
+        for out in emit(validate_lines(model, batch)):
+            yield out
+
+    elapsed = time.perf_counter() - started
+    summary.update(
+        errors_by_field=dict(errors_by_field.most_common()),
+        elapsed_seconds=round(elapsed, 4),
+        records_per_second=round(summary["records"] / elapsed, 1) if elapsed else None,
+        workers=getattr(executor, "_max_workers", None) if used_pool else 0
+    )
+    logger.info(f"Validated {summary['records']} records ({summary['invalid']} invalid) in {elapsed:.3f}s")
+    yield dumps({"summary": summary}) + b"\n"
@@ -0,0 +1,117 @@
+"""
+キャラクターの関係性グラフの読み込み
+
+小説のキャラクターと character_relationships（関係性の種類は relationships）を
+読み込み、CharacterEngine の形式（対象ID → 関係性の種類 → 値）に変換する。
+関係性の種類の名前は自由な文字列のため、キーワードでエンジンの種類に振り分け、
+値は relationships.intensity（1〜10）を 0〜1 に変換したものにする。
+"""
+
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.character_engine import Character, CharacterEngine
+
+logger = logging.getLogger(__name__)
+
+# (エンジンの関係性の種類, 名前に含まれていればその種類とみなすキーワード)。先に一致したものを使う
+RELATIONSHIP_KEYWORDS = [
+    ("rivalry", ("敵", "ライバル", "宿敵", "rival", "enemy", "nemesis")),
+    ("romance", ("恋", "婚", "夫", "妻", "lover", "romance", "spouse")),
+    ("family", ("家族", "親", "父", "母", "兄", "姉", "弟", "妹", "子", "family", "sibling", "parent")),
+    ("mentor", ("師", "弟子", "mentor", "teacher", "student")),
+]
+DEFAULT_RELATIONSHIP_TYPE = "friendship"
+# intensity が設定されていない関係性の値
+DEFAULT_INTENSITY = 5
+MAX_INTENSITY = 10
+
+
+def relationship_type_for(name: Optional[str]) -> str:
+    """関係性の名前（"友人"、"宿敵" など）をエンジンの関係性の種類に振り分ける"""
+    lowered = (name or "").lower()
+    for rel_type, keywords in RELATIONSHIP_KEYWORDS:
+        if any(keyword in lowered for keyword in keywords):
+            return rel_type
+    return DEFAULT_RELATIONSHIP_TYPE
+
+
+def relationship_value(intensity: Optional[int]) -> float:
+    """intensity（1〜10）を関係性の値（0〜1）に変換する"""
+    value = DEFAULT_INTENSITY if intensity is None else intensity
+    return min(max(value / MAX_INTENSITY, 0.0), 1.0)
+
+
+def _personality_traits(text: Optional[str]) -> Dict[str, float]:
+    """personality 列が特性名 → 数値の JSON であれば辞書にする（自由記述の場合は空）"""
+    if not text:
+        return {}
+    try:
+        parsed = json.loads(text)
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    return {
+        str(name): float(value) for name, value in parsed.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+
+async def load_character_graph(db: Session, novel_id: int, author_id: int, engine: CharacterEngine) -> int:
+    """
+    小説のキャラクターと関係性を読み込み、エンジンに載せる
+
+    Args:
+        db: データベースセッション
+        novel_id: 小説ID
+        author_id: 作者のユーザーID（キャラクターの取得に使う）
+        engine: 読み込み先のエンジン
+
+    Returns:
+        int: 読み込んだ関係性（辺）の数
+    """
+    from app.models.character import Relationship, character_relationships as links
+    from app.services import character_service
+
+    rows = await character_service.get_characters_by_novel(db, novel_id, author_id)
+    ids = [row.id for row in rows]
+    relationships: Dict[str, Dict[str, Dict[str, float]]] = {str(i): {} for i in ids}
+    edges = 0
+    if ids:
+        query = db.query(
+            links.c.character_id, links.c.related_character_id, Relationship.name, Relationship.intensity
+        ).outerjoin(
+            Relationship, Relationship.id == links.c.relationship_type_id
+        ).filter(
+            links.c.character_id.in_(ids), links.c.related_character_id.in_(ids)
+        )
+        for source, target, name, intensity in query:
+            values = relationships[str(source)].setdefault(str(target), {})
+            values[relationship_type_for(name)] = relationship_value(intensity)
+            edges += 1
+
+    now = datetime.utcnow()
+    characters: List[Character] = [
+        Character(
+            id=str(row.id),
+            name=row.name,
+            age=row.age,
+            gender=row.gender,
+            personality=_personality_traits(row.personality),
+            background=row.background,
+            appearance={},
+            skills=[],
+            relationships=relationships[str(row.id)],
+            created_at=row.created_at or now,
+            updated_at=row.updated_at or now
+        )
+        for row in rows
+    ]
+    engine.load_characters(characters)
+    logger.debug(f"Loaded {len(characters)} characters and {edges} relationships for novel {novel_id}")
+    return edges
@@ -0,0 +1,218 @@
+"""
+整合性チェック結果の保存と差分
+
+整合性チェックの実行ごとに ConsistencyRun を作り、問題は consistency_hub.issue_id
+による安定したIDで「検出された実行〜解消された実行」の期間として保存する。
+実行のたびに全件を書き込まず、前回から変わった問題の行だけを追加・更新するため、
+保存量とクライアントへ返す差分はどちらも変化した問題の数に比例する。
+コミットは呼び出し側で行う。
+"""
+
+import hashlib
+import json
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.core.consistency_hub import Issue
+from app.models.consistency import ConsistencyIssue, ConsistencyRun
+from app.models.novel import Novel
+
+# 差分を問い合わせられる実行の件数（これより古い実行と、解消済みの問題の行は削除する）
+KEEP_RUNS = 200
+
+
+class RunExpired(Exception):
+    """指定された実行が存在しない（または削除済みの）場合の例外クラス"""
+    pass
+
+
+def _fingerprint(issue: Issue) -> str:
+    raw = json.dumps(issue, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def get_latest_run(db: Session, novel_id: int) -> Optional[ConsistencyRun]:
+    """小説の最新の実行を返す（未実行の場合は None）"""
+    return db.query(ConsistencyRun).filter(
+        ConsistencyRun.novel_id == novel_id
+    ).order_by(ConsistencyRun.id.desc()).first()
+
+
+def _lock_novel(db: Session, novel_id: int) -> None:
+    """
+    小説の行をトランザクションの終わりまでロックする（SELECT ... FOR UPDATE）
+
+    同じ小説の実行の保存を直列化し、未解消の問題の行が重複しないようにする。
+    SQLite は FOR UPDATE を持たないが、書き込みはデータベース全体で直列化される
+    """
+    db.query(Novel.id).filter(Novel.id == novel_id).with_for_update().first()
+
+
+def _open_issues(db: Session, novel_id: int):
+    return db.query(ConsistencyIssue).filter(
+        ConsistencyIssue.novel_id == novel_id,
+        ConsistencyIssue.resolved_run_id.is_(None)
+    )
+
+
+async def record_run(db: Session, novel_id: int, issues: Dict[str, Issue]) -> Tuple[ConsistencyRun, bool]:
+    """
+    整合性チェックの結果を保存する
+
+    前回の実行から問題が 1 件も変わっていない場合は新しい実行を作らず、
+    最新の実行を返す（実行IDは問題一覧の版として扱える）。
+
+    Args:
+        db: データベースセッション
+        novel_id: 小説ID
+        issues: flatten_issues の結果（ID → 問題）
+
+    Returns:
+        (実行, 新しい実行を作ったかどうか)
+    """
+    # 並行する保存が同じ未解消の問題を読んでから書き込まないよう、先にロックする
+    _lock_novel(db, novel_id)
+    latest = get_latest_run(db, novel_id)
+    open_rows = {row.issue_id: row for row in _open_issues(db, novel_id)}
+    fingerprints = {key: _fingerprint(issue) for key, issue in issues.items()}
+
+    added = [key for key in issues if key not in open_rows]
+    resolved = [row for key, row in open_rows.items() if key not in issues]
+    changed = [
+        open_rows[key] for key in issues
+        if key in open_rows and open_rows[key].fingerprint != fingerprints[key]
+    ]
+    if latest is not None and not (added or resolved or changed):
+        return latest, False
+
+    severities = [issue.get("severity") for issue in issues.values()]
+    run = ConsistencyRun(
+        novel_id=novel_id,
+        issue_count=len(issues),
+        error_count=severities.count("error"),
+        warning_count=severities.count("warning"),
+        added=len(added),
+        resolved=len(resolved),
+        changed=len(changed)
+    )
+    db.add(run)
+    db.flush()
+
+    db.bulk_insert_mappings(ConsistencyIssue, [
+        {
+            "novel_id": novel_id,
+            "issue_id": key,
+            "fingerprint": fingerprints[key],
+            "severity": issues[key].get("severity", "error"),
+            "payload": issues[key],
+            "opened_run_id": run.id,
+            "changed_run_id": run.id,
+        }
+        for key in added
+    ])
+    for row in resolved:
+        row.resolved_run_id = run.id
+    for row in changed:
+        issue = issues[row.issue_id]
+        row.fingerprint = fingerprints[row.issue_id]
+        row.severity = issue.get("severity", "error")
+        row.payload = issue
+        row.changed_run_id = run.id
+    db.flush()
+
+    _prune_runs(db, novel_id)
+    return run, True
+
+
+def _prune_runs(db: Session, novel_id: int) -> None:
+    """KEEP_RUNS 件より古い実行と、それより前に解消された問題の行を削除する"""
+    oldest = db.query(ConsistencyRun.id).filter(
+        ConsistencyRun.novel_id == novel_id
+    ).order_by(ConsistencyRun.id.desc()).offset(KEEP_RUNS - 1).limit(1).scalar()
+    if oldest is None:
+        return
+    db.query(ConsistencyRun).filter(
+        ConsistencyRun.novel_id == novel_id,
+        ConsistencyRun.id < oldest
+    ).delete(synchronize_session=False)
+    # 残っているどの実行の時点でも解消済みの行は、差分の計算に使われない
+    db.query(ConsistencyIssue).filter(
+        ConsistencyIssue.novel_id == novel_id,
+        ConsistencyIssue.resolved_run_id <= oldest
+    ).delete(synchronize_session=False)
+
+
+async def get_snapshot(db: Session, novel_id: int) -> Optional[Dict]:
+    """
+    最新の実行時点の問題一覧を返す（未実行の場合は None）
+    """
+    run = get_latest_run(db, novel_id)
+    if run is None:
+        return None
+    rows = _open_issues(db, novel_id).order_by(ConsistencyIssue.id)
+    return {"run_id": run.id, "issues": [row.payload for row in rows]}
+
+
+async def get_delta(db: Session, novel_id: int, since_run_id: int) -> Dict:
+    """
+    指定した実行から最新の実行までに追加・解消・変更された問題を返す
+
+    解消後に再び検出された問題は、指定した実行の時点で存在していなければ added、
+    存在していて内容が異なれば changed として返す。
+
+    Args:
+        db: データベースセッション
+        novel_id: 小説ID
+        since_run_id: クライアントが最後に受け取った実行ID
+
+    Returns:
+        {"since": ..., "run_id": ..., "added": [...], "resolved": [ID...], "changed": [...]}
+
+    Raises:
+        RunExpired: since_run_id がこの小説の実行として残っていない場合
+    """
+    latest = get_latest_run(db, novel_id)
+    exists = db.query(ConsistencyRun.id).filter(
+        ConsistencyRun.novel_id == novel_id,
+        ConsistencyRun.id == since_run_id
+    ).scalar()
+    if latest is None or exists is None:
+        raise RunExpired(f"Consistency run {since_run_id} is not available")
+
+    delta: Dict[str, List] = {"added": [], "resolved": [], "changed": []}
+    if since_run_id != latest.id:
+        # 指定した実行より後に変化した行だけを読み込む
+        rows = db.query(ConsistencyIssue).filter(
+            ConsistencyIssue.novel_id == novel_id,
+            or_(
+                ConsistencyIssue.opened_run_id > since_run_id,
+                ConsistencyIssue.changed_run_id > since_run_id,
+                ConsistencyIssue.resolved_run_id > since_run_id
+            )
+        ).order_by(ConsistencyIssue.id).all()
+
+        was_open = {
+            row.issue_id: row for row in rows
+            if row.opened_run_id <= since_run_id
+            and (row.resolved_run_id is None or row.resolved_run_id > since_run_id)
+        }
+        now_open = {row.issue_id: row for row in rows if row.resolved_run_id is None}
+        for key, row in now_open.items():
+            before = was_open.get(key)
+            if before is None:
+                delta["added"].append(row.payload)
+            elif before is row or before.changed_run_id > since_run_id or before.fingerprint != row.fingerprint:
+                # 解消後に同じ内容で再び検出された問題は、指定した実行の時点から変わっていない
+                delta["changed"].append(row.payload)
+        delta["resolved"] = [key for key in was_open if key not in now_open]
+
+    return {"since": since_run_id, "run_id": latest.id, **delta}
+
+
+async def list_runs(db: Session, novel_id: int, limit: int = 50) -> List[ConsistencyRun]:
+    """小説の実行の履歴を新しい順に返す"""
+    return db.query(ConsistencyRun).filter(
+        ConsistencyRun.novel_id == novel_id
+    ).order_by(ConsistencyRun.id.desc()).limit(limit).all()
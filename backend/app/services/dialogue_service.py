@@ -0,0 +1,135 @@
+"""
+台詞統計エンジンの設定と更新
+
+キャラクターと小説ごとの会話ガイドラインから話者名と口癖を設定し、更新された
+シーンだけを読み込んで台詞統計に反映する。本文の解析は CPU を使うため、
+呼び出し側はスレッドで実行し、エンジンの lock を取得してから呼ぶ。
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.dialogue_engine import DialogueEngine, catchphrases_from_text, guideline_vocabulary
+from app.models.novel import Chapter, Scene
+
+logger = logging.getLogger(__name__)
+
+# 本文を読み込むシーンの件数（1回のクエリあたり）
+CONTENT_BATCH_SIZE = 200
+
+# 小説ごとの設定ファイル（<ディレクトリ>/<小説ID>/dialogue_guidelines.yaml）の置き場所
+NOVEL_SPEC_DIR = Path(os.getenv("NOVELSPEC_NOVEL_SPEC_DIR", "data/novels"))
+GUIDELINES_FILENAME = "dialogue_guidelines.yaml"
+
+# 小説ID → (ファイルの更新日時, 内容)
+_guidelines_cache: Dict[int, Tuple[float, Dict]] = {}
+
+
+def load_dialogue_guidelines(novel_id: int) -> Dict:
+    """
+    小説の会話ガイドラインを読み込む（ファイルが更新されていなければ前回の内容を返す）
+
+    Returns:
+        Dict: ガイドラインの内容（ファイルがない・読めない場合は空の辞書）
+    """
+    path = NOVEL_SPEC_DIR / str(novel_id) / GUIDELINES_FILENAME
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        _guidelines_cache.pop(novel_id, None)
+        return {}
+    cached = _guidelines_cache.get(novel_id)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    import yaml
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            guidelines = yaml.safe_load(f) or {}
+    except Exception as e:
+        logger.warning(f"Failed to load dialogue guidelines for novel {novel_id}: {str(e)}")
+        guidelines = {}
+    _guidelines_cache[novel_id] = (mtime, guidelines)
+    return guidelines
+
+
+def configure_dialogue_engine(engine: DialogueEngine, novel_id: int, characters: Iterable) -> None:
+    """
+    キャラクターと会話ガイドラインから話者名と口癖を設定する（変わった場合だけ集計をやり直す）
+
+    Args:
+        engine: 小説の台詞統計エンジン
+        novel_id: 小説ID
+        characters: 小説のキャラクター（name と、口癖を記述した personality / background）
+    """
+    characters = list(characters)
+    guideline_names, guideline_phrases = guideline_vocabulary(load_dialogue_guidelines(novel_id))
+    names = [character.name for character in characters] + guideline_names
+    phrases = list(guideline_phrases)
+    for character in characters:
+        for field in ("personality", "background"):
+            phrases.extend(catchphrases_from_text(getattr(character, field, None)))
+
+    names = tuple(dict.fromkeys(name for name in names if name))
+    phrases = tuple(dict.fromkeys(phrase for phrase in phrases if phrase))
+    if names != engine.character_names or phrases != engine.catchphrases:
+        engine.set_characters(names, phrases)
+
+
+def refresh_dialogue_engine(db: Session, novel_id: int, engine: DialogueEngine) -> int:
+    """
+    更新されたシーンだけを読み込み、台詞統計に反映する
+
+    Returns:
+        int: 再集計したシーンの数
+    """
+    rows = db.query(Scene.id, Scene.chapter_id, Scene.updated_at).join(Chapter).filter(
+        Chapter.novel_id == novel_id
+    ).all()
+
+    current = {}
+    for scene_id, chapter_id, updated_at in rows:
+        current[str(scene_id)] = (str(chapter_id), updated_at.isoformat() if updated_at else None)
+
+    for scene_id in engine.scene_ids():
+        if scene_id not in current:
+            engine.remove_scene(scene_id)
+
+    changed = [
+        int(scene_id) for scene_id, (_, revision) in current.items()
+        if revision is None or engine.scene_revision(scene_id) != revision
+    ]
+    for start in range(0, len(changed), CONTENT_BATCH_SIZE):
+        batch = changed[start:start + CONTENT_BATCH_SIZE]
+        for scene_id, content in db.query(Scene.id, Scene.content).filter(Scene.id.in_(batch)):
+            chapter_id, revision = current[str(scene_id)]
+            engine.update_scene(str(scene_id), chapter_id, content, revision=revision)
+
+    return len(changed)
+
+
+def sync_dialogue_engine(
+    session_factory: Callable[[], Session],
+    novel_id: int,
+    engine: DialogueEngine,
+    characters: Iterable
+) -> int:
+    """
+    専用のセッションを開いてエンジンを設定し、更新されたシーンを反映する（スレッドから呼ぶ）
+
+    呼び出し側で engine.lock を取得しておく
+
+    Returns:
+        int: 再集計したシーンの数
+    """
+    db = session_factory()
+    try:
+        configure_dialogue_engine(engine, novel_id, characters)
+        return refresh_dialogue_engine(db, novel_id, engine)
+    finally:
+        db.close()
@@ -0,0 +1,361 @@
+"""
+原稿ファイルの取り込み
+
+プレーンテキスト / Markdown の原稿を 1 行ずつ読みながら、見出しや区切り行から
+章とシーンの境界を検出する。保持するのは処理中のシーンの本文だけで、シーンは
+一定件数ごとにまとめて INSERT する。単語数の計算はワーカープールで行い、
+進捗（読み込んだバイト数・章とシーンの件数）はジョブ単位で参照できる。
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Pattern, TextIO
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.ordering import is_valid_key, key_between
+from app.models.novel import Chapter, Scene
+from app.services.ordering_service import rebalance_container
+from app.services.progress_service import apply_word_count_delta
+
+logger = logging.getLogger(__name__)
+
+# 章見出し: Markdown の "# "、"第N章"、"Chapter N"、"Prologue/Epilogue"
+DEFAULT_CHAPTER_PATTERN = (
+    r"^(?:#\s+.+|第[0-9０-９一二三四五六七八九十百千〇零]+章.*|"
+    r"(?:chapter|CHAPTER|Chapter)\s+\S+.*|(?:Prologue|Epilogue|序章|終章)\s*)$"
+)
+# シーン見出し: Markdown の "## "
+DEFAULT_SCENE_PATTERN = r"^##\s+.+$"
+# シーン区切り: "***"、"* * *"、"---"、"◇◇◇"、"＊＊＊"、"#" 単独行など
+DEFAULT_SEPARATOR_PATTERN = r"^\s*(?:\*\s*\*\s*\*[\s*]*|-{3,}|#|◇+|◆+|＊+|☆+)\s*$"
+
+SCENE_BATCH_SIZE = 500
+
+
+def count_words(text: str) -> int:
+    """Scene.calculate_word_count と同じ規則で単語数を数える"""
+    return len(text.split()) if text else 0
+
+
+def _count_words_batch(texts: List[str]) -> List[int]:
+    return [count_words(text) for text in texts]
+
+
+@dataclass
+class BoundaryRules:
+    """章・シーンの境界を判定する規則"""
+    chapter: Pattern = field(default_factory=lambda: re.compile(DEFAULT_CHAPTER_PATTERN))
+    scene: Optional[Pattern] = field(default_factory=lambda: re.compile(DEFAULT_SCENE_PATTERN))
+    separator: Optional[Pattern] = field(default_factory=lambda: re.compile(DEFAULT_SEPARATOR_PATTERN))
+
+    @classmethod
+    def from_patterns(
+        cls,
+        chapter: Optional[str] = None,
+        scene: Optional[str] = None,
+        separator: Optional[str] = None
+    ) -> "BoundaryRules":
+        """
+        正規表現の文字列から規則を作る（省略したものは既定値）
+
+        Raises:
+            re.error: 正規表現が不正な場合
+        """
+        rules = cls()
+        if chapter:
+            rules.chapter = re.compile(chapter)
+        if scene:
+            rules.scene = re.compile(scene)
+        if separator:
+            rules.separator = re.compile(separator)
+        return rules
+
+
+@dataclass
+class ParsedScene:
+    chapter_index: int
+    title: str
+    order: int
+    content: str
+
+
+@dataclass
+class ParsedChapter:
+    index: int
+    title: str
+
+
+def _heading_title(line: str) -> str:
+    return line.lstrip("#").strip() or line.strip()
+
+
+def split_manuscript(lines: Iterable[str], rules: BoundaryRules) -> Iterator[object]:
+    """
+    原稿の行を章とシーンに分割する
+
+    章の見出しで ParsedChapter を、シーンの終わりで ParsedScene を順に返す。
+    最初の章見出しより前に本文がある場合は無題の章を作る。
+
+    Args:
+        lines: 原稿の行（改行付きでもよい）
+        rules: 境界の規則
+
+    Yields:
+        ParsedChapter または ParsedScene
+    """
+    chapter_index = -1
+    scene_order = 0
+    scene_title: Optional[str] = None
+    buffer: List[str] = []
+
+    def end_scene() -> Iterator[object]:
+        nonlocal chapter_index, scene_order, scene_title
+        content = "".join(buffer).strip("\n")
+        buffer.clear()
+        title, scene_title = scene_title, None
+        if not content.strip():
+            return
+        if chapter_index < 0:
+            chapter_index = 0
+            yield ParsedChapter(index=0, title="Untitled")
+        yield ParsedScene(
+            chapter_index=chapter_index,
+            title=title or f"Scene {scene_order + 1}",
+            order=scene_order,
+            content=content
+        )
+        scene_order += 1
+
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        stripped = line.strip()
+        if not stripped:
+            buffer.append("\n")
+        elif rules.scene and rules.scene.match(stripped):
+            yield from end_scene()
+            scene_title = _heading_title(stripped)
+        elif rules.chapter.match(stripped):
+            yield from end_scene()
+            chapter_index += 1
+            scene_order = 0
+            yield ParsedChapter(index=chapter_index, title=_heading_title(stripped))
+        elif rules.separator and rules.separator.match(stripped):
+            yield from end_scene()
+        else:
+            buffer.append(line + "\n")
+
+    yield from end_scene()
+
+
+@dataclass
+class ImportJob:
+    """取り込みジョブの進捗"""
+    id: str
+    novel_id: int
+    total_bytes: int
+    status: str = "pending"
+    bytes_read: int = 0
+    chapters: int = 0
+    scenes: int = 0
+    words: int = 0
+    error: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.time()) - self.started_at, 3)
+        return {
+            "id": self.id,
+            "novel_id": self.novel_id,
+            "status": self.status,
+            "bytes_read": self.bytes_read,
+            "total_bytes": self.total_bytes,
+            "progress": round(self.bytes_read / self.total_bytes, 4) if self.total_bytes else None,
+            "chapters": self.chapters,
+            "scenes": self.scenes,
+            "words": self.words,
+            "elapsed_seconds": elapsed,
+            "error": self.error,
+        }
+
+
+class ImportJobRegistry:
+    """取り込みジョブの一覧（完了したジョブは一定件数だけ残す）"""
+
+    def __init__(self, keep_finished: int = 100):
+        self.keep_finished = keep_finished
+        self._jobs: Dict[str, ImportJob] = {}
+        self._lock = threading.Lock()
+
+    def create(self, novel_id: int, total_bytes: int) -> ImportJob:
+        job = ImportJob(id=uuid.uuid4().hex, novel_id=novel_id, total_bytes=total_bytes)
+        with self._lock:
+            finished = sorted(
+                (j for j in self._jobs.values() if j.finished_at is not None),
+                key=lambda j: j.finished_at
+            )
+            for old in finished[:max(len(finished) - self.keep_finished, 0)]:
+                del self._jobs[old.id]
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        return self._jobs.get(job_id)
+
+
+import_jobs = ImportJobRegistry()
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+
+def get_word_count_executor() -> Executor:
+    """単語数の計算に使うプロセスプール（初回の取り込み時に作成する）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(os.getenv("NOVELSPEC_IMPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+            _executor = ProcessPoolExecutor(max_workers=max(workers, 1))
+        return _executor
+
+
+class _CountingReader:
+    """読み込んだバイト数をジョブに反映する行イテレータ"""
+
+    def __init__(self, stream: TextIO, job: ImportJob):
+        self.stream = stream
+        self.job = job
+
+    def __iter__(self) -> Iterator[str]:
+        for line in self.stream:
+            self.job.bytes_read += len(line.encode("utf-8"))
+            yield line
+
+
+def import_manuscript(
+    db: Session,
+    novel_id: int,
+    stream: TextIO,
+    job: ImportJob,
+    rules: Optional[BoundaryRules] = None,
+    executor: Optional[Executor] = None,
+    batch_size: int = SCENE_BATCH_SIZE
+) -> ImportJob:
+    """
+    原稿を読み込み、章とシーンを既存の章の後ろに追加する
+
+    章は 1 件ずつ、シーンは batch_size 件ごとにまとめて INSERT し、最後に
+    まとめてコミットする。単語数は executor（省略時は呼び出し元のスレッド）で計算する。
+
+    Args:
+        db: データベースセッション
+        novel_id: 取り込み先の小説ID
+        stream: 原稿のテキストストリーム
+        job: 進捗を記録するジョブ
+        rules: 境界の規則（省略時は既定の規則）
+        executor: 単語数を計算するワーカープール
+        batch_size: 1 回の INSERT で追加するシーンの件数
+
+    Returns:
+        ImportJob: 完了したジョブ
+    """
+    rules = rules or BoundaryRules()
+    job.status = "running"
+    job.started_at = time.time()
+
+    def last_chapter_key() -> Optional[str]:
+        return db.query(Chapter.sort_key).filter(
+            Chapter.novel_id == novel_id, Chapter.sort_key.isnot(None)
+        ).order_by(Chapter.sort_key.desc()).limit(1).scalar()
+
+    last_key = last_chapter_key()
+    if last_key is not None and not is_valid_key(last_key):
+        # 旧形式のキーの後ろには新しいキーを作れないため、先に既存の章を振り直す
+        rebalance_container(db, ("chapter", novel_id))
+        last_key = last_chapter_key()
+    next_order = (db.query(Chapter.order).filter(Chapter.novel_id == novel_id)
+                  .order_by(Chapter.order.desc()).limit(1).scalar() or 0) + 1
+
+    chapter_ids: Dict[int, int] = {}
+    chapter_words: Dict[int, int] = {}
+    pending: List[ParsedScene] = []
+    scene_key: Optional[str] = None
+
+    def write_scenes() -> None:
+        nonlocal scene_key
+        if not pending:
+            return
+        texts = [scene.content for scene in pending]
+        if executor is not None:
+            # 細かく分けすぎると受け渡しのコストが勝るため、ワーカー数程度に分割する
+            size = max(len(texts) // 8, 16)
+            chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+            counts = [n for chunk in executor.map(_count_words_batch, chunks) for n in chunk]
+        else:
+            counts = _count_words_batch(texts)
+
+        rows = []
+        for scene, words in zip(pending, counts):
+            if scene.order == 0:
+                scene_key = None
+            scene_key = key_between(scene_key, None)
+            chapter_id = chapter_ids[scene.chapter_index]
+            chapter_words[chapter_id] = chapter_words.get(chapter_id, 0) + words
+            rows.append({
+                "chapter_id": chapter_id,
+                "title": scene.title[:255],
+                "content": scene.content,
+                "order": scene.order + 1,
+                "sort_key": scene_key,
+                "word_count": words,
+                "version": 1,
+            })
+        db.execute(insert(Scene.__table__), rows)
+        job.scenes += len(rows)
+        job.words += sum(counts)
+        pending.clear()
+
+    try:
+        for item in split_manuscript(_CountingReader(stream, job), rules):
+            if isinstance(item, ParsedChapter):
+                last_key = key_between(last_key, None)
+                result = db.execute(insert(Chapter.__table__).values(
+                    novel_id=novel_id,
+                    title=item.title[:255],
+                    order=next_order + item.index,
+                    sort_key=last_key,
+                    current_word_count=0,
+                    version=1
+                ))
+                chapter_ids[item.index] = result.inserted_primary_key[0]
+                job.chapters += 1
+            else:
+                pending.append(item)
+                if len(pending) >= batch_size:
+                    write_scenes()
+        write_scenes()
+
+        for chapter_id, words in chapter_words.items():
+            # 章・小説の単語数と日次の進捗を章ごとに 1 回だけ更新する
+            apply_word_count_delta(db, novel_id, chapter_id, None, 0, words)
+        db.commit()
+        job.status = "completed"
+    except Exception as e:
+        db.rollback()
+        job.status = "failed"
+        job.error = str(e)
+        logger.error(f"Manuscript import {job.id} failed: {str(e)}")
+    finally:
+        job.finished_at = time.time()
+    return job
+
@@ -0,0 +1,261 @@
+"""
+最近編集された小説のウォームアップ
+
+デプロイ直後は、大きな小説への最初のリクエストが構造の構築
+（NovelEngine.create_structure）や各種インデックスの作成を待つことになる。
+起動後のバックグラウンドで updated_at が新しい小説を探し、同時実行数を
+制限しながら次のものを事前に読み込む。
+
+- 物語の構造（エンジンレジストリ。章・タイムライン・作中の暦）
+- パーソナリティの近傍索引と関係図のレイアウト
+- 台詞・話者の集計（シーン本文の解析結果）
+- 共有の世界観のスナップショット
+- 単語数の集計（進捗のダッシュボード）
+
+進捗は WarmupManager の状態（レディネスエンドポイント）に含めて公開する。
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.engine_registry import NovelEngines, engine_registry
+from app.core.shared_world import engine_elements
+from app.db.database import ReadSessionLocal
+from app.models.novel import Chapter, Novel, Scene, sequence_order
+from app.services import progress_service, shared_world_service, timeline_service
+
+logger = logging.getLogger(__name__)
+
+# ウォームアップする小説の数と、対象とする最終更新からの日数
+WARMUP_NOVEL_LIMIT = int(os.getenv("NOVELSPEC_WARMUP_NOVELS", "20"))
+WARMUP_ACTIVE_DAYS = int(os.getenv("NOVELSPEC_WARMUP_ACTIVE_DAYS", "14"))
+# 同時にウォームアップする小説の数（リクエストの処理を妨げないよう小さくする）
+WARMUP_CONCURRENCY = int(os.getenv("NOVELSPEC_WARMUP_CONCURRENCY", "2"))
+
+WarmupStep = Callable[[Session, int], Awaitable[None]]
+
+
+def find_active_novels(db: Session, days: int = WARMUP_ACTIVE_DAYS, limit: int = WARMUP_NOVEL_LIMIT) -> List[int]:
+    """
+    最近更新された小説のIDを新しい順に返す
+
+    Args:
+        db: データベースセッション
+        days: 対象とする最終更新からの日数
+        limit: 最大件数
+
+    Returns:
+        List[int]: 小説IDのリスト
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    rows = db.query(Novel.id).filter(Novel.updated_at >= cutoff).order_by(
+        Novel.updated_at.desc()
+    ).limit(limit)
+    return [row.id for row in rows]
+
+
+def _build_structure_inputs(db: Session, novel_id: int) -> Tuple[List[Dict], List[Dict]]:
+    """章の一覧と、作中の日付が設定されたシーンのタイムラインを読み込む（本文は読み込まない）"""
+    chapters = [
+        {
+            "id": str(row.id),
+            "title": row.title,
+            "description": row.description,
+            "order": row.order,
+            "sort_key": row.sort_key,
+        }
+        for row in db.query(
+            Chapter.id, Chapter.title, Chapter.description, Chapter.order, Chapter.sort_key
+        ).filter(Chapter.novel_id == novel_id).order_by(*sequence_order(Chapter))
+    ]
+    timeline = [
+        {
+            "id": f"scene-{row.id}",
+            "scene_id": row.id,
+            "chapter_id": str(row.chapter_id),
+            "title": row.title,
+            "date": row.time_period,
+        }
+        for row in db.query(Scene.id, Scene.chapter_id, Scene.title, Scene.time_period).join(
+            Chapter, Chapter.id == Scene.chapter_id
+        ).filter(Chapter.novel_id == novel_id, Scene.time_period.isnot(None))
+    ]
+    return chapters, timeline
+
+
+async def load_novel_engines(novel_id: str) -> NovelEngines:
+    """
+    データベースから小説のエンジンの組を構築する（エンジンレジストリのローダー）
+
+    Args:
+        novel_id: 小説ID
+
+    Returns:
+        NovelEngines
+    """
+    from app.services.character_graph import load_character_graph
+
+    engines = NovelEngines(novel_id=novel_id)
+    db = ReadSessionLocal()
+    try:
+        chapters, timeline = _build_structure_inputs(db, int(novel_id))
+        engines.novel.calendar = timeline_service.get_calendar(db, int(novel_id))
+        elements = await shared_world_service.list_novel_elements(db, int(novel_id)) or []
+        author_id = db.query(Novel.author_id).filter(Novel.id == int(novel_id)).scalar()
+        if author_id is not None:
+            await load_character_graph(db, int(novel_id), author_id, engines.characters)
+    finally:
+        db.close()
+
+    # 整合性の検証（consistency_hub）が差分を重ねた要素を対象にできるようにする
+    engines.world.load_elements(engine_elements(elements))
+    await engines.novel.create_structure(
+        plot_elements=[],
+        chapters=chapters,
+        characters=[],
+        world_building={"elements": elements},
+        timeline=timeline
+    )
+    return engines
+
+
+async def warm_structure(db: Session, novel_id: int) -> None:
+    """物語の構造を構築してレジストリに載せる"""
+    await engine_registry.get(str(novel_id))
+
+
+async def warm_relationships(db: Session, novel_id: int) -> None:
+    """パーソナリティの近傍索引と関係図のレイアウトを事前に計算する"""
+    engines = await engine_registry.get(str(novel_id))
+    if not engines.characters.characters:
+        return
+    await asyncio.to_thread(lambda: engines.characters.personality_index)
+    await engines.characters.get_relationship_layout()
+
+
+async def warm_dialogue(db: Session, novel_id: int) -> None:
+    """シーン本文を解析し、台詞・話者の集計を作っておく"""
+    from app.core.dialogue_engine import get_dialogue_engine
+    from app.services import character_service, dialogue_service
+
+    author_id = db.query(Novel.author_id).filter(Novel.id == novel_id).scalar()
+    characters = await character_service.get_characters_by_novel(db, novel_id, author_id)
+    engine = get_dialogue_engine(str(novel_id))
+
+    def refresh() -> None:
+        with engine.lock:
+            dialogue_service.sync_dialogue_engine(ReadSessionLocal, novel_id, engine, characters)
+
+    # 本文の解析は CPU を使うため、イベントループを止めないようスレッドで行う
+    # （ループ側のセッションは渡さず、スレッドの中で開く）
+    await asyncio.to_thread(refresh)
+
+
+async def warm_world(db: Session, novel_id: int) -> None:
+    """共有の世界観のスナップショットと検証結果をキャッシュに載せる"""
+    await shared_world_service.validate_novel_world(db, novel_id)
+
+
+async def warm_word_counts(db: Session, novel_id: int) -> None:
+    """単語数の集計を読み込む（集計テーブルとクエリのキャッシュを温める）"""
+    await progress_service.get_progress_dashboard(db, novel_id)
+    await progress_service.get_chapter_progress(db, novel_id)
+
+
+DEFAULT_STEPS: List[Tuple[str, WarmupStep]] = [
+    ("structure", warm_structure),
+    ("relationships", warm_relationships),
+    ("dialogue", warm_dialogue),
+    ("world", warm_world),
+    ("word_counts", warm_word_counts),
+]
+
+
+@dataclass
+class NovelWarmupState:
+    """小説 1 つ分のウォームアップの状態"""
+    novel_id: int
+    status: str = "pending"  # pending / running / done / failed
+    steps: Dict[str, str] = field(default_factory=dict)  # 処理名 → done / failed: <理由>
+    duration_ms: Optional[float] = None
+
+
+class NovelWarmup:
+    """最近編集された小説のウォームアップを実行するクラス"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = ReadSessionLocal,
+        steps: Optional[List[Tuple[str, WarmupStep]]] = None,
+        concurrency: int = WARMUP_CONCURRENCY,
+        limit: int = WARMUP_NOVEL_LIMIT,
+        days: int = WARMUP_ACTIVE_DAYS
+    ):
+        self.session_factory = session_factory
+        self.steps = steps if steps is not None else DEFAULT_STEPS
+        self.concurrency = max(concurrency, 1)
+        self.limit = limit
+        self.days = days
+        self.novels: Dict[int, NovelWarmupState] = {}
+
+    async def _warm_novel(self, state: NovelWarmupState, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            state.status = "running"
+            started = time.perf_counter()
+            db = self.session_factory()
+            try:
+                for name, step in self.steps:
+                    try:
+                        await step(db, state.novel_id)
+                        state.steps[name] = "done"
+                    except Exception as e:
+                        # 1 つの処理が失敗しても残りは続ける（初回アクセス時に改めて構築される）
+                        state.steps[name] = f"failed: {str(e)}"
+                        logger.warning(f"Warmup step '{name}' failed for novel {state.novel_id}: {str(e)}")
+            finally:
+                db.close()
+            state.duration_ms = (time.perf_counter() - started) * 1000
+            failed = any(result != "done" for result in state.steps.values())
+            state.status = "failed" if failed else "done"
+
+    async def run(self) -> None:
+        """最近編集された小説を探し、同時実行数を制限しながらウォームアップする"""
+        db = self.session_factory()
+        try:
+            novel_ids = find_active_novels(db, self.days, self.limit)
+        finally:
+            db.close()
+        self.novels = {novel_id: NovelWarmupState(novel_id=novel_id) for novel_id in novel_ids}
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*(self._warm_novel(state, semaphore) for state in self.novels.values()))
+        logger.info(f"Warmed {len(self.novels)} active novels")
+
+    def progress(self) -> Dict:
+        """レディネスエンドポイント向けの進捗"""
+        finished = [state for state in self.novels.values() if state.status in ("done", "failed")]
+        return {
+            "total": len(self.novels),
+            "finished": len(finished),
+            "failed": sum(1 for state in finished if state.status == "failed"),
+            "novels": [
+                {
+                    "novel_id": state.novel_id,
+                    "status": state.status,
+                    "steps": state.steps,
+                    "duration_ms": state.duration_ms,
+                }
+                for state in self.novels.values()
+            ],
+        }
+
+
+# アプリケーション全体で共有するウォームアップ
+novel_warmup = NovelWarmup()
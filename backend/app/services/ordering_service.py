@@ -0,0 +1,68 @@
+"""
+章・シーンの並び順キーの採番
+
+並び順キーの生成（app.core.ordering）をデータベースの一覧（小説の章、章の
+シーン）に適用する。コミットは呼び出し側で行う（バックグラウンドの振り直しを除く）。
+"""
+
+from typing import Set, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.core.ordering import evenly_spaced_keys
+from app.db.database import SessionLocal
+from app.models.novel import Chapter, Scene, sequence_order
+
+# (種類, 親ID) 章は小説ID、シーンは章ID
+Container = Tuple[str, int]
+
+
+def container_query(db: Session, container: Container):
+    """一覧に属する章またはシーンのクエリ"""
+    kind, parent_id = container
+    if kind == "chapter":
+        return db.query(Chapter).filter(Chapter.novel_id == parent_id)
+    return db.query(Scene).filter(Scene.chapter_id == parent_id)
+
+
+def model_for(kind: str):
+    return Chapter if kind == "chapter" else Scene
+
+
+def ensure_keys(db: Session, container: Container) -> None:
+    """並び順キーを持たない要素・旧形式（大文字を含む）のキーの要素があれば、一覧のキーを振り直す"""
+    model = model_for(container[0])
+    stale = container_query(db, container).filter(
+        or_(model.sort_key.is_(None), model.sort_key != func.lower(model.sort_key))
+    )
+    if stale.first() is None:
+        return
+    rebalance_container(db, container)
+
+
+def rebalance_container(db: Session, container: Container) -> None:
+    """
+    一覧内のすべての要素に短い並び順キーを振り直す
+    """
+    model = model_for(container[0])
+    rows = container_query(db, container).with_entities(model.id).order_by(*sequence_order(model)).all()
+    keys = evenly_spaced_keys(len(rows))
+    db.bulk_update_mappings(model, [
+        {"id": row.id, "sort_key": key} for row, key in zip(rows, keys)
+    ])
+    db.flush()
+
+
+def rebalance_in_background(containers: Set[Container]) -> None:
+    """専用のセッションで一覧のキーを振り直してコミットする（レスポンス後のバックグラウンド処理）"""
+    db = SessionLocal()
+    try:
+        for container in containers:
+            rebalance_container(db, container)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
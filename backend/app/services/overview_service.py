@@ -0,0 +1,334 @@
+"""
+小説のダッシュボード向けの概要
+
+ダッシュボードの表示に必要な小説・キャラクター・世界観・章の集計・進捗を
+1 回のリクエストでまとめて返す。各項目は読み込み用のセッションを別々に開き、
+同期の関数としてスレッドで同時に取得する。キャラクターは非同期の
+character_service を使うため、イベントループ上で 1 回だけ取得して辞書にする。
+フィールドを指定した場合は必要な列だけを読み込む。
+
+キャッシュを使う場合は、小説・章・シーンの状態（更新日時・件数）と日ごとの
+進捗の集計が変わらず、OVERVIEW_CACHE_TTL 秒以内に作った結果を返す。
+キャラクターと世界観の変更は TTL の間だけ反映が遅れることがある。
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.db.database import ReadSessionLocal
+from app.models.novel import Chapter, Novel, Scene, sequence_order
+from app.models.progress import DailyProgress
+from app.models.world import World
+from app.core.shared_world import merge_elements
+from app.services import progress_service, shared_world_service
+
+logger = logging.getLogger(__name__)
+
+OVERVIEW_CACHE_TTL = float(os.getenv("NOVELSPEC_OVERVIEW_CACHE_TTL", "30"))
+OVERVIEW_CACHE_SIZE = int(os.getenv("NOVELSPEC_OVERVIEW_CACHE_SIZE", "256"))
+
+# 項目ごとに選択できるフィールド（"id" は常に含める）と、指定がない場合のフィールド
+NOVEL_FIELDS = (
+    "id", "title", "description", "genre", "status", "target_word_count",
+    "current_word_count", "created_at", "updated_at",
+)
+CHAPTER_FIELDS = (
+    "id", "title", "order", "sort_key", "description", "current_word_count",
+    "target_word_count", "scene_count", "updated_at",
+)
+CHARACTER_FIELDS = (
+    "id", "name", "age", "gender", "occupation", "role_in_story", "physical_description",
+    "personality", "background", "motivation", "updated_at",
+)
+SELECTABLE_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "novel": NOVEL_FIELDS,
+    "chapters": CHAPTER_FIELDS,
+    "characters": CHARACTER_FIELDS,
+}
+DEFAULT_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "novel": ("id", "title", "genre", "status", "target_word_count", "current_word_count", "updated_at"),
+    "chapters": ("id", "title", "current_word_count", "target_word_count", "scene_count"),
+    "characters": ("id", "name", "role_in_story"),
+}
+SECTIONS = ("novel", "characters", "world", "chapters", "progress")
+
+
+class OverviewFieldError(ValueError):
+    """存在しない項目・フィールドを指定した場合の例外クラス"""
+    pass
+
+
+def parse_selection(
+    include: Optional[str],
+    fields: Optional[str]
+) -> Tuple[Tuple[str, ...], Dict[str, Tuple[str, ...]]]:
+    """
+    クエリパラメータから取得する項目とフィールドを決める
+
+    Args:
+        include: カンマ区切りの項目名（省略時はすべて）
+        fields: カンマ区切りの "項目.フィールド"（指定のない項目は既定のフィールド）
+
+    Returns:
+        (項目のタプル, 項目 → フィールドのタプル)
+
+    Raises:
+        OverviewFieldError: 存在しない項目・フィールドを指定した場合
+    """
+    sections = SECTIONS
+    if include:
+        names = {name.strip() for name in include.split(",") if name.strip()}
+        unknown = names - set(SECTIONS)
+        if unknown:
+            raise OverviewFieldError(f"Unknown sections: {', '.join(sorted(unknown))}")
+        sections = tuple(name for name in SECTIONS if name in names)
+
+    selected: Dict[str, List[str]] = {}
+    for item in (fields or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        section, _, name = item.partition(".")
+        if section not in SELECTABLE_FIELDS or name not in SELECTABLE_FIELDS[section]:
+            raise OverviewFieldError(f"Unknown field: {item}")
+        selected.setdefault(section, ["id"])
+        if name not in selected[section]:
+            selected[section].append(name)
+
+    return sections, {
+        section: tuple(selected.get(section, DEFAULT_FIELDS[section]))
+        for section in SELECTABLE_FIELDS
+        if section in sections
+    }
+
+
+def _row_dict(row: Any, names: Iterable[str]) -> Dict:
+    values = {}
+    for name in names:
+        value = getattr(row, name)
+        values[name] = value.value if isinstance(value, Enum) else value
+    return values
+
+
+def load_novel(db: Session, novel_id: int, fields: Tuple[str, ...]) -> Optional[Dict]:
+    """小説の指定したフィールド"""
+    row = db.query(*(getattr(Novel, name) for name in fields)).filter(Novel.id == novel_id).first()
+    return _row_dict(row, fields) if row else None
+
+
+def load_chapters(db: Session, novel_id: int, fields: Tuple[str, ...]) -> List[Dict]:
+    """章の指定したフィールド（scene_count はシーンの件数を集計する）"""
+    columns = [getattr(Chapter, name) for name in fields if name != "scene_count"]
+    query = db.query(*columns)
+    if "scene_count" in fields:
+        counts = db.query(
+            Scene.chapter_id, func.count(Scene.id).label("scene_count")
+        ).group_by(Scene.chapter_id).subquery()
+        query = query.add_columns(func.coalesce(counts.c.scene_count, 0).label("scene_count")).outerjoin(
+            counts, counts.c.chapter_id == Chapter.id
+        )
+    rows = query.filter(Chapter.novel_id == novel_id).order_by(*sequence_order(Chapter))
+    return [_row_dict(row, fields) for row in rows]
+
+
+def load_world(db: Session, novel_id: int) -> Optional[Dict]:
+    """共有の世界観の名前と、差分を重ねた要素のカテゴリごとの件数"""
+    loaded = shared_world_service.load_novel_world(db, novel_id)
+    if loaded is None:
+        return None
+    base, overrides = loaded
+    name = db.query(World.name).filter(World.id == base.world_id).scalar()
+    elements = merge_elements(base, overrides)
+    categories: Dict[str, int] = {}
+    for element in elements:
+        category = element.get("category") or ""
+        categories[category] = categories.get(category, 0) + 1
+    return {"id": base.world_id, "name": name, "element_count": len(elements), "categories": categories}
+
+
+def load_progress(db: Session, novel_id: int) -> Optional[Dict]:
+    """執筆進捗ダッシュボードの指標"""
+    return progress_service.build_progress_dashboard(db, novel_id)
+
+
+async def load_characters(
+    session_factory: Callable[[], Session],
+    novel_id: int,
+    author_id: int,
+    fields: Tuple[str, ...]
+) -> List[Dict]:
+    """キャラクターの指定したフィールド（イベントループ上で取得し、辞書にして返す）"""
+    from app.services import character_service
+
+    db = session_factory()
+    try:
+        characters = await character_service.get_characters_by_novel(db, novel_id, author_id)
+        return [_row_dict(character, fields) for character in characters]
+    finally:
+        db.close()
+
+
+async def _run_in_session(
+    session_factory: Callable[[], Session],
+    loader: Callable[..., Any],
+    *args
+) -> Any:
+    """専用のセッションを開き、スレッドで loader を実行する（セッションはスレッド間で共有しない）"""
+    def run() -> Any:
+        db = session_factory()
+        try:
+            return loader(db, *args)
+        finally:
+            db.close()
+
+    return await asyncio.to_thread(run)
+
+
+async def build_overview(
+    novel_id: int,
+    author_id: int,
+    sections: Tuple[str, ...] = SECTIONS,
+    fields: Optional[Dict[str, Tuple[str, ...]]] = None,
+    session_factory: Callable[[], Session] = ReadSessionLocal
+) -> Dict:
+    """
+    小説の概要を項目ごとに同時に取得して組み立てる
+
+    Args:
+        novel_id: 小説ID
+        author_id: 作者のユーザーID（キャラクターの取得に使う）
+        sections: 取得する項目
+        fields: 項目 → 取得するフィールド（省略時は既定のフィールド）
+        session_factory: 項目ごとのセッションを作る関数
+
+    Returns:
+        Dict: 項目名 → 内容、と generated_at
+    """
+    fields = fields or DEFAULT_FIELDS
+    loaders = {
+        "novel": (load_novel, novel_id, fields.get("novel", DEFAULT_FIELDS["novel"])),
+        "chapters": (load_chapters, novel_id, fields.get("chapters", DEFAULT_FIELDS["chapters"])),
+        "world": (load_world, novel_id),
+        "progress": (load_progress, novel_id),
+    }
+
+    def load(section: str):
+        if section == "characters":
+            return load_characters(
+                session_factory, novel_id, author_id, fields.get("characters", DEFAULT_FIELDS["characters"])
+            )
+        return _run_in_session(session_factory, *loaders[section])
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(load(section) for section in sections), return_exceptions=True)
+
+    overview: Dict[str, Any] = {}
+    errors = {}
+    for section, result in zip(sections, results):
+        if isinstance(result, Exception):
+            # 1 つの項目が失敗しても残りは返す（ダッシュボードは部分的に表示できる）
+            logger.warning(f"Overview section '{section}' failed for novel {novel_id}: {str(result)}")
+            errors[section] = str(result)
+            overview[section] = None
+        else:
+            overview[section] = result
+    if errors:
+        overview["errors"] = errors
+    overview["generated_at"] = datetime.utcnow()
+    logger.debug(f"Built overview for novel {novel_id} in {(time.perf_counter() - started) * 1000:.1f}ms")
+    return overview
+
+
+def overview_fingerprint(db: Session, novel_id: int) -> Hashable:
+    """小説・章・シーンと進捗の状態を表す値（集計だけで求める）
+
+    自動保存などシーン単位の保存は章や小説の行を更新しないことがあるため、
+    シーンの更新日時と日ごとの進捗（保存回数）も含める。
+    """
+    novel = db.query(Novel.updated_at, Novel.current_word_count).filter(Novel.id == novel_id).first()
+    chapters = db.query(
+        func.count(Chapter.id), func.max(Chapter.updated_at), func.sum(Chapter.current_word_count)
+    ).filter(Chapter.novel_id == novel_id).one()
+    scenes = db.query(func.count(Scene.id), func.max(Scene.updated_at)).join(
+        Chapter, Chapter.id == Scene.chapter_id
+    ).filter(Chapter.novel_id == novel_id).one()
+    progress = db.query(
+        func.count(DailyProgress.day), func.sum(DailyProgress.save_count), func.sum(DailyProgress.net_words)
+    ).filter(DailyProgress.novel_id == novel_id).one()
+    return (tuple(novel) if novel else None, tuple(chapters), tuple(scenes), tuple(progress))
+
+
+class OverviewCache:
+    """(小説ID, 項目, フィールド) → 組み立て済みの概要
+
+    fingerprint が変わった場合と、ttl 秒を過ぎた場合に作り直す。
+    保持する件数は max_entries までで、古いものから破棄する。
+    """
+
+    def __init__(self, ttl: float = OVERVIEW_CACHE_TTL, max_entries: int = OVERVIEW_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[Hashable, float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(novel_id: int, sections: Tuple[str, ...], fields: Dict[str, Tuple[str, ...]]) -> Tuple:
+        return (novel_id, sections, tuple(sorted(fields.items())))
+
+    def get(
+        self,
+        novel_id: int,
+        sections: Tuple[str, ...],
+        fields: Dict[str, Tuple[str, ...]],
+        fingerprint: Hashable
+    ) -> Optional[Dict]:
+        """有効な概要があれば返す"""
+        key = self._key(novel_id, sections, fields)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint and time.monotonic() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        novel_id: int,
+        sections: Tuple[str, ...],
+        fields: Dict[str, Tuple[str, ...]],
+        fingerprint: Hashable,
+        overview: Dict
+    ) -> None:
+        key = self._key(novel_id, sections, fields)
+        with self._lock:
+            self._entries[key] = (fingerprint, time.monotonic(), overview)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, novel_id: int) -> None:
+        """小説の概要をすべて破棄する"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == novel_id]:
+                del self._entries[key]
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# アプリケーション全体で共有する概要のキャッシュ
+overview_cache = OverviewCache()
@@ -0,0 +1,304 @@
+"""
+執筆進捗サービス
+
+保存ごとの単語数の増減を追記専用のログに記録し、同じトランザクション内で
+日次・週次・章ごとの集計を加算更新する。ダッシュボードの指標は集計テーブル
+だけから計算し、原稿やログを走査しない。
+"""
+
+from datetime import date, datetime, timedelta
+from math import ceil
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.db.upsert import dialect_insert
+from app.models.novel import Novel, Chapter, Scene, sequence_order
+from app.models.progress import WordCountEvent, DailyProgress, WeeklyProgress, ChapterProgress
+
+
+def _week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _increment(db: Session, model, keys: Dict, added: int, removed: int, extra: Optional[Dict] = None) -> None:
+    """
+    集計行を加算更新する（行がなければ作成する）
+
+    SQLite / PostgreSQL では 1 文の INSERT ... ON CONFLICT DO UPDATE で行い、
+    同じ行への同時の初回保存でも主キーの重複にならない。
+    """
+    has_save_count = hasattr(model, "save_count")
+    row = {
+        **keys,
+        "words_added": added,
+        "words_removed": removed,
+        "net_words": added - removed,
+        **(extra or {}),
+    }
+    if has_save_count:
+        row["save_count"] = 1
+
+    table = model.__table__
+    values = {
+        "words_added": table.c.words_added + added,
+        "words_removed": table.c.words_removed + removed,
+        "net_words": table.c.net_words + (added - removed),
+        **(extra or {}),
+    }
+    if has_save_count:
+        values["save_count"] = table.c.save_count + 1
+
+    insert = dialect_insert(db)
+    if insert is not None:
+        statement = insert(table).values(**row).on_conflict_do_update(
+            index_elements=list(keys), set_=values
+        )
+        db.execute(statement)
+        return
+
+    query = db.query(model).filter(*(getattr(model, k) == v for k, v in keys.items()))
+    if query.update(values, synchronize_session=False) == 0:
+        db.add(model(**row))
+        db.flush()
+
+
+async def record_word_count_change(
+    db: Session,
+    novel_id: int,
+    chapter_id: Optional[int],
+    scene_id: Optional[int],
+    old_count: int,
+    new_count: int,
+    at: Optional[datetime] = None
+) -> Optional[WordCountEvent]:
+    """単語数の増減を記録する（apply_word_count_delta を参照）"""
+    return apply_word_count_delta(db, novel_id, chapter_id, scene_id, old_count, new_count, at)
+
+
+def apply_word_count_delta(
+    db: Session,
+    novel_id: int,
+    chapter_id: Optional[int],
+    scene_id: Optional[int],
+    old_count: int,
+    new_count: int,
+    at: Optional[datetime] = None
+) -> Optional[WordCountEvent]:
+    """
+    単語数の増減を記録し、集計と小説・章の現在の単語数を更新する
+    コミットは呼び出し側で行う（スレッドで実行するバッチ処理からも呼べる）
+
+    Args:
+        db: データベースセッション
+        novel_id: 小説ID
+        chapter_id: 章ID
+        scene_id: シーンID
+        old_count: 保存前のシーンの単語数
+        new_count: 保存後のシーンの単語数
+        at: 記録日時（省略時は現在時刻）
+
+    Returns:
+        記録したイベント（増減がない場合は None）
+    """
+    delta = new_count - old_count
+    if delta == 0:
+        return None
+
+    at = at or datetime.utcnow()
+    added, removed = (delta, 0) if delta > 0 else (0, -delta)
+
+    event = WordCountEvent(
+        novel_id=novel_id,
+        chapter_id=chapter_id,
+        scene_id=scene_id,
+        delta=delta,
+        words_after=new_count,
+        created_at=at
+    )
+    db.add(event)
+
+    _increment(db, DailyProgress, {"novel_id": novel_id, "day": at.date()}, added, removed)
+    _increment(db, WeeklyProgress, {"novel_id": novel_id, "week_start": _week_start(at.date())}, added, removed)
+    if chapter_id is not None:
+        _increment(
+            db, ChapterProgress, {"chapter_id": chapter_id}, added, removed,
+            extra={"novel_id": novel_id, "last_written_at": at}
+        )
+        db.query(Chapter).filter(Chapter.id == chapter_id).update(
+            {Chapter.current_word_count: Chapter.current_word_count + delta},
+            synchronize_session=False
+        )
+    db.query(Novel).filter(Novel.id == novel_id).update(
+        {Novel.current_word_count: Novel.current_word_count + delta},
+        synchronize_session=False
+    )
+    return event
+
+
+def write_scene_content(db: Session, scene: Scene, novel_id: int, content: Optional[str]) -> int:
+    """
+    シーン本文を更新し、単語数の増減を記録する
+    コミットは呼び出し側で行う（スレッドで実行するバッチ処理からも呼べる）
+
+    Returns:
+        int: 単語数の増減
+    """
+    old_count = scene.word_count or 0
+    scene.content = content
+    scene.calculate_word_count()
+    apply_word_count_delta(db, novel_id, scene.chapter_id, scene.id, old_count, scene.word_count)
+    return scene.word_count - old_count
+
+
+async def apply_scene_content(db: Session, scene: Scene, novel_id: int, content: Optional[str]) -> int:
+    """シーン本文を更新し、単語数の増減を記録する（write_scene_content を参照）"""
+    return write_scene_content(db, scene, novel_id, content)
+
+
+def _streaks(days: List[date], today: date) -> Dict[str, int]:
+    """執筆日（降順）から現在と最長の連続日数を求める"""
+    current = 0
+    longest = 0
+    run = 0
+    previous: Optional[date] = None
+    for day in days:
+        run = run + 1 if previous is not None and previous - day == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+
+    # 今日まだ書いていなくても昨日まで続いていれば継続中とみなす
+    expected = today if days and days[0] == today else today - timedelta(days=1)
+    for day in days:
+        if day != expected:
+            break
+        current += 1
+        expected -= timedelta(days=1)
+    return {"current": current, "longest": longest}
+
+
+def build_progress_dashboard(
+    db: Session,
+    novel_id: int,
+    window_days: int = 14,
+    today: Optional[date] = None
+) -> Optional[Dict]:
+    """
+    執筆進捗ダッシュボードの指標を集計テーブルから計算する（スレッドから呼べる同期版）
+
+    Args:
+        db: データベースセッション
+        novel_id: 小説ID
+        window_days: 執筆速度を求める期間（日数）
+        today: 基準日（省略時は今日）
+
+    Returns:
+        指標の辞書（小説が存在しない場合は None）
+    """
+    novel = db.query(
+        Novel.id, Novel.target_word_count, Novel.current_word_count
+    ).filter(Novel.id == novel_id).first()
+    if novel is None:
+        return None
+
+    today = today or datetime.utcnow().date()
+    window_start = today - timedelta(days=window_days - 1)
+
+    recent = db.query(DailyProgress).filter(
+        DailyProgress.novel_id == novel_id,
+        DailyProgress.day >= window_start,
+        DailyProgress.day <= today
+    ).order_by(DailyProgress.day).all()
+    net_in_window = sum(row.net_words for row in recent)
+    velocity = net_in_window / window_days
+
+    writing_days = [
+        row.day for row in db.query(DailyProgress.day).filter(
+            DailyProgress.novel_id == novel_id,
+            DailyProgress.words_added > 0
+        ).order_by(DailyProgress.day.desc())
+    ]
+
+    current_words = novel.current_word_count or 0
+    remaining = None
+    days_to_target = None
+    projected_completion = None
+    if novel.target_word_count:
+        remaining = max(novel.target_word_count - current_words, 0)
+        if remaining == 0:
+            days_to_target = 0
+        elif velocity > 0:
+            days_to_target = ceil(remaining / velocity)
+        if days_to_target is not None:
+            projected_completion = (today + timedelta(days=days_to_target)).isoformat()
+
+    weeks = db.query(WeeklyProgress).filter(
+        WeeklyProgress.novel_id == novel_id
+    ).order_by(WeeklyProgress.week_start.desc()).limit(12).all()
+
+    return {
+        "novel_id": novel_id,
+        "current_word_count": current_words,
+        "target_word_count": novel.target_word_count,
+        "remaining_words": remaining,
+        "velocity_per_day": round(velocity, 2),
+        "window_days": window_days,
+        "days_to_target": days_to_target,
+        "projected_completion": projected_completion,
+        "streak": _streaks(writing_days, today),
+        "daily": [
+            {
+                "day": row.day.isoformat(),
+                "words_added": row.words_added,
+                "words_removed": row.words_removed,
+                "net_words": row.net_words,
+                "save_count": row.save_count,
+            }
+            for row in recent
+        ],
+        "weekly": [
+            {
+                "week_start": row.week_start.isoformat(),
+                "net_words": row.net_words,
+                "words_added": row.words_added,
+            }
+            for row in reversed(weeks)
+        ],
+    }
+
+
+async def get_progress_dashboard(
+    db: Session,
+    novel_id: int,
+    window_days: int = 14,
+    today: Optional[date] = None
+) -> Optional[Dict]:
+    """執筆進捗ダッシュボードの指標（build_progress_dashboard を参照）"""
+    return build_progress_dashboard(db, novel_id, window_days=window_days, today=today)
+
+
+async def get_chapter_progress(db: Session, novel_id: int) -> List[Dict]:
+    """章ごとの進捗（目標に対する達成率を含む）"""
+    rows = db.query(
+        Chapter.id, Chapter.title, Chapter.target_word_count, Chapter.current_word_count,
+        ChapterProgress.words_added, ChapterProgress.words_removed, ChapterProgress.last_written_at
+    ).outerjoin(
+        ChapterProgress, ChapterProgress.chapter_id == Chapter.id
+    ).filter(Chapter.novel_id == novel_id).order_by(*sequence_order(Chapter)).all()
+
+    return [
+        {
+            "chapter_id": row.id,
+            "title": row.title,
+            "current_word_count": row.current_word_count or 0,
+            "target_word_count": row.target_word_count,
+            "completion": (
+                min((row.current_word_count or 0) / row.target_word_count, 1.0)
+                if row.target_word_count else None
+            ),
+            "words_added": row.words_added or 0,
+            "words_removed": row.words_removed or 0,
+            "last_written_at": row.last_written_at.isoformat() if row.last_written_at else None,
+        }
+        for row in rows
+    ]
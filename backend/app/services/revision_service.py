@@ -0,0 +1,462 @@
+"""
+改訂履歴サービス
+
+シーン本文と章のアウトラインの改訂を、内容で区切ったチャンクの並びとして
+保存する。チャンクは内容ハッシュで重複を除いて 1 件だけ保存するため、
+自動保存のたびに改訂を作っても、増える保存量は編集した部分のチャンクだけになる。
+
+改訂番号は対象の行（シーン・章）をロックしてから採番し、同時の保存で番号が
+重複しないようにする。保持方針による古い改訂の削除は保存のトランザクションでは
+行わず、コミット後にバックグラウンドのスレッドで別のセッションを使って行う。
+"""
+
+import difflib
+import hashlib
+import logging
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app.core.chunking import chunk_hash, split_chunks
+from app.db.upsert import dialect_insert
+from app.models.novel import Chapter, Scene
+from app.models.revision import ContentChunk, Revision
+
+logger = logging.getLogger(__name__)
+
+ENTITY_TYPES = ("scene", "chapter_outline")
+
+# 改訂の対象ごとの、採番時にロックする行のモデル
+ENTITY_MODELS = {"scene": Scene, "chapter_outline": Chapter}
+
+# 改訂の対象ごとの、履歴を取る列（シーンは本文、章はアウトライン = 説明）
+ENTITY_CONTENT_COLUMNS = {"scene": Scene.content, "chapter_outline": Chapter.description}
+
+# コミット後に保持方針を適用する対象を Session.info に記録するキー
+PENDING_RETENTION_KEY = "revision_retention"
+
+
+@dataclass
+class RetentionPolicy:
+    """改訂の保持方針
+
+    最新の keep_last 件、keep_daily_days 日以内の各日の最後の改訂、
+    ラベル付きの改訂（keep_labeled の場合）を残し、それ以外を削除する。
+    """
+    keep_last: int = 100
+    keep_daily_days: int = 30
+    keep_labeled: bool = True
+    # 改訂がこの件数増えるごとに保存時に自動で適用する（0 で無効）
+    prune_every: int = 25
+
+
+DEFAULT_RETENTION = RetentionPolicy()
+
+
+def _content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _store_chunks(db: Session, chunks: List[bytes], hashes: List[str]) -> int:
+    """
+    未保存のチャンクを追加し、参照数を増やす
+
+    SQLite / PostgreSQL では追加を INSERT ... ON CONFLICT DO UPDATE で行い、
+    同じチャンクを同時に追加しても主キーの重複にならない（後から追加した側は
+    参照数を増やすだけになる）。
+
+    Returns:
+        int: 新しく保存したチャンクの圧縮後のバイト数
+    """
+    unique = dict(zip(hashes, chunks))
+    existing = {
+        row.hash for row in db.query(ContentChunk.hash).filter(ContentChunk.hash.in_(list(unique)))
+    }
+    rows = []
+    stored = 0
+    for key, chunk in unique.items():
+        if key in existing:
+            continue
+        data = zlib.compress(chunk, 6)
+        stored += len(data)
+        rows.append({"hash": key, "size": len(chunk), "data": data, "ref_count": 1})
+    if existing:
+        db.query(ContentChunk).filter(ContentChunk.hash.in_(list(existing))).update(
+            {ContentChunk.ref_count: ContentChunk.ref_count + 1}, synchronize_session=False
+        )
+    if rows:
+        insert = dialect_insert(db)
+        if insert is not None:
+            table = ContentChunk.__table__
+            db.execute(insert(table).values(rows).on_conflict_do_update(
+                index_elements=[table.c.hash], set_={"ref_count": table.c.ref_count + 1}
+            ))
+        else:
+            db.add_all(ContentChunk(**row) for row in rows)
+    db.flush()
+    return stored
+
+
+def _release_chunks(db: Session, hash_lists: List[List[str]]) -> None:
+    """削除する改訂が参照していたチャンクの参照数を減らし、参照されなくなったものを削除する"""
+    released = Counter()
+    for hashes in hash_lists:
+        released.update(set(hashes))
+    for count in set(released.values()):
+        keys = [key for key, n in released.items() if n == count]
+        db.query(ContentChunk).filter(ContentChunk.hash.in_(keys)).update(
+            {ContentChunk.ref_count: ContentChunk.ref_count - count}, synchronize_session=False
+        )
+    db.query(ContentChunk).filter(
+        ContentChunk.hash.in_(list(released)), ContentChunk.ref_count <= 0
+    ).delete(synchronize_session=False)
+
+
+def _entity_query(db: Session, entity_type: str, entity_id: int):
+    return db.query(Revision).filter(
+        Revision.entity_type == entity_type, Revision.entity_id == entity_id
+    )
+
+
+def _lock_entity(db: Session, entity_type: str, entity_id: int) -> None:
+    """
+    改訂の対象の行をトランザクションの終わりまでロックする（SELECT ... FOR UPDATE）
+
+    SQLite は FOR UPDATE を持たないが、書き込みはデータベース全体で直列化される
+    """
+    model = ENTITY_MODELS[entity_type]
+    db.query(model.id).filter(model.id == entity_id).with_for_update().first()
+
+
+def stored_content(db: Session, entity_type: str, entity_id: int) -> Optional[str]:
+    """改訂の対象に現在保存されている内容（シーンの本文・章のアウトライン）"""
+    model = ENTITY_MODELS[entity_type]
+    return db.query(ENTITY_CONTENT_COLUMNS[entity_type]).filter(model.id == entity_id).scalar()
+
+
+def write_revision(
+    db: Session,
+    entity_type: str,
+    entity_id: int,
+    content: Optional[str],
+    author_id: Optional[int] = None,
+    label: Optional[str] = None,
+    retention: Optional[RetentionPolicy] = DEFAULT_RETENTION,
+    at: Optional[datetime] = None
+) -> Optional[Revision]:
+    """
+    改訂を保存する（直前の改訂と内容が同じ場合は保存しない）
+    コミットは呼び出し側で行う（スレッドで実行するバッチ処理からも呼べる）
+
+    Args:
+        db: データベースセッション
+        entity_type: "scene" または "chapter_outline"
+        entity_id: シーンIDまたは章ID
+        content: 本文
+        author_id: 保存したユーザーのID
+        label: 改訂の名前（「第1稿」など）
+        retention: コミット後にバックグラウンドで適用する保持方針（None で適用しない）
+        at: 保存日時（省略時は現在時刻）
+
+    Returns:
+        保存した改訂（内容が変わっていない場合は None）
+    """
+    if entity_type not in ENTITY_TYPES:
+        raise ValueError(f"Unknown entity type: {entity_type}")
+
+    data = (content or "").encode("utf-8")
+    digest = _content_hash(data)
+    _lock_entity(db, entity_type, entity_id)
+    latest = _entity_query(db, entity_type, entity_id).with_entities(
+        Revision.number, Revision.content_hash
+    ).order_by(Revision.number.desc()).first()
+    if latest is not None and latest.content_hash == digest and label is None:
+        return None
+
+    chunks = split_chunks(data)
+    hashes = [chunk_hash(chunk) for chunk in chunks]
+    _store_chunks(db, chunks, hashes)
+
+    revision = Revision(
+        entity_type=entity_type,
+        entity_id=entity_id,
+        number=(latest.number if latest else 0) + 1,
+        chunk_hashes=",".join(hashes),
+        content_hash=digest,
+        size=len(data),
+        word_count=len(content.split()) if content else 0,
+        label=label,
+        author_id=author_id,
+        created_at=at or datetime.utcnow()
+    )
+    db.add(revision)
+    db.flush()
+
+    if retention is not None and retention.prune_every and revision.number % retention.prune_every == 0:
+        db.info.setdefault(PENDING_RETENTION_KEY, {})[(entity_type, entity_id)] = retention
+    return revision
+
+
+async def save_revision(
+    db: Session,
+    entity_type: str,
+    entity_id: int,
+    content: Optional[str],
+    author_id: Optional[int] = None,
+    label: Optional[str] = None,
+    retention: Optional[RetentionPolicy] = DEFAULT_RETENTION,
+    at: Optional[datetime] = None
+) -> Optional[Revision]:
+    """改訂を保存する（write_revision を参照）"""
+    return write_revision(
+        db, entity_type, entity_id, content,
+        author_id=author_id, label=label, retention=retention, at=at
+    )
+
+
+async def list_revisions(
+    db: Session,
+    entity_type: str,
+    entity_id: int,
+    limit: int = 50,
+    before: Optional[int] = None
+) -> List[Dict]:
+    """
+    改訂の一覧を新しい順に返す（本文は読み込まない）
+
+    Args:
+        before: この番号より前の改訂だけを返す（ページング用）
+    """
+    query = _entity_query(db, entity_type, entity_id).with_entities(
+        Revision.number, Revision.size, Revision.word_count, Revision.label,
+        Revision.author_id, Revision.created_at
+    )
+    if before is not None:
+        query = query.filter(Revision.number < before)
+    return [
+        {
+            "number": row.number,
+            "size": row.size,
+            "word_count": row.word_count,
+            "label": row.label,
+            "author_id": row.author_id,
+            "created_at": row.created_at,
+        }
+        for row in query.order_by(Revision.number.desc()).limit(limit)
+    ]
+
+
+def _get_revision(db: Session, entity_type: str, entity_id: int, number: int) -> Optional[Revision]:
+    return _entity_query(db, entity_type, entity_id).filter(Revision.number == number).first()
+
+
+def _load_chunks(db: Session, hashes: List[str]) -> Dict[str, bytes]:
+    rows = db.query(ContentChunk.hash, ContentChunk.data).filter(ContentChunk.hash.in_(list(set(hashes))))
+    return {row.hash: zlib.decompress(row.data) for row in rows}
+
+
+def _assemble(hashes: List[str], chunks: Dict[str, bytes]) -> bytes:
+    return b"".join(chunks[key] for key in hashes)
+
+
+async def get_revision_content(
+    db: Session,
+    entity_type: str,
+    entity_id: int,
+    number: int
+) -> Optional[str]:
+    """
+    改訂の本文を復元する（チャンクは 1 回のクエリでまとめて読み込む）
+
+    Returns:
+        本文（改訂が存在しない場合は None）
+    """
+    revision = _get_revision(db, entity_type, entity_id, number)
+    if revision is None:
+        return None
+    hashes = revision.hashes
+    return _assemble(hashes, _load_chunks(db, hashes)).decode("utf-8")
+
+
+async def diff_revisions(
+    db: Session,
+    entity_type: str,
+    entity_id: int,
+    from_number: int,
+    to_number: int
+) -> Optional[Dict]:
+    """
+    2 つの改訂の差分を行単位で返す
+
+    先頭と末尾で一致するチャンクは比較せず、その間の行だけを比較する。
+
+    Returns:
+        差分の辞書（どちらかの改訂が存在しない場合は None）
+    """
+    old = _get_revision(db, entity_type, entity_id, from_number)
+    new = _get_revision(db, entity_type, entity_id, to_number)
+    if old is None or new is None:
+        return None
+
+    old_hashes, new_hashes = old.hashes, new.hashes
+    chunks = _load_chunks(db, old_hashes + new_hashes)
+    old_data, new_data = _assemble(old_hashes, chunks), _assemble(new_hashes, chunks)
+
+    prefix = 0
+    while prefix < min(len(old_hashes), len(new_hashes)) and old_hashes[prefix] == new_hashes[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < min(len(old_hashes), len(new_hashes)) - prefix
+           and old_hashes[-1 - suffix] == new_hashes[-1 - suffix]):
+        suffix += 1
+    head = sum(len(chunks[key]) for key in old_hashes[:prefix])
+    tail = sum(len(chunks[key]) for key in old_hashes[len(old_hashes) - suffix:])
+
+    # チャンクの境界は行の途中にあり得るため、比較範囲を行の境界まで広げる
+    head = old_data.rfind(b"\n", 0, head) + 1
+    tail_at = old_data.find(b"\n", len(old_data) - tail)
+    tail = len(old_data) - tail_at - 1 if tail_at != -1 and tail else 0
+    line_offset = old_data.count(b"\n", 0, head)
+
+    old_lines = old_data[head:len(old_data) - tail].decode("utf-8").splitlines()
+    new_lines = new_data[head:len(new_data) - tail].decode("utf-8").splitlines()
+
+    hunks = []
+    added = removed = 0
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            continue
+        removed += i2 - i1
+        added += j2 - j1
+        hunks.append({
+            "op": op,
+            "from_line": line_offset + i1 + 1,
+            "to_line": line_offset + j1 + 1,
+            "removed": old_lines[i1:i2],
+            "added": new_lines[j1:j2],
+        })
+
+    return {
+        "from_number": from_number,
+        "to_number": to_number,
+        "lines_added": added,
+        "lines_removed": removed,
+        "shared_chunks": len(set(old_hashes) & set(new_hashes)),
+        "hunks": hunks,
+    }
+
+
+def prune_revisions(
+    db: Session,
+    entity_type: str,
+    entity_id: int,
+    policy: RetentionPolicy = DEFAULT_RETENTION,
+    now: Optional[datetime] = None
+) -> int:
+    """
+    保持方針に従って古い改訂を削除する
+    コミットは呼び出し側で行う
+
+    Returns:
+        int: 削除した改訂の数
+    """
+    now = now or datetime.utcnow()
+    rows = _entity_query(db, entity_type, entity_id).with_entities(
+        Revision.id, Revision.number, Revision.label, Revision.created_at
+    ).order_by(Revision.number.desc()).all()
+
+    keep = {row.id for row in rows[:policy.keep_last]}
+    daily_since = now - timedelta(days=policy.keep_daily_days)
+    seen_days = set()
+    for row in rows:
+        if policy.keep_labeled and row.label:
+            keep.add(row.id)
+        day = row.created_at.date()
+        if row.created_at >= daily_since and day not in seen_days:
+            seen_days.add(day)
+            keep.add(row.id)
+
+    doomed = [row.id for row in rows if row.id not in keep]
+    if not doomed:
+        return 0
+
+    hash_lists = [
+        row.chunk_hashes.split(",") if row.chunk_hashes else []
+        for row in db.query(Revision.chunk_hashes).filter(Revision.id.in_(doomed))
+    ]
+    db.query(Revision).filter(Revision.id.in_(doomed)).delete(synchronize_session=False)
+    _release_chunks(db, hash_lists)
+    return len(doomed)
+
+
+async def apply_retention(
+    db: Session,
+    entity_type: str,
+    entity_id: int,
+    policy: RetentionPolicy = DEFAULT_RETENTION,
+    now: Optional[datetime] = None
+) -> int:
+    """保持方針に従って古い改訂を削除する（prune_revisions を参照）"""
+    return prune_revisions(db, entity_type, entity_id, policy, now)
+
+
+# 保存後の保持方針の適用を 1 件ずつ順に行うスレッド
+_retention_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="revision-retention")
+
+
+def _prune_in_background(targets: Dict[Tuple[str, int], RetentionPolicy]) -> None:
+    from app.db.database import SessionLocal
+
+    for (entity_type, entity_id), policy in targets.items():
+        db = SessionLocal()
+        try:
+            deleted = prune_revisions(db, entity_type, entity_id, policy)
+            db.commit()
+            if deleted:
+                logger.debug(f"Pruned {deleted} revisions of {entity_type} {entity_id}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to prune revisions of {entity_type} {entity_id}: {str(e)}")
+        finally:
+            db.close()
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_retention(session: Session) -> None:
+    """保存した改訂が保持方針の適用の区切りに達していれば、コミット後に適用を予約する"""
+    if session.in_nested_transaction():
+        # セーブポイントの解放（外側のトランザクションはまだコミットされていない）
+        return
+    targets = session.info.pop(PENDING_RETENTION_KEY, None)
+    if targets:
+        _retention_executor.submit(_prune_in_background, targets)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_retention(session: Session) -> None:
+    session.info.pop(PENDING_RETENTION_KEY, None)
+
+
+async def get_storage_stats(db: Session, entity_type: str, entity_id: int) -> Dict:
+    """改訂の件数と、本文の合計サイズに対する実際の保存量"""
+    revisions = _entity_query(db, entity_type, entity_id).with_entities(
+        Revision.chunk_hashes, Revision.size
+    ).all()
+    hashes = {key for row in revisions for key in (row.chunk_hashes.split(",") if row.chunk_hashes else [])}
+    stored = db.query(func.coalesce(func.sum(func.length(ContentChunk.data)), 0)).filter(
+        ContentChunk.hash.in_(list(hashes))
+    ).scalar() if hashes else 0
+    logical = sum(row.size for row in revisions)
+    return {
+        "revisions": len(revisions),
+        "logical_bytes": logical,
+        "stored_bytes": int(stored),
+        "unique_chunks": len(hashes),
+    }
@@ -0,0 +1,224 @@
+"""
+共有世界観サービス
+
+小説と共有の世界観の関連付け、小説ごとの差分の保存、差分を重ねた要素一覧と
+検証結果の取得を行う。共有部分は app.core.shared_world のキャッシュから読み、
+差分は小説ごとに 1 回のクエリで読み込む。コミットは呼び出し側で行う。
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.shared_world import (
+    ELEMENT_FIELDS,
+    BaseWorld,
+    ElementOverride,
+    merge_elements,
+    shared_worlds,
+    validate_merged,
+)
+from app.db.versioning import versioned_update
+from app.models.world import NovelWorld, World, WorldElement, WorldOverride
+
+
+def _fingerprint(db: Session, world_id: int) -> Optional[Tuple]:
+    """世界観の状態を表す値（要素を読み込まずに集計だけで求める）"""
+    world_version = db.query(World.version).filter(World.id == world_id).scalar()
+    if world_version is None:
+        return None
+    count, last_updated, max_version = db.query(
+        func.count(WorldElement.id), func.max(WorldElement.updated_at), func.max(WorldElement.version)
+    ).filter(WorldElement.world_id == world_id).one()
+    return (world_version, count, last_updated, max_version)
+
+
+def get_base_world(db: Session, world_id: int) -> Optional[BaseWorld]:
+    """
+    共有の世界観のスナップショットを返す（変更がなければキャッシュを使う）
+
+    Returns:
+        BaseWorld（世界観が存在しない場合は None）
+    """
+    fingerprint = _fingerprint(db, world_id)
+    if fingerprint is None:
+        return None
+
+    def load():
+        query = db.query(
+            WorldElement.id, WorldElement.world_id, WorldElement.name, WorldElement.category,
+            WorldElement.description, WorldElement.details
+        ).filter(WorldElement.world_id == world_id).order_by(WorldElement.id)
+        return [row._asdict() for row in query]
+
+    return shared_worlds.get(world_id, fingerprint, load)
+
+
+def _load_overrides(db: Session, novel_id: int, world_id: int) -> List[ElementOverride]:
+    rows = db.query(WorldOverride).filter(
+        WorldOverride.novel_id == novel_id, WorldOverride.world_id == world_id
+    ).order_by(WorldOverride.id)
+    return [
+        ElementOverride(id=row.id, operation=row.operation, element_id=row.element_id, fields=row.fields or {})
+        for row in rows
+    ]
+
+
+def get_linked_world_id(db: Session, novel_id: int) -> Optional[int]:
+    return db.query(NovelWorld.world_id).filter(NovelWorld.novel_id == novel_id).scalar()
+
+
+def get_linked_novel_ids(db: Session, world_id: int) -> List[int]:
+    """共有の世界観を参照している小説のID"""
+    return [row.novel_id for row in db.query(NovelWorld.novel_id).filter(NovelWorld.world_id == world_id)]
+
+
+async def link_novel(db: Session, novel_id: int, world_id: int) -> NovelWorld:
+    """
+    小説が参照する共有の世界観を設定する
+
+    別の世界観に切り替えた場合、以前の世界観に対する差分は削除する。
+    """
+    link = db.query(NovelWorld).filter(NovelWorld.novel_id == novel_id).first()
+    if link is None:
+        link = NovelWorld(novel_id=novel_id, world_id=world_id)
+        db.add(link)
+    elif link.world_id != world_id:
+        db.query(WorldOverride).filter(WorldOverride.novel_id == novel_id).delete(synchronize_session=False)
+        link.world_id = world_id
+    db.flush()
+    return link
+
+
+def load_novel_world(db: Session, novel_id: int) -> Optional[Tuple[BaseWorld, List[ElementOverride]]]:
+    """
+    小説が参照する共有の世界観と、その小説の差分を返す（スレッドから呼べる同期版）
+
+    Returns:
+        (BaseWorld, 差分の一覧)（世界観が設定されていない場合は None）
+    """
+    world_id = get_linked_world_id(db, novel_id)
+    if world_id is None:
+        return None
+    base = get_base_world(db, world_id)
+    if base is None:
+        return None
+    return base, _load_overrides(db, novel_id, world_id)
+
+
+async def get_novel_world(db: Session, novel_id: int) -> Optional[Tuple[BaseWorld, List[ElementOverride]]]:
+    """小説が参照する共有の世界観と、その小説の差分（load_novel_world を参照）"""
+    return load_novel_world(db, novel_id)
+
+
+async def list_novel_elements(db: Session, novel_id: int) -> Optional[List[Dict]]:
+    """差分を重ねた小説の世界観の要素一覧（世界観が設定されていない場合は None）"""
+    loaded = await get_novel_world(db, novel_id)
+    if loaded is None:
+        return None
+    return merge_elements(*loaded)
+
+
+async def validate_novel_world(db: Session, novel_id: int) -> Optional[Dict]:
+    """差分を重ねた小説の世界観の検証結果（世界観が設定されていない場合は None）"""
+    loaded = await get_novel_world(db, novel_id)
+    if loaded is None:
+        return None
+    return validate_merged(*loaded)
+
+
+def _clean_fields(fields: Dict) -> Dict:
+    return {key: value for key, value in fields.items() if key in ELEMENT_FIELDS}
+
+
+async def override_element(
+    db: Session,
+    novel_id: int,
+    world_id: int,
+    element_id: int,
+    fields: Dict,
+    expected_version: Optional[int] = None
+) -> Optional[WorldOverride]:
+    """
+    共有の要素を小説の中だけで上書きする（共有の要素は変更しない）
+
+    既に上書きがある場合は項目を追加・更新する。
+
+    Returns:
+        WorldOverride（要素が共有の世界観に存在しない場合は None）
+
+    Raises:
+        VersionConflict: expected_version が上書きの現在のバージョンと一致しない場合
+    """
+    exists = db.query(WorldElement.id).filter(
+        WorldElement.id == element_id, WorldElement.world_id == world_id
+    ).first()
+    if exists is None:
+        return None
+
+    fields = _clean_fields(fields)
+    current = db.query(WorldOverride).filter(
+        WorldOverride.novel_id == novel_id, WorldOverride.element_id == element_id
+    ).first()
+    if current is None:
+        override = WorldOverride(
+            novel_id=novel_id, world_id=world_id, element_id=element_id,
+            operation="modify", fields=fields
+        )
+        db.add(override)
+        db.flush()
+        return override
+
+    merged = dict(current.fields or {}) if current.operation == "modify" else {}
+    merged.update(fields)
+    return versioned_update(
+        db,
+        WorldOverride,
+        [WorldOverride.id == current.id],
+        expected_version,
+        {"operation": "modify", "fields": merged}
+    )
+
+
+async def add_novel_element(db: Session, novel_id: int, world_id: int, fields: Dict) -> WorldOverride:
+    """小説だけに存在する要素を追加する"""
+    override = WorldOverride(
+        novel_id=novel_id, world_id=world_id, element_id=None,
+        operation="add", fields=_clean_fields(fields)
+    )
+    db.add(override)
+    db.flush()
+    return override
+
+
+async def hide_element(db: Session, novel_id: int, world_id: int, element_id: int) -> Optional[WorldOverride]:
+    """
+    共有の要素を小説の中だけで非表示にする
+
+    Returns:
+        WorldOverride（要素が共有の世界観に存在しない場合は None）
+    """
+    exists = db.query(WorldElement.id).filter(
+        WorldElement.id == element_id, WorldElement.world_id == world_id
+    ).first()
+    if exists is None:
+        return None
+    override = db.query(WorldOverride).filter(
+        WorldOverride.novel_id == novel_id, WorldOverride.element_id == element_id
+    ).first()
+    if override is None:
+        override = WorldOverride(novel_id=novel_id, world_id=world_id, element_id=element_id)
+        db.add(override)
+    override.operation = "remove"
+    override.fields = None
+    db.flush()
+    return override
+
+
+async def revert_override(db: Session, novel_id: int, override_id: int) -> bool:
+    """差分を削除して共有の状態に戻す（追加した要素の場合は要素を削除する）"""
+    deleted = db.query(WorldOverride).filter(
+        WorldOverride.id == override_id, WorldOverride.novel_id == novel_id
+    ).delete(synchronize_session=False)
+    return bool(deleted)
@@ -0,0 +1,156 @@
+"""
+作中の暦とシーンの時系列
+
+小説ごとの暦の定義を保存し、シーンの time_period を書き込むときに作中の暦で
+通し日数（Scene.time_ordinal）に変換して一緒に保存する。時系列の並べ替えや
+範囲検索は索引付きの整数列で行う。コミットは呼び出し側で行う。
+"""
+
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from app.core.fictional_calendar import FictionalCalendar
+from app.db.versioning import versioned_update
+from app.models.novel import Chapter, Novel, Scene
+
+# 通し日数を計算し直すときに 1 回の UPDATE で更新するシーンの件数
+RECOMPUTE_BATCH_SIZE = 1000
+
+# 小説ID → (暦の定義の JSON, 暦)。定義が変わっていなければ解析し直さない
+_calendars: Dict[int, Tuple[str, FictionalCalendar]] = {}
+_calendars_lock = threading.Lock()
+
+
+def _calendar_for(novel_id: int, config: Optional[Dict]) -> FictionalCalendar:
+    key = json.dumps(config, sort_keys=True, ensure_ascii=False)
+    with _calendars_lock:
+        cached = _calendars.get(novel_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+    calendar = FictionalCalendar.from_dict(config)
+    with _calendars_lock:
+        _calendars[novel_id] = (key, calendar)
+    return calendar
+
+
+def get_calendar(db: Session, novel_id: int) -> FictionalCalendar:
+    """小説の暦を返す（定義がない場合はグレゴリオ暦）"""
+    config = db.query(Novel.calendar).filter(Novel.id == novel_id).scalar()
+    return _calendar_for(novel_id, config)
+
+
+def _novel_scenes(db: Session, novel_id: int):
+    return db.query(Scene).join(Chapter, Chapter.id == Scene.chapter_id).filter(Chapter.novel_id == novel_id)
+
+
+async def set_calendar(db: Session, novel_id: int, config: Optional[Dict]) -> Tuple[FictionalCalendar, int]:
+    """
+    小説の暦を設定し、全シーンの通し日数を計算し直す
+
+    Args:
+        db: データベースセッション
+        novel_id: 小説ID
+        config: 暦の定義（None でグレゴリオ暦に戻す）
+
+    Returns:
+        (暦, 通し日数が変わったシーンの数)
+
+    Raises:
+        CalendarError: 定義が不正な場合
+    """
+    calendar = FictionalCalendar.from_dict(config)
+    normalized = None if calendar.is_default else calendar.to_dict()
+    db.query(Novel).filter(Novel.id == novel_id).update(
+        {Novel.calendar: normalized}, synchronize_session=False
+    )
+    _calendar_for(novel_id, normalized)
+
+    rows = _novel_scenes(db, novel_id).with_entities(Scene.id, Scene.time_period, Scene.time_ordinal)
+    changed = []
+    for row in rows:
+        ordinal = calendar.to_ordinal(row.time_period)
+        if ordinal != row.time_ordinal:
+            changed.append({"scene_id": row.id, "ordinal": ordinal})
+
+    stmt = update(Scene.__table__).where(Scene.__table__.c.id == bindparam("scene_id")).values(
+        time_ordinal=bindparam("ordinal")
+    )
+    for start in range(0, len(changed), RECOMPUTE_BATCH_SIZE):
+        db.execute(stmt, changed[start:start + RECOMPUTE_BATCH_SIZE])
+    return calendar, len(changed)
+
+
+async def set_scene_time(
+    db: Session,
+    novel_id: int,
+    scene_id: int,
+    time_period: Optional[str],
+    expected_version: Optional[int] = None
+) -> Optional[Scene]:
+    """
+    シーンの作中の日付を更新する（通し日数も同時に保存する）
+
+    Returns:
+        更新後のシーン（存在しない場合は None）
+
+    Raises:
+        VersionConflict: expected_version がシーンの現在のバージョンと一致しない場合
+    """
+    ordinal = get_calendar(db, novel_id).to_ordinal(time_period)
+    return versioned_update(
+        db,
+        Scene,
+        [Scene.id == scene_id],
+        expected_version,
+        {"time_period": time_period, "time_ordinal": ordinal}
+    )
+
+
+def _parse_bound(calendar: FictionalCalendar, value: str) -> int:
+    ordinal = calendar.to_ordinal(value)
+    if ordinal is None:
+        raise ValueError(f"Cannot parse date: {value}")
+    return ordinal
+
+
+async def list_scenes_in_range(
+    db: Session,
+    novel_id: int,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: int = 500
+) -> List[Dict]:
+    """
+    作中の日付の範囲に含まれるシーンを時系列順に返す（本文は読み込まない）
+
+    Args:
+        start: 範囲の開始日（作中の暦の表記、省略時は先頭から）
+        end: 範囲の終了日（この日を含む、省略時は末尾まで）
+
+    Raises:
+        ValueError: 日付を作中の暦で解釈できない場合
+    """
+    calendar = get_calendar(db, novel_id)
+    query = _novel_scenes(db, novel_id).with_entities(
+        Scene.id, Scene.chapter_id, Scene.title, Scene.time_period, Scene.time_ordinal
+    ).filter(Scene.time_ordinal.isnot(None))
+    if start is not None:
+        query = query.filter(Scene.time_ordinal >= _parse_bound(calendar, start))
+    if end is not None:
+        query = query.filter(Scene.time_ordinal <= _parse_bound(calendar, end))
+
+    return [
+        {
+            "id": row.id,
+            "chapter_id": row.chapter_id,
+            "title": row.title,
+            "time_period": row.time_period,
+            "time_ordinal": row.time_ordinal,
+            "date": calendar.from_ordinal(row.time_ordinal),
+        }
+        for row in query.order_by(Scene.time_ordinal, Scene.id).limit(limit)
+    ]
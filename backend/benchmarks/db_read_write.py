@@ -0,0 +1,195 @@
+"""
+自動保存が続く中での読み込みスループットの計測
+
+一時ディレクトリの SQLite ファイルにシーンを用意し、複数のスレッドから
+一覧の読み込み（章ごとのシーン一覧と文字数の集計）を繰り返しながら、
+別のスレッドで自動保存を模した書き込み（本文の更新とバージョンの加算）を続ける。
+
+次の 2 つの構成を比較する:
+    shared: ロールバックジャーナル、読み込みと書き込みで 1 つの接続プールを共有する
+    split:  WAL、読み込み用（query_only）と書き込み用で接続プールを分ける
+            （app.db.database.build_sessionmakers と同じ構成）
+
+使い方（backend ディレクトリで実行）:
+    python benchmarks/db_read_write.py
+    python benchmarks/db_read_write.py --readers 16 --writers 2 --seconds 10 --json
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, Text, func, select, update  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.db.database import build_engine, build_sessionmakers  # noqa: E402
+
+metadata = MetaData()
+scenes = Table(
+    "bench_scenes",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("chapter_id", Integer, index=True, nullable=False),
+    Column("title", String(255)),
+    Column("content", Text),
+    Column("word_count", Integer, default=0),
+    Column("version", Integer, default=1),
+)
+
+
+def seed(url: str, chapters: int, scenes_per_chapter: int, wal: bool) -> None:
+    engine = build_engine(url, wal=wal)
+    metadata.create_all(engine)
+    rows = [
+        {
+            "id": chapter * scenes_per_chapter + i + 1,
+            "chapter_id": chapter + 1,
+            "title": f"scene {chapter + 1}-{i + 1}",
+            "content": "本文" * 500,
+            "word_count": 1000,
+            "version": 1,
+        }
+        for chapter in range(chapters)
+        for i in range(scenes_per_chapter)
+    ]
+    with engine.begin() as conn:
+        conn.execute(scenes.insert(), rows)
+    engine.dispose()
+
+
+def run_scenario(mode: str, args) -> Dict:
+    """1 つの構成で読み込みと書き込みを同時に実行し、スループットと待ち時間を返す"""
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        seed(url, args.chapters, args.scenes, wal=mode == "split")
+        if mode == "split":
+            write_sessions, read_sessions = build_sessionmakers(url)
+        else:
+            engine = build_engine(url, wal=False, pool_size=args.readers + args.writers)
+            write_sessions = read_sessions = sessionmaker(bind=engine, autoflush=False)
+
+        stop = threading.Event()
+        read_latencies: List[float] = []
+        write_latencies: List[float] = []
+        errors = {"read": 0, "write": 0}
+        lock = threading.Lock()
+        total_scenes = args.chapters * args.scenes
+
+        def reader(worker: int) -> None:
+            rng = random.Random(worker)
+            local = []
+            while not stop.is_set():
+                chapter_id = rng.randint(1, args.chapters)
+                started = time.perf_counter()
+                db = read_sessions()
+                try:
+                    db.execute(
+                        select(scenes.c.id, scenes.c.title, scenes.c.word_count, scenes.c.version)
+                        .where(scenes.c.chapter_id == chapter_id)
+                        .order_by(scenes.c.id)
+                    ).all()
+                    db.execute(select(func.sum(scenes.c.word_count))).scalar()
+                    local.append(time.perf_counter() - started)
+                except OperationalError:
+                    with lock:
+                        errors["read"] += 1
+                finally:
+                    db.close()
+            with lock:
+                read_latencies.extend(local)
+
+        def writer(worker: int) -> None:
+            rng = random.Random(1000 + worker)
+            local = []
+            while not stop.is_set():
+                scene_id = rng.randint(1, total_scenes)
+                started = time.perf_counter()
+                db = write_sessions()
+                try:
+                    db.execute(
+                        update(scenes).where(scenes.c.id == scene_id).values(
+                            content="本文" * rng.randint(400, 600),
+                            word_count=rng.randint(800, 1200),
+                            version=scenes.c.version + 1
+                        )
+                    )
+                    db.commit()
+                    local.append(time.perf_counter() - started)
+                except OperationalError:
+                    db.rollback()
+                    with lock:
+                        errors["write"] += 1
+                finally:
+                    db.close()
+                time.sleep(args.autosave_interval_ms / 1000)
+            with lock:
+                write_latencies.extend(local)
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+        threads += [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        write_sessions.kw["bind"].dispose()
+        read_sessions.kw["bind"].dispose()
+
+    def percentile(values: List[float], q: int) -> float:
+        if len(values) < 2:
+            return round(sum(values) * 1000, 3)
+        return round(statistics.quantiles(values, n=100)[q - 1] * 1000, 3)
+
+    return {
+        "mode": mode,
+        "readers": args.readers,
+        "writers": args.writers,
+        "reads_per_s": round(len(read_latencies) / args.seconds, 1),
+        "read_p50_ms": percentile(read_latencies, 50),
+        "read_p99_ms": percentile(read_latencies, 99),
+        "writes_per_s": round(len(write_latencies) / args.seconds, 1),
+        "write_p99_ms": percentile(write_latencies, 99),
+        "read_errors": errors["read"],
+        "write_errors": errors["write"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure read throughput under concurrent autosave writes")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--chapters", type=int, default=50)
+    parser.add_argument("--scenes", type=int, default=40, help="章あたりのシーン数")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--autosave-interval-ms", type=float, default=5.0, help="書き込みスレッドが保存の間に待つ時間")
+    parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+    args = parser.parse_args()
+
+    results = [run_scenario(mode, args) for mode in ("shared", "split")]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':>8} {'reads/s':>10} {'read p50':>10} {'read p99':>10} {'writes/s':>10} {'write p99':>10} {'errors':>8}")
+    for r in results:
+        errors = r["read_errors"] + r["write_errors"]
+        print(
+            f"{r['mode']:>8} {r['reads_per_s']:>10} {r['read_p50_ms']:>9}ms {r['read_p99_ms']:>9}ms "
+            f"{r['writes_per_s']:>10} {r['write_p99_ms']:>9}ms {errors:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+エンジン更新の並行性ストレステスト
+
+CharacterEngine.update_relationship を多数のタスクから並行に呼び出し、
+リスナー（永続化を模した読み込み→待機→書き込み）で更新が失われないことと、
+更新対象のキャラクター数に応じてスループットが伸びることを確認する。
+
+比較のため、リスナー全体をグローバルロックで囲んだ場合（全更新を直列化）も計測する。
+
+あわせて、キャラクター・世界観要素の並行作成で、作成の通知が同時に走らないこと、
+作成直後のキャラクターへの更新が作成の通知より先に届かないこと、作成した件数が
+一覧とグラフのバージョンに反映されることを検証する（満たさなければ終了コード 1）。
+
+使い方（backend ディレクトリで実行）:
+    python benchmarks/engine_concurrency.py
+    python benchmarks/engine_concurrency.py --updates 4000 --latency-ms 1 --json
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.character_engine import Character, CharacterEngine  # noqa: E402
+from app.core.world_engine import WorldElement, WorldEngine  # noqa: E402
+
+RELATIONSHIP_TYPES = ["friendship", "romance", "family", "mentor"]
+
+
+class SimulatedStore:
+    """キャラクター単位で関係性を保存する疑似ストレージ
+
+    読み込みと書き込みの間に待機を挟むため、同じキャラクターへの
+    保存が並行すると後勝ちで更新が失われる。
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.rows: Dict[str, Dict] = {}
+
+    async def save(self, event: str, character: Character) -> None:
+        row = copy.deepcopy(self.rows.get(character.id, {}))
+        await asyncio.sleep(self.latency)
+        for target, values in (character.relationships or {}).items():
+            row.setdefault(target, {}).update(values)
+        self.rows[character.id] = row
+
+
+async def run_scenario(
+    characters: int,
+    updates: int,
+    concurrency: int,
+    latency: float,
+    global_lock: bool,
+    seed: int = 0
+) -> Dict:
+    """1 つの条件で更新を実行し、スループットと更新の欠落数を返す"""
+    engine = CharacterEngine()
+    store = SimulatedStore(latency)
+    serialize = asyncio.Lock()
+
+    async def listener(event: str, character: Character) -> None:
+        if global_lock:
+            async with serialize:
+                await store.save(event, character)
+        else:
+            await store.save(event, character)
+
+    ids: List[str] = []
+    for i in range(characters):
+        character = await engine.create_character(name=f"character-{i}")
+        ids.append(character.id)
+    engine.add_listener(listener)
+
+    rng = random.Random(seed)
+    operations = []
+    for _ in range(updates):
+        source = rng.choice(ids)
+        target = rng.choice(ids)
+        operations.append((source, target, rng.choice(RELATIONSHIP_TYPES), round(rng.random(), 3)))
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for op in operations:
+        queue.put_nowait(op)
+
+    async def worker() -> None:
+        while True:
+            try:
+                op = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await engine.update_relationship(*op)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    # エンジンの最終状態とストレージの内容を比較する
+    lost = 0
+    for character_id, character in engine.characters.items():
+        stored = store.rows.get(character_id, {})
+        for target, values in (character.relationships or {}).items():
+            for rel_type, value in values.items():
+                if stored.get(target, {}).get(rel_type) != value:
+                    lost += 1
+
+    return {
+        "characters": characters,
+        "updates": updates,
+        "concurrency": concurrency,
+        "global_lock": global_lock,
+        "elapsed_s": round(elapsed, 4),
+        "updates_per_s": round(updates / elapsed, 1),
+        "lost_writes": lost,
+    }
+
+
+class CreationProbe:
+    """作成の通知の同時実行数と、エンティティごとの通知の順序を記録するリスナー"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.events: Dict[str, List[str]] = {}
+
+    async def __call__(self, event: str, entity) -> None:
+        self.events.setdefault(str(entity.id), []).append(event)
+        if not event.endswith("_created"):
+            return
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+
+async def check_character_creation(count: int, latency: float) -> Dict:
+    """キャラクターを並行に作成し、作成されたものから順にすぐ関係性を更新する"""
+    engine = CharacterEngine()
+    probe = CreationProbe(latency)
+    engine.add_listener(probe)
+
+    creators = asyncio.gather(*(engine.create_character(name=f"character-{i}") for i in range(count)))
+    seen = set()
+    updates = []
+    while not creators.done():
+        for character_id in list(engine.characters):
+            if character_id not in seen:
+                seen.add(character_id)
+                updates.append(asyncio.ensure_future(
+                    engine.update_relationship(character_id, character_id, "friendship", 0.5)
+                ))
+        await asyncio.sleep(0)
+    await creators
+    await asyncio.gather(*updates)
+
+    assert len(engine.characters) == count, f"{len(engine.characters)} characters created, expected {count}"
+    assert engine.graph_version >= count, f"graph_version {engine.graph_version} < {count}"
+    assert probe.max_in_flight == 1, f"{probe.max_in_flight} character creations notified concurrently"
+    out_of_order = [cid for cid, events in probe.events.items() if events[0] != "character_created"]
+    assert not out_of_order, f"{len(out_of_order)} characters were updated before their creation was notified"
+    return {"entity": "character", "created": count, "updated": len(updates)}
+
+
+async def check_world_element_creation(count: int, latency: float) -> Dict:
+    """世界観要素を並行に作成する"""
+    engine = WorldEngine()
+    probe = CreationProbe(latency)
+    engine.add_listener(probe)
+
+    elements: List[WorldElement] = await asyncio.gather(*(
+        engine.create_world_element(name=f"element-{i}", description="", category="place")
+        for i in range(count)
+    ))
+
+    assert len(engine.elements) == count, f"{len(engine.elements)} elements created, expected {count}"
+    assert all(engine.elements[element.id] is element for element in elements)
+    assert probe.max_in_flight == 1, f"{probe.max_in_flight} element creations notified concurrently"
+    assert engine.consistency_cache == {}
+    return {"entity": "world_element", "created": count, "updated": 0}
+
+
+async def main_async(args) -> List[Dict]:
+    results = []
+    for global_lock in (True, False):
+        for characters in args.characters:
+            results.append(await run_scenario(
+                characters=characters,
+                updates=args.updates,
+                concurrency=args.concurrency,
+                latency=args.latency_ms / 1000,
+                global_lock=global_lock
+            ))
+    return results
+
+
+async def creation_checks_async(args) -> List[Dict]:
+    latency = args.latency_ms / 1000
+    return [
+        await check_character_creation(args.creations, latency),
+        await check_world_element_creation(args.creations, latency),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stress test concurrent engine mutations")
+    parser.add_argument("--characters", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--creations", type=int, default=200, help="並行作成の検証で作成する件数")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="疑似ストレージの書き込み待ち時間")
+    parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    try:
+        creations = asyncio.run(creation_checks_async(args))
+    except AssertionError as e:
+        print(f"creation check failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps({"updates": results, "creations": creations}, indent=2))
+    else:
+        print(f"{'lock':>8} {'characters':>10} {'updates/s':>10} {'lost':>6}")
+        for r in results:
+            lock = "global" if r["global_lock"] else "entity"
+            print(f"{lock:>8} {r['characters']:>10} {r['updates_per_s']:>10} {r['lost_writes']:>6}")
+        for r in creations:
+            print(f"creation check passed: {r['created']} {r['entity']}s")
+
+    if any(r["lost_writes"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,546 @@
+"""
+API の負荷試験
+
+ローカルの SQLite（または Postgres 互換のデータベース）に合成データを投入し、
+アプリケーションをプロセス内の uvicorn で起動したうえで、複数の編集者を
+模した並行クライアントからシナリオを実行する。ルートごとの p50 / p95 / p99
+レイテンシとスループットを JSON で出力するため、実行結果同士を比較できる。
+
+シナリオ:
+    autosave         シーン本文への追記保存（PUT /scenes/{id}/content）
+    list_characters  キャラクター一覧の取得
+    world_crud       世界観の取得・更新と要素一覧の取得
+    consistency      整合性チェックの実行
+    progress         進捗ダッシュボードの取得
+
+認証は負荷試験用に差し替え、リクエストヘッダー x-loadtest-user の
+ユーザーとして扱う。
+
+使い方（backend ディレクトリで実行）:
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --concurrency 64 --duration 60 \\
+        --mix autosave=60,list_characters=15,world_crud=10,consistency=5,progress=10 \\
+        --output var/loadtest/run.json
+    python benchmarks/load_test.py --database-url postgresql://localhost/novelspec_load
+    python benchmarks/load_test.py --database-url postgresql://localhost/novelspec_load --reset-schema
+    python benchmarks/load_test.py --compare var/loadtest/before.json
+
+--database-url を指定した場合、既存のテーブルは削除しない（テーブルがなければ作成し、
+空のテーブルにだけ投入する）。作り直す場合は --reset-schema を指定する。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+DEFAULT_MIX = "autosave=50,list_characters=15,world_crud=15,consistency=10,progress=10"
+USER_HEADER = "x-loadtest-user"
+
+SENTENCES = [
+    "風が丘の上を渡っていった。",
+    "彼女は振り返らずに歩き続けた。",
+    "The lanterns flickered as the caravan crossed the bridge.",
+    "「まだ終わっていない」と老人は言った。",
+    "Somewhere below, the river kept its own counsel.",
+]
+
+
+# --- 合成データ ---
+
+@dataclass
+class SeededNovel:
+    """投入した小説 1 つ分のID"""
+    novel_id: int
+    author_id: int
+    world_id: int
+    scene_ids: List[int]
+
+
+def _filler(column, index: int):
+    """必須列に入れる合成値"""
+    from sqlalchemy import Boolean, Date, DateTime, Enum, Integer, Numeric
+
+    kind = column.type
+    if isinstance(kind, Enum):
+        return kind.enums[0]
+    if isinstance(kind, Boolean):
+        return True
+    if isinstance(kind, (Integer, Numeric)):
+        return index
+    if isinstance(kind, DateTime):
+        return datetime.utcnow()
+    if isinstance(kind, Date):
+        return datetime.utcnow().date()
+    return f"loadtest-{column.name}-{index}"
+
+
+def _insert(db, model, rows: List[Dict]) -> None:
+    """必須列を補完して一括挿入する（モデル独自の __init__ を通さない）"""
+    table = model.__table__
+    required = [
+        c for c in table.columns
+        if not c.nullable and c.default is None and c.server_default is None and not c.primary_key
+    ]
+    for index, row in enumerate(rows):
+        for column in required:
+            if column.name not in row:
+                row[column.name] = _filler(column, row.get("id", index))
+    db.execute(table.insert(), rows)
+
+
+def prepare_database(url: str, novels: int, chapters: int, scenes: int,
+                     characters: int, elements: int, seed: int,
+                     reset_schema: bool = False) -> List[SeededNovel]:
+    """
+    スキーマを作成して合成データを投入する
+
+    reset_schema が False の場合はテーブルを削除せず、投入先のテーブルに
+    行が残っていれば中止する（既存のデータベースを誤って消さないため）
+
+    Raises:
+        SystemExit: reset_schema なしで投入先のテーブルが空でない場合
+    """
+    from sqlalchemy import func, select
+
+    from app.db.database import SessionLocal, engine
+    from app.models.character import Character
+    from app.models.novel import Chapter, Novel, Scene
+    from app.models.progress import WordCountEvent
+    from app.models.user import User
+    from app.models.world import World, WorldElement
+
+    models = [User, Novel, Chapter, Scene, Character, World, WorldElement, WordCountEvent]
+    for metadata in {model.metadata for model in models}:
+        if reset_schema:
+            metadata.drop_all(engine)
+        metadata.create_all(engine)
+
+    if not reset_schema:
+        with engine.connect() as connection:
+            occupied = [
+                model.__tablename__ for model in models
+                if connection.execute(select(func.count()).select_from(model.__table__)).scalar()
+            ]
+        if occupied:
+            raise SystemExit(
+                f"Refusing to seed {url}: tables already contain rows ({', '.join(occupied)}). "
+                "Use an empty database or pass --reset-schema to drop and recreate the tables."
+            )
+
+    rng = random.Random(seed)
+    db = SessionLocal()
+    seeded = []
+    try:
+        next_chapter = next_scene = next_character = next_element = 1
+        for n in range(1, novels + 1):
+            _insert(db, User, [{"id": n}])
+            _insert(db, Novel, [{
+                "id": n, "title": f"Load test novel {n}", "author_id": n,
+                "target_word_count": 80000, "current_word_count": 0,
+            }])
+            _insert(db, World, [{
+                "id": n, "name": f"World {n}", "title": f"World {n}",
+                "description": "合成データの世界観", "created_by": n, "version": 1,
+            }])
+            _insert(db, WorldElement, [
+                {"id": next_element + i, "world_id": n, "name": f"Element {next_element + i}",
+                 "category": rng.choice(["geography", "culture", "history"]),
+                 "description": "要素の説明", "version": 1}
+                for i in range(elements)
+            ])
+            next_element += elements
+            _insert(db, Character, [
+                {"id": next_character + i, "name": f"Character {next_character + i}",
+                 "personality": "勇敢", "version": 1}
+                for i in range(characters)
+            ])
+            next_character += characters
+
+            chapter_rows, scene_rows = [], []
+            for c in range(chapters):
+                chapter_rows.append({
+                    "id": next_chapter, "novel_id": n, "title": f"Chapter {c + 1}",
+                    "order": c, "current_word_count": 0, "version": 1,
+                })
+                for s in range(scenes):
+                    text = " ".join(rng.choice(SENTENCES) for _ in range(40))
+                    scene_rows.append({
+                        "id": next_scene, "chapter_id": next_chapter, "title": f"Scene {s + 1}",
+                        "order": s, "content": text, "word_count": len(text.split()), "version": 1,
+                    })
+                    next_scene += 1
+                next_chapter += 1
+            _insert(db, Chapter, chapter_rows)
+            _insert(db, Scene, scene_rows)
+            seeded.append(SeededNovel(
+                novel_id=n, author_id=n, world_id=n, scene_ids=[row["id"] for row in scene_rows]
+            ))
+        db.commit()
+    finally:
+        db.close()
+    return seeded
+
+
+# --- サーバー ---
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int):
+    """アプリケーションをプロセス内の uvicorn で起動する"""
+    import uvicorn
+    from fastapi import Request
+    from types import SimpleNamespace
+
+    from app.main import create_app
+
+    app = create_app()
+
+    async def loadtest_user(request: Request):
+        return SimpleNamespace(id=int(request.headers.get(USER_HEADER, "1")))
+
+    for module_path in ("app.core.security", "app.core.auth"):
+        try:
+            module = __import__(module_path, fromlist=["get_current_user"])
+        except ImportError:
+            continue
+        app.dependency_overrides[module.get_current_user] = loadtest_user
+
+    server = uvicorn.Server(uvicorn.Config(
+        app, host="127.0.0.1", port=port, log_level="warning", access_log=False
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline or not thread.is_alive():
+            raise RuntimeError("Server did not start")
+        time.sleep(0.05)
+    return server, thread
+
+
+# --- シナリオ ---
+
+@dataclass
+class Recorder:
+    """ルートごとのレイテンシと状態コードを記録する"""
+    recording: bool = False
+    latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    statuses: Dict[str, Dict[str, int]] = field(default_factory=lambda: defaultdict(lambda: defaultdict(int)))
+
+    async def request(self, client, route: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = str(response.status_code)
+        except Exception as e:
+            response = None
+            status = type(e).__name__
+        elapsed = time.perf_counter() - started
+        if self.recording:
+            self.latencies[route].append(elapsed)
+            self.statuses[route][status] += 1
+        return response
+
+
+@dataclass
+class Editor:
+    """1 人の編集者（仮想ユーザー）の状態"""
+    novel: SeededNovel
+    scene_id: int
+    rng: random.Random
+    scene_version: Optional[int] = None
+    draft: str = ""
+
+
+async def autosave(client, recorder: Recorder, editor: Editor) -> None:
+    editor.draft += editor.rng.choice(SENTENCES)
+    response = await recorder.request(
+        client, "PUT /scenes/{id}/content", "PUT", f"/api/scenes/{editor.scene_id}/content",
+        json={"content": editor.draft, "version": editor.scene_version},
+        headers={USER_HEADER: str(editor.novel.author_id)}
+    )
+    if response is None:
+        return
+    if response.status_code == 200:
+        editor.scene_version = response.json()["version"]
+    elif response.status_code == 409:
+        editor.scene_version = response.json()["detail"].get("version")
+
+
+async def list_characters(client, recorder: Recorder, editor: Editor) -> None:
+    await recorder.request(
+        client, "GET /characters/list/{id}", "GET", f"/api/characters/list/{editor.novel.novel_id}",
+        headers={USER_HEADER: str(editor.novel.author_id)}
+    )
+
+
+async def world_crud(client, recorder: Recorder, editor: Editor) -> None:
+    headers = {USER_HEADER: str(editor.novel.author_id)}
+    world_id = editor.novel.world_id
+    await recorder.request(client, "GET /worlds/{id}", "GET", f"/api/worlds/{world_id}", headers=headers)
+    await recorder.request(
+        client, "PUT /worlds/{id}", "PUT", f"/api/worlds/{world_id}", headers=headers,
+        json={"title": f"World {world_id}", "description": editor.rng.choice(SENTENCES)}
+    )
+    await recorder.request(
+        client, "GET /worlds/elements/{id}", "GET", f"/api/worlds/elements/{world_id}", headers=headers
+    )
+
+
+async def consistency(client, recorder: Recorder, editor: Editor) -> None:
+    await recorder.request(
+        client, "GET /consistency/novels/{id}", "GET", f"/api/consistency/novels/{editor.novel.novel_id}",
+        headers={USER_HEADER: str(editor.novel.author_id)}
+    )
+
+
+async def progress(client, recorder: Recorder, editor: Editor) -> None:
+    await recorder.request(
+        client, "GET /progress/novels/{id}", "GET", f"/api/progress/novels/{editor.novel.novel_id}",
+        headers={USER_HEADER: str(editor.novel.author_id)}
+    )
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "autosave": autosave,
+    "list_characters": list_characters,
+    "world_crud": world_crud,
+    "consistency": consistency,
+    "progress": progress,
+}
+
+
+def parse_mix(text: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {name} (choose from {', '.join(SCENARIOS)})")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+async def run_load(base_url: str, novels: List[SeededNovel], args) -> Tuple[Recorder, float, Dict[str, int]]:
+    """並行クライアントでシナリオを実行する"""
+    import httpx
+
+    # アプリケーション側の basicConfig でリクエストごとのログが出るのを抑える
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    mix = parse_mix(args.mix)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    recorder = Recorder()
+    executed: Dict[str, int] = defaultdict(int)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        editors = []
+        for i in range(args.concurrency):
+            novel = novels[i % len(novels)]
+            rng = random.Random(args.seed + i)
+            editors.append(Editor(novel=novel, scene_id=rng.choice(novel.scene_ids), rng=rng))
+
+        stop_at = time.perf_counter() + args.warmup + args.duration
+
+        async def editor_loop(editor: Editor) -> None:
+            while time.perf_counter() < stop_at:
+                name = editor.rng.choices(names, weights)[0]
+                await SCENARIOS[name](client, recorder, editor)
+                if recorder.recording:
+                    executed[name] += 1
+                if args.think_ms:
+                    await asyncio.sleep(editor.rng.uniform(0, 2 * args.think_ms) / 1000)
+
+        async def start_recording() -> float:
+            await asyncio.sleep(args.warmup)
+            recorder.recording = True
+            return time.perf_counter()
+
+        recording_task = asyncio.create_task(start_recording())
+        await asyncio.gather(*(editor_loop(editor) for editor in editors))
+        elapsed = time.perf_counter() - await recording_task
+
+    return recorder, elapsed, dict(executed)
+
+
+# --- 集計 ---
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """最近傍順位法によるパーセンタイル"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(p / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(values: List[float], statuses: Dict[str, int], elapsed: float) -> Dict:
+    values = sorted(values)
+    ok = sum(count for status, count in statuses.items() if status.isdigit() and int(status) < 400)
+    return {
+        "requests": len(values),
+        "errors": len(values) - ok,
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(values, 50) * 1000, 2),
+            "p95": round(percentile(values, 95) * 1000, 2),
+            "p99": round(percentile(values, 99) * 1000, 2),
+            "mean": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+            "max": round(values[-1] * 1000, 2) if values else 0.0,
+        },
+        "status": dict(sorted(statuses.items())),
+    }
+
+
+def build_report(recorder: Recorder, elapsed: float, executed: Dict[str, int], args, database_url: str) -> Dict:
+    routes = {
+        route: summarize(values, recorder.statuses[route], elapsed)
+        for route, values in sorted(recorder.latencies.items())
+    }
+    all_values = [v for values in recorder.latencies.values() for v in values]
+    all_statuses: Dict[str, int] = defaultdict(int)
+    for statuses in recorder.statuses.values():
+        for status, count in statuses.items():
+            all_statuses[status] += count
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        commit = None
+
+    return {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": database_url.split("@")[-1],
+            "config": {
+                "concurrency": args.concurrency,
+                "duration_s": args.duration,
+                "warmup_s": args.warmup,
+                "think_ms": args.think_ms,
+                "mix": args.mix,
+                "novels": args.novels,
+                "chapters": args.chapters,
+                "scenes": args.scenes,
+                "characters": args.characters,
+                "elements": args.elements,
+                "seed": args.seed,
+            },
+        },
+        "elapsed_s": round(elapsed, 3),
+        "scenarios": executed,
+        "total": summarize(all_values, all_statuses, elapsed),
+        "routes": routes,
+    }
+
+
+def print_table(report: Dict, baseline: Optional[Dict] = None) -> None:
+    out = sys.stderr
+    header = f"{'route':<32} {'req':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    if baseline:
+        header += f" {'p95 Δ%':>8}"
+    print(header, file=out)
+    rows = list(report["routes"].items()) + [("TOTAL", report["total"])]
+    for route, r in rows:
+        lat = r["latency_ms"]
+        line = (f"{route:<32} {r['requests']:>7} {r['errors']:>5} {r['throughput_rps']:>8} "
+                f"{lat['p50']:>8} {lat['p95']:>8} {lat['p99']:>8}")
+        if baseline:
+            before = baseline["total"] if route == "TOTAL" else baseline["routes"].get(route)
+            if before and before["latency_ms"]["p95"]:
+                change = (lat["p95"] - before["latency_ms"]["p95"]) / before["latency_ms"]["p95"] * 100
+                line += f" {change:>+8.1f}"
+        print(line, file=out)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the NovelSpec API")
+    parser.add_argument("--database-url", help="接続先（省略時は一時ディレクトリの SQLite）")
+    parser.add_argument(
+        "--reset-schema", action="store_true",
+        help="--database-url のテーブルを削除して作り直す（一時データベースでは常に作り直す）"
+    )
+    parser.add_argument("--base-url", help="起動済みのインスタンスに対して実行する（データは --database-url に投入）")
+    parser.add_argument("--concurrency", type=int, default=32, help="同時に操作する編集者の数")
+    parser.add_argument("--duration", type=float, default=20.0, help="計測時間（秒）")
+    parser.add_argument("--warmup", type=float, default=3.0, help="計測前のウォームアップ時間（秒）")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="操作間の平均待ち時間（ミリ秒）")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="シナリオ=重み のカンマ区切り")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--novels", type=int, default=8)
+    parser.add_argument("--chapters", type=int, default=20)
+    parser.add_argument("--scenes", type=int, default=5, help="章あたりのシーン数")
+    parser.add_argument("--characters", type=int, default=50, help="小説あたりのキャラクター数")
+    parser.add_argument("--elements", type=int, default=100, help="世界観あたりの要素数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="結果の JSON を書き出すパス（省略時は標準出力）")
+    parser.add_argument("--compare", help="比較対象の結果 JSON（p95 の変化率を表示する）")
+    args = parser.parse_args()
+
+    database_url = args.database_url or (
+        f"sqlite:///{Path(tempfile.mkdtemp(prefix='novelspec-load-')) / 'load.db'}"
+    )
+    # アプリケーションのモジュールを読み込む前に接続先を設定する
+    os.environ["NOVELSPEC_DATABASE_URL"] = database_url
+
+    novels = prepare_database(
+        database_url, args.novels, args.chapters, args.scenes,
+        args.characters, args.elements, args.seed,
+        reset_schema=args.reset_schema or args.database_url is None
+    )
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        port = _free_port()
+        server, thread = start_server(port)
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        recorder, elapsed, executed = asyncio.run(run_load(base_url, novels, args))
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+    report = build_report(recorder, elapsed, executed, args, database_url)
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_table(report, baseline)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
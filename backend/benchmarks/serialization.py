@@ -0,0 +1,86 @@
+"""
+一覧レスポンスのシリアライズ性能の比較
+
+FastAPI の既定の経路（orm_mode の from_orm → jsonable_encoder → json.dumps）と、
+app.core.responses の経路（orm_to_dict → dumps）で、同じ件数の ORM 風オブジェクトを
+シリアライズする時間を比較する。NDJSON については先頭行を得るまでの時間も計測する。
+
+使い方（backend ディレクトリで実行）:
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --sizes 1000 10000 100000 --json
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.core import responses  # noqa: E402
+from app.schemas.world import WorldElementResponse  # noqa: E402
+
+
+def make_rows(count: int) -> List[SimpleNamespace]:
+    now = datetime.utcnow()
+    return [
+        SimpleNamespace(
+            id=i, world_id=1, name=f"要素{i}", category="geography",
+            description="山脈と河川に囲まれた王国の首都" * 4, details=None,
+            version=1, created_at=now, updated_at=now
+        )
+        for i in range(count)
+    ]
+
+
+def measure(rows: List[SimpleNamespace]) -> Dict:
+    started = time.perf_counter()
+    baseline = json.dumps(
+        jsonable_encoder([WorldElementResponse.from_orm(row) for row in rows]), ensure_ascii=False
+    ).encode("utf-8")
+    baseline_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fast = responses.dumps(responses.serialize_many(rows, WorldElementResponse))
+    fast_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    stream = responses.iter_ndjson(iter(rows), WorldElementResponse)
+    next(stream)
+    first_line_s = time.perf_counter() - started
+
+    return {
+        "rows": len(rows),
+        "encoder": "orjson" if responses.orjson is not None else "json",
+        "orm_mode_s": round(baseline_s, 4),
+        "fast_s": round(fast_s, 4),
+        "speedup": round(baseline_s / fast_s, 2) if fast_s else None,
+        "bytes": len(fast),
+        "baseline_bytes": len(baseline),
+        "ndjson_first_line_ms": round(first_line_s * 1000, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare list response serialization paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+    args = parser.parse_args()
+
+    results = [measure(make_rows(size)) for size in args.sizes]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'rows':>8} {'orm_mode s':>11} {'fast s':>8} {'speedup':>8} {'ndjson 1st ms':>14}")
+    for r in results:
+        print(f"{r['rows']:>8} {r['orm_mode_s']:>11} {r['fast_s']:>8} {r['speedup']:>8} {r['ndjson_first_line_ms']:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+起動時間ベンチマーク
+
+新しいインタプリタで `python -X importtime` を使ってアプリケーションを読み込み、
+モジュールごとのインポート時間と create_app / ウォームアップの所要時間を計測する。
+
+使い方（backend ディレクトリで実行）:
+    python benchmarks/startup_imports.py --top 25
+    python benchmarks/startup_imports.py --json > startup.json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# 子プロセスで実行するスクリプト。計測結果は最終行に JSON で出力する
+CHILD_SCRIPT = """
+import asyncio, json, time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+warmup = {}
+if WITH_WARMUP:
+    from app.core.warmup import warmup_manager
+    asyncio.run(warmup_manager.run())
+    warmup = warmup_manager.status()
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "warmup_ms": (t2 - t1) * 1000, "warmup": warmup}))
+"""
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    -X importtime の出力を解析する
+
+    Args:
+        stderr: 子プロセスの標準エラー出力
+
+    Returns:
+        モジュールごとの self / cumulative 時間（マイクロ秒）のリスト
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            _, timings = line.split(":", 1)
+            self_us, cumulative_us, name = timings.split("|", 2)
+            entries.append({
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip())) // 2,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us)
+            })
+        except ValueError:
+            continue
+    return entries
+
+
+def run_benchmark(with_warmup: bool) -> Dict:
+    """子プロセスでアプリケーションを読み込み、計測結果を返す"""
+    script = CHILD_SCRIPT.replace("WITH_WARMUP", "True" if with_warmup else "False")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    if proc.returncode != 0:
+        tail = "\n".join(proc.stderr.splitlines()[-20:])
+        raise RuntimeError(f"Failed to import application:\n{tail}")
+
+    summary = json.loads(proc.stdout.strip().splitlines()[-1])
+    modules = parse_importtime(proc.stderr)
+    app_modules = [m for m in modules if m["module"].split(".")[0] == "app"]
+    return {
+        **summary,
+        "module_count": len(modules),
+        "modules": modules,
+        "app_modules": app_modules
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure application startup time")
+    parser.add_argument("--top", type=int, default=20, help="表示する上位モジュール数")
+    parser.add_argument("--runs", type=int, default=3, help="計測回数（中央値を採用）")
+    parser.add_argument("--no-warmup", action="store_true", help="ウォームアップを計測しない")
+    parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+    args = parser.parse_args()
+
+    results = [run_benchmark(not args.no_warmup) for _ in range(args.runs)]
+    results.sort(key=lambda r: r["import_ms"])
+    median = results[len(results) // 2]
+    top = sorted(median["modules"], key=lambda m: m["self_us"], reverse=True)[:args.top]
+
+    if args.json:
+        print(json.dumps({
+            "runs": args.runs,
+            "import_ms": median["import_ms"],
+            "warmup_ms": median["warmup_ms"],
+            "module_count": median["module_count"],
+            "top_self": top,
+            "app_modules": median["app_modules"],
+            "warmup": median["warmup"]
+        }, ensure_ascii=False, indent=2))
+        return
+
+    print(f"import app.main: {median['import_ms']:.1f} ms ({median['module_count']} modules, median of {args.runs})")
+    if not args.no_warmup:
+        print(f"warmup:          {median['warmup_ms']:.1f} ms")
+    print()
+    print(f"{'self [ms]':>10} {'cumulative [ms]':>16}  module")
+    for m in top:
+        print(f"{m['self_us'] / 1000:>10.2f} {m['cumulative_us'] / 1000:>16.2f}  {m['module']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+物語構造の保存・読み込みの計測
+
+プロット要素・章・キャラクター・タイムラインを持つ StoryStructure を生成し、
+次の 2 つの方法で保存（変換）と読み込みにかかる時間と大きさを比較する:
+    json:   StoryStructure.json() / StoryStructure.parse_raw()（pydantic の検証あり）
+    binary: NovelEngine.dump_structure() / decode_structure()（app.core.structure_codec）
+
+あわせて、StructureView で列を展開せずに参照した場合（タイムラインの通し日数の
+最大値とプロット要素の order の合計）の時間も計測する。
+
+使い方（backend ディレクトリで実行）:
+    python benchmarks/structure_codec.py
+    python benchmarks/structure_codec.py --plot-elements 20000 --timeline 50000 --json
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.novel_engine import PlotElement, StoryStructure  # noqa: E402
+from app.core.structure_codec import StructureView, decode_structure, encode_structure  # noqa: E402
+
+
+def build_structure(args) -> StoryStructure:
+    rng = random.Random(42)
+    now = datetime(2024, 1, 1)
+    chapters = [
+        {
+            "id": str(i + 1),
+            "title": f"第{i + 1}章",
+            "description": "章の概要" * 5,
+            "order": i,
+            "characters": [f"人物{rng.randint(1, args.characters)}" for _ in range(5)],
+        }
+        for i in range(args.chapters)
+    ]
+    plot_elements = [
+        PlotElement(
+            id=f"plot-{i}",
+            title=f"出来事{i % 500}",
+            description="プロットの説明" * rng.randint(1, 8),
+            order=i,
+            sort_key=f"a{i:06d}",
+            chapter_id=str(rng.randint(1, args.chapters)),
+            created_at=now + timedelta(minutes=i),
+            updated_at=now + timedelta(minutes=i, seconds=30),
+        )
+        for i in range(args.plot_elements)
+    ]
+    characters = [
+        {"name": f"人物{i + 1}", "age": rng.randint(10, 80), "traits": ["勇敢", "慎重"], "height": 150 + rng.random() * 40}
+        for i in range(args.characters)
+    ]
+    timeline = [
+        {
+            "id": f"scene-{i}",
+            "scene_id": i,
+            "chapter_id": str(rng.randint(1, args.chapters)),
+            "title": f"シーン{i}",
+            "date": f"20{rng.randint(10, 30)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "ordinal": 730000 + rng.randint(0, 7000),
+        }
+        for i in range(args.timeline)
+    ]
+    world_building = {
+        "rules": [{"name": f"rule-{i}", "condition": "魔法は夜にだけ使える"} for i in range(50)],
+        "elements": [],
+    }
+    return StoryStructure(
+        plot_elements=plot_elements,
+        chapters=chapters,
+        characters=characters,
+        world_building=world_building,
+        timeline=timeline,
+    )
+
+
+def best_ms(fn: Callable, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return round(min(times) * 1000, 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare JSON and binary story structure serialization")
+    parser.add_argument("--plot-elements", type=int, default=5000)
+    parser.add_argument("--chapters", type=int, default=200)
+    parser.add_argument("--characters", type=int, default=300)
+    parser.add_argument("--timeline", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+    args = parser.parse_args()
+
+    structure = build_structure(args)
+    json_data = structure.json().encode("utf-8")
+    binary_data = encode_structure(structure)
+    assert decode_structure(binary_data, StoryStructure, PlotElement).dict() == structure.dict()
+
+    def scan_view() -> Dict:
+        view = StructureView(binary_data)
+        ordinals = view.column("timeline_ordinal")
+        return {"max_ordinal": max(ordinals) if len(ordinals) else None, "order_sum": sum(view.column("plot_order"))}
+
+    results = [
+        {
+            "format": "json",
+            "bytes": len(json_data),
+            "save_ms": best_ms(structure.json, args.repeat),
+            "load_ms": best_ms(lambda: StoryStructure.parse_raw(json_data), args.repeat),
+            "scan_ms": best_ms(lambda: json.loads(json_data)["timeline"], args.repeat),
+        },
+        {
+            "format": "binary",
+            "bytes": len(binary_data),
+            "save_ms": best_ms(lambda: encode_structure(structure), args.repeat),
+            "load_ms": best_ms(lambda: decode_structure(binary_data, StoryStructure, PlotElement), args.repeat),
+            "scan_ms": best_ms(scan_view, args.repeat),
+        },
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'format':>8} {'size':>12} {'save':>10} {'load':>10} {'scan':>10}")
+    for r in results:
+        print(f"{r['format']:>8} {r['bytes']:>12,} {r['save_ms']:>8}ms {r['load_ms']:>8}ms {r['scan_ms']:>8}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -39,6 +39,29 @@ export interface CreateCharacterInput {
 // キャラクター更新用の入力型
 export type UpdateCharacterInput = Partial<CreateCharacterInput>;
 
+// サーバー側で計算した関係性グラフのレイアウト
+export interface RelationshipLayout {
+  version: number;
+  method: 'force' | 'stress';
+  ids: string[];
+  // ids と同じ順の [x0, y0, x1, y1, ...]（[-1, 1] に正規化済み）
+  coords: Float32Array;
+  // ids の添字の組の平坦な配列 [a0, b0, a1, b1, ...]
+  edges: number[];
+  weights: number[];
+  incremental: boolean;
+}
+
+// base64 の float32（リトルエンディアン）配列を復元する
+const decodeFloat32 = (encoded: string): Float32Array => {
+  const binary = atob(encoded);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return new Float32Array(bytes.buffer);
+};
+
 // キャラクターAPI関連の関数を含むオブジェクト
 export const charactersApi = {
   // 全てのキャラクターを取得
@@ -112,6 +135,23 @@ export const charactersApi = {
     }
   },
 
+  // 関係性グラフのレイアウトを取得（座標の計算はサーバー側で行う）
+  async getRelationshipLayout(
+    novelId: string,
+    method: 'force' | 'stress' = 'force'
+  ): Promise<RelationshipLayout> {
+    try {
+      const response = await axios.get(`${API_BASE_URL}/api/characters/engine/${novelId}/layout`, {
+        params: { method, encoding: 'base64' },
+      });
+      const { coords_b64, ...rest } = response.data;
+      return { ...rest, coords: decodeFloat32(coords_b64) };
+    } catch (error) {
+      console.error(`Error fetching relationship layout for novel ${novelId}:`, error);
+      throw error;
+    }
+  },
+
   // キャラクターの検索
   async searchCharacters(query: string): Promise<Character[]> {
     try {
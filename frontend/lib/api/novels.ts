@@ -29,6 +29,52 @@ export interface NovelMetadata {
   language: string;
 }
 
+// ダッシュボード向けの概要（取得しなかった項目は含まれない）
+export type NovelOverviewSection = 'novel' | 'characters' | 'world' | 'chapters' | 'progress';
+
+export interface NovelOverview {
+  novel?: Record<string, any> | null;
+  characters?: Record<string, any>[] | null;
+  world?: {
+    id: number;
+    name: string;
+    element_count: number;
+    categories: Record<string, number>;
+  } | null;
+  chapters?: Record<string, any>[] | null;
+  progress?: Record<string, any> | null;
+  errors?: Partial<Record<NovelOverviewSection, string>>;
+  generated_at: string;
+  cached: boolean;
+}
+
+export interface NovelOverviewOptions {
+  // 取得する項目（省略時はすべて）
+  include?: NovelOverviewSection[];
+  // 項目ごとのフィールド（例: { chapters: ['title', 'scene_count'] }）
+  fields?: Partial<Record<'novel' | 'characters' | 'chapters', string[]>>;
+  // サーバーのキャッシュを使う
+  cached?: boolean;
+}
+
+// 概要のクエリパラメータを組み立てる
+export function buildOverviewParams(options: NovelOverviewOptions = {}) {
+  const params: Record<string, string | boolean> = {};
+  if (options.include?.length) {
+    params.include = options.include.join(',');
+  }
+  const fields = Object.entries(options.fields || {}).flatMap(([section, names]) =>
+    (names || []).map((name) => `${section}.${name}`)
+  );
+  if (fields.length) {
+    params.fields = fields.join(',');
+  }
+  if (options.cached) {
+    params.cached = true;
+  }
+  return params;
+}
+
 // APIクライアントの設定
 const api = axios.create({
   baseURL: `${API_BASE_URL}/api/novels`,
@@ -68,6 +114,14 @@ export const novelsApi = {
     await api.delete(`/${id}`);
   },
 
+  // 小説・キャラクター・世界観・章の集計・進捗をまとめて取得
+  async getOverview(id: string, options: NovelOverviewOptions = {}) {
+    const response = await api.get<NovelOverview>(`/${id}/overview`, {
+      params: buildOverviewParams(options),
+    });
+    return response.data;
+  },
+
   // チャプター関連の操作
   chapters: {
     // チャプター一覧の取得
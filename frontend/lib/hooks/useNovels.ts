@@ -1,6 +1,15 @@
 import useSWR, { mutate } from 'swr';
 import { useState } from 'react';
-import { fetchNovels, createNovel, updateNovel, deleteNovel } from '../api/novels';
+import {
+  fetchNovels,
+  createNovel,
+  updateNovel,
+  deleteNovel,
+  novelsApi,
+  buildOverviewParams,
+  NovelOverview,
+  NovelOverviewOptions,
+} from '../api/novels';
 
 export interface Novel {
   id: string;
@@ -94,4 +103,40 @@ export const useNovels = (): UseNovelsReturn => {
   };
 };
 
-export default useNovels;
\ No newline at end of file
+interface UseNovelOverviewReturn {
+  overview: NovelOverview | undefined;
+  isLoading: boolean;
+  error: Error | null;
+  refreshOverview: () => Promise<NovelOverview | undefined>;
+}
+
+/**
+ * ダッシュボード向けの小説の概要を 1 回のリクエストで取得するフック
+ * @param novelId - 小説ID（未指定の場合は取得しない）
+ * @param options - 取得する項目・フィールドとキャッシュの使用
+ */
+export const useNovelOverview = (
+  novelId?: string,
+  options: NovelOverviewOptions = {}
+): UseNovelOverviewReturn => {
+  // 同じ項目・フィールドの指定は同じキーにまとめる
+  const key = novelId
+    ? `/api/novels/${novelId}/overview?${new URLSearchParams(
+        buildOverviewParams(options) as Record<string, string>
+      ).toString()}`
+    : null;
+
+  const { data: overview, error, isLoading, mutate: mutateOverview } = useSWR<NovelOverview>(
+    key,
+    () => novelsApi.getOverview(novelId as string, options)
+  );
+
+  return {
+    overview,
+    isLoading,
+    error: error || null,
+    refreshOverview: () => mutateOverview(),
+  };
+};
+
+export default useNovels;